@@ -0,0 +1,292 @@
+"""Headless HTTP/JSON and Server-Sent Events API for the assistant.
+
+Exposes chat and direct tool invocation through the same routing, cache,
+scheduler and tool handlers as the Streamlit app, on an asyncio (aiohttp)
+server. Gemini, openrouteservice and PostgreSQL are called without blocking
+the event loop; hardware, media and file tools run in a worker thread pool,
+and long-running tools become background jobs.
+
+Run:
+    python api_server.py [--host 127.0.0.1] [--port 8080]
+
+Endpoints:
+    GET    /health
+    GET    /tools                  Tool declarations
+    POST   /tools/{name}           {"arguments": {...}, "session_id": "..."} -> reply
+    POST   /chat                   {"prompt": "...", "session_id": "..."} -> function call and reply
+    POST   /chat/stream            Same as /chat, streamed as Server-Sent Events
+    GET    /jobs/{id}              Background job status and result
+    GET    /jobs/{id}/events       Job progress as Server-Sent Events
+    DELETE /jobs/{id}              Cancel a job
+    GET    /exports/{file}         Download a finished Telegram export
+    GET    /metrics                Prometheus metrics
+"""
+import argparse
+import asyncio
+import functools
+import json
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web, ClientSession
+
+from config import (GOOGLE_API_KEY, GEMINI_MODEL, DB_CONFIG, API_HOST, API_PORT, API_WORKER_THREADS,
+                    API_DB_POOL_SIZE, API_MAX_SESSIONS, API_SSE_INTERVAL, EXPORT_DIR)
+from utils.dispatch_util import resolve_prompt_async, dispatch_function_call_async, TOOL_HANDLERS
+from utils.tool_schema_util import TOOL_DECLARATIONS
+from utils.db_util import create_db_pool
+from utils.job_util import job_runner
+from utils.metrics_util import metrics
+
+# Whiteboard storage works on the Streamlit canvas session, which the API does not have
+UNSUPPORTED_TOOLS = ("save_whiteboard", "load_whiteboard", "list_whiteboards", "export_whiteboard")
+
+_dumps = functools.partial(json.dumps, default=str)  # Dates and Decimals from the database
+
+
+def _json(data, status=200):
+    return web.json_response(data, status=status, dumps=_dumps)
+
+
+def _plain_arguments(arguments):
+    """Gemini returns a proto map; the handlers and JSON want a dict."""
+    return dict(arguments) if arguments else {}
+
+
+class ApiSessionStore:
+    """Per-client state (media playlist position, whiteboard flags), least recently used evicted.
+
+    Not the Streamlit session spill store (utils.session_store_util.SessionStore).
+    """
+
+    def __init__(self, max_sessions=API_MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+
+    def get(self, session_id):
+        state = self._sessions.pop(session_id, None)
+        if state is None:
+            state = {}
+        self._sessions[session_id] = state
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        return state
+
+
+async def _read_body(request):
+    try:
+        body = await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise web.HTTPBadRequest(text="Request body must be JSON")
+    if not isinstance(body, dict):
+        raise web.HTTPBadRequest(text="Request body must be a JSON object")
+    return body
+
+
+async def _chat(request, body):
+    """Resolve a prompt and dispatch the tool call. Returns (function_name, arguments, reply)."""
+    prompt = body.get("prompt")
+    if not isinstance(prompt, str) or not prompt.strip():
+        raise web.HTTPBadRequest(text="'prompt' is required")
+    app = request.app
+    state = app["sessions"].get(str(body.get("session_id", "default")))
+    function_name, arguments, response_text = await resolve_prompt_async(prompt, app["model"])
+    if not function_name:
+        status = "error" if response_text.startswith("⏳") else "success"
+        return None, None, {"status": status, "content": response_text}
+    arguments = _plain_arguments(arguments)
+    if function_name in UNSUPPORTED_TOOLS:
+        return function_name, arguments, {"status": "error",
+                                          "content": f"❌ Error: '{function_name}' needs the Streamlit app"}
+    reply = await dispatch_function_call_async(function_name, arguments, state,
+                                               resources=app["resources"], background=True)
+    return function_name, arguments, reply
+
+
+async def health(request):
+    return _json({"status": "ok", "model": request.app["model_name"]})
+
+
+async def list_tools(request):
+    return _json({"tools": TOOL_DECLARATIONS})
+
+
+async def call_tool(request):
+    name = request.match_info["name"]
+    if name not in TOOL_HANDLERS:
+        raise web.HTTPNotFound(text=f"Unknown tool '{name}'")
+    if name in UNSUPPORTED_TOOLS:
+        raise web.HTTPBadRequest(text=f"'{name}' needs the Streamlit app")
+    body = await _read_body(request)
+    arguments = body.get("arguments") or {}
+    if not isinstance(arguments, dict):
+        raise web.HTTPBadRequest(text="'arguments' must be an object")
+    state = request.app["sessions"].get(str(body.get("session_id", "default")))
+    reply = await dispatch_function_call_async(name, arguments, state, resources=request.app["resources"],
+                                               background=bool(body.get("background", True)))
+    if reply is None:
+        raise web.HTTPBadRequest(text="Missing required arguments")
+    return _json(reply)
+
+
+async def chat(request):
+    body = await _read_body(request)
+    function_name, arguments, reply = await _chat(request, body)
+    return _json({"function_call": {"name": function_name, "arguments": arguments} if function_name else None,
+                  "reply": reply})
+
+
+async def _sse_response(request):
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream",
+                                           "Cache-Control": "no-cache",
+                                           "X-Accel-Buffering": "no"})
+    await response.prepare(request)
+    return response
+
+
+async def _send_event(response, event, data):
+    await response.write(f"event: {event}\ndata: {_dumps(data)}\n\n".encode("utf-8"))
+
+
+async def _stream_job(response, job_id, interval):
+    """Send progress events until the job finishes, then its final state and result."""
+    last = None
+    while True:
+        job = job_runner.get(job_id)
+        if job is None:
+            await _send_event(response, "error", {"message": f"Unknown job '{job_id}'"})
+            return
+        snapshot = job.snapshot()
+        progress = (snapshot["status"], snapshot["done"], snapshot["total"], snapshot["label"])
+        if progress != last:
+            await _send_event(response, "progress", snapshot)
+            last = progress
+        if job.is_finished:
+            await _send_event(response, "job", {**snapshot, "result": job.result})
+            return
+        await asyncio.sleep(interval)
+
+
+async def chat_stream(request):
+    body = await _read_body(request)
+    response = await _sse_response(request)
+    await _send_event(response, "status", {"stage": "resolving"})
+    try:
+        function_name, arguments, reply = await _chat(request, body)
+    except web.HTTPException as e:
+        await _send_event(response, "error", {"message": e.text})
+        return response
+    if function_name:
+        await _send_event(response, "function_call", {"name": function_name, "arguments": arguments})
+    await _send_event(response, "reply", reply)
+    if reply and reply.get("job_id"):
+        await _stream_job(response, reply["job_id"], request.app["sse_interval"])
+    await _send_event(response, "done", {})
+    return response
+
+
+def _job_or_404(request):
+    job = job_runner.get(request.match_info["job_id"])
+    if job is None:
+        raise web.HTTPNotFound(text="Unknown job")
+    return job
+
+
+async def get_job(request):
+    job = _job_or_404(request)
+    return _json({**job.snapshot(), "result": job.result})
+
+
+async def job_events(request):
+    job = _job_or_404(request)
+    response = await _sse_response(request)
+    await _stream_job(response, job.id, request.app["sse_interval"])
+    return response
+
+
+async def cancel_job(request):
+    job = _job_or_404(request)
+    return _json({"cancelled": job_runner.cancel(job.id), "status": job.status})
+
+
+async def download_export(request):
+    # Only plain file names inside EXPORT_DIR are served
+    name = os.path.basename(request.match_info["name"])
+    path = os.path.join(EXPORT_DIR, name)
+    if name != request.match_info["name"] or not os.path.isfile(path):
+        raise web.HTTPNotFound(text="Unknown export")
+    return web.FileResponse(path, headers={"Content-Disposition": f'attachment; filename="{name}"'})
+
+
+async def prometheus(request):
+    return web.Response(text=metrics.render_prometheus(), content_type="text/plain")
+
+
+async def _open_resources(app):
+    loop = asyncio.get_running_loop()
+    # Blocking handlers (hardware, media, files, psycopg2 fallback) share this pool
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=API_WORKER_THREADS, thread_name_prefix="api"))
+    app["resources"]["http"] = ClientSession()
+    if app["use_db_pool"] and DB_CONFIG["host"]:
+        try:
+            app["resources"]["db_pool"] = await create_db_pool(max_size=API_DB_POOL_SIZE)
+        except Exception as e:
+            # Fall back to psycopg2 in the executor
+            print(f"PostgreSQL pool unavailable ({e}); using blocking queries in worker threads")
+
+
+async def _close_resources(app):
+    await app["resources"]["http"].close()
+    if app["resources"].get("db_pool") is not None:
+        await app["resources"]["db_pool"].close()
+
+
+def create_app(model=None, model_name=GEMINI_MODEL, use_db_pool=True, sse_interval=API_SSE_INTERVAL):
+    """Build the aiohttp application.
+
+    Args:
+        model: GenerativeModel (or compatible stand-in); defaults to GEMINI_MODEL
+        model_name (str): Model name reported by /health and used in cache keys
+        use_db_pool (bool): Open an asyncpg pool for Telegram queries when possible
+        sse_interval (float): Seconds between job progress polls in SSE streams
+    """
+    if model is None:
+        import google.generativeai as genai
+        genai.configure(api_key=GOOGLE_API_KEY)
+        model = genai.GenerativeModel(model_name)
+
+    app = web.Application()
+    app["model"] = model
+    app["model_name"] = model_name
+    app["sessions"] = ApiSessionStore()
+    app["resources"] = {}
+    app["use_db_pool"] = use_db_pool
+    app["sse_interval"] = sse_interval
+    app.on_startup.append(_open_resources)
+    app.on_cleanup.append(_close_resources)
+    app.add_routes([
+        web.get("/health", health),
+        web.get("/tools", list_tools),
+        web.post("/tools/{name}", call_tool),
+        web.post("/chat", chat),
+        web.post("/chat/stream", chat_stream),
+        web.get("/jobs/{job_id}", get_job),
+        web.get("/jobs/{job_id}/events", job_events),
+        web.delete("/jobs/{job_id}", cancel_job),
+        web.get("/exports/{name}", download_export),
+        web.get("/metrics", prometheus),
+    ])
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless HTTP/JSON and SSE API for the assistant")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    args = parser.parse_args()
+    web.run_app(create_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
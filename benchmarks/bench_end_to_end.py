@@ -0,0 +1,360 @@
+"""End-to-end benchmark of the chat dispatch path, per tool, with local stand-ins.
+
+Every prompt goes through utils.dispatch_util exactly as main.py sends it
+(local router, response cache, scheduler, Gemini, tool handler). Gemini is
+replaced by a FakeGeminiServer that answers with scripted function calls, and
+every tool runs against a local stand-in:
+
+- Telegram search: SQLite seeded with synthetic telegram_messages
+  (or a real PostgreSQL from the DB_* settings with --postgres)
+- Distance: an openrouteservice stub server (OPENROUTE_BASE_URL)
+- File grouping / read aloud: generated document corpora
+- Media: generated placeholder files and the fake player
+- TTS, brightness, volume: null backends
+
+Each scenario runs in its own process so peak RSS is attributable to it,
+--repeats times; every metric reported is the median over the repeats.
+Results are compared with the baseline committed at benchmarks/baseline.json;
+the exit code is 1 if any tool regressed by more than the tolerance, and 2
+(argparse usage error) if the baseline file is missing.
+
+Run from the repository root:
+    python -m benchmarks.bench_end_to_end                  # compare with benchmarks/baseline.json
+    python -m benchmarks.bench_end_to_end --save-baseline  # record a new baseline
+    python -m benchmarks.bench_end_to_end --tools get_distance,query_telegram_messages --scale 0.2
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.fake_gemini import FakeGeminiServer
+from benchmarks.stand_ins import (CHANNELS, OpenRouteStub, generate_document_corpus,
+                                  generate_media_folder, seed_postgres, seed_telegram_db)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+CITIES = ["Addis Ababa", "Bahir Dar", "Gondar", "Mekelle", "Hawassa", "Dire Dawa", "Jimma", "Adama"]
+
+# Metrics compared with the baseline: (higher is worse, noise floor). Changes smaller
+# than the floor (ms per call for p50 and throughput, MiB for RSS) are not
+# regressions. Tools that take about 1 ms move by 1-2 ms between runs on a busy
+# machine, so the time floors sit well above that.
+COMPARED_METRICS = {"p50_ms": (True, 5.0), "throughput": (False, 5.0), "peak_rss_mb": (True, 20.0)}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MiB, or None if unavailable."""
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and KiB elsewhere
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+    except (ImportError, AttributeError):
+        return None
+
+
+def build_scenarios(paths, scale):
+    """Return {scenario name: {"calls": [...], "setup": [...]}}.
+
+    Each call is a scripted Gemini answer ({"function_call": ...} or {"text": ...})
+    or, for the router scenario, a raw prompt that never reaches Gemini.
+    """
+    def count(n):
+        return max(3, int(n * scale))
+
+    def calls(name, n, make_args):
+        return [{"function_call": {"name": name, "args": make_args(i)}} for i in range(count(n))]
+
+    documents = paths["documents"]
+    queries = ([f"channel '{channel}'" for channel in CHANNELS] +
+               ["message 'vaccine'", "message 'python release'", "channel 'Tech Addis' message 'update'",
+                "date '2023-03-01'", "emoji '🔥'"])
+    open_media = {"function_call": {"name": "open_first_media_file",
+                                    "args": {"folder_path": paths["media"], "sort_by": "name"}}}
+    return {
+        "chat": {"calls": [{"text": f"Answer number {i}: " + "lorem ipsum " * 20} for i in range(count(200))]},
+        "routed_command": {"prompts": [f"volume {i % 100}" for i in range(count(200))]},
+        "adjust_brightness": {"calls": calls("adjust_brightness", 200, lambda i: {"percentage": i % 101})},
+        "adjust_volume": {"calls": calls("adjust_volume", 200, lambda i: {"percentage": i % 101})},
+        "get_distance": {"calls": calls("get_distance", 100, lambda i: {
+            "origin": CITIES[i % len(CITIES)], "destination": CITIES[(i * 3 + 1) % len(CITIES)]})},
+        "query_telegram_messages": {"calls": calls("query_telegram_messages", 100,
+                                                   lambda i: {"query": queries[i % len(queries)]})},
+        "open_first_media_file": {"calls": calls("open_first_media_file", 50, lambda i: {
+            "folder_path": paths["media"], "search": ["teddy", "gigi", "track", None][i % 4],
+            "sort_by": ["name", "size", "mtime"][i % 3]})},
+        "navigate_media_file": {"setup": [open_media],
+                                "calls": calls("navigate_media_file", 200,
+                                               lambda i: {"direction": "next" if i % 3 else "previous"})},
+        "start_annotation": {"calls": calls("start_annotation", 200,
+                                            lambda i: {"tool": ["pen", "rectangle", "circle"][i % 3]})},
+        "toggle_whiteboard": {"calls": calls("toggle_whiteboard", 200, lambda i: {"enable": bool(i % 2)})},
+        "read_file_aloud": {"calls": calls("read_file_aloud", 100,
+                                           lambda i: {"file_path": documents[i % len(documents)]})},
+        "group_related_files": {"calls": calls("group_related_files", 5, lambda i: {
+            "folder_path": paths["corpus"], "output_folder": os.path.join(paths["work"], f"grouped_{i}"),
+            "similarity_threshold": 0.3})},
+    }
+
+
+def script_scenarios(scenarios):
+    """Give every scripted answer a unique prompt; return (prompt script, scenarios with prompts)."""
+    script = {}
+    for name, scenario in scenarios.items():
+        for key in ("setup", "calls"):
+            prompts = []
+            for i, answer in enumerate(scenario.get(key, [])):
+                # Opaque prompts so the local router and response cache never short-circuit them
+                prompt = f"benchmark request {name} {key} {i}"
+                script[prompt] = answer
+                prompts.append(prompt)
+            if key == "calls":
+                scenario.setdefault("prompts", prompts)
+            else:
+                scenario["setup_prompts"] = prompts
+    return script, scenarios
+
+
+def run_scenario(name, scenario, environment, warmup):
+    """Child process: install stand-ins, then drive the dispatch path and time it."""
+    os.environ.update(environment["env"])
+    from benchmarks.stand_ins import install_fake_db, install_null_backends
+    install_null_backends()
+    if environment["sqlite_path"]:
+        install_fake_db(environment["sqlite_path"])
+    from benchmarks.fake_gemini import FakeGeminiModel
+    from utils.dispatch_util import resolve_prompt, dispatch_function_call
+
+    model = FakeGeminiModel(environment["gemini_url"])
+    state = {}
+
+    def send(prompt):
+        function_name, arguments, response_text = resolve_prompt(prompt, model)
+        if function_name:
+            return dispatch_function_call(function_name, arguments, state)
+        return {"status": "error" if response_text.startswith("⏳") else "success", "content": response_text}
+
+    for prompt in scenario.get("setup_prompts", []):
+        send(prompt)
+    rss_before = peak_rss_mb()
+
+    latencies = []
+    errors = 0
+    first_error = None
+    for i, prompt in enumerate(scenario["prompts"]):
+        start = time.perf_counter()
+        reply = send(prompt)
+        elapsed = time.perf_counter() - start
+        if i >= warmup:
+            latencies.append(elapsed)
+        if reply is None or reply["status"] == "error":
+            errors += 1
+            first_error = first_error or (reply["content"] if reply else "missing arguments")
+
+    peak = peak_rss_mb()
+    busy = sum(latencies)
+    return {
+        "calls": len(latencies),
+        "errors": errors,
+        "first_error": first_error,
+        "throughput": round(len(latencies) / busy, 2) if busy else 0.0,
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "peak_rss_mb": round(peak, 1) if peak is not None else None,
+        "rss_growth_mb": round(peak - rss_before, 1) if peak is not None and rss_before is not None else None,
+    }
+
+
+def median_result(runs):
+    """Combine the repeats of one scenario: the median of each metric, the worst error count."""
+    result = dict(runs[0])
+    for metric in ("throughput", "p50_ms", "p99_ms", "peak_rss_mb", "rss_growth_mb"):
+        values = [run[metric] for run in runs if run[metric] is not None]
+        result[metric] = round(statistics.median(values), 3) if values else None
+    result["errors"] = max(run["errors"] for run in runs)
+    result["first_error"] = next((run["first_error"] for run in runs if run["first_error"]), None)
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of regression descriptions versus the baseline."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get("tools", {}).get(name)
+        if not base:
+            continue
+        for metric, (higher_is_worse, floor) in COMPARED_METRICS.items():
+            current, previous = result.get(metric), base.get(metric)
+            if not current or not previous:
+                continue
+            change = (current - previous) / previous
+            # Throughput is compared as time per call for the noise floor
+            delta = 1000 / current - 1000 / previous if metric == "throughput" else current - previous
+            if abs(delta) < floor:
+                continue
+            if (change > tolerance) if higher_is_worse else (change < -tolerance):
+                regressions.append(f"{name}: {metric} {previous} -> {current} ({change:+.0%})")
+    return regressions
+
+
+def report(results, baseline):
+    print(f"{'tool':<24}{'calls':>7}{'errors':>8}{'ops/s':>10}{'p50 ms':>10}{'p99 ms':>10}"
+          f"{'peak MB':>10}{'+MB':>8}{'vs base p50':>13}")
+    for name, result in results.items():
+        base = baseline.get("tools", {}).get(name, {}) if baseline else {}
+        delta = ""
+        if base.get("p50_ms"):
+            delta = f"{(result['p50_ms'] - base['p50_ms']) / base['p50_ms']:+.0%}"
+        print(f"{name:<24}{result['calls']:>7}{result['errors']:>8}{result['throughput']:>10.1f}"
+              f"{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+              f"{result['peak_rss_mb'] if result['peak_rss_mb'] is not None else '-':>10}"
+              f"{result['rss_growth_mb'] if result['rss_growth_mb'] is not None else '-':>8}{delta:>13}")
+        if result["first_error"]:
+            print(f"    first error: {result['first_error'][:100]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tools", help="Comma-separated scenario names (default: all)")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplier for the calls per scenario")
+    parser.add_argument("--warmup", type=int, default=2, help="Calls per scenario excluded from timing")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per scenario; metrics are their medians")
+    parser.add_argument("--messages", type=int, default=50000, help="Synthetic telegram_messages rows")
+    parser.add_argument("--documents", type=int, default=200, help="Documents in the grouping corpus")
+    parser.add_argument("--media-files", type=int, default=500)
+    parser.add_argument("--gemini-latency-ms", type=float, default=0.0)
+    parser.add_argument("--ors-latency-ms", type=float, default=0.0)
+    parser.add_argument("--postgres", action="store_true",
+                        help="Use (and seed if empty) the PostgreSQL database from the DB_* settings")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+    if not args.save_baseline and not os.path.exists(args.baseline):
+        # Without a baseline the run could not detect a regression, so it must not pass silently
+        parser.error(f"no baseline at {args.baseline}; record one with --save-baseline")
+
+    work = tempfile.mkdtemp(prefix="assistant_bench_")
+    paths = {
+        "work": work,
+        "corpus": os.path.join(work, "corpus"),
+        "media": generate_media_folder(os.path.join(work, "media"), args.media_files),
+    }
+    paths["documents"] = generate_document_corpus(paths["corpus"], args.documents)
+
+    sqlite_path = None
+    if args.postgres:
+        from config import DB_CONFIG
+        seed_postgres(DB_CONFIG, args.messages)
+    else:
+        sqlite_path = os.path.join(work, "telegram.db")
+        seed_telegram_db(sqlite_path, args.messages)
+
+    scenarios = build_scenarios(paths, args.scale)
+    if args.tools:
+        wanted = args.tools.split(",")
+        unknown = set(wanted) - set(scenarios)
+        if unknown:
+            parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+        scenarios = {name: scenarios[name] for name in wanted}
+    script, scenarios = script_scenarios(scenarios)
+
+    gemini = FakeGeminiServer(script, latency_ms=args.gemini_latency_ms).start()
+    openroute = OpenRouteStub(latency_ms=args.ors_latency_ms).start()
+    environment = {
+        "gemini_url": gemini.url,
+        "sqlite_path": sqlite_path,
+        "env": {
+            "OPENROUTE_BASE_URL": openroute.url,
+            "GOOGLE_MAPS_API_KEY": "benchmark",
+            "MEDIA_PLAYER": "fake",
+            "MEDIA_INDEX_DIR": os.path.join(work, "media_index"),
+            "WHITEBOARD_DB_PATH": os.path.join(work, "whiteboards.db"),
+            # Measure the dispatch path, not the production rate limits
+            "GEMINI_REQUESTS_PER_MINUTE": "6000000",
+            "GEMINI_TOKENS_PER_MINUTE": "1000000000",
+            "METRICS_PORT": "0",
+        },
+    }
+
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    try:
+        for name, scenario in scenarios.items():
+            runs = []
+            for _ in range(max(1, args.repeats)):
+                # A fresh process per run keeps peak RSS attributable to one tool
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    runs.append(executor.submit(run_scenario, name, scenario, environment, args.warmup).result())
+            results[name] = median_result(runs)
+            print(f"finished {name}", file=sys.stderr)
+    finally:
+        gemini.stop()
+        openroute.stop()
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    print(f"work dir: {work}")
+    report(results, baseline)
+
+    run = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "scale": args.scale,
+            "messages": args.messages,
+            "documents": args.documents,
+            "media_files": args.media_files,
+            "database": "postgres" if args.postgres else "sqlite",
+            "repeats": max(1, args.repeats),
+        },
+        "tools": results,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(run, f, indent=2)
+
+    if args.save_baseline:
+        if baseline:
+            # Keep scenarios that were not part of this run
+            run["tools"] = {**baseline.get("tools", {}), **results}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(run, f, indent=2)
+        print(f"baseline saved to {args.baseline}")
+        return 0
+
+    settings = {key: value for key, value in run["meta"].items() if key not in ("python", "platform")}
+    if any(baseline.get("meta", {}).get(key) != value for key, value in settings.items()):
+        print("warning: baseline was recorded with different settings:", baseline.get("meta"))
+    regressions = compare(results, baseline, args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if not regressions:
+        print(f"no regressions beyond {args.tolerance:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
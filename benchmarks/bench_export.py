@@ -0,0 +1,95 @@
+"""Throughput benchmark for Telegram exports on a multi-million-row table.
+
+Compares, each in its own process so peak RSS is attributable:
+
+- fetchall_dataframe: query_telegram_messages() rows into a pandas DataFrame,
+  written with to_csv (what "export everything" used to cost)
+- copy_csv / copy_parquet: export_telegram_messages() streaming COPY output
+  into a file in bounded chunks
+
+By default the table is SQLite with a COPY emulation (so absolute numbers
+measure the stand-in as much as the export path); use --postgres to run
+against the PostgreSQL from the DB_* settings.
+
+Run from the repository root:
+    python -m benchmarks.bench_export                 # 2,000,000 rows
+    python -m benchmarks.bench_export --rows 500000 --methods copy_csv,copy_parquet
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.stand_ins import seed_postgres, seed_telegram_db
+
+METHODS = ("fetchall_dataframe", "copy_csv", "copy_parquet")
+
+# Matches every row while exercising the filter path
+EXPORT_FILTERS = {"date_from": "2000-01-01"}
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_method(method, sqlite_path, export_dir):
+    """Child process: export with one method and measure it."""
+    if sqlite_path:
+        from benchmarks.stand_ins import install_fake_db
+        install_fake_db(sqlite_path)
+    baseline_rss = peak_rss_mb()
+    start = time.perf_counter()
+    if method == "fetchall_dataframe":
+        import pandas as pd
+        from utils.db_util import query_telegram_messages
+        result = query_telegram_messages(**EXPORT_FILTERS)
+        path = os.path.join(export_dir, "fetchall.csv")
+        pd.DataFrame(result["data"]).to_csv(path, index=False)
+        rows = len(result["data"])
+    else:
+        from utils.export_util import export_telegram_messages
+        result = export_telegram_messages(format=method.split("_")[1], export_dir=export_dir, **EXPORT_FILTERS)
+        if result["status"] != "success":
+            raise RuntimeError(result["message"])
+        path, rows = result["path"], result["rows"]
+    seconds = time.perf_counter() - start
+    size = os.path.getsize(path)
+    os.remove(path)
+    return {"rows": rows, "seconds": seconds, "mib": size / 2 ** 20,
+            "peak_rss_mb": peak_rss_mb(), "added_rss_mb": peak_rss_mb() - baseline_rss}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--methods", default=",".join(METHODS))
+    parser.add_argument("--postgres", action="store_true", help="Use the PostgreSQL from the DB_* settings")
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="export_bench_")
+    start = time.perf_counter()
+    sqlite_path = None
+    if args.postgres:
+        from config import DB_CONFIG
+        seed_postgres(DB_CONFIG, args.rows)
+    else:
+        sqlite_path = os.path.join(work, "telegram.db")
+        seed_telegram_db(sqlite_path, args.rows)
+    print(f"Seeded {args.rows:,} rows in {time.perf_counter() - start:.1f} s")
+
+    context = multiprocessing.get_context("spawn")
+    print(f"{'method':<20} {'rows':>10} {'seconds':>8} {'rows/s':>10} {'MiB/s':>7} {'peak MB':>8} {'+MB':>7}")
+    for method in args.methods.split(","):
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            r = executor.submit(run_method, method, sqlite_path, work).result()
+        print(f"{method:<20} {r['rows']:>10,} {r['seconds']:>8.2f} {r['rows'] / r['seconds']:>10,.0f} "
+              f"{r['mib'] / r['seconds']:>7.1f} {r['peak_rss_mb']:>8.0f} {r['added_rss_mb']:>7.0f}")
+
+
+if __name__ == "__main__":
+    main()
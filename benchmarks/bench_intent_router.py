@@ -0,0 +1,83 @@
+"""Benchmark the local intent router on a recorded prompt corpus.
+
+For every prompt in benchmarks/data/prompt_corpus.tsv the router either
+dispatches locally or defers to Gemini. The report shows how many Gemini calls
+are saved, whether routed calls hit the expected tool, and the end-to-end
+latency with and without the fast path. Gemini latency is simulated with
+--gemini-latency-ms (use a value measured on your own deployment).
+
+Run from the repository root:
+    python -m benchmarks.bench_intent_router
+"""
+import argparse
+import os
+import statistics
+import time
+
+from utils.intent_router_util import route_prompt
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "data", "prompt_corpus.tsv")
+
+
+def load_corpus(path):
+    """Read (expected_tool, prompt) pairs; expected_tool is None for Gemini-only prompts."""
+    corpus = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line or line.startswith("#"):
+                continue
+            expected, prompt = line.split("\t", 1)
+            corpus.append((None if expected == "-" else expected, prompt))
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", default=CORPUS_PATH)
+    parser.add_argument("--gemini-latency-ms", type=float, default=900.0,
+                        help="Simulated Gemini round-trip latency")
+    parser.add_argument("--repeat", type=int, default=200,
+                        help="Routing passes over the corpus for timing")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    routed = correct = false_positives = missed = 0
+    route_times = []
+    for expected, prompt in corpus:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            result = route_prompt(prompt)
+        route_times.append((time.perf_counter() - start) / args.repeat * 1000)
+
+        if result:
+            routed += 1
+            if expected is None:
+                false_positives += 1
+                print(f"  wrongly routed: {prompt!r} -> {result}")
+            elif result[0] == expected:
+                correct += 1
+            else:
+                print(f"  wrong tool: {prompt!r} -> {result[0]} (expected {expected})")
+        elif expected is not None:
+            missed += 1
+
+    total = len(corpus)
+    router_overhead = statistics.mean(route_times)
+    # Without the router every prompt pays the Gemini round trip
+    before = args.gemini_latency_ms
+    # With the router, routed prompts pay only routing; the rest pay both
+    after = (routed * router_overhead
+             + (total - routed) * (router_overhead + args.gemini_latency_ms)) / total
+
+    print(f"prompts:                  {total}")
+    print(f"routed locally:           {routed} ({routed / total:.0%} of Gemini calls saved)")
+    print(f"routed to expected tool:  {correct}/{routed}")
+    print(f"false positives:          {false_positives}")
+    print(f"missed fast-path prompts: {missed}")
+    print(f"router latency:           mean {router_overhead:.4f} ms, max {max(route_times):.4f} ms")
+    print(f"mean dispatch latency:    {before:.1f} ms before, {after:.1f} ms after")
+
+
+if __name__ == "__main__":
+    main()
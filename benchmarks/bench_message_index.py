@@ -0,0 +1,115 @@
+"""Benchmark the similar-message index on a large synthetic telegram_messages table.
+
+Builds the index by streaming the table (SQLite stand-in by default, or a real
+PostgreSQL from the DB_* settings with --postgres), then reports:
+
+- build time, rows/sec, peak RSS and on-disk size
+- query latency p50/p99 for the IVF search and for a brute-force scan
+- recall@k of the IVF search against the brute-force results, per nprobe
+- incremental update time after appending new rows
+
+Run from the repository root:
+    python -m benchmarks.bench_message_index                 # 1,000,000 rows
+    python -m benchmarks.bench_message_index --rows 200000 --nprobe 4,16,64
+"""
+import argparse
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.stand_ins import INSERT_MESSAGE, seed_postgres, seed_telegram_db, synthetic_messages
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def append_rows(count, seed):
+    """Insert more synthetic rows through the (real or fake) psycopg2 module."""
+    import psycopg2
+    from config import DB_CONFIG
+    connection = psycopg2.connect(**DB_CONFIG)
+    cursor = connection.cursor()
+    cursor.executemany(INSERT_MESSAGE, list(synthetic_messages(count, seed)))
+    connection.commit()
+    connection.close()
+
+
+def timed_search(search, queries):
+    latencies, results = [], []
+    for text in queries:
+        start = time.perf_counter()
+        results.append(search(text))
+        latencies.append(time.perf_counter() - start)
+    return latencies, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--nprobe", default="4,16,64", help="Comma-separated nprobe values to compare")
+    parser.add_argument("--append", type=float, default=0.01, help="Fraction of rows added for the update test")
+    parser.add_argument("--postgres", action="store_true", help="Use the PostgreSQL from the DB_* settings")
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="message_index_bench_")
+    os.environ["MESSAGE_INDEX_DIR"] = os.path.join(work, "index")
+
+    start = time.perf_counter()
+    if args.postgres:
+        from config import DB_CONFIG
+        seed_postgres(DB_CONFIG, args.rows)
+    else:
+        from benchmarks.stand_ins import install_fake_db
+        sqlite_path = os.path.join(work, "telegram.db")
+        seed_telegram_db(sqlite_path, args.rows)
+        install_fake_db(sqlite_path)
+    print(f"Seeded {args.rows} rows in {time.perf_counter() - start:.1f} s")
+
+    from utils.message_index_util import MessageIndex, build_message_index
+
+    index = MessageIndex()
+    start = time.perf_counter()
+    result = build_message_index(index, rebuild=True)
+    build_seconds = time.perf_counter() - start
+    stats = result["stats"]
+    print(f"Build: {build_seconds:.1f} s ({args.rows / build_seconds:,.0f} rows/s), {stats['lists']} lists, "
+          f"{stats['bytes'] / 2 ** 20:.0f} MiB on disk, peak RSS {peak_rss_mb():.0f} MiB")
+
+    # Queries are fresh messages from the same distribution, not rows in the table
+    queries = [row[2] for row in synthetic_messages(args.queries, seed=99)]
+    exact_latencies, exact = timed_search(lambda text: index.search_exact(text, k=args.k), queries)
+    print(f"Brute force  p50 {statistics.median(exact_latencies) * 1000:7.2f} ms  "
+          f"p99 {percentile(exact_latencies, 0.99) * 1000:7.2f} ms")
+    for nprobe in (int(value) for value in args.nprobe.split(",")):
+        latencies, approximate = timed_search(lambda text: index.search(text, k=args.k, nprobe=nprobe), queries)
+        recall = statistics.mean(
+            len({i for i, _ in found} & {i for i, _ in truth}) / max(1, len(truth))
+            for found, truth in zip(approximate, exact))
+        print(f"IVF nprobe={nprobe:<4} p50 {statistics.median(latencies) * 1000:7.2f} ms  "
+              f"p99 {percentile(latencies, 0.99) * 1000:7.2f} ms  recall@{args.k} {recall:.3f}")
+
+    added = max(1, int(args.rows * args.append))
+    append_rows(added, seed=7)
+    start = time.perf_counter()
+    result = build_message_index(index)
+    print(f"Update: {result['message']} in {time.perf_counter() - start:.2f} s "
+          f"({result['stats']['unsorted']} rows awaiting compaction)")
+    start = time.perf_counter()
+    index.compact()
+    print(f"Compact: {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Offline routing latency: contraction hierarchy, bidirectional Dijkstra, A* and Dijkstra.
+
+Generates a synthetic road network (a jittered grid with faster arterial
+roads, missing links and some one-way streets) plus a gazetteer of towns,
+writes it with and without a contraction hierarchy, checks that every
+method finds the same travel times as plain Dijkstra, and reports query
+latency per method. get_distance() through the local backend is compared
+with the openrouteservice path against the local stub (three HTTP round
+trips, plus --latency-ms of simulated network time each).
+
+Run from the repository root:
+    python -m benchmarks.bench_routing                 # 120 x 120 grid, 14,400 nodes
+    python -m benchmarks.bench_routing --grid 200 --queries 500
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+from utils.routing_util import RoadGraph, haversine_m, write_road_graph
+
+SPACING_DEGREES = 0.005  # About 550 m between intersections
+
+
+def synthetic_network(size, seed=0):
+    """Nodes, directed edges and towns of a size x size road grid near Addis Ababa."""
+    rng = random.Random(seed)
+    coordinates = [(8.5 + row * SPACING_DEGREES + rng.uniform(-0.001, 0.001),
+                    38.3 + column * SPACING_DEGREES + rng.uniform(-0.001, 0.001))
+                   for row in range(size) for column in range(size)]
+    edges = []
+
+    def road(a, b, speed_kmh):
+        meters = haversine_m(*coordinates[a], *coordinates[b])
+        seconds = meters / (speed_kmh / 3.6)
+        edges.append((a, b, seconds, meters))
+        if rng.random() > 0.05:  # 5% one-way streets
+            edges.append((b, a, seconds, meters))
+
+    for row in range(size):
+        for column in range(size):
+            node = row * size + column
+            if column + 1 < size and rng.random() > 0.1:
+                road(node, node + 1, 80 if row % 10 == 0 else rng.choice((30, 40, 50)))
+            if row + 1 < size and rng.random() > 0.1:
+                road(node, node + size, 80 if column % 10 == 0 else rng.choice((30, 40, 50)))
+    towns = [(f"Town {i}", *coordinates[rng.randrange(len(coordinates))], rng.randint(1000, 100000), "town")
+             for i in range(100)]
+    return coordinates, edges, towns
+
+
+def latency(fn, pairs):
+    samples = []
+    for pair in pairs:
+        start = time.perf_counter()
+        fn(*pair)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(0.99 * (len(samples) - 1))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--grid", type=int, default=120, help="Intersections per side")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Simulated openrouteservice latency")
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="routing_bench_")
+    try:
+        coordinates, edges, towns = synthetic_network(args.grid)
+        plain_dir, ch_dir = os.path.join(work, "plain"), os.path.join(work, "ch")
+        start = time.perf_counter()
+        write_road_graph(plain_dir, coordinates, edges, towns)
+        print(f"Graph of {len(coordinates):,} nodes, {len(edges):,} edges written in {time.perf_counter() - start:.1f} s")
+        start = time.perf_counter()
+        meta = write_road_graph(ch_dir, coordinates, edges, towns, contract=True)
+        print(f"With contraction hierarchy ({meta['shortcut_edges']:,} up/down edges): "
+              f"{time.perf_counter() - start:.1f} s")
+        start = time.perf_counter()
+        graph = RoadGraph(ch_dir)
+        print(f"Load: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        rng = random.Random(1)
+        pairs = [(rng.randrange(len(graph)), rng.randrange(len(graph))) for _ in range(args.queries)]
+        reference = [graph.route(source, target, "dijkstra") for source, target in pairs]
+        print(f"{'method':<14} {'p50 ms':>8} {'p99 ms':>8} {'mismatches':>11}")
+        for method in RoadGraph.METHODS:
+            mismatches = 0
+            for (source, target), expected in zip(pairs, reference):
+                found = graph.route(source, target, method)
+                if (found is None) != (expected is None) or (found and abs(found[0] - expected[0]) > 1e-3 * expected[0]):
+                    mismatches += 1
+            p50, p99 = latency(lambda s, t: graph.route(s, t, method), pairs)
+            print(f"{method:<14} {p50:>8.2f} {p99:>8.2f} {mismatches:>11}")
+
+        # End to end through get_distance(): place lookup, snapping and the query
+        from utils import distance_util, routing_util
+        routing_util.ROUTING_GRAPH_DIR = ch_dir
+        distance_util.DISTANCE_BACKEND = "local"
+        place_pairs = [(rng.choice(towns)[0], rng.choice(towns)[0]) for _ in range(min(args.queries, 100))]
+        distance_util.get_distance(*place_pairs[0])  # Loads the graph
+        p50, p99 = latency(distance_util.get_distance, place_pairs)
+        print(f"{'get_distance (local)':<24} p50 {p50:.2f} ms, p99 {p99:.2f} ms")
+
+        from benchmarks.stand_ins import OpenRouteStub
+        stub = OpenRouteStub(latency_ms=args.latency_ms).start()
+        distance_util.DISTANCE_BACKEND = "openrouteservice"
+        distance_util.OPENROUTE_BASE_URL = stub.url
+        distance_util.GOOGLE_MAPS_API_KEY = distance_util.GOOGLE_MAPS_API_KEY or "bench-key"
+        p50, p99 = latency(distance_util.get_distance, place_pairs[:20])
+        stub.stop()
+        print(f"{'get_distance (stub ORS)':<24} p50 {p50:.2f} ms, p99 {p99:.2f} ms "
+              f"({args.latency_ms:g} ms simulated latency per request)")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
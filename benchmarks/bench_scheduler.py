@@ -0,0 +1,100 @@
+"""Exercise the Gemini request scheduler against a fake endpoint that returns 429s.
+
+A burst of concurrent "sessions" sends a mix of short and long prompts to a
+local FakeGeminiServer with a per-second quota and random 429 injection. The
+run is repeated without the scheduler to show how many raw errors users would
+otherwise see.
+
+Run from the repository root:
+    python -m benchmarks.bench_scheduler
+"""
+import argparse
+import statistics
+import threading
+import time
+
+from benchmarks.fake_gemini import FakeGeminiModel, FakeGeminiServer
+from utils.gemini_scheduler_util import RequestScheduler, estimate_tokens
+
+SHORT_PROMPT = "next"
+LONG_PROMPT = "Summarize the following meeting notes in detail. " * 40
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def run(model, scheduler, sessions, requests_per_session):
+    """Fire requests from concurrent sessions; return latencies per kind and error count."""
+    latencies = {"short": [], "long": []}
+    errors = []
+    lock = threading.Lock()
+
+    def session(index):
+        for i in range(requests_per_session):
+            kind = "long" if (index + i) % 4 == 0 else "short"
+            prompt = LONG_PROMPT if kind == "long" else SHORT_PROMPT
+            chat = model.start_chat(history=[])
+            start = time.perf_counter()
+            try:
+                if scheduler:
+                    scheduler.submit(chat.send_message, prompt, prompt_tokens=estimate_tokens(prompt))
+                else:
+                    chat.send_message(prompt)
+                with lock:
+                    latencies[kind].append(time.perf_counter() - start)
+            except Exception as e:
+                with lock:
+                    errors.append(e)
+
+    threads = [threading.Thread(target=session, args=(n,)) for n in range(sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - start
+
+
+def report(label, server, latencies, errors, elapsed, scheduler=None):
+    total = sum(len(v) for v in latencies.values()) + len(errors)
+    print(f"{label}")
+    print(f"  requests: {total}, succeeded: {total - len(errors)}, user-visible errors: {len(errors)}")
+    print(f"  endpoint: {server.served} served, {server.rejected} rejected with 429, {elapsed:.1f} s wall time")
+    for kind, values in latencies.items():
+        if values:
+            print(f"  {kind:>5} prompts: p50 {statistics.median(values) * 1000:.0f} ms, "
+                  f"p99 {percentile(values, 0.99) * 1000:.0f} ms")
+    if scheduler:
+        print(f"  scheduler: {scheduler.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=5, help="Requests per session")
+    parser.add_argument("--quota", type=float, default=10, help="Endpoint requests per second")
+    parser.add_argument("--inject-429", type=float, default=0.1, help="Random 429 probability")
+    parser.add_argument("--latency-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    for use_scheduler in (False, True):
+        server = FakeGeminiServer(requests_per_second=args.quota, inject_429_rate=args.inject_429,
+                                  latency_ms=args.latency_ms).start()
+        model = FakeGeminiModel(server.url)
+        scheduler = None
+        if use_scheduler:
+            # Stay a little under the endpoint quota; short backoff keeps the run quick
+            scheduler = RequestScheduler(requests_per_minute=args.quota * 60 * 0.9,
+                                         tokens_per_minute=10_000_000, max_concurrency=4,
+                                         max_retries=8, backoff_base=0.05, backoff_max=1.0,
+                                         queue_timeout=300, burst_seconds=1.0)
+        latencies, errors, elapsed = run(model, scheduler, args.sessions, args.requests)
+        report("with scheduler" if use_scheduler else "without scheduler",
+               server, latencies, errors, elapsed, scheduler)
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Memory held by many chat sessions with and without the session spill store.
+
+Simulates concurrent sessions whose runs add chat messages, table results,
+a media folder listing and whiteboard strokes, interleaved round robin. The
+unmanaged baseline keeps everything in memory (as before); the managed run
+calls SessionStore.begin()/end() around every run. Reports traced Python
+memory after all runs, spilled bytes, end-of-run overhead and the latency
+of loading a spilled table back.
+
+Run from the repository root:
+    python -m benchmarks.bench_session_memory
+    python -m benchmarks.bench_session_memory --sessions 50 --runs 20 --total-mb 16
+"""
+import argparse
+import gc
+import random
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.bench_stroke_log import make_stroke
+from benchmarks.stand_ins import synthetic_messages
+from utils.session_store_util import SessionStore, Spilled, load_spilled
+from utils.stroke_log_util import StrokeLog
+
+
+class State(dict):
+    """Plain session state (dicts cannot be weak-referenced)."""
+
+
+def run_once(state, rng, run, args):
+    """One rerun of the chat script: a prompt, an answer and some side state."""
+    messages = state.setdefault("messages", [])
+    messages.append({"role": "user", "content": f"prompt {run} " + "word " * rng.randint(5, 40)})
+    answer = {"role": "assistant", "content": "answer " * rng.randint(20, 200)}
+    if run % args.table_every == 0:
+        answer["table"] = list(synthetic_messages(args.table_rows, seed=run))
+        answer["columns"] = ["Channel", "Message ID", "Message", "Timestamp", "Media", "Emojis", "URL", "Metadata"]
+    messages.append(answer)
+    if run == 0:
+        state["file_list"] = [f"/media/library/folder_{i // 200}/clip_{i:06d}.mp4" for i in range(args.files)]
+        state["stroke_log"] = StrokeLog()
+    log = state["stroke_log"]
+    if not isinstance(log, Spilled):
+        log.record({"version": "4.4.0", "objects": log.materialize()["objects"]
+                    + [make_stroke(rng) for _ in range(args.strokes_per_run)]})
+
+
+def simulate(args, store):
+    rng = random.Random(0)
+    states = [State() for _ in range(args.sessions)]
+    end_seconds = []
+    gc.collect()
+    tracemalloc.start()
+    for run in range(args.runs):
+        for s, state in enumerate(states):
+            if store:
+                store.begin(f"session-{s}", state)
+                # The whiteboard is drawn on, so its stroke log comes back first
+                if isinstance(state.get("stroke_log"), Spilled):
+                    state["stroke_log"] = store.load(state["stroke_log"], discard=True)
+            run_once(state, rng, run, args)
+            if store:
+                start = time.perf_counter()
+                store.end(f"session-{s}", state)
+                end_seconds.append(time.perf_counter() - start)
+    gc.collect()
+    traced = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return states, traced, end_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=30, help="Reruns per session")
+    parser.add_argument("--table-rows", type=int, default=2000)
+    parser.add_argument("--table-every", type=int, default=4, help="Every Nth answer carries a table")
+    parser.add_argument("--files", type=int, default=20000, help="Media folder listing size")
+    parser.add_argument("--strokes-per-run", type=int, default=5)
+    parser.add_argument("--budget-mb", type=float, default=8, help="Per-session budget")
+    parser.add_argument("--total-mb", type=float, default=128, help="Budget across sessions")
+    parser.add_argument("--history", type=int, default=40, help="Chat messages kept in memory")
+    args = parser.parse_args()
+
+    _, baseline, _ = simulate(args, None)
+    print(f"{args.sessions} sessions x {args.runs} runs")
+    print(f"unmanaged: {baseline / 2 ** 20:8.1f} MiB traced")
+
+    spill_dir = tempfile.mkdtemp(prefix="session_spill_")
+    try:
+        store = SessionStore(spill_dir=spill_dir, session_budget=args.budget_mb * 2 ** 20,
+                             total_budget=args.total_mb * 2 ** 20, history_messages=args.history)
+        states, managed, end_seconds = simulate(args, store)
+        stats = store.stats()
+        end_ms = sorted(seconds * 1000 for seconds in end_seconds)
+        print(f"managed:   {managed / 2 ** 20:8.1f} MiB traced, {stats['spilled_mb']:.1f} MiB spilled "
+              f"in {stats['spills']} spills")
+        print(f"end-of-run overhead: p50 {statistics.median(end_ms):.2f} ms, "
+              f"p99 {end_ms[int(0.99 * (len(end_ms) - 1))]:.2f} ms")
+
+        tables = [message["table"] for state in states
+                  for chunk in state.get("spilled_history", []) for message in load_spilled(chunk, [])
+                  if isinstance(message.get("table"), Spilled)][:20]
+        if tables:
+            samples = []
+            for table in tables:
+                start = time.perf_counter()
+                load_spilled(table)
+                samples.append((time.perf_counter() - start) * 1000)
+            print(f"lazy table load ({args.table_rows} rows): p50 {statistics.median(samples):.2f} ms")
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
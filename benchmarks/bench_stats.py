@@ -0,0 +1,93 @@
+"""Latency of summary statistics from the summary table vs aggregating raw rows.
+
+Seeds a synthetic telegram_messages table (SQLite stand-in, or the
+PostgreSQL from the DB_* settings with --postgres), builds the summary,
+then times each telegram_stats() question against the equivalent GROUP BY
+over telegram_messages, and an incremental refresh after appending rows.
+
+Run from the repository root:
+    python -m benchmarks.bench_stats                 # 1,000,000 rows
+    python -m benchmarks.bench_stats --rows 200000 --repeat 50
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.stand_ins import seed_postgres, seed_telegram_db
+
+# (label, telegram_stats kwargs, equivalent query over the raw table)
+QUESTIONS = [
+    ("counts per channel", {"metric": "counts"},
+     "SELECT channel_title, COUNT(*) FROM telegram_messages GROUP BY channel_title"),
+    ("monthly histogram", {"metric": "histogram", "channel": "Doctors Ethiopia", "interval": "month"},
+     "SELECT message_date, COUNT(*) FROM telegram_messages WHERE channel_title = 'Doctors Ethiopia' "
+     "GROUP BY message_date"),
+    ("emoji frequencies", {"metric": "emojis"},
+     "SELECT emoji, COUNT(*) FROM telegram_messages GROUP BY emoji"),
+]
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--append", type=int, default=10000, help="Rows added for the incremental refresh")
+    parser.add_argument("--postgres", action="store_true", help="Use the PostgreSQL from the DB_* settings")
+    args = parser.parse_args()
+
+    # Refresh only when asked, so question latency excludes refreshes
+    os.environ["STATS_REFRESH_SECONDS"] = "1e9"
+    if args.postgres:
+        from config import DB_CONFIG
+        seed_postgres(DB_CONFIG, args.rows)
+    else:
+        from benchmarks.stand_ins import install_fake_db
+        sqlite_path = os.path.join(tempfile.mkdtemp(prefix="stats_bench_"), "telegram.db")
+        seed_telegram_db(sqlite_path, args.rows)
+        install_fake_db(sqlite_path)
+
+    import psycopg2
+    from config import DB_CONFIG
+    from benchmarks.stand_ins import INSERT_MESSAGE, synthetic_messages
+    from utils.stats_util import refresh_telegram_stats, telegram_stats
+
+    start = time.perf_counter()
+    refresh_telegram_stats(rebuild=True)
+    print(f"Initial summary of {args.rows:,} rows: {time.perf_counter() - start:.2f} s")
+
+    def raw(sql):
+        conn = psycopg2.connect(**DB_CONFIG)
+        cur = conn.cursor()
+        cur.execute(sql)
+        cur.fetchall()
+        conn.close()
+
+    print(f"{'question':<22} {'summary ms':>11} {'raw ms':>9}")
+    for label, kwargs, sql in QUESTIONS:
+        summary_ms = timed(lambda: telegram_stats(**kwargs), args.repeat)
+        raw_ms = timed(lambda: raw(sql), max(1, args.repeat // 5))
+        print(f"{label:<22} {summary_ms:>11.2f} {raw_ms:>9.1f}")
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    cur = conn.cursor()
+    cur.executemany(INSERT_MESSAGE, list(synthetic_messages(args.append, seed=3)))
+    conn.commit()
+    conn.close()
+    start = time.perf_counter()
+    result = refresh_telegram_stats()
+    print(f"Incremental refresh: {result['message']} in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
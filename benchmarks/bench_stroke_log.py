@@ -0,0 +1,150 @@
+"""Benchmark canvas persistence: full-JSON reruns versus the stroke log.
+
+Simulates a whiteboard session of N freehand strokes. For each rerun the old
+approach re-sends the complete canvas JSON as `initial_drawing`; the stroke log
+records a delta and re-sends only the drawing the canvas was mounted with.
+
+That mount payload is small only while the canvas was mounted empty. After a
+remount (loading a board, or showing the whiteboard again) or a restore from
+the binary format, the canvas is seeded with the whole drawing (quantized to
+0.1 px), and that payload is re-sent on every rerun until the next remount.
+The remount section reports that cost for the full N-stroke drawing, and
+checks that the first interaction after a restore records only the new
+stroke.
+
+Run from the repository root:
+    python -m benchmarks.bench_stroke_log --strokes 5000
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from utils.stroke_log_util import StrokeLog
+
+# Properties fabric.js emits for every freehand path, as returned by st_canvas
+PATH_DEFAULTS = {
+    "type": "path", "version": "4.4.0", "originX": "left", "originY": "top",
+    "fill": None, "stroke": "#FF0000", "strokeWidth": 3, "strokeDashArray": None,
+    "strokeLineCap": "round", "strokeDashOffset": 0, "strokeLineJoin": "round",
+    "strokeUniform": False, "strokeMiterLimit": 10, "scaleX": 1, "scaleY": 1,
+    "angle": 0, "flipX": False, "flipY": False, "opacity": 1, "shadow": None,
+    "visible": True, "backgroundColor": "", "fillRule": "nonzero",
+    "paintFirst": "fill", "globalCompositeOperation": "source-over",
+    "skewX": 0, "skewY": 0,
+}
+
+
+def make_stroke(rng, points=40):
+    """Generate a random freehand stroke in fabric.js path format."""
+    x, y = rng.uniform(0, 700), rng.uniform(0, 500)
+    path = [["M", x, y]]
+    for _ in range(points):
+        nx, ny = x + rng.uniform(-4, 4), y + rng.uniform(-4, 4)
+        path.append(["Q", x, y, (x + nx) / 2, (y + ny) / 2])
+        x, y = nx, ny
+    path.append(["L", x, y])
+    xs = [value for segment in path for value in segment[1::2]]
+    ys = [value for segment in path for value in segment[2::2]]
+    stroke = dict(PATH_DEFAULTS)
+    stroke.update({"left": min(xs), "top": min(ys), "width": max(xs) - min(xs),
+                   "height": max(ys) - min(ys), "path": path})
+    return stroke
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--strokes", type=int, default=5000)
+    parser.add_argument("--checkpoint", type=int, default=500,
+                        help="Measure the full-JSON rerun cost every N strokes")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    objects = []
+    log = StrokeLog()
+    mounted = json.dumps(log.materialize())  # Drawing the canvas was mounted with
+    delta_latencies = []
+    checkpoints = []
+
+    for stroke_number in range(1, args.strokes + 1):
+        objects.append(make_stroke(rng))
+        canvas_json = {"version": "4.4.0", "objects": objects}
+
+        # Stroke log rerun: record the delta, re-send the unchanged mount payload
+        start = time.perf_counter()
+        log.record(canvas_json)
+        payload = json.dumps(json.loads(mounted))
+        delta_latencies.append(time.perf_counter() - start)
+
+        if stroke_number % args.checkpoint == 0 or stroke_number == args.strokes:
+            # Old rerun: the whole drawing is stored and re-sent as initial_drawing
+            start = time.perf_counter()
+            full_payload = json.dumps(canvas_json)
+            full_latency = time.perf_counter() - start
+            checkpoints.append((stroke_number, len(full_payload), full_latency,
+                                len(payload), delta_latencies[-1]))
+
+    print("Canvas mounted empty, drawing grows:")
+    print(f"{'strokes':>8} {'full bytes':>12} {'full ms':>9} {'log bytes':>10} {'log ms':>8}")
+    for strokes, full_bytes, full_latency, log_bytes, log_latency in checkpoints:
+        print(f"{strokes:>8} {full_bytes:>12,} {full_latency * 1000:>9.2f} "
+              f"{log_bytes:>10,} {log_latency * 1000:>8.3f}")
+
+    full_json = json.dumps(log.materialize()).encode("utf-8")
+    start = time.perf_counter()
+    binary = log.to_bytes()
+    encode_time = time.perf_counter() - start
+    start = time.perf_counter()
+    restored = StrokeLog.from_bytes(binary)
+    decode_time = time.perf_counter() - start
+    assert len(restored) == len(log)
+    assert restored.fingerprints == log.fingerprints, "restored strokes must match the originals"
+
+    # Remount with the whole drawing: st_canvas needs it as initial_drawing, and
+    # Streamlit sends component arguments with every rerun while it stays mounted
+    start = time.perf_counter()
+    mounted_drawing = log.materialize(quantized=True)
+    remount_payload = json.dumps(mounted_drawing)
+    remount_time = time.perf_counter() - start
+    rerun_times, raw_times = [], []
+    for _ in range(3):
+        start = time.perf_counter()
+        json.dumps(mounted_drawing)
+        rerun_times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        json.dumps(canvas_json)
+        raw_times.append(time.perf_counter() - start)
+
+    # Restore, then the canvas echoes the restored drawing plus one new stroke
+    restored_objects = restored.materialize()["objects"]
+    start = time.perf_counter()
+    restored.record({"version": "4.4.0", "objects": restored_objects + [make_stroke(rng)]})
+    first_record_time = time.perf_counter() - start
+    op, added = restored.deltas[-1]
+    readded = len(added) if op == "add" else 0
+    truncated = any(op == "truncate" for op, _ in restored.deltas)
+
+    print()
+    print(f"remount with {len(log):,} strokes: {len(remount_payload):,} bytes of quantized initial_drawing "
+          f"(raw floats: {len(full_json):,}), {remount_time * 1000:.0f} ms to build")
+    print(f"rerun while remounted:      the same payload again, {statistics.median(rerun_times) * 1000:.0f} ms "
+          f"(raw drawing: {statistics.median(raw_times) * 1000:.0f} ms)")
+    print(f"first record after restore: {readded} object(s) added, "
+          f"{'a truncate' if truncated else 'no truncate'}, {first_record_time * 1000:.2f} ms")
+    print(f"stroke log rerun latency (canvas mounted empty): p50 {statistics.median(delta_latencies) * 1000:.3f} ms, "
+          f"p99 {percentile(delta_latencies, 0.99) * 1000:.3f} ms")
+    print(f"full drawing as JSON:     {len(full_json):,} bytes")
+    print(f"stroke log binary:        {len(binary):,} bytes "
+          f"({len(full_json) / len(binary):.1f}x smaller, "
+          f"encode {encode_time * 1000:.0f} ms, decode {decode_time * 1000:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
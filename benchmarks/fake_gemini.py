@@ -0,0 +1,183 @@
+"""Local stand-in for the Gemini API.
+
+FakeGeminiServer is a small HTTP endpoint that answers prompts from a script
+(plain text or a scripted function call), enforces its own request quota and
+can inject 429 responses at random. FakeGeminiModel mimics the parts of
+google.generativeai.GenerativeModel that main.py uses
+(start_chat().send_message() returning .parts[0].function_call / .text).
+"""
+import asyncio
+import functools
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Non-blocking client for send_message_async(); falls back to a worker thread
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class FakeApiError(Exception):
+    """HTTP error from the fake endpoint; `code` mirrors google.api_core exceptions."""
+
+    def __init__(self, code, message):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+class FakeFunctionCall:
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+
+class FakePart:
+    def __init__(self, text=None, function_call=None):
+        self.text = text
+        self.function_call = function_call
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        call = payload.get("function_call")
+        if call:
+            self.parts = [FakePart(function_call=FakeFunctionCall(call["name"], call.get("args", {})))]
+        else:
+            self.parts = [FakePart(text=payload.get("text", ""))]
+
+    @property
+    def text(self):
+        if self.parts[0].function_call:
+            raise ValueError("Response contains a function call, not text")
+        return self.parts[0].text
+
+
+class FakeGeminiServer:
+    """Threaded HTTP server answering POST /generate from a script.
+
+    Args:
+        script (dict): Maps prompt text to {"text": ...} or {"function_call": {"name", "args"}}
+        requests_per_second (float): Quota; requests over it get a 429
+        inject_429_rate (float): Probability of a spurious 429 for any request
+        reject_first (int): Answer this many requests with a 429 before serving any
+        latency_ms (float): Simulated model latency per answered request
+    """
+
+    def __init__(self, script=None, requests_per_second=None, inject_429_rate=0.0,
+                 latency_ms=0.0, seed=0, reject_first=0):
+        self.script = script or {}
+        self.requests_per_second = requests_per_second
+        self.inject_429_rate = inject_429_rate
+        self.reject_first = reject_first
+        self.latency_ms = latency_ms
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.recent = deque()  # Timestamps of accepted requests in the last second
+        self.arrivals = []     # (monotonic time, prompt, status) of every request, in order
+        self.served = 0
+        self.rejected = 0
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}"
+
+    def _admit(self, prompt):
+        """Apply the quota and 429 injection; return True if the request is served."""
+        with self.lock:
+            now = time.monotonic()
+            while self.recent and now - self.recent[0] >= 1.0:
+                self.recent.popleft()
+            over_quota = self.requests_per_second is not None and len(self.recent) >= self.requests_per_second
+            if over_quota or self.rejected < self.reject_first or self.random.random() < self.inject_429_rate:
+                self.rejected += 1
+                self.arrivals.append((now, prompt, 429))
+                return False
+            self.recent.append(now)
+            self.served += 1
+            self.arrivals.append((now, prompt, 200))
+            return True
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                if not server._admit(body["prompt"]):
+                    self._reply(429, {"error": "Resource has been exhausted (e.g. check quota)."})
+                    return
+                if server.latency_ms:
+                    time.sleep(server.latency_ms / 1000)
+                answer = server.script.get(body["prompt"], {"text": f"Echo: {body['prompt']}"})
+                self._reply(200, answer)
+
+            def _reply(self, status, payload):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass  # Keep benchmark output clean
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class FakeChat:
+    def __init__(self, base_url):
+        self.base_url = base_url
+
+    def send_message(self, prompt, tools=None):
+        request = urllib.request.Request(
+            f"{self.base_url}/generate",
+            data=json.dumps({"prompt": prompt}).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=30) as reply:
+                return FakeResponse(json.loads(reply.read()))
+        except urllib.error.HTTPError as e:
+            raise FakeApiError(e.code, e.read().decode("utf-8", "replace")) from None
+
+    async def send_message_async(self, prompt, tools=None):
+        if aiohttp is None:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, functools.partial(self.send_message, prompt, tools=tools))
+        async with aiohttp.ClientSession() as session:
+            async with session.post(f"{self.base_url}/generate", json={"prompt": prompt}) as reply:
+                if reply.status >= 400:
+                    raise FakeApiError(reply.status, await reply.text())
+                return FakeResponse(await reply.json(content_type=None))
+
+
+class FakeGeminiModel:
+    """Drop-in for genai.GenerativeModel backed by a FakeGeminiServer."""
+
+    def __init__(self, base_url, model_name="fake-gemini"):
+        self.base_url = base_url
+        self.model_name = model_name
+
+    def start_chat(self, history=None):
+        return FakeChat(self.base_url)
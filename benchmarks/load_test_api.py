@@ -0,0 +1,176 @@
+"""Load-test the headless API server with many concurrent clients.
+
+Each client loops over a mix of requests (Gemini-routed tool calls, text
+answers, locally routed commands, direct tool calls) until the duration
+elapses. Reports requests/sec overall and p50/p99 latency per request kind.
+
+By default a local server is started in a separate process with the
+benchmark stand-ins (fake Gemini, openrouteservice stub, SQLite telegram
+database, null hardware backends). Pass --url to load-test a running server
+instead.
+
+Run from the repository root:
+    python -m benchmarks.load_test_api --clients 100 --duration 15
+    python -m benchmarks.load_test_api --url http://127.0.0.1:8080 --clients 50
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import statistics
+import tempfile
+import time
+import urllib.request
+
+import aiohttp
+
+from benchmarks.fake_gemini import FakeGeminiServer
+from benchmarks.stand_ins import OpenRouteStub, seed_telegram_db
+
+FACT_TOPICS = ("servers", "coffee", "the Blue Nile", "Lalibela", "injera", "the Simien Mountains",
+               "Lucy", "the Ethiopian calendar", "Aksum", "the Danakil Depression")
+
+
+def fun_fact_prompt(index, n):
+    """A different text prompt per client and request, so nothing can answer it from a cache."""
+    return {"prompt": f"Tell me a fun fact about {FACT_TOPICS[n % len(FACT_TOPICS)]} "
+                      f"(client {index}, request {n})"}
+
+
+# (kind, method path, JSON body or body(client index, request number))
+REQUEST_MIX = [
+    ("chat_tool_call", "/chat", {"prompt": "How far is Gondar from Addis Ababa?"}),
+    ("chat_text", "/chat", fun_fact_prompt),
+    ("chat_routed", "/chat", {"prompt": "volume 40"}),
+    ("tool_telegram", "/tools/query_telegram_messages", {"arguments": {"query": "channel 'Tech Addis' message 'python release'"}}),
+    ("tool_volume", "/tools/adjust_volume", {"arguments": {"percentage": 30}}),
+]
+
+GEMINI_SCRIPT = {
+    "How far is Gondar from Addis Ababa?": {"function_call": {"name": "get_distance",
+                                                              "args": {"origin": "Gondar", "destination": "Addis Ababa"}}},
+}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve_local(port, env, gemini_url, sqlite_path):
+    """Child process: install stand-ins and run the API server."""
+    os.environ.update(env)
+    from benchmarks.stand_ins import install_fake_db, install_null_backends
+    install_null_backends()
+    install_fake_db(sqlite_path)
+    from aiohttp import web
+    from api_server import create_app
+    from benchmarks.fake_gemini import FakeGeminiModel
+    # No asyncpg pool against SQLite: Telegram queries take the worker-thread path
+    app = create_app(model=FakeGeminiModel(gemini_url), model_name="fake-gemini", use_db_pool=False)
+    web.run_app(app, host="127.0.0.1", port=port, print=None)
+
+
+def wait_until_up(url, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{url}/health", timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"API server at {url} did not start")
+
+
+async def client(session, url, deadline, index, latencies, failures):
+    n = index
+    while time.monotonic() < deadline:
+        kind, path, body = REQUEST_MIX[n % len(REQUEST_MIX)]
+        if callable(body):
+            body = body(index, n)
+        n += 1
+        start = time.perf_counter()
+        try:
+            async with session.post(f"{url}{path}", json={**body, "session_id": f"client-{index}"}) as response:
+                payload = await response.json(content_type=None)
+                reply = payload.get("reply", payload) if isinstance(payload, dict) else {}
+                ok = response.status == 200 and reply.get("status") != "error"
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            ok = False
+        latencies.setdefault(kind, []).append(time.perf_counter() - start)
+        if not ok:
+            failures[kind] = failures.get(kind, 0) + 1
+
+
+async def run_load(url, clients, duration):
+    latencies, failures = {}, {}
+    connector = aiohttp.TCPConnector(limit=clients)
+    timeout = aiohttp.ClientTimeout(total=60)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        deadline = time.monotonic() + duration
+        start = time.perf_counter()
+        await asyncio.gather(*(client(session, url, deadline, i, latencies, failures) for i in range(clients)))
+        elapsed = time.perf_counter() - start
+    return latencies, failures, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Running server to test (default: start a local one with stand-ins)")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds")
+    parser.add_argument("--gemini-latency-ms", type=float, default=200.0)
+    parser.add_argument("--ors-latency-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    url = args.url
+    stand_ins = []
+    server = None
+    if url is None:
+        work = tempfile.mkdtemp(prefix="assistant_load_")
+        sqlite_path = os.path.join(work, "telegram.db")
+        seed_telegram_db(sqlite_path, 20000)
+        gemini = FakeGeminiServer(GEMINI_SCRIPT, latency_ms=args.gemini_latency_ms).start()
+        openroute = OpenRouteStub(latency_ms=args.ors_latency_ms).start()
+        stand_ins = [gemini, openroute]
+        env = {
+            "OPENROUTE_BASE_URL": openroute.url,
+            "GOOGLE_MAPS_API_KEY": "load-test",
+            "MEDIA_PLAYER": "fake",
+            "MEDIA_INDEX_DIR": os.path.join(work, "media_index"),
+            "GEMINI_REQUESTS_PER_MINUTE": "6000000",
+            "GEMINI_TOKENS_PER_MINUTE": "1000000000",
+            "GEMINI_MAX_CONCURRENCY": str(max(4, args.clients)),
+        }
+        port = free_port()
+        url = f"http://127.0.0.1:{port}"
+        server = multiprocessing.get_context("spawn").Process(
+            target=serve_local, args=(port, env, gemini.url, sqlite_path), daemon=True)
+        server.start()
+    try:
+        wait_until_up(url)
+        latencies, failures, elapsed = asyncio.run(run_load(url, args.clients, args.duration))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.join()
+        for stand_in in stand_ins:
+            stand_in.stop()
+
+    total = sum(len(values) for values in latencies.values())
+    print(f"{args.clients} clients, {elapsed:.1f} s: {total} requests, {total / elapsed:.1f} req/s, "
+          f"{sum(failures.values())} failed")
+    for kind, values in sorted(latencies.items()):
+        print(f"  {kind:<16} {len(values):>7} req  p50 {statistics.median(values) * 1000:8.1f} ms  "
+              f"p99 {percentile(values, 0.99) * 1000:8.1f} ms  failed {failures.get(kind, 0)}")
+
+
+if __name__ == "__main__":
+    main()
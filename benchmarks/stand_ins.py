@@ -0,0 +1,474 @@
+"""Local stand-ins for every external dependency the tools talk to.
+
+- install_null_backends(): no-op pyttsx3, WMI and pycaw/comtypes modules so
+  the TTS and hardware tools run headlessly on any OS.
+- FakePsycopg2 / seed_telegram_db(): a psycopg2-compatible module backed by
+  SQLite (with PREPARE/EXECUTE emulated) and seeded with synthetic
+  telegram_messages rows.
+- seed_postgres(): the same synthetic rows for a real local PostgreSQL.
+- OpenRouteStub: a tiny openrouteservice geocode/directions HTTP server.
+- generate_document_corpus() / generate_media_folder(): deterministic files
+  for group_related_files, read_file_aloud and the media tools.
+
+Install the module stand-ins BEFORE importing anything from utils.
+"""
+import csv
+import datetime
+import io
+import json
+import math
+import os
+import random
+import re
+import sqlite3
+import sys
+import threading
+import time
+import types
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+CHANNELS = ["Doctors Ethiopia", "Tech Addis", "Daily News", "Music Corner", "Study Group"]
+EMOJIS = ["👍", "🔥", "❤️", "😂", "🎉", ""]
+WORDS = ("health clinic vaccine doctor patient python release update market price news "
+         "election music album concert exam lecture homework study weather rain road").split()
+
+TOPICS = {
+    "medicine": "patient doctor clinic diagnosis treatment vaccine symptoms hospital nurse dose",
+    "finance": "budget invoice revenue expense profit quarterly tax account balance forecast",
+    "software": "python function release bug deploy server database api commit test",
+    "travel": "flight hotel itinerary passport luggage airport booking visa tour beach",
+}
+
+MEDIA_ARTISTS = ["Aster Aweke", "Teddy Afro", "Mahmoud Ahmed", "Gigi"]
+
+
+# ---------------------------------------------------------------------------
+# Null TTS and hardware backends
+# ---------------------------------------------------------------------------
+
+class _NullEngine:
+    """pyttsx3 engine that accepts text and finishes immediately."""
+
+    def __init__(self):
+        self.spoken_chars = 0
+
+    def say(self, text):
+        self.spoken_chars += len(text)
+
+    def runAndWait(self):
+        pass
+
+    def setProperty(self, name, value):
+        pass
+
+    def stop(self):
+        pass
+
+
+class _NullBrightnessMethods:
+    def WmiSetBrightness(self, percentage, timeout):
+        pass
+
+
+class _NullWMI:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def WmiMonitorBrightnessMethods(self):
+        return [_NullBrightnessMethods()]
+
+
+class _NullVolume:
+    def __init__(self):
+        self.level = 1.0
+
+    def SetMasterVolumeLevelScalar(self, scalar, context):
+        self.level = scalar
+
+    def GetMasterVolumeLevelScalar(self):
+        return self.level
+
+
+def _module(name, **attributes):
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    return module
+
+
+def install_null_backends():
+    """Replace pyttsx3, wmi, pycaw and comtypes with no-op modules."""
+    sys.modules["pyttsx3"] = _module("pyttsx3", init=lambda *args, **kwargs: _NullEngine())
+    sys.modules["wmi"] = _module("wmi", WMI=_NullWMI)
+    sys.modules["comtypes"] = _module("comtypes", CLSCTX_ALL=0, CoInitialize=lambda: None)
+    pycaw_inner = _module("pycaw.pycaw", AudioUtilities=None, IAudioEndpointVolume=None)
+    sys.modules["pycaw"] = _module("pycaw", pycaw=pycaw_inner)
+    sys.modules["pycaw.pycaw"] = pycaw_inner
+    # The real interface is a ctypes COM pointer; hand adjust_volume a plain object instead
+    import utils.audio_util
+    utils.audio_util.get_volume_interface = _NullVolume
+
+
+# ---------------------------------------------------------------------------
+# Fake database
+# ---------------------------------------------------------------------------
+
+TELEGRAM_SCHEMA = """
+CREATE TABLE IF NOT EXISTS telegram_messages (
+    id INTEGER PRIMARY KEY,
+    channel_title TEXT,
+    message_id INTEGER,
+    message TEXT,
+    message_date TEXT,
+    media_path TEXT,
+    emoji TEXT,
+    youtube TEXT,
+    metadata TEXT
+)
+"""
+
+
+def translate_sql(query):
+    """Rewrite the psycopg2 dialect used by the utils into SQLite's."""
+    return (query.replace("%s", "?").replace(" ILIKE ", " LIKE ").replace("::timestamp", "")
+            .replace("::date", "").replace(" FOR UPDATE", ""))
+
+
+def _date_trunc(field, value):
+    """PostgreSQL date_trunc() over ISO date text, for the day/week/month/year fields."""
+    day = datetime.date.fromisoformat(str(value)[:10])
+    if field == "week":
+        day -= datetime.timedelta(days=day.weekday())
+    elif field == "month":
+        day = day.replace(day=1)
+    elif field == "year":
+        day = day.replace(month=1, day=1)
+    return day.isoformat()
+
+
+def _sqlite_params(params):
+    # Dates are stored as ISO text in the SQLite table
+    return tuple(p.isoformat() if isinstance(p, datetime.date) else p for p in (params or ()))
+
+
+PREPARE_PATTERN = re.compile(r"^PREPARE (\w+)(?: \([^)]*\))? AS (.*)$", re.DOTALL)
+EXECUTE_PATTERN = re.compile(r"^EXECUTE (\w+)")
+
+
+class _SqliteCursor:
+    """Cursor over SQLite that also emulates PostgreSQL PREPARE/EXECUTE.
+
+    Prepared statements live on the connection, as they do per server
+    session, and every statement is appended to connection.statements so
+    callers can check which path a query took.
+    """
+
+    def __init__(self, cursor, connection):
+        self._cursor = cursor
+        self._connection = connection
+
+    def execute(self, query, params=()):
+        self._connection.statements.append(query)
+        prepare = PREPARE_PATTERN.match(query)
+        if prepare:
+            name, body = prepare.groups()
+            if name in self._connection.prepared:
+                raise sqlite3.OperationalError(f'prepared statement "{name}" already exists')
+            self._connection.prepared[name] = re.sub(r"\$\d+", "%s", body)
+            return
+        execute = EXECUTE_PATTERN.match(query)
+        if execute:
+            query = self._connection.prepared.get(execute.group(1))
+            if query is None:
+                raise sqlite3.OperationalError(f'prepared statement "{execute.group(1)}" does not exist')
+        self._cursor.execute(translate_sql(query), _sqlite_params(params))
+
+    def executemany(self, query, rows):
+        self._cursor.executemany(translate_sql(query), rows)
+
+    def mogrify(self, query, params=()):
+        """Inline params as SQL literals, like psycopg2 (returns bytes)."""
+        def literal(value):
+            if value is None:
+                return "NULL"
+            if isinstance(value, (int, float)):
+                return str(value)
+            if isinstance(value, datetime.date):
+                value = value.isoformat()
+            return "'" + str(value).replace("'", "''") + "'"
+        parts = query.split("%s")
+        values = [literal(p) for p in params or ()]
+        return "".join(part + (values[n] if n < len(values) else "") for n, part in enumerate(parts)).encode("utf-8")
+
+    def copy_expert(self, sql, file, size=8192):
+        """Emulate COPY (query) TO STDOUT WITH (FORMAT csv, HEADER): one write() per row."""
+        match = re.match(r"COPY \((.*)\) TO STDOUT", sql, re.DOTALL)
+        self._cursor.execute(translate_sql(match.group(1)))
+        line = io.StringIO()
+        writer = csv.writer(line, lineterminator="\n")
+        rows = iter([[column[0] for column in self._cursor.description]]) if "HEADER" in sql else iter(())
+        while True:
+            for row in rows:
+                writer.writerow(row)
+                file.write(line.getvalue().encode("utf-8"))
+                line.seek(0)
+                line.truncate()
+            rows = self._cursor.fetchmany(1000)
+            if not rows:
+                break
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size=1):
+        return self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def close(self):
+        self._cursor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _SqliteConnection:
+    def __init__(self, path):
+        self._connection = sqlite3.connect(path, check_same_thread=False)  # Pooled across threads
+        self._connection.create_function("date_trunc", 2, _date_trunc, deterministic=True)
+        self.prepared = {}    # PREPAREd statement name -> SQL
+        self.statements = []  # Every statement executed, in order
+
+    def cursor(self, *args, **kwargs):
+        return _SqliteCursor(self._connection.cursor(), self)
+
+    def commit(self):
+        self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+
+
+class FakePsycopg2(types.ModuleType):
+    """psycopg2-compatible module whose connect() opens a SQLite file."""
+
+    Error = sqlite3.Error
+    DatabaseError = sqlite3.DatabaseError
+    OperationalError = sqlite3.OperationalError
+
+    def __init__(self, path):
+        super().__init__("psycopg2")
+        self.path = path
+
+    def connect(self, *args, **kwargs):
+        return _SqliteConnection(self.path)
+
+
+def install_fake_db(path):
+    """Make `import psycopg2` resolve to a FakePsycopg2 over the SQLite file at path."""
+    fake = FakePsycopg2(path)
+    sys.modules["psycopg2"] = fake
+    return fake
+
+
+def synthetic_messages(count, seed=0):
+    """Yield deterministic telegram_messages rows (without the id column)."""
+    rng = random.Random(seed)
+    start = time.mktime((2023, 1, 1, 0, 0, 0, 0, 0, -1))
+    for n in range(count):
+        channel = CHANNELS[n % len(CHANNELS)]
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 40)))
+        date = time.strftime("%Y-%m-%d", time.localtime(start + rng.randint(0, 365) * 86400))
+        youtube = f"https://youtu.be/{zlib.crc32(text.encode()):08x}" if n % 7 == 0 else None
+        media = f"media/{n}.jpg" if n % 5 == 0 else None
+        yield (channel, n + 1, text, date, media, rng.choice(EMOJIS), youtube,
+               json.dumps({"views": rng.randint(0, 5000)}))
+
+
+INSERT_MESSAGE = ("INSERT INTO telegram_messages "
+                  "(channel_title, message_id, message, message_date, media_path, emoji, youtube, metadata) "
+                  "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)")
+
+
+def seed_telegram_db(path, count, seed=0):
+    """Create a SQLite telegram_messages table with `count` synthetic rows."""
+    if os.path.exists(path):
+        os.remove(path)
+    connection = sqlite3.connect(path)
+    connection.execute(TELEGRAM_SCHEMA)
+    connection.executemany(translate_sql(INSERT_MESSAGE), synthetic_messages(count, seed))
+    connection.commit()
+    connection.close()
+
+
+def seed_postgres(db_config, count, seed=0):
+    """Seed a real PostgreSQL telegram_messages table if it is missing or empty."""
+    import psycopg2
+    connection = psycopg2.connect(**db_config)
+    try:
+        with connection, connection.cursor() as cursor:
+            cursor.execute(TELEGRAM_SCHEMA.replace("INTEGER PRIMARY KEY", "SERIAL PRIMARY KEY")
+                           .replace("message_date TEXT", "message_date DATE"))
+            cursor.execute("SELECT COUNT(*) FROM telegram_messages")
+            if cursor.fetchone()[0] == 0:
+                cursor.executemany(INSERT_MESSAGE, list(synthetic_messages(count, seed)))
+    finally:
+        connection.close()
+
+
+# ---------------------------------------------------------------------------
+# openrouteservice stub
+# ---------------------------------------------------------------------------
+
+def place_coordinates(name):
+    """Deterministic [lng, lat] for a place name (roughly inside Ethiopia)."""
+    digest = zlib.crc32(name.lower().encode("utf-8"))
+    return [33.0 + (digest % 10000) / 1000.0, 3.5 + (digest // 10000 % 10000) / 1000.0]
+
+
+def haversine_km(a, b):
+    lng1, lat1, lng2, lat2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(h))
+
+
+class OpenRouteStub:
+    """Serves /geocode/search and /v2/directions/driving-car like openrouteservice.
+
+    Args:
+        latency_ms (float): Simulated network latency per request
+    """
+
+    def __init__(self, latency_ms=0.0):
+        self.latency_ms = latency_ms
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}"
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _count(self):
+                with stub.lock:
+                    stub.requests += 1
+                if stub.latency_ms:
+                    time.sleep(stub.latency_ms / 1000)
+
+            def do_GET(self):
+                self._count()
+                url = urlparse(self.path)
+                if url.path != "/geocode/search":
+                    self._reply(404, {"error": {"message": "Not found"}})
+                    return
+                text = parse_qs(url.query).get("text", [""])[0]
+                features = []
+                if text and not text.lower().startswith("nowhere"):
+                    features.append({"geometry": {"type": "Point", "coordinates": place_coordinates(text)},
+                                     "properties": {"label": text}})
+                self._reply(200, {"type": "FeatureCollection", "features": features})
+
+            def do_POST(self):
+                self._count()
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                if urlparse(self.path).path != "/v2/directions/driving-car":
+                    self._reply(404, {"error": {"message": "Not found"}})
+                    return
+                start, end = body["coordinates"]
+                distance = haversine_km(start, end) * 1.3  # Roads are not straight
+                self._reply(200, {"routes": [{"summary": {"distance": distance,
+                                                          "duration": distance / 60.0 * 3600}}]})
+
+            def _reply(self, status, payload):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass  # Keep benchmark output clean
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+# ---------------------------------------------------------------------------
+# Generated files
+# ---------------------------------------------------------------------------
+
+def generate_document_corpus(folder, count, words_per_file=300, seed=0):
+    """Write `count` .txt documents, each drawn mostly from one topic vocabulary.
+
+    Returns:
+        list: Paths of the generated files
+    """
+    os.makedirs(folder, exist_ok=True)
+    rng = random.Random(seed)
+    topics = sorted(TOPICS)
+    filler = " ".join(WORDS).split()
+    paths = []
+    for n in range(count):
+        topic = topics[n % len(topics)]
+        vocabulary = TOPICS[topic].split()
+        words = [rng.choice(vocabulary) if rng.random() < 0.8 else rng.choice(filler)
+                 for _ in range(words_per_file)]
+        path = os.path.join(folder, f"{topic}_{n:04d}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(" ".join(words))
+        paths.append(path)
+    return paths
+
+
+def generate_media_folder(folder, count, seed=0):
+    """Create `count` small placeholder audio/video files with varied names and sizes."""
+    os.makedirs(folder, exist_ok=True)
+    rng = random.Random(seed)
+    for n in range(count):
+        extension = ".mp3" if n % 2 else ".mp4"
+        name = f"{MEDIA_ARTISTS[n % len(MEDIA_ARTISTS)]} - track {n:04d}{extension}"
+        with open(os.path.join(folder, name), "wb") as f:
+            f.write(os.urandom(rng.randint(256, 4096)))
+    return folder
@@ -3,10 +3,97 @@ import os
 # Configuration settings
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
+OPENROUTE_BASE_URL = os.getenv("OPENROUTE_BASE_URL", "https://api.openrouteservice.org")
 DB_CONFIG = {
     "host": os.getenv("DB_HOST"),
     "port": os.getenv("DB_PORT"),
     "dbname": os.getenv("DB_NAME"),
     "user": os.getenv("DB_USER"),
     "password": os.getenv("DB_PASSWORD"),
-}
\ No newline at end of file
+}
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))  # Pooled connections for Telegram queries; each keeps its prepared statements
+
+# Media library settings
+MEDIA_INDEX_DIR = os.getenv("MEDIA_INDEX_DIR", os.path.join(os.path.expanduser("~"), ".gemini_assistant", "media_index"))
+MEDIA_INDEX_MAX_AGE_SECONDS = float(os.getenv("MEDIA_INDEX_MAX_AGE_SECONDS", "60"))  # Rescan an unchanged folder at most this often
+MEDIA_PLAYER = os.getenv("MEDIA_PLAYER", "mpv")  # "mpv", "system" or "fake"
+MPV_PATH = os.getenv("MPV_PATH", "mpv")
+MEDIA_SYSTEM_PLAYER = os.getenv("MEDIA_SYSTEM_PLAYER", "")  # Player command for the fallback, e.g. "vlc --play-and-exit"
+
+# Whiteboard storage settings
+WHITEBOARD_DB_PATH = os.getenv("WHITEBOARD_DB_PATH", os.path.join(os.path.expanduser("~"), ".gemini_assistant", "whiteboards.db"))
+WHITEBOARD_EXPORT_DIR = os.getenv("WHITEBOARD_EXPORT_DIR", "whiteboard_exports")
+
+# Gemini settings
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+
+# Response cache settings (plain-text Gemini answers)
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") == "1"
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "86400"))  # Seconds
+
+# Gemini request scheduler settings (shared by all sessions)
+GEMINI_REQUESTS_PER_MINUTE = int(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "15"))
+GEMINI_TOKENS_PER_MINUTE = int(os.getenv("GEMINI_TOKENS_PER_MINUTE", "1000000"))
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "5"))
+GEMINI_BACKOFF_BASE = float(os.getenv("GEMINI_BACKOFF_BASE", "1.0"))  # Seconds
+GEMINI_BACKOFF_MAX = float(os.getenv("GEMINI_BACKOFF_MAX", "30.0"))  # Seconds
+GEMINI_QUEUE_TIMEOUT = float(os.getenv("GEMINI_QUEUE_TIMEOUT", "120.0"))  # Seconds
+GEMINI_SHORT_PROMPT_TOKENS = int(os.getenv("GEMINI_SHORT_PROMPT_TOKENS", "64"))
+GEMINI_BURST_SECONDS = float(os.getenv("GEMINI_BURST_SECONDS", "4.0"))  # Budget that may be spent back to back
+
+# Metrics settings: Prometheus endpoint port ("0" disables it)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+
+# Background job settings (long-running tools such as file grouping and read aloud)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "50"))  # Finished jobs kept for result retrieval
+JOB_REFRESH_SECONDS = float(os.getenv("JOB_REFRESH_SECONDS", "1.0"))  # Progress panel refresh interval
+
+# Headless API server settings (python api_server.py)
+API_HOST = os.getenv("API_HOST", "127.0.0.1")
+API_PORT = int(os.getenv("API_PORT", "8080"))
+API_WORKER_THREADS = int(os.getenv("API_WORKER_THREADS", "16"))  # Threads for blocking tools
+API_DB_POOL_SIZE = int(os.getenv("API_DB_POOL_SIZE", "10"))
+API_MAX_SESSIONS = int(os.getenv("API_MAX_SESSIONS", "1000"))
+API_SSE_INTERVAL = float(os.getenv("API_SSE_INTERVAL", "0.5"))  # Seconds between job progress events
+
+# Similar-message search settings (local vector index over telegram_messages)
+MESSAGE_INDEX_DIR = os.getenv("MESSAGE_INDEX_DIR", os.path.join(os.path.expanduser("~"), ".gemini_assistant", "message_index"))
+MESSAGE_INDEX_DIM = int(os.getenv("MESSAGE_INDEX_DIM", "128"))  # Vector size (float32 per dimension per message)
+MESSAGE_INDEX_NPROBE = int(os.getenv("MESSAGE_INDEX_NPROBE", "16"))  # Clusters scanned per query
+MESSAGE_INDEX_REFRESH_SECONDS = float(os.getenv("MESSAGE_INDEX_REFRESH_SECONDS", "60"))  # Min gap between incremental updates
+
+# Telegram export settings
+EXPORT_DIR = os.getenv("EXPORT_DIR", os.path.join(os.path.expanduser("~"), ".gemini_assistant", "exports"))
+EXPORT_CHUNK_BYTES = int(os.getenv("EXPORT_CHUNK_BYTES", str(8 * 1024 * 1024)))  # Bytes written per chunk
+EXPORT_INLINE_DOWNLOAD_MB = float(os.getenv("EXPORT_INLINE_DOWNLOAD_MB", "20"))  # Larger exports show only the file path (or API link) in the chat
+EXPORT_BASE_URL = os.getenv("EXPORT_BASE_URL")  # Browser-reachable API server URL; exports are then linked to its streaming /exports route
+
+# Telegram statistics (summary table refreshed from new messages)
+STATS_REFRESH_SECONDS = float(os.getenv("STATS_REFRESH_SECONDS", "60"))  # Max age of the summary before a question refreshes it
+STATS_WATERMARK_LAG_SECONDS = float(os.getenv("STATS_WATERMARK_LAG_SECONDS", "300"))  # Longest insert transaction the incremental refresh allows for
+
+# Per-session memory limits (large session state is spilled to disk and loaded back lazily)
+SESSION_SPILL_DIR = os.getenv("SESSION_SPILL_DIR", os.path.join(os.path.expanduser("~"), ".gemini_assistant", "session_spill"))
+SESSION_MEMORY_BUDGET_MB = float(os.getenv("SESSION_MEMORY_BUDGET_MB", "64"))  # Per session, before whole values are spilled
+SESSION_TOTAL_MEMORY_MB = float(os.getenv("SESSION_TOTAL_MEMORY_MB", "1024"))  # All sessions, before least recently used ones are spilled
+SESSION_SPILL_THRESHOLD_KB = int(os.getenv("SESSION_SPILL_THRESHOLD_KB", "256"))  # Table results above this go to disk
+SESSION_HISTORY_MESSAGES = int(os.getenv("SESSION_HISTORY_MESSAGES", "100"))  # Chat messages kept in memory per session
+SESSION_IDLE_SECONDS = float(os.getenv("SESSION_IDLE_SECONDS", "900"))  # Idle sessions are spilled to disk
+SESSION_EXPIRE_SECONDS = float(os.getenv("SESSION_EXPIRE_SECONDS", "86400"))  # Spill files of sessions idle this long are deleted
+
+# Driving distance backend: "openrouteservice", "local" (offline road graph) or
+# "auto" (local graph when one has been built, openrouteservice otherwise)
+DISTANCE_BACKEND = os.getenv("DISTANCE_BACKEND", "auto")
+ROUTING_GRAPH_DIR = os.getenv("ROUTING_GRAPH_DIR", os.path.join(os.path.expanduser("~"), ".gemini_assistant", "road_graph"))
+ROUTING_MAX_SNAP_KM = float(os.getenv("ROUTING_MAX_SNAP_KM", "5"))  # Max distance from a place to the nearest road
+
+# Per-request profiling (cProfile, sampled stacks and tracemalloc); "/profile <prompt>" profiles one request
+PROFILE_REQUESTS = os.getenv("PROFILE_REQUESTS", "0") == "1"  # Profile every chat request
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.path.expanduser("~"), ".gemini_assistant", "profiles"))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))  # Stack sampling interval for flame graphs
+PROFILE_TOP_ENTRIES = int(os.getenv("PROFILE_TOP_ENTRIES", "25"))  # Functions and allocation sites in the report
+PROFILE_HISTORY = int(os.getenv("PROFILE_HISTORY", "20"))  # Recent profiles kept per session for the diagnostics panel
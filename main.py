@@ -2,27 +2,31 @@
 import pandas as pd
 import streamlit as st  # For building the web app interface
 import google.generativeai as genai  # For accessing Gemini AI
-from utils.audio_util import adjust_volume  # Volume control utility
-from utils.brightness_util import adjust_brightness  # Screen brightness control
-from utils.distance_util import get_distance  # Distance calculation utility
-from utils.file_analysis_util import group_related_files  # File grouping utility
-from utils.media_util import open_first_media_file, navigate_media_file  # Media file handling
-from utils.db_util import query_telegram_messages  # Database query utility
-from config import GOOGLE_API_KEY  # API key configuration
+from config import GOOGLE_API_KEY, GEMINI_MODEL  # API key and model configuration
 from utils.annotation_util import *  # Annotation tools
 from utils.canvas_util import *  # Canvas drawing utilities
 import comtypes  # For COM object initialization (Windows specific)
 import time  # For time-related functions
 from streamlit_drawable_canvas import st_canvas  # Interactive canvas component
-from utils.tts_util import read_file_aloud  # Text-to-speech functionality
+from utils.dispatch_util import resolve_prompt, dispatch_function_call  # Routing, caching and tool dispatch
+from utils.metrics_util import start_metrics_server  # Latency/error instrumentation
+from utils.diagnostics_util import show_diagnostics_panel  # Sidebar diagnostics panel
+from utils.job_panel_util import show_jobs_panel, show_download_button  # Live progress of background jobs, export downloads
+from utils.profiling_util import profile_request, profiling_enabled, split_profile_prefix  # Per-request profiling
+from utils.session_store_util import (begin_session_run, end_session_run, load_spilled, restore_session_values,
+                                      Spilled)  # Per-session memory limits
+from config import METRICS_PORT  # Prometheus endpoint port
 
 # Initialize COM (Component Object Model) for Windows applications
 comtypes.CoInitialize()
 
 # Configure Gemini API with the provided API key
 genai.configure(api_key=GOOGLE_API_KEY)
-# Initialize the Gemini model with flash version
-model = genai.GenerativeModel('gemini-1.5-flash')
+# Initialize the Gemini model (flash version by default)
+model = genai.GenerativeModel(GEMINI_MODEL)
+
+# Serve the same metrics to Prometheus (started once per process)
+metrics_url = start_metrics_server(METRICS_PORT)
 
 # Function to load custom CSS styles
 def load_css():
@@ -34,6 +38,9 @@ def load_css():
 # Load the CSS styles
 load_css()
 
+# Show where time goes per model/tool call
+show_diagnostics_panel(metrics_url)
+
 def handle_markdown_command(text):
     """Processes markdown commands in user input"""
     if "```markdown" in text:
@@ -42,6 +49,9 @@ def handle_markdown_command(text):
         return "Here's your rendered markdown:", md_content
     return None, None
 
+# Mark this session active and bring back its chat history if it was spilled to disk
+begin_session_run()
+
 # Initialize chat history and session state variables
 if "messages" not in st.session_state:
     st.session_state.messages = []  # Stores chat messages
@@ -58,15 +68,38 @@ if "whiteboard_mode" not in st.session_state:
 if "presentation_mode" not in st.session_state:
     st.session_state.presentation_mode = False  # Presentation mode state
 
-# Display existing chat messages
-for message in st.session_state.messages:
+def show_message(message, key):
+    """Draws one chat history message (key keeps its widgets unique)"""
     # Set avatar based on message role
     avatar = "👤" if message["role"] == "user" else "🤖"
     with st.chat_message(message["role"], avatar=avatar):
         st.markdown(message["content"])  # Display message content
+        table = message.get("table")
+        if isinstance(table, Spilled):
+            # Large results live on disk and are only read when asked for
+            if st.toggle(f"Show table ({table.count:,} rows)", key=f"table_{key}"):
+                st.dataframe(pd.DataFrame(load_spilled(table, []), columns=message["columns"]))
+        elif table is not None:
+            st.dataframe(pd.DataFrame(table, columns=message["columns"]))
+        if message.get("download"):
+            show_download_button(message["download"])  # Exported file from a finished job
+
+# Older messages were moved to disk; load them only when asked for
+spilled_history = st.session_state.get("spilled_history", [])
+if spilled_history:
+    earlier = sum(chunk.count or 0 for chunk in spilled_history)
+    if st.toggle(f"Show {earlier} earlier messages", key="show_spilled_history"):
+        for c, chunk in enumerate(spilled_history):
+            for i, message in enumerate(load_spilled(chunk, [])):
+                show_message(message, f"spilled_{c}_{i}")
+
+# Display existing chat messages
+for i, message in enumerate(st.session_state.messages):
+    show_message(message, f"message_{len(spilled_history)}_{i}")
 
 # Chat input field
 if prompt := st.chat_input("Type your message..."):
+    prompt, profile_requested = split_profile_prefix(prompt)
     # First check for markdown commands
     md_response = handle_markdown_command(prompt)
     if md_response[0]:
@@ -80,331 +113,64 @@ if prompt := st.chat_input("Type your message..."):
         with st.chat_message("user", avatar="👤"):
             st.markdown(prompt)  # Display user message
 
-        # Start chat with Gemini AI
-        chat = model.start_chat(history=[])
-        # Send prompt with all available tools/functionalities
-        response = chat.send_message(
-            prompt,
-            tools=[{
-                "function_declarations": [
-                    # Brightness adjustment tool
-                    {
-                        "name": "adjust_brightness",
-                        "description": "Adjusts screen brightness percentage",
-                        "parameters": {
-                            "type": "OBJECT",
-                            "properties": {
-                                "percentage": {
-                                    "type": "NUMBER",
-                                    "description": "Brightness percentage (0-100)",
-                                },
-                            },
-                            "required": ["percentage"],
-                        },
-                    },
-                    # Volume adjustment tool
-                    {
-                        "name": "adjust_volume",
-                        "description": "Adjusts system volume percentage",
-                        "parameters": {
-                            "type": "OBJECT",
-                            "properties": {
-                                "percentage": {
-                                    "type": "NUMBER",
-                                    "description": "Volume percentage (0-100)",
-                                },
-                            },
-                            "required": ["percentage"],
-                        },
-                    },
-                    # Distance calculation tool
-                    {
-                        "name": "get_distance",
-                        "description": "Calculates driving distance between locations",
-                        "parameters": {
-                            "type": "OBJECT",
-                            "properties": {
-                                "origin": {"type": "STRING", "description": "Start location"},
-                                "destination": {"type": "STRING", "description": "End location"},
-                            },
-                            "required": ["origin", "destination"],
-                        },
-                    },
-                    # Media file opener
-                    {
-                        "name": "open_first_media_file",
-                        "description": "Opens first media file in folder",
-                        "parameters": {
-                            "type": "OBJECT",
-                            "properties": {
-                                "folder_path": {
-                                    "type": "STRING",
-                                    "description": "Path to media files folder",
-                                },
-                            },
-                            "required": ["folder_path"],
-                        },
-                    },
-                    # Media file navigator
-                    {
-                        "name": "navigate_media_file",
-                        "description": "Navigates between media files",
-                        "parameters": {
-                            "type": "OBJECT",
-                            "properties": {
-                                "direction": {
-                                    "type": "STRING",
-                                    "enum": ["next", "previous"],
-                                    "description": "Navigation direction",
-                                },
-                            },
-                            "required": ["direction"],
-                        },
-                    },
-                    # Telegram messages query
-                    {
-                        "name": "query_telegram_messages",
-                        "description": "Queries telegram messages database",
-                        "parameters": {
-                            "type": "OBJECT",
-                            "properties": {
-                                "query": {
-                                    "type": "STRING",
-                                    "description": "Search query",
-                                },
-                            },
-                            "required": ["query"],
-                        },
-                    },
-                    # Annotation tool starter
-                    {
-                        "name": "start_annotation",
-                        "description": "Starts annotation with specified tool",
-                        "parameters": {
-                            "type": "OBJECT",
-                            "properties": {
-                                "tool": {
-                                    "type": "STRING",
-                                    "enum": ["pen", "rectangle", "circle"],
-                                    "description": "Annotation tool to use",
-                                },
-                            },
-                            "required": ["tool"],
-                        },
-                    },                    
-                    # Whiteboard toggle
-                    {
-                        "name": "toggle_whiteboard",
-                        "description": "Toggles whiteboard mode",
-                        "parameters": {
-                            "type": "OBJECT",
-                            "properties": {
-                                "enable": {
-                                    "type": "BOOLEAN",
-                                    "description": "Enable/disable whiteboard",
-                                },
-                            },
-                            "required": ["enable"],
-                        },
-                    },
-                    # Text-to-speech reader
-                    {
-                        "name": "read_file_aloud",
-                        "description": "Reads file content aloud",
-                        "parameters": {
-                            "type": "OBJECT",
-                            "properties": {
-                                "file_path": {
-                                    "type": "STRING",
-                                    "description": "Path to file to read",
-                                },
-                            },
-                            "required": ["file_path"],
-                        },
-                    },
-                    # File grouping tool
-                    {
-                        "name": "group_related_files",
-                        "description": "Groups similar files in folder",
-                        "parameters": {
-                            "type": "OBJECT",
-                            "properties": {
-                                "folder_path": {
-                                    "type": "STRING",
-                                    "description": "Path to folder to analyze",
-                                },
-                                "output_folder": {
-                                    "type": "STRING",
-                                    "description": "Output folder name",
-                                },
-                                "similarity_threshold": {
-                                    "type": "NUMBER",
-                                    "description": "Similarity threshold (0-1)",
-                                },
-                            },
-                            "required": ["folder_path"],
-                        },
-                    }                
-                ]
-            }]
-        )
-
-        # Process Gemini's response
-        if hasattr(response.parts[0], 'function_call') and response.parts[0].function_call:
-            function_name = response.parts[0].function_call.name
-            arguments = response.parts[0].function_call.args
-
-            # Brightness adjustment handler
-            if function_name == "adjust_brightness":
-                percentage = arguments.get("percentage")
-                if percentage is not None:
-                    function_result = adjust_brightness(percentage)
-                    st.session_state.messages.append({"role": "assistant", "content": function_result})
-                    with st.chat_message("assistant", avatar="🤖"):
-                        st.markdown(function_result)
-
-            # Volume adjustment handler
-            elif function_name == "adjust_volume":
-                percentage = arguments.get("percentage")
-                if percentage is not None:
-                    function_result = adjust_volume(percentage)
-                    st.session_state.messages.append({"role": "assistant", "content": function_result})
-                    with st.chat_message("assistant", avatar="🤖"):
-                        st.markdown(function_result)
-
-            # Distance calculation handler
-            elif function_name == "get_distance":
-                origin = arguments.get("origin")
-                destination = arguments.get("destination")
-                if origin and destination:
-                    function_result = get_distance(origin, destination)
-                    st.session_state.messages.append({"role": "assistant", "content": function_result})
+        # "/profile <prompt>", the sidebar toggle or PROFILE_REQUESTS profile this request
+        profiled = profiling_enabled(profile_requested or st.session_state.get("profile_requests", False))
+        # Profiles are listed per session in the Diagnostics panel
+        restore_session_values(st.session_state, "profiles")
+        with profile_request(prompt, enabled=profiled,
+                             history=st.session_state.setdefault("profiles", [])) as profile:
+            # Local route, cached answer or Gemini call
+            function_name, arguments, response_text = resolve_prompt(prompt, model)
+
+            # Dispatch the requested function
+            if function_name:
+                # Long-running tools (file grouping, read aloud) run as background jobs,
+                # except when profiled so the profile covers the work itself
+                reply = dispatch_function_call(function_name, arguments, st.session_state, background=not profile)
+                if reply:
+                    message = {"role": "assistant", "content": reply["content"]}
+                    if reply.get("table") is not None:
+                        # Kept with the message (large tables are spilled to disk after the run)
+                        message.update(table=reply["table"], columns=reply["columns"])
+                    st.session_state.messages.append(message)
                     with st.chat_message("assistant", avatar="🤖"):
-                        st.markdown(function_result)
-
-            # Media file opener handler
-            elif function_name == "open_first_media_file":
-                folder_path = arguments.get("folder_path")
-                if folder_path:
-                    result = open_first_media_file(folder_path)
-                    st.session_state.messages.append({"role": "assistant", "content": result["message"]})
-                    if result["status"] == "success":
-                        st.session_state.current_file_index = result["current_file_index"]
-                        st.session_state.file_list = result["file_list"]
-                    with st.chat_message("assistant", avatar="🤖"):
-                        st.markdown(result["message"])
-
-            # Media file navigation handler
-            elif function_name == "navigate_media_file":
-                direction = arguments.get("direction")
-                if direction:
-                    result = navigate_media_file(
-                        direction,
-                        st.session_state.current_file_index,
-                        st.session_state.file_list
-                    )
-                    st.session_state.messages.append({"role": "assistant", "content": result["message"]})
-                    if result["status"] == "success":
-                        st.session_state.current_file_index = result["current_file_index"]
-                    with st.chat_message("assistant", avatar="🤖"):
-                        st.markdown(result["message"])
-
-            # Telegram messages query handler
-            if function_name == "query_telegram_messages":
-                query = arguments.get("query")
-                if query:
-                    result = query_telegram_messages(query)
-                    if result["status"] == "success":
-                        if "data" in result:
-                            # Convert the data to a pandas DataFrame for easy tabular display
-                            df = pd.DataFrame(result["data"], columns=["ID", "Channel", "Message ID", "Message", "Timestamp", "Media", "Emojis", "URL", "Metadata"])
-                            st.session_state.messages.append({"role": "assistant", "content": "Here are the results in a table format:"})
-                            with st.chat_message("assistant", avatar="🤖"):
-                                st.markdown("Here are the results in a table format:")
-                                st.dataframe(df)  # Display the DataFrame as a table
-                        else:
-                            st.session_state.messages.append({"role": "assistant", "content": result["message"]})
-                            with st.chat_message("assistant", avatar="🤖"):
-                                st.markdown(result["message"])
-                    else:
-                        st.session_state.messages.append({"role": "assistant", "content": result["message"]})
-                        with st.chat_message("assistant", avatar="🤖"):
-                            st.markdown(result["message"])
-
-            # Annotation tool starter handler
-            elif function_name == "start_annotation":
-                tool = arguments.get("tool", "pen")
-                tool_mapping = {
-                    "pen": "freedraw",
-                    "rectangle": "rect", 
-                    "circle": "circle"
-                }
-                
-                init_annotation_session()
-                st.session_state.annotation_tool = tool_mapping.get(tool, "freedraw")
-                st.session_state.whiteboard_mode = True
-                
-                response_msg = f"🎨 Whiteboard: {tool} tool active"
-                st.session_state.messages.append({"role": "assistant", "content": response_msg})
-                
+                        st.markdown(reply["content"])
+                        if reply.get("table") is not None:
+                            # Convert the rows to a pandas DataFrame for easy tabular display
+                            st.dataframe(pd.DataFrame(reply["table"], columns=reply["columns"]))
+                        if reply.get("show_canvas"):
+                            init_annotation_session()
+                            show_annotation_controls()
+                            canvas = get_annotation_canvas()
+
+                            if canvas.json_data is not None:
+                                record_canvas_update(canvas.json_data)
+
+            # If no function call, just display Gemini's text response
+            else:
+                st.session_state.messages.append({"role": "assistant", "content": response_text})
                 with st.chat_message("assistant", avatar="🤖"):
-                    st.markdown(response_msg)
-                    show_annotation_controls()
-                    canvas = get_annotation_canvas()
-                    
-                    if canvas.json_data is not None:
-                        st.session_state.canvas_data = canvas.json_data
+                    st.markdown(response_text)
 
-            # Whiteboard toggle handler
-            elif function_name == "toggle_whiteboard":
-                enable = arguments.get("enable", True)
-                st.session_state.whiteboard_mode = enable
-                response_msg = "🖍️ Whiteboard enabled" if enable else "Whiteboard disabled"
-                st.session_state.messages.append({"role": "assistant", "content": response_msg})
-                with st.chat_message("assistant", avatar="🤖"):
-                    st.markdown(response_msg)  
-            
-            # Text-to-speech handler
-            elif function_name == "read_file_aloud":
-                file_path = arguments.get("file_path")
-                if file_path:
-                    result = read_file_aloud(file_path)
-                    st.session_state.messages.append({"role": "assistant", "content": result["message"]})
-                    with st.chat_message("assistant", avatar="🤖"):
-                        st.markdown(result["message"])    
-            
-            # File grouping handler
-            elif function_name == "group_related_files":
-                folder_path = arguments.get("folder_path")
-                output_folder = arguments.get("output_folder", "grouped_files")
-                similarity_threshold = arguments.get("similarity_threshold", 0.5)
-                
-                result = group_related_files(folder_path, output_folder, similarity_threshold)
-                
-                if result["status"] == "success":
-                    response_msg = (f"✅ Successfully grouped files into {len(result['groups'])} groups.\n"
-                                f"📁 Output folder: {result['output_folder']}\n\n"
-                                "Groups created:\n" + 
-                                "\n".join([f"- {g['group_name']}: {', '.join(g['files'])}" 
-                                        for g in result["groups"]]))
-                else:
-                    response_msg = f"❌ Error: {result['message']}"
-                
-                st.session_state.messages.append({"role": "assistant", "content": response_msg})
-                with st.chat_message("assistant", avatar="🤖"):
-                    st.markdown(response_msg)    
-       
-        # If no function call, just display Gemini's text response
-        else:
-            st.session_state.messages.append({"role": "assistant", "content": response.text})
-            with st.chat_message("assistant", avatar="🤖"):
-                st.markdown(response.text)
+        if profile and profile.seconds is not None:
+            st.caption(f"🔬 Profiled in {profile.seconds * 1000:.0f} ms · saved to `{profile.folder}` "
+                       f"(see Diagnostics)")
 
 # Display whiteboard if enabled
 if st.session_state.get('whiteboard_mode', False):
     st.subheader("🖍️ Interactive Whiteboard")
+    show_whiteboard_jobs()
     show_annotation_controls()
     canvas = get_annotation_canvas()
     
     if canvas.json_data is not None:
-        st.session_state.canvas_data = canvas.json_data
\ No newline at end of file
+        record_canvas_update(canvas.json_data)
+else:
+    # The canvas is not rendered this run, so it must be re-seeded when shown again
+    release_annotation_canvas()
+
+# Background jobs with live progress (drawn last so jobs started in this run are included)
+show_jobs_panel()
+
+# Spill what exceeds this session's memory limits before the run ends
+end_session_run()
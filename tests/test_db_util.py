@@ -0,0 +1,133 @@
+"""Prepared-statement path of query_telegram_messages against the SQLite stand-in."""
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from benchmarks.stand_ins import FakePsycopg2, seed_telegram_db
+from utils import db_util
+
+
+class PgError(sqlite3.OperationalError):
+    """An error carrying a PostgreSQL SQLSTATE, like psycopg2's."""
+
+    def __init__(self, pgcode):
+        super().__init__(pgcode)
+        self.pgcode = pgcode
+
+
+class PreparedQueryTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.folder = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.folder.name, "telegram.sqlite")
+        seed_telegram_db(cls.path, 500)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.folder.cleanup()
+
+    def setUp(self):
+        db_util._reset_pool()
+        patcher = mock.patch.object(db_util, "psycopg2", FakePsycopg2(self.path))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(db_util._reset_pool)
+
+    def pooled(self):
+        """The only pooled connection and its prepared-statement state."""
+        self.assertEqual(len(db_util._idle), 1)
+        return db_util._idle[0]
+
+    def statements(self, verb):
+        return [s for s in self.pooled()[0].statements if s.startswith(verb)]
+
+    def test_shape_is_prepared_once_then_executed(self):
+        first = db_util.query_telegram_messages(date_from="2020-01-01", text="a", limit=5, order="newest")
+        second = db_util.query_telegram_messages(date_from="2021-01-01", text="e", limit=5, order="newest")
+        self.assertEqual(first["status"], "success")
+        self.assertEqual(len(self.statements("PREPARE")), 1)
+        self.assertEqual(len(self.statements("EXECUTE")), 2)
+        self.assertTrue(self.pooled()[1]["can_prepare"])
+
+        # Same rows as the unprepared statement
+        sql_query, params, _, _ = db_util.build_telegram_query(date_from="2021-01-01", text="e", limit=5,
+                                                               order="newest")
+        cur = self.pooled()[0].cursor()
+        cur.execute(sql_query, params)
+        self.assertEqual(second.get("data"), cur.fetchall() or None)
+
+    def test_queries_from_different_threads_share_the_prepared_statement(self):
+        results = []
+        for date_from in ("2020-01-01", "2021-01-01"):
+            # A new thread per query, like Streamlit's reruns
+            thread = threading.Thread(target=lambda: results.append(
+                db_util.query_telegram_messages(channel="Tech Addis", date_from=date_from)))
+            thread.start()
+            thread.join()
+        self.assertEqual([result["status"] for result in results], ["success", "success"])
+        self.assertEqual(len(self.statements("PREPARE")), 1)
+        self.assertEqual(len(self.statements("EXECUTE")), 2)
+
+    def test_transient_prepare_failure_retries_next_query(self):
+        db_util.query_telegram_messages(channel="Tech Addis", text="warm up")
+        conn, state = self.pooled()
+        state["prepared"].clear()
+        conn.prepared.clear()
+        execute = conn.cursor().__class__.execute
+        failures = [sqlite3.OperationalError("canceling statement due to statement timeout")]
+
+        def flaky(cursor, query, params=()):
+            if query.startswith("PREPARE") and failures:
+                raise failures.pop()
+            return execute(cursor, query, params)
+
+        with mock.patch.object(conn.cursor().__class__, "execute", flaky):
+            self.assertEqual(db_util.query_telegram_messages(channel="Tech Addis")["status"], "success")
+            self.assertTrue(state["can_prepare"])
+            self.assertFalse(state["prepared"])
+            db_util.query_telegram_messages(channel="Tech Addis")
+        self.assertEqual(state["prepared"], {"telegram_q_channel"})
+
+    def test_unsupported_prepare_falls_back_to_plain_queries(self):
+        db_util.query_telegram_messages(channel="Tech Addis", text="warm up")
+        conn, state = self.pooled()
+        state["prepared"].clear()
+        conn.statements.clear()
+        execute = conn.cursor().__class__.execute
+        attempts = []
+
+        def pooler(cursor, query, params=()):
+            if query.startswith("PREPARE"):
+                attempts.append(query)
+                raise PgError("0A000")
+            return execute(cursor, query, params)
+
+        with mock.patch.object(conn.cursor().__class__, "execute", pooler):
+            self.assertEqual(db_util.query_telegram_messages(channel="Tech Addis")["status"], "success")
+            db_util.query_telegram_messages(channel="Tech Addis")
+        self.assertFalse(state["can_prepare"])
+        self.assertEqual(len(attempts), 1)
+        self.assertFalse(self.statements("EXECUTE"))
+
+    def test_missing_statement_on_execute_falls_back(self):
+        db_util.query_telegram_messages(channel="Tech Addis")
+        conn, state = self.pooled()
+        conn.prepared.clear()  # A pooler moved the session to another backend
+        execute = conn.cursor().__class__.execute
+
+        def moved(cursor, query, params=()):
+            if query.startswith("EXECUTE") and query.split()[1] not in conn.prepared:
+                raise PgError("26000")
+            return execute(cursor, query, params)
+
+        with mock.patch.object(conn.cursor().__class__, "execute", moved):
+            self.assertEqual(db_util.query_telegram_messages(channel="Tech Addis")["status"], "success")
+        self.assertFalse(state["can_prepare"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+"""Folder scanning: filters, absolute paths and errors on the root."""
+import os
+import tempfile
+import unittest
+
+from utils.file_analysis_util import group_related_files
+from utils.file_scan_util import scan_files
+
+
+class ScanFilesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+        for relative in ("a.txt", "sub/b.txt", "sub/c.tmp"):
+            path = os.path.join(self.folder.name, relative)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write("text")
+
+    def test_relative_root_gives_absolute_paths(self):
+        cwd = os.getcwd()
+        os.chdir(self.folder.name)
+        self.addCleanup(os.chdir, cwd)
+        scanned = scan_files(".", exclude=["*.tmp"])
+        self.assertEqual([relative for relative, _, _ in scanned], ["a.txt", "sub/b.txt"])
+        for relative, path, size in scanned:
+            self.assertTrue(os.path.isabs(path))
+            self.assertEqual(path, os.path.join(os.path.realpath(self.folder.name), *relative.split("/")))
+            self.assertEqual(size, 4)
+
+    def test_missing_root_raises(self):
+        with self.assertRaises(OSError):
+            scan_files(os.path.join(self.folder.name, "missing"))
+
+    def test_missing_folder_is_an_error_not_an_empty_folder(self):
+        result = group_related_files(os.path.join(self.folder.name, "missing"),
+                                     output_folder=os.path.join(self.folder.name, "out"))
+        self.assertEqual(result["status"], "error")
+        self.assertNotIn("No files found", result["message"])
+
+
+if __name__ == "__main__":
+    unittest.main()
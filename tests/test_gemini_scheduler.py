@@ -0,0 +1,133 @@
+"""RequestScheduler against the local fake Gemini endpoint."""
+import asyncio
+import threading
+import time
+import unittest
+from unittest import mock
+
+from benchmarks.fake_gemini import FakeGeminiModel, FakeGeminiServer
+from utils.gemini_scheduler_util import RequestScheduler, SchedulerBusyError
+
+
+def max_in_window(times, window):
+    """Largest number of timestamps inside any interval of the given length."""
+    times = sorted(times)
+    best, start = 0, 0
+    for end, t in enumerate(times):
+        while t - times[start] > window:
+            start += 1
+        best = max(best, end - start + 1)
+    return best
+
+
+class SchedulerTest(unittest.TestCase):
+
+    def start_server(self, **kwargs):
+        server = FakeGeminiServer(**kwargs).start()
+        self.addCleanup(server.stop)
+        return server, FakeGeminiModel(server.url).start_chat()
+
+    def test_retries_with_backoff_after_429(self):
+        server, chat = self.start_server(reject_first=2)
+        scheduler = RequestScheduler(requests_per_minute=6000, tokens_per_minute=10 ** 9, max_retries=3,
+                                     backoff_base=0.1, backoff_max=1.0)
+        # Take the top of the jitter range so the expected pauses are exact
+        with mock.patch("utils.gemini_scheduler_util.random.uniform", lambda low, high: high):
+            response = scheduler.submit(chat.send_message, "hello")
+
+        self.assertEqual(response.text, "Echo: hello")
+        self.assertEqual([status for _, _, status in server.arrivals], [429, 429, 200])
+        self.assertEqual((scheduler.retries, scheduler.completed, scheduler.failures), (2, 1, 0))
+        times = [t for t, _, _ in server.arrivals]
+        self.assertGreaterEqual(times[1] - times[0], 0.1)  # backoff_base * 2 ** 0
+        self.assertGreaterEqual(times[2] - times[1], 0.2)  # backoff_base * 2 ** 1
+
+    def test_gives_up_after_max_retries(self):
+        server, chat = self.start_server(reject_first=10)
+        scheduler = RequestScheduler(requests_per_minute=6000, tokens_per_minute=10 ** 9, max_retries=2,
+                                     backoff_base=0.01, backoff_max=0.01)
+        with self.assertRaises(SchedulerBusyError):
+            scheduler.submit(chat.send_message, "hello")
+        self.assertEqual(server.rejected, 3)
+        self.assertEqual(scheduler.failures, 1)
+
+    def test_short_prompts_go_first(self):
+        server, chat = self.start_server()
+        scheduler = RequestScheduler(requests_per_minute=6000, tokens_per_minute=10 ** 9, max_concurrency=1,
+                                     short_prompt_tokens=50)
+        release = threading.Event()
+        holder = threading.Thread(target=scheduler.submit, args=(release.wait,))
+        holder.start()
+        while scheduler.stats()["active"] != 1:
+            time.sleep(0.001)
+
+        # Queued in this order while the only slot is taken
+        requests = [("long 1", 500), ("long 2", 500), ("short 1", 10), ("short 2", 10)]
+        threads = []
+        for prompt, tokens in requests:
+            thread = threading.Thread(target=scheduler.submit, args=(chat.send_message, prompt),
+                                      kwargs={"prompt_tokens": tokens})
+            thread.start()
+            threads.append(thread)
+            while scheduler.stats()["waiting"] != len(threads):
+                time.sleep(0.001)
+
+        release.set()
+        for thread in [holder] + threads:
+            thread.join(5)
+        self.assertEqual([prompt for _, prompt, _ in server.arrivals], ["short 1", "short 2", "long 1", "long 2"])
+
+    def test_request_rate_stays_within_bucket(self):
+        # 10 requests/s with a 0.5 s burst allows at most 15 in any second; the server rejects a 17th
+        server, chat = self.start_server(requests_per_second=16)
+        scheduler = RequestScheduler(requests_per_minute=600, tokens_per_minute=10 ** 9, max_concurrency=8,
+                                     burst_seconds=0.5, max_retries=0)
+        threads = [threading.Thread(target=lambda: [scheduler.submit(chat.send_message, "ping")
+                                                    for _ in range(3)]) for _ in range(8)]
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        elapsed = time.monotonic() - start
+
+        self.assertEqual((server.served, server.rejected), (24, 0))
+        times = [t for t, _, _ in server.arrivals]
+        for window in (0.5, 1.0, 2.0):
+            # Burst capacity (5) plus the refill during the window, plus one for timer slack
+            self.assertLessEqual(max_in_window(times, window), 5 + 10 * window + 1)
+        self.assertGreaterEqual(elapsed, (24 - 5) / 10 - 0.1)
+
+    def test_async_waiters_sleep_until_tokens_are_available(self):
+        server, chat = self.start_server()
+        scheduler = RequestScheduler(requests_per_minute=1200, tokens_per_minute=10 ** 9, max_concurrency=4,
+                                     burst_seconds=0.1)
+        attempts = []
+        try_acquire = scheduler._try_acquire
+
+        def counted(ticket, tokens):
+            attempts.append(ticket)
+            return try_acquire(ticket, tokens)
+
+        scheduler._try_acquire = counted
+
+        async def run():
+            await asyncio.gather(*(scheduler.submit_async(chat.send_message_async, f"ping {i}")
+                                   for i in range(20)))
+
+        start = time.monotonic()
+        asyncio.run(run())
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(server.served, 20)
+        # 20 requests at 20/s after a 2-request burst take about 0.9 s. Polling every 10 ms
+        # would have made hundreds of attempts; sleeping until the next token (or until
+        # first in line) makes a few per request
+        self.assertGreaterEqual(elapsed, 0.8)
+        self.assertLess(len(attempts), 5 * 20)
+        times = [t for t, _, _ in server.arrivals]
+        self.assertLessEqual(max_in_window(times, 0.5), 2 + 20 * 0.5 + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
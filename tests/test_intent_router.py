@@ -0,0 +1,32 @@
+"""Local routing of obvious commands."""
+import unittest
+
+from utils.intent_router_util import route_prompt, tokenize
+
+
+class RoutePromptTest(unittest.TestCase):
+
+    def test_percentage(self):
+        self.assertEqual(route_prompt("volume 20"), ("adjust_volume", {"percentage": 20.0}))
+        self.assertEqual(route_prompt("set brightness to 75%"), ("adjust_brightness", {"percentage": 75.0}))
+
+    def test_minus_sign_is_kept(self):
+        self.assertEqual(tokenize("volume -20"), ["volume", "-20"])
+
+    def test_negative_percentage_is_not_routed(self):
+        self.assertIsNone(route_prompt("volume -20"))
+        self.assertIsNone(route_prompt("set brightness to -5 percent"))
+
+    def test_percentage_outside_0_to_100_is_not_routed(self):
+        self.assertIsNone(route_prompt("volume 200"))
+        self.assertIsNone(route_prompt("brightness 999"))
+        self.assertEqual(route_prompt("volume 100"), ("adjust_volume", {"percentage": 100.0}))
+        self.assertEqual(route_prompt("volume 0"), ("adjust_volume", {"percentage": 0.0}))
+
+    def test_fractional_percentage_is_not_routed(self):
+        self.assertIsNone(route_prompt("brightness 0.5"))
+        self.assertIsNone(route_prompt("volume 33.3%"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+"""Media index: playlist order, incremental refresh and the staleness check."""
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from utils import media_util
+from utils.media_util import MediaIndex, get_media_index, open_first_media_file
+from utils.player_util import FakePlayer, set_player, shutdown_player
+
+
+class MediaIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+        self.media = os.path.join(self.folder.name, "media")
+        os.makedirs(self.media)
+        for name in ("a.mp3", "b.mp3", "c.mp3", "d.mp4", "notes.txt"):
+            self.write(name)
+        for patcher in (mock.patch.object(media_util, "MEDIA_INDEX_DIR", os.path.join(self.folder.name, "index")),
+                        mock.patch.dict(media_util._media_indexes, clear=True)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def write(self, name, size=16):
+        with open(os.path.join(self.media, name), "wb") as f:
+            f.write(b"\0" * size)
+
+    def touch_folder(self):
+        # Coarse filesystem timestamps may not change within the same second
+        mtime = os.stat(self.media).st_mtime + 10
+        os.utime(self.media, (mtime, mtime))
+
+    def names(self, entries):
+        return [entry["name"] for entry in entries]
+
+    def test_index_lists_media_files_only(self):
+        index = get_media_index(self.media)
+        self.assertEqual(self.names(index.query()), ["a.mp3", "b.mp3", "c.mp3", "d.mp4"])
+        self.assertEqual(self.names(index.query(media_type="video")), ["d.mp4"])
+        self.assertEqual(self.names(index.query(search="B.MP")), ["b.mp3"])
+
+    def test_missing_values_sort_last_in_both_directions(self):
+        index = get_media_index(self.media)
+        durations = {"a.mp3": 30.0, "b.mp3": None, "c.mp3": 10.0, "d.mp4": 20.0}
+        for entry in index.entries.values():
+            entry["duration"] = durations[entry["name"]]
+        self.assertEqual(self.names(index.query(sort_by="duration")), ["c.mp3", "d.mp4", "a.mp3", "b.mp3"])
+        self.assertEqual(self.names(index.query(sort_by="duration", descending=True)),
+                         ["a.mp3", "d.mp4", "c.mp3", "b.mp3"])
+
+    def test_refresh_rereads_only_changed_files(self):
+        get_media_index(self.media)
+        self.write("b.mp3", size=32)
+        os.remove(os.path.join(self.media, "c.mp3"))
+        with mock.patch.object(media_util, "read_media_metadata", wraps=media_util.read_media_metadata) as read:
+            index = get_media_index(self.media)
+        self.assertEqual([os.path.basename(call.args[0]) for call in read.call_args_list], ["b.mp3"])
+        self.assertEqual(self.names(index.query()), ["a.mp3", "b.mp3", "d.mp4"])
+
+    def test_saved_index_is_reused_after_a_restart(self):
+        get_media_index(self.media)
+        media_util._media_indexes.clear()
+        with mock.patch.object(media_util, "read_media_metadata") as read:
+            index = get_media_index(self.media)
+        read.assert_not_called()
+        self.assertEqual(len(index.entries), 4)
+
+    def test_open_rescans_only_when_the_folder_changed(self):
+        set_player(FakePlayer())
+        self.addCleanup(shutdown_player)
+        self.assertEqual(open_first_media_file(self.media)["status"], "success")
+
+        with mock.patch.object(MediaIndex, "refresh", autospec=True, side_effect=MediaIndex.refresh) as refresh:
+            open_first_media_file(self.media)
+            refresh.assert_not_called()
+
+            self.write("0.mp3")
+            self.touch_folder()
+            opened = open_first_media_file(self.media)
+            self.assertEqual(refresh.call_count, 1)
+        self.assertEqual(os.path.basename(opened["file_list"][0]), "0.mp3")
+
+    def test_unchanged_folder_is_rescanned_after_max_age(self):
+        index = get_media_index(self.media)
+        self.assertFalse(index.is_stale())
+        self.assertTrue(index.is_stale(max_age=-1))
+
+
+if __name__ == "__main__":
+    unittest.main()
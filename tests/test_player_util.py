@@ -0,0 +1,81 @@
+"""Media navigation on the shared player: one player at a time, previous ones reaped."""
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from utils import media_util, player_util
+from utils.media_util import navigate_media_file, open_first_media_file
+from utils.player_util import FakePlayer, SystemPlayer, set_player, shutdown_player
+
+# A "player" that stays open with the file until it is terminated
+SLEEPING_PLAYER = [sys.executable, "-c", "import time; time.sleep(60)"]
+
+
+class PlayerNavigationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+        self.media = os.path.join(self.folder.name, "media")
+        os.makedirs(self.media)
+        for name in ("a.mp4", "b.mp4", "c.mp3"):
+            with open(os.path.join(self.media, name), "wb") as f:
+                f.write(b"\0" * 16)
+        patcher = mock.patch.object(media_util, "MEDIA_INDEX_DIR", os.path.join(self.folder.name, "index"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(shutdown_player)
+
+    def path(self, name):
+        return os.path.abspath(os.path.join(self.media, name))
+
+    def test_next_previous_and_stop_reap_the_previous_player(self):
+        player = SystemPlayer(command=SLEEPING_PLAYER)
+        set_player(player)
+
+        opened = open_first_media_file(self.media)
+        self.assertEqual(opened["status"], "success")
+        first = player.process
+        self.assertEqual(first.args[-1], self.path("a.mp4"))
+
+        moved = navigate_media_file("next", opened["current_file_index"], opened["file_list"])
+        second = player.process
+        self.assertEqual(second.args[-1], self.path("b.mp4"))
+        self.assertIsNotNone(first.returncode)  # Terminated and waited for, no zombie left
+        self.assertIsNone(second.poll())
+
+        back = navigate_media_file("previous", moved["current_file_index"], moved["file_list"])
+        third = player.process
+        self.assertEqual(back["current_file_index"], 0)
+        self.assertEqual(third.args[-1], self.path("a.mp4"))
+        self.assertIsNotNone(second.returncode)
+
+        shutdown_player()
+        self.assertIsNotNone(third.returncode)
+        self.assertFalse(player.is_alive())
+
+    def test_navigation_reuses_one_player(self):
+        player = FakePlayer()
+        set_player(player)
+        opened = open_first_media_file(self.media, media_type="video")
+        index, files = opened["current_file_index"], opened["file_list"]
+        for direction in ("next", "next", "previous"):
+            result = navigate_media_file(direction, index, files)
+            index = result["current_file_index"]
+
+        # Wraps around the two videos; the fake "process" is started only once
+        self.assertEqual(player.played, [self.path(name) for name in ("a.mp4", "b.mp4", "a.mp4", "b.mp4")])
+        self.assertEqual(player.started, 1)
+        set_player(None)
+        self.assertFalse(player.is_alive())
+
+    def test_opener_fallback_cannot_close_players(self):
+        with mock.patch.object(player_util, "find_system_player", return_value=None):
+            self.assertFalse(SystemPlayer().can_close)
+        self.assertTrue(SystemPlayer(command=SLEEPING_PLAYER).can_close)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+"""Road graph building from OSM XML."""
+import os
+import tempfile
+import unittest
+from unittest import mock
+import xml.etree.ElementTree as ET
+
+from utils import routing_util
+from utils.routing_util import RoadGraph, build_road_graph, compress_chains, haversine_m
+
+# A two-way primary road with shape points, crossed by a one-way residential road
+NODES = {n: (9.0, 38.70 + n * 0.001) for n in range(1, 11)}
+NODES.update({21: (8.998, 38.705), 22: (8.999, 38.705), 23: (9.001, 38.705), 24: (9.002, 38.705)})
+WAYS = [(list(range(1, 11)), {"highway": "primary", "maxspeed": "60"}),
+        ([21, 22, 5, 23, 24], {"highway": "residential", "oneway": "yes", "maxspeed": "30"})]
+
+
+def write_osm(path):
+    lines = ['<?xml version="1.0"?>', '<osm version="0.6">']
+    for node, (lat, lng) in NODES.items():
+        lines.append(f'<node id="{node}" lat="{lat}" lon="{lng}"/>')
+    for n, (refs, tags) in enumerate(WAYS, 1):
+        lines.append(f'<way id="{n}">' + "".join(f'<nd ref="{ref}"/>' for ref in refs)
+                     + "".join(f'<tag k="{k}" v="{v}"/>' for k, v in tags.items()) + "</way>")
+    lines.append("</osm>")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+
+
+def road_meters(refs):
+    return sum(haversine_m(*NODES[a], *NODES[b]) for a, b in zip(refs, refs[1:]))
+
+
+class BuildRoadGraphTest(unittest.TestCase):
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.osm = os.path.join(folder.name, "roads.osm")
+        self.graph_dir = os.path.join(folder.name, "graph")
+        write_osm(self.osm)
+
+    def test_chains_are_compressed_to_junctions(self):
+        result = build_road_graph(self.osm, self.graph_dir)
+        self.assertEqual(result["status"], "success")
+        graph = RoadGraph(self.graph_dir)
+        # Ends of both roads plus the junction at node 5
+        self.assertEqual(len(graph), 5)
+        self.assertEqual(result["meta"]["edges"], 2 + 2 + 1 + 1)
+
+        def node(osm_id):
+            return graph.nearest_node(*NODES[osm_id])[0]
+
+        seconds, meters = graph.route(node(1), node(10))
+        self.assertAlmostEqual(meters, road_meters(range(1, 11)), delta=1)
+        self.assertAlmostEqual(seconds, meters / (60 / 3.6), delta=0.1)
+        # One way: 21 -> 24 through the junction, not back
+        self.assertAlmostEqual(graph.route(node(21), node(24))[1], road_meters([21, 22, 5, 23, 24]), delta=1)
+        self.assertIsNone(graph.route(node(24), node(21), "dijkstra"))
+
+    def test_compress_chains_keeps_junctions_and_loops(self):
+        # 0 - 1 - 2 - 0 is a loop hanging off junction 0, which also leads to 3
+        edges = [(a, b, 1.0, 10.0) for a, b in ((0, 1), (1, 2), (2, 0), (0, 3))]
+        edges += [(b, a, seconds, meters) for a, b, seconds, meters in edges]
+        compressed = compress_chains(4, edges)
+        self.assertEqual(sorted(compressed), [(0, 3, 1.0, 10.0), (3, 0, 1.0, 10.0)])
+
+    def test_xml_reader_detaches_elements_from_the_root(self):
+        roots = []
+        iterparse = ET.iterparse
+
+        def tracked(*args, **kwargs):
+            events = iterparse(*args, **kwargs)
+            for event, element in events:
+                roots.append(element)
+                yield event, element
+                break
+            yield from events
+
+        with mock.patch.object(routing_util.ET, "iterparse", tracked):
+            ways, locations, _ = routing_util._read_osm_xml(self.osm)
+        self.assertEqual(len(ways), 2)
+        self.assertEqual(len(locations), len(NODES))
+        self.assertEqual([len(root) for root in roots], [0, 0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+"""Session store: spilling tables and history, idle sessions and expiry."""
+import os
+import tempfile
+import unittest
+
+from utils.session_store_util import SessionStore, Spilled, HISTORY_KEY
+
+
+class State(dict):
+    """Stand-in for Streamlit's SessionState (the store keeps weak references to it)."""
+
+
+def big_table(rows=200):
+    return [{"id": i, "text": "message text " * 4} for i in range(rows)]
+
+
+class SessionStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.spill_dir = tempfile.TemporaryDirectory()
+        self.store = SessionStore(spill_dir=self.spill_dir.name, session_budget=10 * 2 ** 20,
+                                  total_budget=10 * 2 ** 20, spill_threshold=1024, history_messages=3,
+                                  idle_seconds=60, expire_seconds=600)
+
+    def tearDown(self):
+        self.spill_dir.cleanup()
+
+    def run_session(self, session_id, state):
+        self.store.begin(session_id, state)
+        return self.store.end(session_id, state)
+
+    def age(self, session_id, seconds):
+        # Pretend the session was last seen a while ago, and let the next end() sweep
+        self.store._sessions[session_id]["last_seen"] -= seconds
+        self.store._last_sweep = 0.0
+
+    def test_table_over_threshold_is_spilled_and_restored(self):
+        table, small = big_table(), big_table(rows=2)
+        state = State(messages=[{"role": "assistant", "content": "rows", "table": table},
+                                {"role": "assistant", "content": "few rows", "table": small}])
+        self.run_session("a", state)
+        spilled = state["messages"][0]["table"]
+        self.assertIsInstance(spilled, Spilled)
+        self.assertIs(state["messages"][1]["table"], small)
+        self.assertEqual(self.store.load(spilled), table)
+
+    def test_history_is_chunked_past_history_messages(self):
+        messages = [{"role": "user", "content": f"message {i}"} for i in range(5)]
+        state = State(messages=list(messages))
+        self.run_session("a", state)
+        self.assertEqual(state["messages"], messages[2:])
+        self.assertEqual(len(state[HISTORY_KEY]), 1)
+
+        state["messages"].extend({"role": "user", "content": f"message {i}"} for i in range(5, 7))
+        messages = messages + state["messages"][-2:]
+        self.run_session("a", state)
+        self.assertEqual(state["messages"], messages[4:])
+        chunks = [self.store.load(chunk) for chunk in state[HISTORY_KEY]]
+        self.assertEqual(chunks, [messages[:2], messages[2:4]])
+
+    def test_idle_session_is_spilled_by_another_sessions_end(self):
+        idle, other = State(file_list=big_table()), State()
+        self.run_session("idle", idle)
+        self.age("idle", 120)
+        self.run_session("other", other)
+        self.assertIsInstance(idle["file_list"], Spilled)
+        self.assertEqual(self.store.stats()["idle_sessions"], 1)
+
+        # Its next run finds the placeholder, which the code that needs the value loads
+        self.assertEqual(self.store.load(idle["file_list"]), big_table())
+
+    def test_running_session_is_not_spilled(self):
+        self.store.total_budget = 0  # Every sweep looks for sessions to spill
+        running, other = State(file_list=big_table()), State()
+        self.run_session("running", running)
+        self.store.begin("running", running)
+        self.run_session("other", other)
+        self.assertIsInstance(running["file_list"], list)
+
+        self.store.end("running", running)
+        self.run_session("other", other)
+        self.assertIsInstance(running["file_list"], Spilled)
+
+    def test_spill_folder_is_removed_on_expiry(self):
+        state = State(messages=[{"role": "assistant", "content": "rows", "table": big_table()}])
+        self.run_session("gone", state)
+        folder = os.path.join(self.spill_dir.name, "gone")
+        self.assertTrue(os.listdir(folder))
+
+        self.age("gone", 1200)
+        self.run_session("other", State())
+        self.assertFalse(os.path.exists(folder))
+        stats = self.store.stats()
+        self.assertEqual((stats["sessions"], stats["expired"]), (1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
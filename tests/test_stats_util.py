@@ -0,0 +1,86 @@
+"""Summary statistics against the SQLite stand-in."""
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from benchmarks.stand_ins import TELEGRAM_SCHEMA, FakePsycopg2
+from utils import stats_util
+
+
+def message(id, channel, date):
+    return (id, channel, id, f"message {id}", date, None, "👍", None, "{}")
+
+
+class StatsTest(unittest.TestCase):
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.path = os.path.join(folder.name, "telegram.sqlite")
+        conn = sqlite3.connect(self.path)
+        conn.execute(TELEGRAM_SCHEMA)
+        conn.close()
+        patches = {"psycopg2": FakePsycopg2(self.path), "_tables_ready": False, "_last_refresh": 0.0,
+                   "STATS_REFRESH_SECONDS": 1e9}
+        for name, value in patches.items():
+            patcher = mock.patch.object(stats_util, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def insert(self, *rows):
+        conn = sqlite3.connect(self.path)
+        conn.executemany("INSERT INTO telegram_messages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        conn.commit()
+        conn.close()
+
+    def test_histogram_is_bucketed_by_period(self):
+        dates = ["2024-01-01", "2024-01-03", "2024-01-08", "2024-02-29", "2025-03-01"]
+        self.insert(*(message(n, "A", date) for n, date in enumerate(dates, 1)), message(9, "B", "2024-01-07"))
+        stats_util.refresh_telegram_stats()
+
+        weeks = stats_util.telegram_stats("histogram", channel="A", interval="week")
+        self.assertEqual(weeks["data"], [("A", "2024-01-01", 2), ("A", "2024-01-08", 1),
+                                         ("A", "2024-02-26", 1), ("A", "2025-02-24", 1)])
+        months = stats_util.telegram_stats("histogram", interval="month")
+        self.assertEqual(months["data"], [("A", "2024-01", 3), ("A", "2024-02", 1), ("A", "2025-03", 1),
+                                          ("B", "2024-01", 1)])
+        years = stats_util.telegram_stats("histogram", interval="year", limit=1)
+        self.assertEqual(years["data"], [("A", "2024", 4)])
+
+    def test_late_commit_with_lower_id_is_counted_once(self):
+        self.insert(message(1, "A", "2024-01-01"), message(2, "A", "2024-01-01"), message(4, "A", "2024-01-02"))
+        self.assertEqual(stats_util.refresh_telegram_stats()["new_rows"], 3)
+        # Id 3 was assigned before id 4 but its transaction committed later
+        self.insert(message(3, "A", "2024-01-02"))
+        self.assertEqual(stats_util.refresh_telegram_stats()["new_rows"], 1)
+        self.assertEqual(stats_util.refresh_telegram_stats()["new_rows"], 0)
+        counts = stats_util.telegram_stats("counts")
+        self.assertEqual(counts["data"], [("A", 4, "2024-01-01", "2024-01-02")])
+
+    def test_watermark_advances_after_the_lag(self):
+        self.insert(message(1, "A", "2024-01-01"), message(2, "A", "2024-01-01"))
+        self.assertEqual(stats_util.refresh_telegram_stats()["watermark"], 0)
+        with mock.patch.object(stats_util, "STATS_WATERMARK_LAG_SECONDS", 0):
+            self.assertEqual(stats_util.refresh_telegram_stats()["watermark"], 2)
+        conn = sqlite3.connect(self.path)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM telegram_stats_counted").fetchone()[0], 0)
+        conn.close()
+
+    def test_tables_are_created_once(self):
+        created = []
+        create = stats_util.create_stats_tables
+
+        def counted():
+            created.append(1)
+            return create()
+
+        with mock.patch.object(stats_util, "create_stats_tables", counted):
+            for _ in range(3):
+                self.assertEqual(stats_util.refresh_telegram_stats()["status"], "success")
+        self.assertEqual(len(created), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
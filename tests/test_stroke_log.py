@@ -0,0 +1,40 @@
+"""Stroke log deltas across a save and restore."""
+import random
+import unittest
+
+from benchmarks.bench_stroke_log import make_stroke
+from utils.stroke_log_util import StrokeLog
+
+
+class StrokeLogTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(0)
+        self.strokes = [make_stroke(rng) for _ in range(20)]
+        self.new_stroke = make_stroke(rng)
+        self.log = StrokeLog()
+        self.log.record({"version": "4.4.0", "objects": self.strokes})
+
+    def test_first_record_after_restore_adds_only_the_new_stroke(self):
+        restored = StrokeLog.from_bytes(self.log.to_bytes())
+        restored.deltas = []
+        # The canvas was seeded with the restored (quantized) drawing
+        echoed = restored.materialize()["objects"] + [self.new_stroke]
+        self.assertTrue(restored.record({"version": "4.4.0", "objects": echoed}))
+        self.assertEqual(len(restored.deltas), 1)
+        op, added = restored.deltas[0]
+        self.assertEqual((op, len(added)), ("add", 1))
+
+    def test_quantized_mount_matches_the_recorded_strokes(self):
+        mounted = self.log.materialize(quantized=True)
+        self.assertFalse(self.log.record(mounted))
+        self.assertLess(len(str(mounted)), len(str(self.log.materialize())))
+
+    def test_changed_stroke_is_replaced(self):
+        changed = dict(self.strokes[-1], left=self.strokes[-1]["left"] + 5)
+        self.assertTrue(self.log.record({"version": "4.4.0", "objects": self.strokes[:-1] + [changed]}))
+        self.assertEqual(self.log.deltas[-2:], [("truncate", 19), ("add", [changed])])
+
+
+if __name__ == "__main__":
+    unittest.main()
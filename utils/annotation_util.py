@@ -2,10 +2,17 @@
 import streamlit as st
 # Import canvas component for drawing functionality
 from streamlit_drawable_canvas import st_canvas
+# Import delta log that stores the drawing between reruns
+from utils.stroke_log_util import StrokeLog
+# Brings back the drawing if it was spilled to disk while the whiteboard was hidden
+from utils.session_store_util import restore_session_values
 
 def init_annotation_session():
     """Initialize all annotation session variables in Streamlit's session state"""
     
+    # Load the drawing back if it was moved to disk (expired spills are re-initialized below)
+    restore_session_values(st.session_state, 'canvas_data', 'stroke_log')
+    
     # Check if annotation tool is set, default to 'freedraw' (pen tool)
     if 'annotation_tool' not in st.session_state:
         st.session_state.annotation_tool = 'freedraw'
@@ -19,6 +26,7 @@ def init_annotation_session():
         st.session_state.stroke_width = 3
     
     # Check if canvas data exists, initialize to None (no existing drawings)
+    # This only holds the drawing the canvas was last mounted with
     if 'canvas_data' not in st.session_state:
         st.session_state.canvas_data = None
     
@@ -26,6 +34,14 @@ def init_annotation_session():
     if 'canvas_key' not in st.session_state:
         st.session_state.canvas_key = 0
     
+    # Check if the stroke log exists; it records drawing changes as deltas
+    if 'stroke_log' not in st.session_state:
+        st.session_state.stroke_log = StrokeLog()
+    
+    # Key of the currently mounted canvas component (None when not shown)
+    if 'canvas_mounted_key' not in st.session_state:
+        st.session_state.canvas_mounted_key = None
+    
 
 def show_annotation_controls():
     """Display all annotation controls in the Streamlit interface"""
@@ -85,6 +101,16 @@ def get_annotation_canvas():
     # Ensure all session variables are initialized
     init_annotation_session()
     
+    # Seed the component with the full drawing only when it is (re)mounted.
+    # While mounted the browser keeps its own copy, so reruns pass the same
+    # unchanged value instead of a payload that grows with every stroke.
+    mount_key = f"canvas_{st.session_state.canvas_key}"
+    if st.session_state.canvas_mounted_key != mount_key:
+        log = st.session_state.stroke_log
+        # Quantized: the payload is re-sent on every rerun while this canvas stays mounted
+        st.session_state.canvas_data = log.materialize(quantized=True) if len(log) else None
+        st.session_state.canvas_mounted_key = mount_key
+    
     # Create and return the canvas component with all settings
     return st_canvas(
         # Fill color for shapes (orange with 30% opacity)
@@ -108,4 +134,17 @@ def get_annotation_canvas():
         update_streamlit=True,
         # Load any existing drawing data
         initial_drawing=st.session_state.canvas_data
-    )
\ No newline at end of file
+    )
+
+def record_canvas_update(json_data):
+    """Record the drawing returned by the canvas as a delta in the stroke log
+    
+    Args:
+        json_data (dict): The canvas `json_data` returned by st_canvas
+    """
+    init_annotation_session()
+    st.session_state.stroke_log.record(json_data)
+
+def release_annotation_canvas():
+    """Mark the canvas as unmounted so it is re-seeded the next time it is shown"""
+    st.session_state.canvas_mounted_key = None
\ No newline at end of file
@@ -1,69 +1,171 @@
+import os
 import streamlit as st
-import json     #for serialization/deserialization
+from utils.annotation_util import init_annotation_session  # Stroke log session state
+from utils.stroke_log_util import StrokeLog
+from utils.whiteboard_store_util import get_whiteboard_store  # Durable whiteboard storage
 
 def init_canvas_session():
     """Initialize the canvas session state with default values
-    
+
     Creates and initializes all necessary session state variables
-    required for the drawing canvas functionality.
+    required for the drawing canvas and whiteboard storage.
     """
-    # Initialize empty list to store drawing objects if not exists
-    if 'drawings' not in st.session_state:
-        st.session_state.drawings = []
-    
-    # Set default drawing tool to 'pen' if not exists
-    if 'current_tool' not in st.session_state:
-        st.session_state.current_tool = 'pen'
-    
-    # Set default drawing color to red (#FF0000) if not exists
-    if 'draw_color' not in st.session_state:
-        st.session_state.draw_color = '#FF0000'
-    
-    # Set default line width to 3 pixels if not exists
-    if 'line_width' not in st.session_state:
-        st.session_state.line_width = 3
-
-def save_canvas_state():
-    """Serialize the current canvas state to JSON string
-    
+    # Annotation state holds the stroke log with the current drawing
+    init_annotation_session()
+
+    # Name of the board the current drawing was loaded from or saved to
+    if 'whiteboard_name' not in st.session_state:
+        st.session_state.whiteboard_name = None
+
+    # Pending background saves and exports (list of (description, Future))
+    if 'whiteboard_jobs' not in st.session_state:
+        st.session_state.whiteboard_jobs = []
+
+    # Finished exports waiting to be downloaded (list of (description, file name, bytes))
+    if 'whiteboard_downloads' not in st.session_state:
+        st.session_state.whiteboard_downloads = []
+
+def save_canvas_state(name):
+    """Save the current drawing as a new version of a named whiteboard
+
+    The save runs on a background writer thread so drawing is not blocked.
+
+    Args:
+        name (str): Whiteboard name
+
     Returns:
-        str: JSON string containing all canvas state information
-             including drawings, tool, color and line width
+        dict: Dictionary containing:
+            - status: "success" or "error"
+            - message: Result description
     """
-    # Convert current canvas state to JSON format
-    return json.dumps({
-        'drawings': st.session_state.drawings,        # List of drawing objects
-        'current_tool': st.session_state.current_tool,  # Active drawing tool
-        'draw_color': st.session_state.draw_color,    # Current drawing color
-        'line_width': st.session_state.line_width     # Current line width
-    })
-
-def load_canvas_state(state_json):
-    """Load canvas state from JSON string
-    
+    init_canvas_session()
+    try:
+        drawing = st.session_state.stroke_log.materialize()
+        future = get_whiteboard_store().save_async(name, drawing)
+        st.session_state.whiteboard_name = name
+        st.session_state.whiteboard_jobs.append((f"Saved whiteboard '{name}'", future))
+        return {
+            "status": "success",
+            "message": f"💾 Saving whiteboard '{name}' ({len(drawing['objects'])} objects)"
+        }
+    except Exception as e:
+        return {"status": "error", "message": f"Error saving whiteboard: {str(e)}"}
+
+def load_canvas_state(name, version=None):
+    """Load a saved whiteboard into the canvas
+
     Args:
-        state_json (str): JSON string containing saved canvas state
+        name (str): Whiteboard name
+        version (int): Version to restore (default: latest)
+
+    Returns:
+        dict: Dictionary containing:
+            - status: "success" or "error"
+            - message: Result description
     """
-    # Parse JSON string back to Python dictionary
-    state = json.loads(state_json)
-    
-    # Restore drawings from saved state
-    st.session_state.drawings = state['drawings']
-    
-    # Restore drawing tool from saved state
-    st.session_state.current_tool = state['current_tool']
-    
-    # Restore drawing color from saved state
-    st.session_state.draw_color = state['draw_color']
-    
-    # Restore line width from saved state
-    st.session_state.line_width = state['line_width']
+    init_canvas_session()
+    try:
+        log = get_whiteboard_store().load(name, version)
+        if log is None:
+            return {"status": "error", "message": f"Whiteboard '{name}' not found"}
+
+        # Replace the drawing and force the canvas to remount with it
+        st.session_state.stroke_log = log
+        st.session_state.canvas_key += 1
+        st.session_state.whiteboard_name = name
+        st.session_state.whiteboard_mode = True
+        label = f"version {version}" if version is not None else "latest version"
+        return {
+            "status": "success",
+            "message": f"📂 Loaded whiteboard '{name}' ({label}, {len(log)} objects)"
+        }
+    except Exception as e:
+        return {"status": "error", "message": f"Error loading whiteboard: {str(e)}"}
+
+def list_saved_canvases():
+    """Describe the saved whiteboards without loading their drawings
+
+    Returns:
+        dict: Dictionary containing:
+            - status: "success" or "error"
+            - message: Markdown list of boards with version and object counts
+    """
+    try:
+        boards = get_whiteboard_store().list_boards()
+        if not boards:
+            return {"status": "success", "message": "No saved whiteboards yet."}
+        lines = [f"- **{b['name']}**: {b['latest_version']} version(s), {b['object_count']} objects"
+                 for b in boards]
+        return {"status": "success", "message": "Saved whiteboards:\n" + "\n".join(lines)}
+    except Exception as e:
+        return {"status": "error", "message": f"Error listing whiteboards: {str(e)}"}
+
+def export_canvas(name, fmt="png", version=None):
+    """Export a saved whiteboard to PNG or SVG in the background
+
+    Args:
+        name (str): Whiteboard name
+        fmt (str): "png" or "svg"
+        version (int): Version to export (default: latest)
+
+    Returns:
+        dict: Dictionary containing:
+            - status: "success" or "error"
+            - message: Result description
+    """
+    init_canvas_session()
+    try:
+        future = get_whiteboard_store().export(name, fmt, version)
+        st.session_state.whiteboard_jobs.append((f"Exported whiteboard '{name}'", future))
+        return {"status": "success", "message": f"🖼️ Exporting whiteboard '{name}' as {fmt.upper()}"}
+    except Exception as e:
+        return {"status": "error", "message": f"Error exporting whiteboard: {str(e)}"}
+
+def show_whiteboard_jobs():
+    """Report finished background saves/exports and offer exported files for download
+
+    Finished futures are dropped after they are reported. An exported file is
+    read once when its export finishes, and its download button is removed
+    once it has been clicked.
+    """
+    init_canvas_session()
+    remaining = []
+    for description, future in st.session_state.whiteboard_jobs:
+        if not future.done():
+            remaining.append((description, future))
+            continue
+        error = future.exception()
+        if error is not None:
+            st.error(f"{description} failed: {error}")
+            continue
+        result = future.result()
+        if isinstance(result, str):
+            # Exports resolve to the written file path
+            try:
+                with open(result, "rb") as f:
+                    st.session_state.whiteboard_downloads.append((description, os.path.basename(result), f.read()))
+            except OSError as e:
+                st.error(f"{description} failed: {e}")
+        else:
+            # Saves resolve to the version number and are reported once
+            st.caption(f"{description} (version {result})")
+    st.session_state.whiteboard_jobs = remaining
+
+    pending = []
+    for description, file_name, data in st.session_state.whiteboard_downloads:
+        # Export file names are unique, so they make stable widget keys
+        if not st.download_button(f"⬇️ {description}", data, file_name=file_name,
+                                  key=f"whiteboard_download_{file_name}"):
+            pending.append((description, file_name, data))
+    st.session_state.whiteboard_downloads = pending
 
 def clear_canvas():
     """Reset the canvas by clearing all drawings
-    
+
     Maintains current tool, color and line width settings
     but removes all drawing objects from the canvas.
     """
-    # Empty the drawings list while keeping other settings
-    st.session_state.drawings = []
\ No newline at end of file
+    init_canvas_session()
+    # Start a fresh log and remount the canvas empty
+    st.session_state.stroke_log = StrokeLog()
+    st.session_state.canvas_key += 1
\ No newline at end of file
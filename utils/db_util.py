@@ -1,62 +1,372 @@
 import psycopg2
 import re
-from config import DB_CONFIG
+import argparse
+import datetime
+import threading
+from contextlib import contextmanager
+from config import DB_CONFIG, DB_POOL_SIZE
 
-def query_telegram_messages(query):
+# Non-blocking PostgreSQL driver used by the API server; optional for the Streamlit app
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+# Patterns for the free-text form: channel 'X' date 'YYYY-MM-DD' message 'text' emoji '👍' youtube 'url'
+QUERY_PATTERNS = {
+    name: re.compile(rf"{keyword}\s*['\"](.*?)['\"]", re.IGNORECASE)
+    for name, keyword in (("channel", "channel"), ("date", "date"), ("text", "message"),
+                          ("emoji", "emoji"), ("youtube", "youtube"))
+}
+
+# Sort orders; both can walk the (channel_title, message_date) index
+QUERY_ORDERS = {
+    "newest": " ORDER BY message_date DESC, id DESC",
+    "oldest": " ORDER BY message_date ASC, id ASC",
+}
+
+# Filter name -> (SQL predicate, PostgreSQL parameter type), in statement order
+QUERY_FILTERS = (
+    ("channel", "channel_title = %s", "text"),
+    ("date_from", "message_date >= %s::date", "date"),
+    ("date_to", "message_date < %s::date", "date"),  # Exclusive: the day after the last date
+    ("text", "message ILIKE %s", "text"),
+    ("emoji", "emoji = %s", "text"),
+    ("youtube", "youtube = %s", "text"),
+)
+
+# Built by `python -m utils.db_util migrate`, never from the query path: CONCURRENTLY
+# does not block writers, but it cannot run inside a transaction
+CHANNEL_DATE_INDEX_NAME = "telegram_messages_channel_date_idx"
+CHANNEL_DATE_INDEX = (f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {CHANNEL_DATE_INDEX_NAME} "
+                      "ON telegram_messages (channel_title, message_date)")
+# A failed concurrent build leaves an INVALID index that IF NOT EXISTS would keep
+INVALID_INDEX_QUERY = ("SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                       "WHERE c.relname = %s AND NOT i.indisvalid")
+
+# SQLSTATEs meaning the server, or a transaction-mode pooler in front of it, cannot
+# keep prepared statements: feature_not_supported, invalid_sql_statement_name
+PREPARE_UNSUPPORTED = ("0A000", "26000")
+DUPLICATE_PREPARED_STATEMENT = "42P05"
+
+# Process-wide pool of persistent connections. Streamlit runs every rerun on a new
+# thread, so prepared statements are tracked per pooled connection, not per thread.
+_idle = []  # (connection, {"prepared": statement names, "can_prepare": bool}) not checked out
+_pool_lock = threading.Lock()
+_pool_slots = threading.BoundedSemaphore(DB_POOL_SIZE)  # Queries wait for a free connection
+
+def parse_telegram_query(query):
+    """Extract filters from the free-text query form.
+
+    Args:
+        query (str): Text such as "channel 'Doctors Ethiopia' message 'vaccine'"
+
+    Returns:
+        dict: Filters for build_telegram_query (a date becomes a one-day range)
+    """
+    filters = {}
+    for name, pattern in QUERY_PATTERNS.items():
+        match = pattern.search(query or "")
+        if match:
+            filters[name] = match.group(1)
+    if "date" in filters:
+        filters["date_from"] = filters["date_to"] = filters.pop("date")
+    return filters
+
+def parse_date(value, name):
+    """A date from a date object or YYYY-MM-DD text (ValueError naming the argument otherwise)."""
+    if isinstance(value, datetime.date):
+        return value
+    try:
+        return datetime.date.fromisoformat(str(value).strip()[:10])
+    except ValueError:
+        raise ValueError(f"{name} must be a date like 2024-01-31, got '{value}'")
+
+def build_telegram_query(channel=None, date_from=None, date_to=None, text=None, emoji=None, youtube=None,
+                         limit=None, order=None):
+    """Build the SQL for a set of typed filters.
+
+    Args:
+        channel (str): Exact channel title
+        date_from (str or date): First day to include (YYYY-MM-DD)
+        date_to (str or date): Last day to include (YYYY-MM-DD)
+        text (str): Case-insensitive substring of the message
+        emoji (str): Exact emoji
+        youtube (str): Exact YouTube link
+        limit (int): Maximum number of rows
+        order (str): "newest" or "oldest" first (default: table order)
+
+    Returns:
+        tuple: (sql_query with %s placeholders, params, statement_name, param_types);
+               queries with the same filters present share a statement name
+    """
+    values = {
+        "channel": channel,
+        "date_from": parse_date(date_from, "date_from") if date_from else None,
+        # Whole days: message_date < the day after date_to
+        "date_to": parse_date(date_to, "date_to") + datetime.timedelta(days=1) if date_to else None,
+        "text": f"%{text}%" if text else None,
+        "emoji": emoji,
+        "youtube": youtube,
+    }
+    if order is not None and order not in QUERY_ORDERS:
+        raise ValueError(f"order must be one of {', '.join(QUERY_ORDERS)}")
+
+    sql_query = "SELECT * FROM telegram_messages WHERE 1=1"
+    params, types, shape = [], [], []
+    for name, predicate, param_type in QUERY_FILTERS:
+        if values[name] is not None:
+            sql_query += f" AND {predicate}"
+            params.append(values[name])
+            types.append(param_type)
+            shape.append(name)
+    if order:
+        sql_query += QUERY_ORDERS[order]
+        shape.append(order)
+    if limit is not None:
+        sql_query += " LIMIT %s"
+        params.append(int(limit))
+        types.append("bigint")
+        shape.append("limit")
+    return sql_query, params, "telegram_q_" + "_".join(shape or ["all"]), types
+
+def _numbered(sql_query):
+    """Rewrite %s placeholders as $1, $2, ... (PREPARE and asyncpg syntax)."""
+    parts = sql_query.split("%s")
+    return "".join(part + (f"${n}" if n < len(parts) else "") for n, part in enumerate(parts, 1))
+
+def _query_result(results):
+    if results:
+        return {
+            "status": "success",
+            "data": results
+        }
+    else:
+        return {
+            "status": "success",
+            "message": "No matching messages found."
+        }
+
+def create_indexes():
+    """Build the (channel_title, message_date) index without blocking writes to telegram_messages.
+
+    Run once at setup (`python -m utils.db_util migrate`); on a large table
+    the build takes a while, so it is never started from a chat request.
+
+    Returns:
+        dict: Dictionary containing status and message
+    """
     try:
         conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
+        try:
+            conn.autocommit = True  # CREATE INDEX CONCURRENTLY cannot run in a transaction block
+            with conn.cursor() as cur:
+                cur.execute(INVALID_INDEX_QUERY, (CHANNEL_DATE_INDEX_NAME,))
+                if cur.fetchone():
+                    cur.execute(f"DROP INDEX CONCURRENTLY {CHANNEL_DATE_INDEX_NAME}")
+                cur.execute(CHANNEL_DATE_INDEX)
+        finally:
+            conn.close()
+        return {"status": "success", "message": f"Index {CHANNEL_DATE_INDEX_NAME} is ready"}
+    except Exception as e:
+        return {"status": "error", "message": f"Error creating indexes: {str(e)}"}
 
-        channel_pattern = r"channel\s*['\"](.*?)['\"]"
-        date_pattern = r"date\s*['\"](.*?)['\"]"
-        message_pattern = r"message\s*['\"](.*?)['\"]"
-        emoji_pattern = r"emoji\s*['\"](.*?)['\"]"
-        youtube_pattern = r"youtube\s*['\"](.*?)['\"]"
-
-        channel_match = re.search(channel_pattern, query, re.IGNORECASE)
-        date_match = re.search(date_pattern, query, re.IGNORECASE)
-        message_match = re.search(message_pattern, query, re.IGNORECASE)
-        emoji_match = re.search(emoji_pattern, query, re.IGNORECASE)
-        youtube_match = re.search(youtube_pattern, query, re.IGNORECASE)
-
-        sql_query = "SELECT * FROM telegram_messages WHERE 1=1"
-        params = []
-        
-        if channel_match: 
-            sql_query += " AND channel_title = %s"
-            params.append(channel_match.group(1))
-        if date_match: 
-            sql_query += " AND message_date = %s"
-            params.append(date_match.group(1))
-        if message_match: 
-            sql_query += " AND message ILIKE %s"
-            params.append(f"%{message_match.group(1)}%")
-        if emoji_match: 
-            sql_query += " AND emoji = %s"
-            params.append(emoji_match.group(1))
-        if youtube_match: 
-            sql_query += " AND youtube = %s"
-            params.append(youtube_match.group(1))
-
-        cur.execute(sql_query, params)
-        results = cur.fetchall()
+def _reset_pool():
+    """Close the idle pooled connections; later queries open new ones."""
+    with _pool_lock:
+        idle = _idle[:]
+        del _idle[:]
+    for conn, _ in idle:
+        try:
+            conn.close()
+        except Exception:
+            pass
 
-        cur.close()
-        conn.close()
+@contextmanager
+def _pooled_connection():
+    """Check out a pooled connection (opened on first use) and return it afterwards.
+
+    Yields:
+        tuple: (connection, {"prepared": set, "can_prepare": bool}); the state
+               stays with the connection, so its prepared statements are reused
+               by whichever thread checks it out next
+    """
+    with _pool_slots:
+        with _pool_lock:
+            conn, state = _idle.pop() if _idle else (None, None)
+        if conn is None or getattr(conn, "closed", 0):
+            conn = psycopg2.connect(**DB_CONFIG)
+            conn.autocommit = True  # Plain reads; no transaction left open between queries
+            state = {"prepared": set(), "can_prepare": True}
+        try:
+            yield conn, state
+        except Exception:
+            # Drop a connection that may be broken; a later query opens a new one
+            try:
+                conn.close()
+            except Exception:
+                pass
+            raise
+        with _pool_lock:
+            _idle.append((conn, state))
+
+def _execute_prepared(cur, state, sql_query, params, name, types):
+    """Run a query through a server-side prepared statement, preparing it once per connection.
+
+    Only errors saying prepared statements are unsupported switch the
+    connection to plain queries; after any other PREPARE failure this query
+    runs unprepared and the next one tries again.
+
+    Args:
+        state (dict): The pooled connection's "prepared" names and "can_prepare" flag
+    """
+    prepared = state["prepared"]
+    if state["can_prepare"] and name not in prepared:
+        try:
+            cur.execute(f"PREPARE {name} ({', '.join(types)}) AS {_numbered(sql_query)}" if types
+                        else f"PREPARE {name} AS {sql_query}")
+            prepared.add(name)
+        except Exception as e:
+            code = getattr(e, "pgcode", None)
+            if code == DUPLICATE_PREPARED_STATEMENT:
+                prepared.add(name)  # Already prepared in this server session
+            elif code in PREPARE_UNSUPPORTED:
+                state["can_prepare"] = False
+    if name in prepared:
+        try:
+            cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})" if params
+                        else f"EXECUTE {name}", params)
+            return
+        except Exception as e:
+            if getattr(e, "pgcode", None) not in PREPARE_UNSUPPORTED:
+                raise
+            # A transaction-mode pooler moved us to a backend without the statement
+            prepared.clear()
+            state["can_prepare"] = False
+    cur.execute(sql_query, params)
+
+def query_telegram_messages(query=None, **filters):
+    """Query telegram_messages by typed filters and/or the free-text query form.
 
-        if results:
-            return {
-                "status": "success",
-                "data": results
-            }
-        else:
-            return {
-                "status": "success",
-                "message": "No matching messages found."
-            }
+    Args:
+        query (str): Optional free-text filters, e.g. "channel 'Tech Addis' message 'python'"
+        filters: channel, date_from, date_to, text, emoji, youtube, limit, order
+                 (see build_telegram_query); these override the free-text ones
+
+    Returns:
+        dict: Dictionary containing status and either data (rows) or message
+    """
+    try:
+        arguments = parse_telegram_query(query) if query else {}
+        arguments.update({key: value for key, value in filters.items() if value not in (None, "")})
+        sql_query, params, name, types = build_telegram_query(**arguments)
+
+        with _pooled_connection() as (conn, state):
+            cur = conn.cursor()
+            _execute_prepared(cur, state, sql_query, params, name, types)
+            results = cur.fetchall()
+            cur.close()
+
+        return _query_result(results)
 
     except Exception as e:
         return {
             "status": "error",
             "message": f"Error querying database: {str(e)}"
-        }
\ No newline at end of file
+        }
+
+async def create_db_pool(min_size=1, max_size=10):
+    """Create an asyncpg connection pool from DB_CONFIG (None if asyncpg is missing)."""
+    if asyncpg is None:
+        return None
+    return await asyncpg.create_pool(
+        host=DB_CONFIG["host"],
+        port=int(DB_CONFIG["port"]) if DB_CONFIG["port"] else None,
+        database=DB_CONFIG["dbname"],
+        user=DB_CONFIG["user"],
+        password=DB_CONFIG["password"],
+        min_size=min_size,
+        max_size=max_size
+    )
+
+async def query_telegram_messages_async(query=None, pool=None, **filters):
+    """Non-blocking query_telegram_messages() over an asyncpg pool.
+
+    asyncpg prepares and caches each statement per connection by itself.
+
+    Returns:
+        dict: The same result shape as query_telegram_messages()
+    """
+    try:
+        arguments = parse_telegram_query(query) if query else {}
+        arguments.update({key: value for key, value in filters.items() if value not in (None, "")})
+        sql_query, params, _, _ = build_telegram_query(**arguments)
+        async with pool.acquire() as conn:
+            records = await conn.fetch(_numbered(sql_query), *params)
+        return _query_result([tuple(record) for record in records])
+
+    except Exception as e:
+        return {
+            "status": "error",
+            "message": f"Error querying database: {str(e)}"
+        }
+
+def count_telegram_messages(after_id=0):
+    """Count messages with an id greater than after_id."""
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM telegram_messages WHERE id > %s", (after_id,))
+        return cur.fetchone()[0]
+    finally:
+        conn.close()
+
+def stream_telegram_messages(after_id=0, batch_size=10000):
+    """Yield (id, message) rows with id > after_id in id order, one batch (list) at a time.
+
+    A server-side (named) cursor streams the table, so memory stays bounded
+    by batch_size however large the table is.
+    """
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        cur = conn.cursor(name="telegram_messages_stream")
+        cur.itersize = batch_size
+        cur.execute("SELECT id, message FROM telegram_messages WHERE id > %s ORDER BY id", (after_id,))
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+        cur.close()
+    finally:
+        conn.close()
+
+def fetch_telegram_messages_by_id(ids):
+    """Return full telegram_messages rows for the given ids (in no particular order)."""
+    if not ids:
+        return []
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        cur = conn.cursor()
+        placeholders = ", ".join(["%s"] * len(ids))
+        cur.execute(f"SELECT * FROM telegram_messages WHERE id IN ({placeholders})", list(ids))
+        return cur.fetchall()
+    finally:
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Telegram database setup")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("migrate", help="Create the indexes and statistics tables the Telegram queries use")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        # Imported here: stats_util imports this module
+        from utils.stats_util import create_stats_tables
+        results = [create_indexes(), create_stats_tables()]
+        for result in results:
+            print(result["message"])
+        raise SystemExit(0 if all(result["status"] == "success" for result in results) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# Standard library imports
+import os          # For file sizes
+import re          # For splitting text into words
+import zlib        # For fast 32-bit shingle hashes
+import hashlib     # For content hashes
+from collections import defaultdict  # For size, hash and LSH buckets
+import numpy as np  # For vectorised MinHash
+
+HEAD_BYTES = 64 * 1024        # Bytes hashed first to split same-size files cheaply
+READ_CHUNK = 1024 * 1024      # Read size for full-content hashes
+MERSENNE_PRIME = (1 << 31) - 1  # Keeps a * x + b within uint64 for 31-bit values
+NUM_PERMUTATIONS = 128        # MinHash signature length
+LSH_BANDS = 32                # Bands x rows must equal NUM_PERMUTATIONS
+SHINGLE_WORDS = 3             # Words per shingle
+
+
+def _file_hash(path, limit=None):
+    """blake2b of the first `limit` bytes of a file (all of it when limit is None)."""
+    digest = hashlib.blake2b(digest_size=16)
+    remaining = limit
+    with open(path, "rb") as f:
+        while remaining is None or remaining > 0:
+            chunk = f.read(READ_CHUNK if remaining is None else min(READ_CHUNK, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+    return digest.digest()
+
+
+def _split_buckets(paths, key):
+    """Regroup paths by key(path), keeping only buckets with more than one file."""
+    buckets = defaultdict(list)
+    for path in paths:
+        try:
+            buckets[key(path)].append(path)
+        except OSError:
+            continue  # Unreadable files cannot be proven duplicates
+    return [bucket for bucket in buckets.values() if len(bucket) > 1]
+
+
+def find_exact_duplicates(paths, sizes=None):
+    """Find byte-identical files.
+
+    Files are bucketed by size, then by a hash of their first HEAD_BYTES, and
+    only files still sharing a bucket are hashed in full.
+
+    Args:
+        paths (list): File paths to compare
+        sizes (dict): Optional path -> size, to reuse stats the caller already has
+
+    Returns:
+        list: Groups (lists) of identical paths, each in the order given
+    """
+    size_of = (lambda path: sizes[path]) if sizes else os.path.getsize
+    groups = []
+    for same_size in _split_buckets(paths, size_of):
+        size = size_of(same_size[0])
+        for same_head in _split_buckets(same_size, lambda path: _file_hash(path, HEAD_BYTES)):
+            # Files no larger than the head are already fully hashed
+            if size <= HEAD_BYTES:
+                groups.append(same_head)
+            else:
+                groups.extend(_split_buckets(same_head, _file_hash))
+    # Preserve the caller's ordering within each group
+    order = {path: n for n, path in enumerate(paths)}
+    return [sorted(group, key=order.get) for group in groups]
+
+
+class MinHasher:
+    """MinHash signatures of word shingles, for estimating Jaccard similarity."""
+
+    def __init__(self, num_permutations=NUM_PERMUTATIONS, shingle_words=SHINGLE_WORDS, seed=1):
+        rng = np.random.default_rng(seed)
+        self.shingle_words = shingle_words
+        self._a = rng.integers(1, MERSENNE_PRIME, num_permutations, dtype=np.uint64)
+        self._b = rng.integers(0, MERSENNE_PRIME, num_permutations, dtype=np.uint64)
+
+    def shingles(self, text):
+        """31-bit hashes of the distinct word shingles in text."""
+        words = re.findall(r"\w+", text.lower())
+        size = min(self.shingle_words, len(words)) or 1
+        hashes = {zlib.crc32(" ".join(words[i:i + size]).encode("utf-8")) & MERSENNE_PRIME
+                  for i in range(max(1, len(words) - size + 1))}
+        return np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+
+    def signature(self, text):
+        """MinHash signature (uint64 array of num_permutations values)."""
+        shingles = self.shingles(text)
+        signature = np.full(len(self._a), MERSENNE_PRIME, dtype=np.uint64)
+        # Chunk the shingles so very large documents stay within memory
+        for start in range(0, len(shingles), 4096):
+            chunk = shingles[start:start + 4096]
+            hashed = (self._a[:, None] * chunk[None, :] + self._b[:, None]) % MERSENNE_PRIME
+            np.minimum(signature, hashed.min(axis=1), out=signature)
+        return signature
+
+
+def find_near_duplicates(texts, threshold=0.8, bands=LSH_BANDS, hasher=None):
+    """Find documents whose word shingles overlap by at least `threshold` (Jaccard).
+
+    Locality-sensitive hashing over MinHash bands proposes candidate pairs, so
+    only documents sharing a band are compared instead of every pair.
+
+    Args:
+        texts (dict): name -> extracted text
+        threshold (float): Minimum estimated Jaccard similarity (0-1)
+        bands (int): LSH bands; more bands find lower similarities at more cost
+        hasher (MinHasher): Signature generator (default: a new MinHasher)
+
+    Returns:
+        list: (names, similarity) per group, names in the order given and
+              similarity the lowest estimate linking the group
+    """
+    hasher = hasher or MinHasher()
+    names = list(texts)
+    if len(names) < 2:
+        return []
+    signatures = np.stack([hasher.signature(texts[name]) for name in names])
+    rows = signatures.shape[1] // bands
+
+    candidates = set()
+    for band in range(bands):
+        buckets = defaultdict(list)
+        for n, key in enumerate(map(bytes, signatures[:, band * rows:(band + 1) * rows])):
+            buckets[key].append(n)
+        for members in buckets.values():
+            candidates.update((members[i], j) for i in range(len(members)) for j in members[i + 1:])
+
+    # Union-find over verified pairs
+    parent = list(range(len(names)))
+
+    def root(n):
+        while parent[n] != n:
+            parent[n] = parent[parent[n]]
+            n = parent[n]
+        return n
+
+    verified = []
+    for i, j in candidates:
+        similarity = float(np.mean(signatures[i] == signatures[j]))
+        if similarity >= threshold:
+            verified.append((i, similarity))
+            a, b = root(i), root(j)
+            if a != b:
+                parent[max(a, b)] = min(a, b)
+
+    groups = defaultdict(list)
+    for n in range(len(names)):
+        groups[root(n)].append(n)
+    group_similarity = {}
+    for i, similarity in verified:
+        group_similarity[root(i)] = min(group_similarity.get(root(i), 1.0), similarity)
+    return [([names[n] for n in members], group_similarity.get(key, 1.0))
+            for key, members in sorted(groups.items()) if len(members) > 1]
@@ -0,0 +1,62 @@
+import time
+import streamlit as st
+from utils.metrics_util import metrics  # Shared metrics registry
+from utils.profiling_util import recent_profiles, PROFILE_PREFIX  # Saved request profiles
+from utils.session_store_util import load_spilled  # Session values may be spilled to disk
+from utils.download_util import offer_file_download  # Reads files only when a download is requested
+
+# Profile files offered for download, with their button labels
+PROFILE_DOWNLOADS = (("report", "Report"), ("stacks", "Flame graph stacks"), ("pstats", "pstats"))
+
+def show_diagnostics_panel(metrics_url=None):
+    """Show per-call latency, error and cache statistics in a sidebar panel
+    
+    Args:
+        metrics_url (str): Prometheus endpoint URL to display, if it is running
+    """
+    with st.sidebar.expander("🩺 Diagnostics", expanded=False):
+        # Latency, errors and payload size per model/tool call
+        rows = metrics.summary()
+        if rows:
+            st.dataframe(rows, hide_index=True, use_container_width=True)
+        else:
+            st.caption("No calls recorded yet.")
+        
+        # Gauges reported by caches and the request scheduler
+        for source, gauges in metrics.collect_gauges().items():
+            st.write(f"**{source.replace('_', ' ').capitalize()}**")
+            if "hit_rate" in gauges:
+                st.metric("Hit rate", f"{gauges['hit_rate']:.0%}")
+            st.caption(", ".join(f"{key}: {value}" for key, value in gauges.items() if key != "hit_rate"))
+        
+        # Per-request profiles (cProfile, sampled stacks, top allocations)
+        st.write("**Profiling**")
+        st.toggle("Profile my requests", key="profile_requests",
+                  help=f"Or start a single prompt with {PROFILE_PREFIX}")
+        show_recent_profiles()
+        
+        # Where Prometheus can scrape the same data
+        if metrics_url:
+            st.caption(f"Prometheus metrics: {metrics_url}")
+
+
+def show_recent_profiles(limit=5):
+    """List this session's latest profiled requests with their files for download
+    
+    Args:
+        limit (int): Number of profiles to show
+    """
+    profiles = recent_profiles(load_spilled(st.session_state.get("profiles"), []))[:limit]
+    if not profiles:
+        st.caption("No profiled requests yet.")
+    for i, profile in enumerate(profiles):
+        started = time.strftime("%H:%M:%S", time.localtime(profile["started_at"]))
+        st.caption(f"{started} · {profile['seconds'] * 1000:.0f} ms · peak {profile['peak_mb']:.1f} MiB · "
+                   f"{profile['label'][:60]}")
+        columns = st.columns(len(PROFILE_DOWNLOADS))
+        for column, (kind, label) in zip(columns, PROFILE_DOWNLOADS):
+            path = profile["files"].get(kind)
+            if path:
+                # Read only when asked for; the panel redraws on every rerun
+                offer_file_download(label, path, key=f"profile_{kind}_{profile['folder']}", container=column)
+        st.caption(f"`{profile['folder']}`")
@@ -0,0 +1,427 @@
+# Tool utilities
+from utils.audio_util import adjust_volume  # Volume control utility
+from utils.brightness_util import adjust_brightness  # Screen brightness control
+from utils.distance_util import get_distance, get_distance_async  # Distance calculation utility
+from utils.file_analysis_util import group_related_files  # File grouping utility
+from utils.media_util import open_first_media_file, navigate_media_file  # Media file handling
+from utils.db_util import query_telegram_messages, query_telegram_messages_async  # Database query utility
+from utils.message_index_util import find_similar_messages  # Similar-message search
+from utils.export_util import export_telegram_messages  # Streaming CSV/Parquet export
+from utils.stats_util import telegram_stats  # Per-channel summary statistics
+from utils.tts_util import read_file_aloud  # Text-to-speech functionality
+# Request path helpers
+from config import GEMINI_MODEL, RESPONSE_CACHE_ENABLED
+from utils.tool_schema_util import TOOL_DECLARATIONS, TOOL_SCHEMA_VERSION
+from utils.intent_router_util import route_prompt
+from utils.response_cache_util import response_cache, make_cache_key
+from utils.gemini_scheduler_util import gemini_scheduler, estimate_tokens, SchedulerBusyError
+from utils.metrics_util import instrument
+from utils.job_util import job_runner  # Background jobs for long-running tools
+from utils.session_store_util import restore_session_values  # Spilled session values
+import json  # For sizing the tool declarations
+import asyncio  # For the API server's non-blocking path
+import functools  # For running blocking handlers in the executor
+
+# Column names of the telegram_messages table, in SELECT * order
+TELEGRAM_COLUMNS = ["ID", "Channel", "Message ID", "Message", "Timestamp", "Media", "Emojis", "URL", "Metadata"]
+
+# Tool declarations are sent with every request and count against the token budget
+TOOL_DECLARATION_TOKENS = estimate_tokens(json.dumps(TOOL_DECLARATIONS))
+
+# Tools that run as background jobs when the caller allows it
+BACKGROUND_TOOLS = ("group_related_files", "read_file_aloud", "export_telegram_messages")
+
+# Maps the annotation tool names exposed to Gemini onto canvas drawing modes
+ANNOTATION_TOOL_MAPPING = {
+    "pen": "freedraw",
+    "rectangle": "rect",
+    "circle": "circle"
+}
+
+
+def _answer_locally(prompt, model_name):
+    """Try the local router and the response cache.
+
+    Returns:
+        tuple: (answer, cache_key); answer is a resolve_prompt() result or None
+    """
+    # Obvious commands ("volume 50", "next") are dispatched without a Gemini round trip
+    routed_call = instrument("router", "route_prompt")(route_prompt)(prompt)
+    if routed_call:
+        return (routed_call[0], routed_call[1], None), None
+
+    # Plain-text answers to identical prompts are served from the shared cache
+    cache_key = make_cache_key(prompt, model_name, TOOL_SCHEMA_VERSION)
+    if RESPONSE_CACHE_ENABLED:
+        cached_text = response_cache.get(cache_key)
+        if cached_text is not None:
+            return (None, None, cached_text), cache_key
+    return None, cache_key
+
+
+def _read_response(response, cache_key):
+    """Turn a Gemini response into a resolve_prompt() result, caching text answers."""
+    if hasattr(response.parts[0], 'function_call') and response.parts[0].function_call:
+        return response.parts[0].function_call.name, response.parts[0].function_call.args, None
+
+    response_text = response.text
+    # Only text answers are cached; tool calls depend on live state
+    if RESPONSE_CACHE_ENABLED:
+        response_cache.put(cache_key, response_text)
+    return None, None, response_text
+
+
+def resolve_prompt(prompt, model, model_name=GEMINI_MODEL):
+    """Decide how to answer a prompt: a local route, a cached answer or a Gemini call.
+
+    Args:
+        prompt (str): The user's message
+        model: A GenerativeModel (or compatible stand-in) to call when needed
+        model_name (str): Model name used in cache keys and metrics
+
+    Returns:
+        tuple: (function_name, arguments, response_text); function_name is None
+               when the answer is plain text
+    """
+    answer, cache_key = _answer_locally(prompt, model_name)
+    if answer:
+        return answer
+
+    # Start chat with Gemini AI
+    chat = model.start_chat(history=[])
+    # Send prompt with all available tools/functionalities through the shared
+    # scheduler, which rate limits all sessions and retries 429s with backoff
+    try:
+        response = gemini_scheduler.submit(
+            instrument("model", model_name)(chat.send_message),
+            prompt,
+            tools=[{"function_declarations": TOOL_DECLARATIONS}],
+            prompt_tokens=estimate_tokens(prompt),
+            extra_tokens=TOOL_DECLARATION_TOKENS
+        )
+    except SchedulerBusyError as e:
+        # Show a friendly message instead of the raw rate-limit error
+        return None, None, f"⏳ {e}"
+
+    # Process Gemini's response
+    return _read_response(response, cache_key)
+
+
+async def resolve_prompt_async(prompt, model, model_name=GEMINI_MODEL):
+    """Non-blocking resolve_prompt() for the API server (same routing, cache and scheduler)."""
+    answer, cache_key = _answer_locally(prompt, model_name)
+    if answer:
+        return answer
+
+    chat = model.start_chat(history=[])
+    send_message = getattr(chat, "send_message_async", None)
+    if send_message is None:
+        # Clients without an async API run in the default executor
+        async def send_message(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, functools.partial(chat.send_message, *args, **kwargs))
+    try:
+        response = await gemini_scheduler.submit_async(
+            instrument("model", model_name)(send_message),
+            prompt,
+            tools=[{"function_declarations": TOOL_DECLARATIONS}],
+            prompt_tokens=estimate_tokens(prompt),
+            extra_tokens=TOOL_DECLARATION_TOKENS
+        )
+    except SchedulerBusyError as e:
+        return None, None, f"⏳ {e}"
+
+    return _read_response(response, cache_key)
+
+
+def _reply(content, status="success", **extra):
+    """Build a reply dict: markdown content plus optional table/canvas display hints."""
+    reply = {"status": status, "content": content}
+    reply.update(extra)
+    return reply
+
+
+def _text_reply(function_result):
+    """Wrap a tool that returns a plain message string."""
+    status = "error" if function_result.startswith(("Error", "⚠️")) else "success"
+    return _reply(function_result, status)
+
+
+def handle_adjust_brightness(arguments, state):
+    percentage = arguments.get("percentage")
+    if percentage is not None:
+        return _text_reply(adjust_brightness(percentage))
+
+
+def handle_adjust_volume(arguments, state):
+    percentage = arguments.get("percentage")
+    if percentage is not None:
+        return _text_reply(adjust_volume(percentage))
+
+
+def handle_get_distance(arguments, state):
+    origin = arguments.get("origin")
+    destination = arguments.get("destination")
+    if origin and destination:
+        return _text_reply(get_distance(origin, destination))
+
+
+def handle_open_first_media_file(arguments, state):
+    folder_path = arguments.get("folder_path")
+    if folder_path:
+        result = open_first_media_file(
+            folder_path,
+            media_type=arguments.get("media_type"),
+            search=arguments.get("search"),
+            sort_by=arguments.get("sort_by", "name"),
+            descending=arguments.get("descending", False)
+        )
+        if result["status"] == "success":
+            state["current_file_index"] = result["current_file_index"]
+            state["file_list"] = result["file_list"]
+        return _reply(result["message"], result["status"])
+
+
+def handle_navigate_media_file(arguments, state):
+    direction = arguments.get("direction")
+    if direction:
+        restore_session_values(state, "file_list")  # Large folder listings may be on disk
+        result = navigate_media_file(
+            direction,
+            state.get("current_file_index", 0),
+            state.get("file_list", []),
+            media_type=arguments.get("media_type"),
+            search=arguments.get("search")
+        )
+        if result["status"] == "success":
+            state["current_file_index"] = result["current_file_index"]
+        return _reply(result["message"], result["status"])
+
+
+# Typed filter arguments of the query_telegram_messages tool
+TELEGRAM_FILTERS = ("channel", "date_from", "date_to", "text", "emoji", "youtube", "limit", "order")
+
+
+def _telegram_filters(arguments):
+    """The typed filters present in the arguments (Gemini sends numbers as floats)."""
+    filters = {name: arguments[name] for name in TELEGRAM_FILTERS if arguments.get(name) not in (None, "")}
+    if "limit" in filters:
+        filters["limit"] = int(filters["limit"])
+    return filters
+
+
+def handle_query_telegram_messages(arguments, state):
+    query = arguments.get("query")
+    filters = _telegram_filters(arguments)
+    if query or filters:
+        result = query_telegram_messages(query, **filters)
+        if result["status"] == "success" and "data" in result:
+            # Rows are shown as a table by the caller
+            return _reply("Here are the results in a table format:",
+                          table=result["data"], columns=TELEGRAM_COLUMNS)
+        return _reply(result["message"], result["status"])
+
+
+def handle_export_telegram_messages(arguments, state, progress=None):
+    query = arguments.get("query")
+    filters = _telegram_filters(arguments)
+    if query or filters:
+        result = export_telegram_messages(query, arguments.get("format", "csv"), progress=progress, **filters)
+        if result["status"] == "success":
+            # The UI offers a download button; the API serves the file under /exports/
+            return _reply(f"📦 {result['message']}\n\nSaved to `{result['path']}`",
+                          download={"path": result["path"], "name": result["file_name"],
+                                    "url": f"/exports/{result['file_name']}", "bytes": result["bytes"]})
+        if result["status"] == "cancelled":
+            return _reply(f"⏹️ {result['message']}", "cancelled")
+        return _reply(f"❌ Error: {result['message']}", "error")
+
+
+def handle_telegram_stats(arguments, state):
+    result = telegram_stats(
+        metric=arguments.get("metric", "counts"),
+        channel=arguments.get("channel") or None,
+        interval=arguments.get("interval", "month"),
+        date_from=arguments.get("date_from") or None,
+        date_to=arguments.get("date_to") or None,
+        limit=int(arguments["limit"]) if arguments.get("limit") is not None else None,
+    )
+    if result["status"] == "success" and "data" in result:
+        return _reply("Here are the statistics:", table=result["data"], columns=result["columns"])
+    return _reply(result["message"], result["status"])
+
+
+def handle_find_similar_messages(arguments, state):
+    text = arguments.get("text")
+    if text:
+        result = find_similar_messages(text, arguments.get("limit", 10))
+        if result["status"] == "success" and "data" in result:
+            return _reply("Here are the most similar messages:",
+                          table=result["data"], columns=TELEGRAM_COLUMNS + ["Similarity"])
+        return _reply(result["message"], result["status"])
+
+
+def handle_start_annotation(arguments, state):
+    tool = arguments.get("tool", "pen")
+    state["annotation_tool"] = ANNOTATION_TOOL_MAPPING.get(tool, "freedraw")
+    state["whiteboard_mode"] = True
+    return _reply(f"🎨 Whiteboard: {tool} tool active", show_canvas=True)
+
+
+def handle_toggle_whiteboard(arguments, state):
+    enable = arguments.get("enable", True)
+    state["whiteboard_mode"] = enable
+    return _reply("🖍️ Whiteboard enabled" if enable else "Whiteboard disabled")
+
+
+def handle_whiteboard_storage(function_name):
+    """Build the handler for one of the whiteboard storage tools."""
+    def handler(arguments, state):
+        # Imported here: whiteboard storage needs a Streamlit session
+        from utils.canvas_util import save_canvas_state, load_canvas_state, list_saved_canvases, export_canvas
+        name = arguments.get("name")
+        version = arguments.get("version")
+        version = int(version) if version is not None else None
+        if function_name == "save_whiteboard":
+            result = save_canvas_state(name)
+        elif function_name == "load_whiteboard":
+            result = load_canvas_state(name, version)
+        elif function_name == "list_whiteboards":
+            result = list_saved_canvases()
+        else:
+            result = export_canvas(name, arguments.get("format", "png"), version)
+        return _reply(result["message"], result["status"])
+    return handler
+
+
+def handle_read_file_aloud(arguments, state, progress=None):
+    file_path = arguments.get("file_path")
+    if file_path:
+        result = read_file_aloud(file_path, progress=progress)
+        return _reply(result["message"], result["status"])
+
+
+def handle_group_related_files(arguments, state, progress=None):
+    folder_path = arguments.get("folder_path")
+    output_folder = arguments.get("output_folder", "grouped_files")
+    similarity_threshold = arguments.get("similarity_threshold", 0.5)
+    max_depth = arguments.get("max_depth")
+
+    def patterns(name):
+        value = arguments.get(name)
+        return [p.strip() for p in value.split(",") if p.strip()] if value else None
+
+    result = group_related_files(folder_path, output_folder, similarity_threshold, progress=progress,
+                                 recursive=bool(arguments.get("recursive", False)),
+                                 include=patterns("include"), exclude=patterns("exclude"),
+                                 max_depth=int(max_depth) if max_depth is not None else None)
+
+    if result["status"] == "cancelled":
+        return _reply(f"⏹️ {result['message']}", "cancelled")
+    if result["status"] == "success":
+        response_msg = (f"✅ Successfully grouped files into {len(result['groups'])} groups.\n"
+                        f"📁 Output folder: {result['output_folder']}\n\n"
+                        "Groups created:\n" +
+                        "\n".join([f"- {g['group_name']}: {', '.join(g['files'])}"
+                                   for g in result["groups"]]))
+        if result.get("duplicates"):
+            response_msg += ("\n\nDuplicates set aside:\n" +
+                             "\n".join([f"- {', '.join(d['duplicates'])} ({d['type']} copy of {d['original']})"
+                                         for d in result["duplicates"]]))
+        return _reply(response_msg)
+    return _reply(f"❌ Error: {result['message']}", "error")
+
+
+# Handler per tool name; each records latency, payload size and errors
+TOOL_HANDLERS = {
+    name: instrument("tool", name)(handler)
+    for name, handler in {
+        "adjust_brightness": handle_adjust_brightness,
+        "adjust_volume": handle_adjust_volume,
+        "get_distance": handle_get_distance,
+        "open_first_media_file": handle_open_first_media_file,
+        "navigate_media_file": handle_navigate_media_file,
+        "query_telegram_messages": handle_query_telegram_messages,
+        "find_similar_messages": handle_find_similar_messages,
+        "export_telegram_messages": handle_export_telegram_messages,
+        "telegram_stats": handle_telegram_stats,
+        "start_annotation": handle_start_annotation,
+        "toggle_whiteboard": handle_toggle_whiteboard,
+        "save_whiteboard": handle_whiteboard_storage("save_whiteboard"),
+        "load_whiteboard": handle_whiteboard_storage("load_whiteboard"),
+        "list_whiteboards": handle_whiteboard_storage("list_whiteboards"),
+        "export_whiteboard": handle_whiteboard_storage("export_whiteboard"),
+        "read_file_aloud": handle_read_file_aloud,
+        "group_related_files": handle_group_related_files,
+    }.items()
+}
+
+
+def dispatch_function_call(function_name, arguments, state, background=False):
+    """Run the handler for a function call.
+
+    Args:
+        function_name (str): Tool name from Gemini or the local router
+        arguments (dict): Tool arguments
+        state (dict-like): Session state (st.session_state or a plain dict)
+        background (bool): Run BACKGROUND_TOOLS as jobs instead of inline; the
+                           job ID is appended to state["job_ids"]
+
+    Returns:
+        dict: Reply with "status" and markdown "content", plus optional
+              "table"/"columns" (rows to show as a table), "show_canvas" and
+              "job_id"; None if required arguments were missing
+    """
+    handler = TOOL_HANDLERS.get(function_name)
+    if handler is None:
+        return _reply(f"❌ Error: Unknown function '{function_name}'", "error")
+    if background and function_name in BACKGROUND_TOOLS:
+        # Jobs run outside the session, so they get their own scratch state
+        arguments = dict(arguments)
+        description = arguments.get("folder_path") or arguments.get("file_path") or function_name
+        job = job_runner.submit(function_name, handler, arguments, {},
+                                description=f"{function_name}: {description}")
+        state["job_ids"] = list(state.get("job_ids", [])) + [job.id]
+        return _reply(f"⏳ Started `{function_name}` in the background (job `{job.id}`).", job_id=job.id)
+    return handler(arguments, state)
+
+
+async def handle_get_distance_async(arguments, state, http_session):
+    origin = arguments.get("origin")
+    destination = arguments.get("destination")
+    if origin and destination:
+        return _text_reply(await get_distance_async(origin, destination, http_session))
+
+
+async def handle_query_telegram_messages_async(arguments, state, db_pool):
+    query = arguments.get("query")
+    filters = _telegram_filters(arguments)
+    if query or filters:
+        result = await query_telegram_messages_async(query, db_pool, **filters)
+        if result["status"] == "success" and "data" in result:
+            return _reply("Here are the results in a table format:",
+                          table=result["data"], columns=TELEGRAM_COLUMNS)
+        return _reply(result["message"], result["status"])
+
+
+# Tools with a non-blocking implementation: name -> (required resource, handler)
+ASYNC_TOOL_HANDLERS = {
+    "get_distance": ("http", instrument("tool", "get_distance")(handle_get_distance_async)),
+    "query_telegram_messages": ("db_pool", instrument("tool", "query_telegram_messages")(handle_query_telegram_messages_async)),
+}
+
+
+async def dispatch_function_call_async(function_name, arguments, state, resources=None, background=False):
+    """Non-blocking dispatch_function_call() for the API server.
+
+    Tools with an async implementation use the shared aiohttp session
+    (resources["http"]) or asyncpg pool (resources["db_pool"]); every other
+    tool runs its regular handler in the default executor.
+    """
+    resources = resources or {}
+    resource_name, handler = ASYNC_TOOL_HANDLERS.get(function_name, (None, None))
+    if handler is not None and resources.get(resource_name) is not None:
+        return await handler(arguments, state, resources[resource_name])
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        None, functools.partial(dispatch_function_call, function_name, arguments, state, background))
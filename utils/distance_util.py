@@ -1,55 +1,131 @@
+import asyncio
 import requests
-from config import GOOGLE_MAPS_API_KEY
+from config import GOOGLE_MAPS_API_KEY, OPENROUTE_BASE_URL, DISTANCE_BACKEND
+from utils.routing_util import local_route, has_road_graph  # Offline road graph backend
+
+def _headers():
+    return {
+        'Authorization': GOOGLE_MAPS_API_KEY,
+        'Content-Type': 'application/json',
+    }
+
+def _coordinates(data, place_name):
+    """Pick the first geocoding match as {"lat", "lng"}."""
+    if not data["features"]:
+        raise ValueError(f"Location '{place_name}' not found.")
+    return {
+        "lat": data["features"][0]["geometry"]["coordinates"][1],
+        "lng": data["features"][0]["geometry"]["coordinates"][0]
+    }
+
+def _route_request(origin_coords, destination_coords):
+    return {
+        "coordinates": [
+            [origin_coords["lng"], origin_coords["lat"]],
+            [destination_coords["lng"], destination_coords["lat"]],
+        ],
+        "units": "km"
+    }
+
+def _format_route(origin, destination, data):
+    """Turn a directions response into the chat message."""
+    if "routes" not in data:
+        return f"⚠️ No route found. Error: {data.get('error')['message']}"
+
+    distance_km = data["routes"][0]["summary"]["distance"]
+    duration_min = data["routes"][0]["summary"]["duration"] / 60
+    return _format_summary(origin, destination, distance_km, duration_min)
+
+def _format_summary(origin, destination, distance_km, duration_min):
+    return (
+        f"📍 Distance from {origin} to {destination}:\n\n"
+        f"\t\t🚙 Driving distance: {distance_km:.1f} km\n\n"
+        f"\t⌚ Estimated duration: {duration_min:.1f} minutes\n"
+    )
+
+def _local_distance(origin, destination):
+    """Answer from the offline road graph if the backend setting allows it.
+
+    Returns:
+        str: The chat message, or None to fall through to openrouteservice
+    """
+    if DISTANCE_BACKEND == "openrouteservice" or (DISTANCE_BACKEND == "auto" and not has_road_graph()):
+        return None
+    if DISTANCE_BACKEND == "local" and not has_road_graph():
+        return "⚠️ No local road graph. Build one with: python -m utils.routing_util build <extract.osm.pbf>"
+    result = local_route(origin, destination)
+    if result["status"] == "success":
+        return _format_summary(origin, destination, result["distance_km"], result["duration_min"])
+    if DISTANCE_BACKEND == "local" or not GOOGLE_MAPS_API_KEY:
+        return f"⚠️ {result['message']}"
+    return None  # e.g. a place outside the local extract: ask openrouteservice
 
 def get_distance(origin, destination):
     try:
+        local = _local_distance(origin, destination)
+        if local:
+            return local
+
         if not GOOGLE_MAPS_API_KEY:
             return "⚠️ Please set OPENROUTE_API_KEY."
-        
-        headers = {
-            'Authorization': GOOGLE_MAPS_API_KEY,
-            'Content-Type': 'application/json',
-        }
+
+        headers = _headers()
 
         def geocode(place_name):
-            url = f"https://api.openrouteservice.org/geocode/search?text={place_name}&api_key={GOOGLE_MAPS_API_KEY}"
+            url = f"{OPENROUTE_BASE_URL}/geocode/search?text={place_name}&api_key={GOOGLE_MAPS_API_KEY}"
             response = requests.get(url, headers=headers)
-            data = response.json()
-            if not data["features"]:
-                raise ValueError(f"Location '{place_name}' not found.")
-            return {
-                "lat": data["features"][0]["geometry"]["coordinates"][1],
-                "lng": data["features"][0]["geometry"]["coordinates"][0]
-            }
+            return _coordinates(response.json(), place_name)
 
         origin_coords = geocode(origin)
         destination_coords = geocode(destination)
 
-        url = "https://api.openrouteservice.org/v2/directions/driving-car"
+        url = f"{OPENROUTE_BASE_URL}/v2/directions/driving-car"
         response = requests.post(
             url,
             headers=headers,
-            json={
-                "coordinates": [
-                    [origin_coords["lng"], origin_coords["lat"]],
-                    [destination_coords["lng"], destination_coords["lat"]],
-                ],
-                "units": "km"
-            }
+            json=_route_request(origin_coords, destination_coords)
         )
-        data = response.json()
+        return _format_route(origin, destination, response.json())
+
+    except Exception as e:
+        return f"⚠️ Error calculating distance: {str(e)}"
 
-        if "routes" not in data:
-            return f"⚠️ No route found. Error: {data.get('error')['message']}"
+async def get_distance_async(origin, destination, session):
+    """Non-blocking get_distance() for the API server.
 
-        distance_km = data["routes"][0]["summary"]["distance"]
-        duration_min = data["routes"][0]["summary"]["duration"] / 60
+    Both places are geocoded concurrently.
 
-        return (
-            f"📍 Distance from {origin} to {destination}:\n\n"
-            f"\t\t🚙 Driving distance: {distance_km:.1f} km\n\n"
-            f"\t⌚ Estimated duration: {duration_min:.1f} minutes\n"
-        )
+    Args:
+        origin (str): Starting place name
+        destination (str): Destination place name
+        session (aiohttp.ClientSession): Shared HTTP session
+
+    Returns:
+        str: The same message get_distance() returns
+    """
+    try:
+        # Local queries take milliseconds, but the first one loads the graph from disk
+        local = await asyncio.get_running_loop().run_in_executor(None, _local_distance, origin, destination)
+        if local:
+            return local
+
+        if not GOOGLE_MAPS_API_KEY:
+            return "⚠️ Please set OPENROUTE_API_KEY."
+
+        headers = _headers()
+
+        async def geocode(place_name):
+            url = f"{OPENROUTE_BASE_URL}/geocode/search"
+            params = {"text": place_name, "api_key": GOOGLE_MAPS_API_KEY}
+            async with session.get(url, params=params, headers=headers) as response:
+                return _coordinates(await response.json(content_type=None), place_name)
+
+        origin_coords, destination_coords = await asyncio.gather(geocode(origin), geocode(destination))
+
+        url = f"{OPENROUTE_BASE_URL}/v2/directions/driving-car"
+        async with session.post(url, headers=headers,
+                                json=_route_request(origin_coords, destination_coords)) as response:
+            return _format_route(origin, destination, await response.json(content_type=None))
 
     except Exception as e:
-        return f"⚠️ Error calculating distance: {str(e)}"
\ No newline at end of file
+        return f"⚠️ Error calculating distance: {str(e)}"
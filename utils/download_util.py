@@ -0,0 +1,46 @@
+import os
+import streamlit as st
+
+
+def offer_file_download(label, path, key, container=None, max_bytes=None):
+    """Offer a file on disk for download, reading it only once the user asks for it
+
+    st.download_button needs the file's bytes on every rerun it is drawn, so a
+    plain button is shown first. Clicking it reads the file and swaps in the
+    download button; the bytes are dropped again once the download is clicked.
+
+    Args:
+        label (str): Button label
+        path (str): File to offer
+        key (str): Unique widget key
+        container: Streamlit container to draw in (defaults to the main area)
+        max_bytes (int): Larger files are not read; only a caption is shown
+
+    Returns:
+        bool: True if the file is (still) available
+    """
+    container = container or st
+    if "prepared_downloads" not in st.session_state:
+        st.session_state.prepared_downloads = {}
+    prepared = st.session_state.prepared_downloads
+
+    if not os.path.exists(path):
+        prepared.pop(key, None)
+        return False
+    if max_bytes is not None and os.path.getsize(path) > max_bytes:
+        container.caption(f"{os.path.basename(path)} is too large to download here; open it from `{path}`.")
+        return True
+
+    if key not in prepared:
+        if not container.button(label, key=f"prepare_{key}"):
+            return True
+        try:
+            with open(path, "rb") as f:
+                prepared[key] = f.read()
+        except OSError as e:
+            container.caption(f"Could not read {os.path.basename(path)}: {e}")
+            return True
+
+    if container.download_button(f"⬇️ {label}", prepared[key], file_name=os.path.basename(path), key=key):
+        del prepared[key]
+    return True
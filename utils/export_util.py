@@ -0,0 +1,200 @@
+# Standard library imports
+import os     # For export paths
+import re     # For file-name slugs
+import time   # For export timing and file names
+import uuid   # For unique export file names
+import psycopg2
+from config import DB_CONFIG, EXPORT_DIR, EXPORT_CHUNK_BYTES
+from utils.db_util import build_telegram_query, parse_telegram_query
+
+# Parquet output is optional; CSV exports work without pyarrow
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+EXPORT_FORMATS = ("csv", "parquet")
+
+# Kept as strings in Parquet (type inference on the first block could pick null or int)
+TEXT_COLUMNS = ("channel_title", "message", "media_path", "emoji", "youtube", "metadata")
+
+PARQUET_READ_BLOCK_BYTES = 1024 * 1024  # CSV bytes parsed per block when converting
+PARQUET_ROW_GROUP_ROWS = 128 * 1024     # Rows per Parquet row group
+
+
+class ExportCancelled(Exception):
+    """Raised from inside COPY to abort an export whose job was cancelled."""
+
+
+class _ChunkedWriter:
+    """File-like sink for COPY ... TO STDOUT.
+
+    psycopg2 hands over one row per write(); rows are buffered and written to
+    the file chunk_bytes at a time, and on_chunk(rows, bytes) is called after
+    each chunk (returning False aborts the COPY).
+    """
+
+    def __init__(self, file, chunk_bytes, on_chunk):
+        self.file = file
+        self.chunk_bytes = chunk_bytes
+        self.on_chunk = on_chunk
+        self.buffer = bytearray()
+        self.lines = 0
+        self.bytes = 0
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self.buffer += data
+        if len(self.buffer) >= self.chunk_bytes:
+            self.flush()
+        return len(data)
+
+    def flush(self):
+        if not self.buffer:
+            return
+        # Approximate: quoted messages can contain newlines
+        self.lines += self.buffer.count(b"\n")
+        self.bytes += len(self.buffer)
+        self.file.write(self.buffer)
+        self.buffer.clear()
+        if not self.on_chunk(self.lines, self.bytes):
+            raise ExportCancelled()
+
+
+def _export_name(filters, extension):
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", filters.get("channel") or "all").strip("-").lower() or "all"
+    return f"telegram_{slug}_{time.strftime('%Y%m%d-%H%M%S')}_{uuid.uuid4().hex[:6]}.{extension}"
+
+
+def _copy_to_csv(filters, path, chunk_bytes, progress):
+    """COPY the filtered rows into a CSV file. Returns the number of rows."""
+    sql_query, params, _, _ = build_telegram_query(**filters)
+    # Counting ignores order and limit (ORDER BY is not valid next to COUNT(*))
+    count_filters = {key: value for key, value in filters.items() if key not in ("limit", "order")}
+    count_query, count_params, _, _ = build_telegram_query(**count_filters)
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        cur = conn.cursor()
+        cur.execute(count_query.replace("SELECT *", "SELECT COUNT(*)", 1), count_params)
+        total = cur.fetchone()[0]
+        if filters.get("limit") is not None:
+            total = min(total, int(filters["limit"]))
+
+        def on_chunk(lines, size):
+            done = min(max(lines - 1, 0), total)  # Minus the header
+            return not progress or progress(done, total, f"Exported ~{done:,} of {total:,} rows "
+                                                         f"({size / 2 ** 20:.1f} MiB)")
+
+        # COPY takes no parameters, so they are inlined with psycopg2's own quoting
+        literal = cur.mogrify(sql_query, params)
+        literal = literal.decode("utf-8") if isinstance(literal, bytes) else literal
+        with open(path, "wb") as f:
+            writer = _ChunkedWriter(f, chunk_bytes, on_chunk)
+            cur.copy_expert(f"COPY ({literal}) TO STDOUT WITH (FORMAT csv, HEADER)", writer)
+            writer.flush()
+        cur.close()
+        return total
+    finally:
+        conn.close()
+
+
+def _csv_to_parquet(csv_path, parquet_path, row_group_rows=PARQUET_ROW_GROUP_ROWS):
+    """Convert a CSV file to Parquet block by block (rows never become Python objects).
+
+    The CSV reader's memory grows with its block size (it reads ahead several
+    blocks), so small blocks are read and gathered into row groups of
+    row_group_rows rows.
+    """
+    reader = pa_csv.open_csv(
+        csv_path,
+        read_options=pa_csv.ReadOptions(block_size=PARQUET_READ_BLOCK_BYTES),
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(column_types={name: pa.string() for name in TEXT_COLUMNS},
+                                              strings_can_be_null=True),
+    )
+    with pq.ParquetWriter(parquet_path, reader.schema) as writer:
+        batches, rows = [], 0
+        for batch in reader:
+            batches.append(batch)
+            rows += batch.num_rows
+            if rows >= row_group_rows:
+                writer.write_table(pa.Table.from_batches(batches))
+                batches, rows = [], 0
+        if batches:
+            writer.write_table(pa.Table.from_batches(batches))
+
+
+def _remove(*paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def export_telegram_messages(query=None, format="csv", progress=None, chunk_bytes=EXPORT_CHUNK_BYTES,
+                             export_dir=None, **filters):
+    """Export matching telegram_messages to a CSV or Parquet file.
+
+    Rows are streamed with COPY ... TO STDOUT straight into the file in
+    chunk_bytes chunks, so memory use does not grow with the result size.
+    Parquet is converted from that CSV block by block with pyarrow.
+
+    Args:
+        query (str): Optional free-text filters (see db_util.parse_telegram_query)
+        format (str): "csv" or "parquet"
+        progress (callable): Optional progress(done, total, label); returning False cancels
+        chunk_bytes (int): Bytes written per chunk
+        export_dir (str): Output folder (default: EXPORT_DIR)
+        filters: channel, date_from, date_to, text, emoji, youtube, limit, order
+
+    Returns:
+        dict: Dictionary containing status, message and, on success, path,
+              file_name, rows, bytes and seconds
+    """
+    export_dir = export_dir or EXPORT_DIR
+    if format not in EXPORT_FORMATS:
+        return {"status": "error", "message": f"Unsupported export format '{format}' (use csv or parquet)"}
+    if format == "parquet" and pa is None:
+        return {"status": "error", "message": "Parquet export needs pyarrow (pip install pyarrow)"}
+
+    start = time.perf_counter()
+    arguments = parse_telegram_query(query) if query else {}
+    arguments.update({key: value for key, value in filters.items() if value not in (None, "")})
+    file_name = _export_name(arguments, format)
+    path = os.path.join(export_dir, file_name)
+    csv_part = path + (".csv.part" if format == "parquet" else ".part")
+    parquet_part = path + ".part"
+    try:
+        os.makedirs(export_dir, exist_ok=True)
+        rows = _copy_to_csv(arguments, csv_part, chunk_bytes, progress)
+        if format == "parquet":
+            if progress and not progress(rows, rows, "Converting to Parquet"):
+                raise ExportCancelled()
+            _csv_to_parquet(csv_part, parquet_part)
+            _remove(csv_part)
+            os.replace(parquet_part, path)
+        else:
+            os.replace(csv_part, path)
+        size = os.path.getsize(path)
+        seconds = time.perf_counter() - start
+        return {
+            "status": "success",
+            "message": f"Exported {rows:,} messages ({size / 2 ** 20:.1f} MiB) in {seconds:.1f} s",
+            "path": os.path.abspath(path),
+            "file_name": file_name,
+            "rows": rows,
+            "bytes": size,
+            "seconds": seconds,
+        }
+
+    except ExportCancelled:
+        _remove(csv_part, parquet_part)
+        return {"status": "cancelled", "message": "Export cancelled"}
+    except Exception as e:
+        _remove(csv_part, parquet_part)
+        return {"status": "error", "message": f"Error exporting messages: {str(e)}"}
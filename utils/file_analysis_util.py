@@ -7,6 +7,14 @@ from docx import Document  # For reading Word documents
 import pptx  # For reading PowerPoint files
 import shutil  # For file operations
 import os  # For path operations
+import csv  # For CSV grouping manifests
+import json  # For JSON grouping manifests
+import glob  # For expanding folder patterns on the command line
+import time  # For batch timing statistics
+import argparse  # For the command-line batch mode
+from concurrent.futures import ProcessPoolExecutor, as_completed  # For grouping folders in parallel
+from utils.dedup_util import find_exact_duplicates, find_near_duplicates  # Duplicate detection
+from utils.file_scan_util import scan_files  # Recursive, parallel folder scanning
 
 def extract_text_from_file(file_path):
     """Extract text content from various file formats.
@@ -55,43 +63,101 @@ def extract_text_from_file(file_path):
     except Exception:
         return ""
 
-def group_related_files(folder_path, output_folder="grouped_files", similarity_threshold=0.5):
+def _copy_into(folder_path, relative_path, destination):
+    """Copy folder_path/relative_path to destination/relative_path, creating subfolders."""
+    dst = os.path.join(destination, relative_path)
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    shutil.copy2(os.path.join(folder_path, relative_path), dst)  # copy2 preserves metadata
+
+def group_related_files(folder_path, output_folder="grouped_files", similarity_threshold=0.5, progress=None,
+                        detect_duplicates=True, near_duplicate_threshold=0.8, recursive=False,
+                        include=None, exclude=None, max_depth=None, max_size=None):
     """Group files based on textual similarity using cosine similarity of TF-IDF vectors.
     
+    Exact and near-duplicate copies are set aside first: only one file of each
+    duplicate set is parsed and grouped, and the copies go to a "duplicates"
+    folder.
+    
     Args:
         folder_path (str): Path to folder containing files to analyze
         output_folder (str): Name of folder to store grouped files (default: "grouped_files")
         similarity_threshold (float): Minimum similarity score for grouping (0-1, default: 0.5)
+        progress (callable): Optional progress(done, total, label) callback; returning
+                             False cancels the grouping
+        detect_duplicates (bool): Separate duplicate copies before grouping (default: True)
+        near_duplicate_threshold (float): Minimum estimated Jaccard similarity of word
+                                          shingles for near-duplicates (0-1, default: 0.8)
+        recursive (bool): Include files in subfolders (default: False)
+        include (list): Glob patterns files must match, e.g. ["*.pdf", "reports/*"]
+        exclude (list): Glob patterns for files and folders to skip, e.g. [".git", "*.tmp"]
+        max_depth (int): Deepest subfolder level to scan when recursive (default: unlimited)
+        max_size (int): Largest file size in bytes to analyze (default: unlimited)
         
     Returns:
         dict: Dictionary containing:
-            - status: "success" or "error"
+            - status: "success", "error" or "cancelled"
             - message: Result description
             - groups: List of file groups with metadata
+            - duplicates: List of {"type", "original", "duplicates", "similarity"}
             - output_folder: Absolute path to output directory
+            - file_count / total_bytes: Files scanned and their total size
+        
+        File names are paths relative to folder_path, and the output folders
+        keep that structure so same-named files from different subfolders
+        do not overwrite each other.
     """
     try:
-        # Get all files in the specified folder (excluding subdirectories)
-        files = [f for f in os.listdir(folder_path) 
-                if os.path.isfile(os.path.join(folder_path, f))]
+        # Get all files in the specified folder, reusing each entry's stat for its size
+        # (sorted, so the original kept from each duplicate set is predictable)
+        scanned = scan_files(folder_path, recursive=recursive, include=include, exclude=exclude,
+                             max_depth=max_depth, max_size=max_size, skip_dirs=[output_folder])
+        files = [relative for relative, _, _ in scanned]
+        paths = {path: relative for relative, path, _ in scanned}
         
         # Return error if folder is empty
         if not files:
             return {"status": "error", "message": "No files found in the specified folder"}
         
+        # Byte-identical copies are found by size and hash, without parsing them
+        duplicates = []      # Duplicate sets, each with one original kept for grouping
+        duplicate_files = set()  # Copies set aside from grouping
+        if detect_duplicates:
+            sizes = {path: size for _, path, size in scanned}
+            for same in find_exact_duplicates(list(paths), sizes):
+                same = [paths[path] for path in same]
+                duplicates.append({"type": "exact", "original": same[0], "duplicates": same[1:], "similarity": 1.0})
+                duplicate_files.update(same[1:])
+        
         # Extract text content from each file
         file_contents = {}
-        for file in files:
+        for n, file in enumerate(files, 1):
+            if file in duplicate_files:
+                continue
             file_path = os.path.join(folder_path, file)
             content = extract_text_from_file(file_path)
             # Only store files with non-empty content
             if content.strip():
                 file_contents[file] = content
+            # Report each extracted file and stop if the job was cancelled
+            if progress and not progress(n, len(files), f"Extracted {n}/{len(files)} files"):
+                return {"status": "cancelled", "message": "File grouping cancelled"}
         
         # Return error if no files had readable content
         if not file_contents:
             return {"status": "error", "message": "No readable content found in any files"}
         
+        if progress and not progress(len(files), len(files), "Comparing file contents"):
+            return {"status": "cancelled", "message": "File grouping cancelled"}
+        
+        # Near-duplicates (e.g. re-saved or lightly edited copies) via MinHash/LSH
+        if detect_duplicates:
+            for same, similarity in find_near_duplicates(file_contents, near_duplicate_threshold):
+                duplicates.append({"type": "near", "original": same[0], "duplicates": same[1:],
+                                   "similarity": round(similarity, 3)})
+                duplicate_files.update(same[1:])
+                for file in same[1:]:
+                    del file_contents[file]
+        
         # Convert text to TF-IDF feature vectors
         vectorizer = TfidfVectorizer()
         tfidf_matrix = vectorizer.fit_transform(file_contents.values())
@@ -127,9 +193,7 @@ def group_related_files(folder_path, output_folder="grouped_files", similarity_t
                 
                 # Copy all similar files to group folder
                 for file in similar_files:
-                    src = os.path.join(folder_path, file)
-                    dst = os.path.join(group_path, file)
-                    shutil.copy2(src, dst)  # copy2 preserves metadata
+                    _copy_into(folder_path, file, group_path)
                     grouped.add(file)  # Mark as grouped
                 
                 # Store group metadata
@@ -139,25 +203,167 @@ def group_related_files(folder_path, output_folder="grouped_files", similarity_t
                     "similarity_score": max(similarity_matrix[i])  # Highest similarity in group
                 })
         
+        # Copy duplicate copies to their own folder
+        if duplicate_files:
+            duplicates_path = os.path.join(output_folder, "duplicates")
+            os.makedirs(duplicates_path, exist_ok=True)
+            for file in duplicate_files:
+                _copy_into(folder_path, file, duplicates_path)
+        
         # Handle ungrouped files
         ungrouped_path = os.path.join(output_folder, "ungrouped")
         os.makedirs(ungrouped_path, exist_ok=True)
         
         # Copy files that didn't meet similarity threshold
         for file in files:
-            if file not in grouped:
-                src = os.path.join(folder_path, file)
-                dst = os.path.join(ungrouped_path, file)
-                shutil.copy2(src, dst)
+            if file not in grouped and file not in duplicate_files:
+                _copy_into(folder_path, file, ungrouped_path)
         
         # Return success with grouping results
         return {
             "status": "success",
-            "message": f"Grouped {len(groups)} sets of related files",
+            "message": f"Grouped {len(groups)} sets of related files, set aside {len(duplicate_files)} duplicates",
             "groups": groups,
-            "output_folder": os.path.abspath(output_folder)  # Return absolute path
+            "duplicates": duplicates,
+            "output_folder": os.path.abspath(output_folder),  # Return absolute path
+            "file_count": len(files),
+            "total_bytes": sum(size for _, _, size in scanned)
         }
     
     # Handle any exceptions during processing
     except Exception as e:
-        return {"status": "error", "message": f"Error processing files: {str(e)}"}
\ No newline at end of file
+        return {"status": "error", "message": f"Error processing files: {str(e)}"}
+
+def write_grouping_manifest(result, output_folder, formats=("json", "csv")):
+    """Write a grouping result as manifest files in the output folder.
+
+    Args:
+        result (dict): Result returned by group_related_files
+        output_folder (str): Folder to write grouping_manifest.json / .csv to
+        formats (tuple): Any of "json" and "csv"
+
+    Returns:
+        list: Paths of the manifests written
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    written = []
+    if "json" in formats:
+        path = os.path.join(output_folder, "grouping_manifest.json")
+        with open(path, "w", encoding="utf-8") as f:
+            # Similarity scores are numpy floats
+            json.dump(result, f, indent=2, default=float)
+        written.append(path)
+    if "csv" in formats:
+        path = os.path.join(output_folder, "grouping_manifest.csv")
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["group", "file", "similarity_score", "duplicate_of"])
+            for group in result.get("groups", []):
+                for file in group["files"]:
+                    writer.writerow([group["group_name"], file, f"{float(group['similarity_score']):.4f}", ""])
+            for duplicate in result.get("duplicates", []):
+                for file in duplicate["duplicates"]:
+                    writer.writerow([f"duplicates ({duplicate['type']})", file,
+                                     f"{float(duplicate['similarity']):.4f}", duplicate["original"]])
+        written.append(path)
+    return written
+
+
+def group_folder_batch(folder_path, output_folder, similarity_threshold=0.5, formats=("json", "csv"), **scan_options):
+    """Group one folder and write its manifests, with timing (runs in a worker process).
+
+    Args:
+        scan_options: recursive, include, exclude, max_depth and max_size for group_related_files
+
+    Returns:
+        dict: The group_related_files result plus folder, files, bytes, seconds and manifests
+    """
+    start = time.perf_counter()
+    result = group_related_files(folder_path, output_folder, similarity_threshold, **scan_options)
+    result.update({
+        "folder": os.path.abspath(folder_path),
+        "files": result.get("file_count", 0),
+        "bytes": result.get("total_bytes", 0),
+        "seconds": time.perf_counter() - start,
+    })
+    if result["status"] == "success":
+        result["manifests"] = write_grouping_manifest(result, output_folder, formats)
+    return result
+
+
+def _batch_output_folders(folders, output_root):
+    """Map each folder to output_root/<folder name>, suffixing repeated names."""
+    outputs, used = {}, set()
+    for folder in folders:
+        name = os.path.basename(os.path.normpath(folder)) or "root"
+        candidate, n = name, 2
+        while candidate in used:
+            candidate, n = f"{name}_{n}", n + 1
+        used.add(candidate)
+        outputs[folder] = os.path.join(output_root, candidate)
+    return outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Group related files in many folders without the chat UI")
+    parser.add_argument("folders", nargs="+", help="Folders or glob patterns (e.g. 'shares/*/docs')")
+    parser.add_argument("-o", "--output-dir", default="grouped_files",
+                        help="Each folder is grouped into <output-dir>/<folder name>")
+    parser.add_argument("-t", "--threshold", type=float, default=0.5, help="Similarity threshold (0-1)")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="Folders processed in parallel")
+    parser.add_argument("--manifest", default="json,csv", help="Manifest formats: json, csv or json,csv")
+    parser.add_argument("-r", "--recursive", action="store_true", help="Include files in subfolders")
+    parser.add_argument("--include", action="append", help="Only files matching this glob (repeatable)")
+    parser.add_argument("--exclude", action="append", help="Skip files and folders matching this glob (repeatable)")
+    parser.add_argument("--max-depth", type=int, help="Deepest subfolder level with --recursive")
+    parser.add_argument("--max-size-mb", type=float, help="Skip files larger than this")
+    args = parser.parse_args()
+
+    # Expand patterns ourselves so quoting works the same on Windows shells
+    folders = []
+    for pattern in args.folders:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        folders.extend(m for m in matches if os.path.isdir(m) and m not in folders)
+    if not folders:
+        parser.error("no folders matched")
+    formats = tuple(f.strip() for f in args.manifest.split(",") if f.strip())
+    outputs = _batch_output_folders(folders, args.output_dir)
+    scan_options = {
+        "recursive": args.recursive,
+        "include": args.include,
+        "exclude": args.exclude,
+        "max_depth": args.max_depth,
+        "max_size": int(args.max_size_mb * 2 ** 20) if args.max_size_mb is not None else None,
+    }
+
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=max(1, min(args.workers, len(folders)))) as executor:
+        futures = {executor.submit(group_folder_batch, folder, outputs[folder], args.threshold, formats,
+                                   **scan_options): folder
+                   for folder in folders}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"status": "error", "message": str(e), "folder": futures[future],
+                          "files": 0, "bytes": 0, "seconds": 0.0}
+            results.append(result)
+            detail = (f"{len(result['groups'])} groups" if result["status"] == "success"
+                      else f"{result['status']}: {result['message']}")
+            print(f"{result['folder']}: {result['files']} files in {result['seconds']:.2f} s, {detail}")
+    elapsed = time.perf_counter() - start
+
+    files = sum(r["files"] for r in results)
+    megabytes = sum(r["bytes"] for r in results) / 2 ** 20
+    failed = sum(r["status"] != "success" for r in results)
+    slowest = max(results, key=lambda r: r["seconds"])
+    print(f"\n{len(results)} folders ({failed} failed), {files} files, {megabytes:.1f} MiB in {elapsed:.2f} s: "
+          f"{files / elapsed:.1f} files/s, {megabytes / elapsed:.2f} MiB/s, "
+          f"slowest {slowest['folder']} ({slowest['seconds']:.2f} s)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,90 @@
+# Standard library imports
+import os        # For os.scandir
+import fnmatch   # For include/exclude glob patterns
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED  # For walking subtrees concurrently
+
+# Directory listings are I/O bound; on network shares most of the time is latency
+SCAN_WORKERS = 8
+
+
+def _matches(relative_path, patterns):
+    """True if the relative path (with "/" separators) or its name matches any glob."""
+    name = relative_path.rsplit("/", 1)[-1]
+    return any(fnmatch.fnmatch(relative_path, pattern) or fnmatch.fnmatch(name, pattern) for pattern in patterns)
+
+
+def _scan_directory(path, relative, depth, options):
+    """List one directory. Returns (files, subdirectories) that pass the filters.
+
+    Files are (relative path, absolute path, size) using the DirEntry's cached
+    stat; subdirectories are (absolute path, relative path, depth). Paths are
+    absolute because scan_files() passes an absolute root.
+
+    Raises:
+        OSError: If the root itself (relative == "") cannot be listed
+    """
+    include, exclude, max_depth, max_size, skip = options
+    files, subdirectories = [], []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                entry_relative = f"{relative}/{entry.name}" if relative else entry.name
+                try:
+                    # Symlinked directories are not followed, so links cannot create cycles
+                    if entry.is_dir(follow_symlinks=False):
+                        if (max_depth is None or depth < max_depth) and not _matches(entry_relative, exclude) \
+                                and not (skip and os.path.abspath(entry.path) in skip):
+                            subdirectories.append((entry.path, entry_relative, depth + 1))
+                    elif entry.is_file():
+                        if include and not _matches(entry_relative, include):
+                            continue
+                        if exclude and _matches(entry_relative, exclude):
+                            continue
+                        size = entry.stat().st_size
+                        if max_size is None or size <= max_size:
+                            files.append((entry_relative, entry.path, size))
+                except OSError:
+                    continue  # Entries that vanish or cannot be stat'ed are skipped
+    except OSError:
+        if not relative:
+            raise  # A missing or unreadable root is an error, not an empty folder
+        # Unreadable subdirectories are skipped
+    return files, subdirectories
+
+
+def scan_files(root, recursive=True, include=None, exclude=None, max_depth=None, max_size=None,
+               skip_dirs=(), workers=SCAN_WORKERS):
+    """List the files under root, walking subdirectories concurrently.
+
+    Args:
+        root (str): Folder to scan
+        recursive (bool): Descend into subfolders (False lists only root)
+        include (list): Glob patterns a file's relative path or name must match (default: all)
+        exclude (list): Glob patterns for files and folders to leave out
+        max_depth (int): Deepest subfolder level to enter (root is 0; default: unlimited)
+        max_size (int): Largest file size in bytes to include (default: unlimited)
+        skip_dirs (iterable): Folders never entered, e.g. an output folder inside root
+        workers (int): Directories listed in parallel
+
+    Returns:
+        list: (relative path with "/" separators, absolute path, size) tuples, sorted by relative path
+
+    Raises:
+        OSError: If root does not exist or cannot be listed
+    """
+    # DirEntry.path is built from the path given to scandir, so start from an absolute one
+    root = os.path.abspath(root)
+    options = (list(include or []), list(exclude or []), max_depth if recursive else 0, max_size,
+               {os.path.abspath(d) for d in skip_dirs})
+    files = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        pending = {executor.submit(_scan_directory, root, "", 0, options)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                found, subdirectories = future.result()
+                files.extend(found)
+                pending.update(executor.submit(_scan_directory, path, relative, depth, options)
+                               for path, relative, depth in subdirectories)
+    files.sort()
+    return files
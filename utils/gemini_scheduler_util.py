@@ -0,0 +1,284 @@
+# Standard library imports
+import time        # For refill and backoff timing
+import asyncio     # For the non-blocking submit used by the API server
+import heapq       # For the priority wait queue
+import random      # For backoff jitter
+import itertools   # For FIFO tie-breaking between equal priorities
+import threading   # For cross-session coordination
+from config import (GEMINI_REQUESTS_PER_MINUTE, GEMINI_TOKENS_PER_MINUTE, GEMINI_MAX_CONCURRENCY,
+                    GEMINI_MAX_RETRIES, GEMINI_BACKOFF_BASE, GEMINI_BACKOFF_MAX,
+                    GEMINI_QUEUE_TIMEOUT, GEMINI_SHORT_PROMPT_TOKENS, GEMINI_BURST_SECONDS)
+from utils.metrics_util import metrics  # Exposes queue and retry statistics
+
+# HTTP status codes worth retrying: rate limited or temporarily unavailable
+RETRYABLE_CODES = {429, 500, 503}
+
+
+class SchedulerBusyError(Exception):
+    """Raised when a request could not be completed within the retry or queue limits."""
+
+
+def estimate_tokens(*texts):
+    """Rough token estimate (about four characters per token)."""
+    return sum(len(text) for text in texts) // 4 + 1
+
+
+def is_retryable(error):
+    """Return True for rate-limit (429) and transient server errors."""
+    for attribute in ("code", "status_code", "status"):
+        code = getattr(error, attribute, None)
+        code = code() if callable(code) else code
+        if isinstance(code, int) and code in RETRYABLE_CODES:
+            return True
+    # google.api_core exceptions are named after the gRPC status
+    return type(error).__name__ in ("ResourceExhausted", "ServiceUnavailable", "TooManyRequests")
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `rate_per_minute`.
+
+    The bucket holds `burst_seconds` worth of tokens (at least one), which
+    bounds how many requests can be sent back to back after an idle period.
+    """
+
+    def __init__(self, rate_per_minute, burst_seconds=GEMINI_BURST_SECONDS):
+        self.rate = rate_per_minute / 60.0  # Tokens per second
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until `amount` tokens are available (0 if available now)."""
+        self._refill()
+        amount = min(amount, self.capacity)  # Oversized requests wait for a full bucket
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount):
+        self.tokens -= min(amount, self.capacity)
+
+    def drain(self):
+        """Empty the bucket so every waiter pauses until it refills."""
+        self._refill()
+        self.tokens = min(self.tokens, 0.0)
+
+
+class RequestScheduler:
+    """Shared scheduler for Gemini calls from every Streamlit session.
+
+    Requests wait in a priority queue (short interactive prompts first, FIFO
+    otherwise) until a concurrency slot and enough request/token budget are
+    available. Rate-limit and transient errors are retried with jittered
+    exponential backoff.
+    """
+
+    def __init__(self, requests_per_minute=GEMINI_REQUESTS_PER_MINUTE,
+                 tokens_per_minute=GEMINI_TOKENS_PER_MINUTE,
+                 max_concurrency=GEMINI_MAX_CONCURRENCY, max_retries=GEMINI_MAX_RETRIES,
+                 backoff_base=GEMINI_BACKOFF_BASE, backoff_max=GEMINI_BACKOFF_MAX,
+                 queue_timeout=GEMINI_QUEUE_TIMEOUT, short_prompt_tokens=GEMINI_SHORT_PROMPT_TOKENS,
+                 burst_seconds=GEMINI_BURST_SECONDS):
+        self.request_bucket = TokenBucket(requests_per_minute, burst_seconds)
+        self.token_bucket = TokenBucket(tokens_per_minute, burst_seconds)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.queue_timeout = queue_timeout
+        self.short_prompt_tokens = short_prompt_tokens
+        self._condition = threading.Condition()
+        self._waiting = []  # Heap of (priority, sequence) tickets
+        self._sequence = itertools.count()
+        self._active = 0
+        self._async_waiters = {}  # Ticket -> (event loop, asyncio.Event) of a waiting coroutine
+        # Counters for diagnostics
+        self.completed = 0
+        self.retries = 0
+        self.failures = 0
+
+    def _try_acquire(self, ticket, tokens):
+        """Take a slot for ticket if it is first in line and within every limit (lock held).
+
+        Returns:
+            float: 0 if acquired, otherwise seconds worth waiting (None: until notified)
+        """
+        if self._waiting[0] != ticket or self._active >= self.max_concurrency:
+            return None
+        wait = max(self.request_bucket.wait_time(1), self.token_bucket.wait_time(tokens))
+        if wait == 0:
+            self.request_bucket.consume(1)
+            self.token_bucket.consume(tokens)
+            self._active += 1
+        return wait
+
+    def _notify_all(self):
+        """Wake waiting threads and the coroutine first in line (lock held).
+
+        Only the first ticket can take a slot, so other coroutines stay asleep.
+        """
+        self._condition.notify_all()
+        waiter = self._async_waiters.get(self._waiting[0]) if self._waiting else None
+        if waiter is not None:
+            loop, event = waiter
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # The waiter's event loop has closed
+
+    def _leave_queue(self, ticket):
+        """Remove ticket from the wait queue and wake the others (lock held)."""
+        self._waiting.remove(ticket)
+        heapq.heapify(self._waiting)
+        self._notify_all()
+
+    def _acquire(self, priority, tokens):
+        """Block until this request is first in line and within every limit."""
+        ticket = (priority, next(self._sequence))
+        deadline = time.monotonic() + self.queue_timeout
+        with self._condition:
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise SchedulerBusyError("Timed out waiting for a Gemini request slot")
+                    wait = self._try_acquire(ticket, tokens)
+                    if wait == 0:
+                        return
+                    self._condition.wait(remaining if wait is None else min(wait, remaining))
+            finally:
+                # Leave the queue whether we got a slot or gave up
+                self._leave_queue(ticket)
+
+    async def _acquire_async(self, priority, tokens):
+        """Like _acquire, but sleeps on the event loop instead of blocking a thread.
+
+        The coroutine sleeps until the budget it needs has refilled, or until
+        it is first in line and another request frees a slot or leaves the queue.
+        """
+        ticket = (priority, next(self._sequence))
+        deadline = time.monotonic() + self.queue_timeout
+        event = asyncio.Event()
+        with self._condition:
+            heapq.heappush(self._waiting, ticket)
+            self._async_waiters[ticket] = (asyncio.get_running_loop(), event)
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise SchedulerBusyError("Timed out waiting for a Gemini request slot")
+                with self._condition:
+                    event.clear()  # Notifications from here on wake this attempt
+                    wait = self._try_acquire(ticket, tokens)
+                if wait == 0:
+                    return
+                try:
+                    await asyncio.wait_for(event.wait(), remaining if wait is None else min(wait, remaining))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._condition:
+                del self._async_waiters[ticket]
+                self._leave_queue(ticket)
+
+    def _release(self, throttled=False):
+        with self._condition:
+            self._active -= 1
+            if throttled:
+                # The server pushed back: stop every session from sending until the budget refills
+                self.request_bucket.drain()
+            self._notify_all()
+
+    def backoff_delay(self, attempt):
+        """Full-jitter exponential backoff for the given retry attempt (0-based)."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def submit(self, fn, *args, prompt_tokens=1, extra_tokens=0, **kwargs):
+        """Run fn(*args, **kwargs) under the scheduler's limits.
+
+        Args:
+            fn (callable): The Gemini call, e.g. chat.send_message
+            prompt_tokens (int): Estimated prompt size; short prompts get priority
+            extra_tokens (int): Additional tokens charged to the budget (tool schemas, output)
+
+        Returns:
+            The result of fn
+
+        Raises:
+            SchedulerBusyError: If retries or queue time are exhausted
+        """
+        priority = 0 if prompt_tokens <= self.short_prompt_tokens else 1
+        tokens = prompt_tokens + extra_tokens
+        attempt = 0
+        while True:
+            self._acquire(priority, tokens)
+            throttled = False
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                throttled = True
+                if attempt >= self.max_retries:
+                    self.failures += 1
+                    raise SchedulerBusyError("Gemini is rate limiting requests, please try again shortly") from e
+                self.retries += 1
+            else:
+                self.completed += 1
+                return result
+            finally:
+                self._release(throttled)
+            time.sleep(self.backoff_delay(attempt))
+            attempt += 1
+
+    async def submit_async(self, fn, *args, prompt_tokens=1, extra_tokens=0, **kwargs):
+        """Async variant of submit() for coroutine functions such as chat.send_message_async.
+
+        Shares the queue, budgets and counters with submit(), so sync and async
+        callers are limited together.
+        """
+        priority = 0 if prompt_tokens <= self.short_prompt_tokens else 1
+        tokens = prompt_tokens + extra_tokens
+        attempt = 0
+        while True:
+            await self._acquire_async(priority, tokens)
+            throttled = False
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                throttled = True
+                if attempt >= self.max_retries:
+                    self.failures += 1
+                    raise SchedulerBusyError("Gemini is rate limiting requests, please try again shortly") from e
+                self.retries += 1
+            else:
+                self.completed += 1
+                return result
+            finally:
+                self._release(throttled)
+            await asyncio.sleep(self.backoff_delay(attempt))
+            attempt += 1
+
+    def stats(self):
+        """Return queue depth, active requests and retry counters."""
+        with self._condition:
+            return {
+                "waiting": len(self._waiting),
+                "active": self._active,
+                "completed": self.completed,
+                "retries": self.retries,
+                "failures": self.failures,
+            }
+
+
+# One scheduler shared by every session in the process
+gemini_scheduler = RequestScheduler()
+metrics.register_collector("gemini_scheduler", gemini_scheduler.stats)
@@ -0,0 +1,180 @@
+# Standard library imports
+import re  # For tokenising prompts
+from utils.tool_schema_util import TOOL_DECLARATIONS
+
+# Words in tool names that describe the action rather than the target
+ACTION_WORDS = {"adjust", "toggle", "start", "navigate", "get", "open", "first", "file",
+                "query", "read", "group", "related", "save", "load", "export", "aloud", "list"}
+
+# Words that may appear in a command without changing its meaning
+FILLER_WORDS = {"set", "to", "the", "please", "turn", "make", "change", "adjust", "my", "a",
+                "go", "play", "percent", "level", "at", "it", "now", "use", "tool", "mode",
+                "track", "file", "one", "switch", "select", "of", "and", "with", "list"}
+
+# Words that fill a BOOLEAN parameter
+TRUE_WORDS = {"on", "enable", "open", "show", "start", "true", "yes"}
+FALSE_WORDS = {"off", "disable", "close", "hide", "stop", "false", "no"}
+
+# Common spellings mapped onto the words used in the declarations
+ALIASES = {
+    "prev": "previous", "back": "previous", "skip": "next", "forward": "next",
+    "rect": "rectangle", "square": "rectangle", "pencil": "pen", "draw": "pen",
+    "sound": "volume", "songs": "audio", "song": "audio", "music": "audio",
+    "videos": "video", "movie": "video", "screen": "brightness", "%": "percent",
+}
+
+# Prompts longer than this are left to Gemini
+MAX_TOKENS = 8
+
+# Allowed range written in a NUMBER parameter's description, e.g. "Volume percentage (0-100)"
+RANGE_PATTERN = re.compile(r"\((-?\d+(?:\.\d+)?)\s*-\s*(-?\d+(?:\.\d+)?)\)")
+
+# A minus sign directly before a number belongs to it ("volume -20")
+TOKEN_PATTERN = re.compile(r"-?\d+(?:\.\d+)?|%|[a-z]+")
+
+
+class _Route:
+    """Matching rules derived from one tool declaration."""
+
+    def __init__(self, declaration):
+        self.name = declaration["name"]
+        parameters = declaration.get("parameters", {})
+        self.properties = parameters.get("properties", {})
+        self.required = parameters.get("required", [])
+        self.keywords = {word for word in self.name.split("_") if word not in ACTION_WORDS}
+        # enum value -> parameter name
+        self.enum_values = {}
+        # NUMBER parameter -> (minimum, maximum, whole numbers only)
+        self.ranges = {}
+        for param, schema in self.properties.items():
+            for value in schema.get("enum", []):
+                self.enum_values[value.lower()] = param
+            match = RANGE_PATTERN.search(schema.get("description", "")) if schema["type"] == "NUMBER" else None
+            if match:
+                # "brightness 0.5" more likely means half than 0.5%, so percentages must be whole
+                self.ranges[param] = (float(match.group(1)), float(match.group(2)),
+                                      "percentage" in schema["description"].lower())
+
+    def is_eligible(self):
+        """Only tools whose required parameters are numbers, enums or booleans are routed."""
+        for param in self.required:
+            schema = self.properties[param]
+            if schema["type"] == "STRING" and "enum" not in schema:
+                return False
+        return True
+
+    def match(self, tokens, unique_enum_values):
+        """Try to fill this tool's parameters from the prompt tokens.
+
+        Returns:
+            tuple: (arguments dict, set of consumed tokens) or None
+        """
+        consumed = {token for token in tokens if token in self.keywords}
+        # Without its own keyword a tool can still be addressed by an enum value only it accepts
+        if not consumed and not any(token in unique_enum_values.get(self.name, ()) for token in tokens):
+            return None
+
+        arguments = {}
+        for param, schema in self.properties.items():
+            if schema["type"] == "NUMBER":
+                numbers = [token for token in tokens if _is_number(token)]
+                if len(numbers) == 1:
+                    value = float(numbers[0])
+                    if not self.in_range(param, value):
+                        return None  # Out of the schema's range: let Gemini interpret it
+                    arguments[param] = value
+                    consumed.add(numbers[0])
+                elif len(numbers) > 1:
+                    return None  # Ambiguous
+            elif schema["type"] == "BOOLEAN":
+                values = {token in TRUE_WORDS for token in tokens if token in TRUE_WORDS | FALSE_WORDS}
+                if len(values) == 1:
+                    arguments[param] = values.pop()
+                    consumed.update(token for token in tokens if token in TRUE_WORDS | FALSE_WORDS)
+                elif len(values) > 1:
+                    return None
+            elif "enum" in schema:
+                matches = [token for token in tokens if self.enum_values.get(token) == param]
+                if len(set(matches)) == 1:
+                    arguments[param] = matches[0]
+                    consumed.add(matches[0])
+                elif len(set(matches)) > 1:
+                    return None
+
+        if any(param not in arguments for param in self.required):
+            return None
+        return arguments, consumed
+
+    def in_range(self, param, value):
+        """True if a number is allowed for the parameter (never negative; within a stated range)."""
+        if value < 0:
+            return False  # No routed tool takes a negative value
+        if param not in self.ranges:
+            return True
+        low, high, whole = self.ranges[param]
+        return low <= value <= high and (not whole or value.is_integer())
+
+
+def _is_number(token):
+    return token.lstrip("-")[:1].isdigit()
+
+
+def tokenize(prompt):
+    """Lowercase the prompt, split it into words/numbers and apply ALIASES."""
+    return [ALIASES.get(token, token) for token in TOKEN_PATTERN.findall(prompt.lower())]
+
+
+def build_routes(declarations):
+    """Build matching rules for every declaration that can be routed locally."""
+    routes = [_Route(declaration) for declaration in declarations]
+    routes = [route for route in routes if route.is_eligible()]
+    # Enum values accepted by exactly one tool can identify that tool on their own
+    owners = {}
+    for route in routes:
+        for value in route.enum_values:
+            owners.setdefault(value, set()).add(route.name)
+    unique = {}
+    for value, names in owners.items():
+        if len(names) == 1:
+            unique.setdefault(next(iter(names)), set()).add(value)
+    return routes, unique
+
+
+_routes, _unique_enum_values = build_routes(TOOL_DECLARATIONS)
+
+
+def route_prompt(prompt, routes=None):
+    """Match an obvious command locally so it can skip the Gemini round trip.
+
+    A prompt is routed only when exactly one tool matches, all of that tool's
+    required parameters are filled from the prompt, and every word in the
+    prompt is accounted for (keyword, parameter value or filler). Anything
+    else returns None and should go to Gemini.
+
+    Args:
+        prompt (str): The user's message
+        routes (tuple): Optional (routes, unique enum values) from build_routes()
+
+    Returns:
+        tuple: (function_name, arguments dict) or None
+    """
+    routes, unique_enum_values = routes or (_routes, _unique_enum_values)
+    if "?" in prompt:
+        return None
+    tokens = tokenize(prompt)
+    if not tokens or len(tokens) > MAX_TOKENS:
+        return None
+
+    candidates = []
+    for route in routes:
+        result = route.match(tokens, unique_enum_values)
+        if result is None:
+            continue
+        arguments, consumed = result
+        # Every remaining word must be filler, otherwise the request may mean more
+        if all(token in consumed or token in FILLER_WORDS for token in tokens):
+            candidates.append((route.name, arguments))
+
+    if len(candidates) == 1:
+        return candidates[0]
+    return None
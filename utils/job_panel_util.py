@@ -0,0 +1,107 @@
+import os
+from urllib.parse import quote
+import streamlit as st
+from config import JOB_REFRESH_SECONDS, EXPORT_INLINE_DOWNLOAD_MB, EXPORT_BASE_URL
+from utils.job_util import job_runner, RUNNING, QUEUED, SUCCEEDED  # Shared background job runner
+from utils.download_util import offer_file_download  # Reads files only when a download is requested
+
+# st.fragment reruns only the panel; older Streamlit releases ship it as experimental
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+
+STATUS_ICONS = {"queued": "🕒", "running": "⚙️", "succeeded": "✅", "failed": "❌", "cancelled": "⏹️"}
+
+
+def announce_finished_jobs():
+    """Post the results of this session's finished jobs into the chat history (once each)
+
+    Returns:
+        bool: True if any message was added
+    """
+    if "announced_jobs" not in st.session_state:
+        st.session_state.announced_jobs = set()
+
+    added = False
+    for job_id in st.session_state.get("job_ids", []):
+        job = job_runner.get(job_id)
+        if job is None or not job.is_finished or job_id in st.session_state.announced_jobs:
+            continue
+        st.session_state.announced_jobs.add(job_id)
+        message = {"role": "assistant"}
+        if isinstance(job.result, dict) and job.result.get("content"):
+            message["content"] = job.result["content"]
+            if job.result.get("download"):
+                message["download"] = job.result["download"]
+        else:
+            message["content"] = f"❌ Job `{job_id}` {job.status}: {job.error or 'no result'}"
+        st.session_state.messages.append(message)
+        added = True
+    return added
+
+
+def show_download_button(download):
+    """Offer an exported file for download from a chat message
+
+    With EXPORT_BASE_URL set the file is linked to the API server, which streams
+    it from disk. Otherwise the file is read only when the user asks for it, and
+    exports larger than EXPORT_INLINE_DOWNLOAD_MB are left at the path given in
+    the message.
+    """
+    path = download["path"]
+    if not os.path.exists(path):
+        st.caption(f"{download['name']} is no longer available.")
+    elif EXPORT_BASE_URL and download.get("url"):
+        st.markdown(f"[⬇️ Download {download['name']}]({EXPORT_BASE_URL.rstrip('/')}{quote(download['url'])})")
+    else:
+        offer_file_download(f"Download {download['name']}", path, key=f"download_{download['name']}",
+                            max_bytes=EXPORT_INLINE_DOWNLOAD_MB * 2 ** 20)
+
+
+def _session_jobs():
+    """This session's jobs, newest first (the runner is shared by every session)"""
+    job_ids = set(st.session_state.get("job_ids", []))
+    return [job for job in job_runner.jobs() if job.id in job_ids]
+
+
+def _render_jobs():
+    """Draw a progress bar and cancel button per job of this session"""
+    jobs = _session_jobs()
+    if not jobs:
+        st.caption("No background jobs.")
+    for job in jobs:
+        info = job.snapshot()
+        st.write(f"{STATUS_ICONS.get(info['status'], '')} **{info['description']}**")
+        label = info["label"] or info["status"]
+        if info["status"] in (RUNNING, QUEUED):
+            if info["fraction"] is not None:
+                st.progress(info["fraction"], text=f"{label} · {info['elapsed']} s")
+            else:
+                st.caption(f"{label} · {info['elapsed']} s")
+            if info["cancel_requested"]:
+                st.caption("Cancelling…")
+            elif st.button("Cancel", key=f"cancel_job_{info['id']}"):
+                job_runner.cancel(info["id"])
+        else:
+            detail = info["error"] if info["status"] != SUCCEEDED and info["error"] else label
+            st.caption(f"{info['status']} after {info['elapsed']} s · {detail}")
+
+    # Finished jobs from this session show up in the chat without user action
+    if announce_finished_jobs():
+        st.rerun()
+
+
+def show_jobs_panel():
+    """Show background jobs with live progress in the sidebar
+
+    Only this session's jobs are listed. While one of them is queued or
+    running, the panel refreshes itself every JOB_REFRESH_SECONDS without rerunning the rest of the app, so the chat
+    stays usable.
+    """
+    active = any(job.status in (RUNNING, QUEUED) for job in _session_jobs())
+    with st.sidebar:
+        st.subheader("🧵 Background jobs")
+        if _fragment is not None:
+            _fragment(run_every=JOB_REFRESH_SECONDS if active else None)(_render_jobs)()
+        else:
+            _render_jobs()
+            if active:
+                st.button("Refresh progress", key="refresh_jobs")
@@ -0,0 +1,196 @@
+# Standard library imports
+import time        # For job timestamps
+import uuid        # For job IDs
+import atexit      # For stopping jobs when the app exits
+import threading   # For cancellation flags and the job table lock
+from collections import OrderedDict  # For keeping jobs in submission order
+from concurrent.futures import ThreadPoolExecutor  # Worker threads
+from config import JOB_WORKERS, JOB_HISTORY
+from utils.metrics_util import metrics  # Exposes queue statistics
+
+# Job states; the last three are final
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINAL_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+def _init_worker():
+    """Initialise COM in each worker thread (pyttsx3's SAPI5 driver needs it on Windows)."""
+    try:
+        import comtypes
+        comtypes.CoInitialize()
+    except Exception:
+        pass
+
+
+class Job:
+    """A tool call running in the background.
+
+    The tool receives `report` as its `progress` callback and should call
+    report(done, total, label) as it goes; report returns False once
+    cancellation was requested, and the tool should then stop and return
+    {"status": "cancelled", ...}.
+    """
+
+    def __init__(self, name, description=None):
+        self.id = uuid.uuid4().hex[:8]
+        self.name = name
+        self.description = description or name
+        self.status = QUEUED
+        self.done = 0
+        self.total = None
+        self.label = ""
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.future = None
+        self._cancel = threading.Event()
+
+    def report(self, done, total=None, label=None):
+        """Progress callback for the tool. Returns False if the job should stop."""
+        self.done = done
+        if total is not None:
+            self.total = total
+        if label is not None:
+            self.label = label
+        return not self._cancel.is_set()
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    @property
+    def fraction(self):
+        """Completed fraction (0-1), or None if the total is unknown."""
+        if self.status == SUCCEEDED:
+            return 1.0
+        if not self.total:
+            return None
+        return min(1.0, self.done / self.total)
+
+    @property
+    def is_finished(self):
+        return self.status in FINAL_STATES
+
+    def snapshot(self):
+        """Plain dict describing the job (safe to hand to the UI)."""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "description": self.description,
+            "status": self.status,
+            "done": self.done,
+            "total": self.total,
+            "label": self.label,
+            "fraction": self.fraction,
+            "cancel_requested": self.cancel_requested,
+            "error": self.error,
+            "elapsed": round((self.finished or time.time()) - (self.started or self.created), 1),
+        }
+
+
+class JobRunner:
+    """Thread pool that runs tool calls as jobs with progress and cancellation.
+
+    Jobs live in the process, not in a Streamlit session, so they keep running
+    across reruns and page refreshes. The most recent `history` finished jobs
+    are kept for result retrieval.
+    """
+
+    def __init__(self, max_workers=JOB_WORKERS, history=JOB_HISTORY):
+        self.history = history
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job",
+                                            initializer=_init_worker)
+        self._jobs = OrderedDict()  # job id -> Job, oldest first
+        self._lock = threading.Lock()
+
+    def submit(self, name, fn, *args, description=None, **kwargs):
+        """Run fn(*args, progress=job.report, **kwargs) in the background.
+
+        Returns:
+            Job: The queued job
+        """
+        job = Job(name, description)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        job.future = self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        if job.cancel_requested:
+            job.status = CANCELLED
+            job.finished = time.time()
+            return None
+        job.status = RUNNING
+        job.started = time.time()
+        try:
+            result = fn(*args, progress=job.report, **kwargs)
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+        else:
+            job.result = result
+            # Tools report failure and cancellation in their result dict
+            status = result.get("status") if isinstance(result, dict) else None
+            if status == "cancelled" or (job.cancel_requested and status != "success"):
+                job.status = CANCELLED
+            elif status == "error":
+                job.error = result.get("message") or result.get("content")
+                job.status = FAILED
+            else:
+                job.status = SUCCEEDED
+        job.finished = time.time()
+        return job.result
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond the history limit (lock held)."""
+        finished = [job_id for job_id, job in self._jobs.items() if job.is_finished]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        """Return the Job with this ID, or None."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Request cancellation. Queued jobs never start; running jobs stop at their next progress report.
+
+        Returns:
+            bool: False if the job is unknown or already finished
+        """
+        job = self.get(job_id)
+        if job is None or job.is_finished:
+            return False
+        job._cancel.set()
+        if job.future is not None and job.future.cancel():
+            job.status = CANCELLED
+            job.finished = time.time()
+        return True
+
+    def jobs(self):
+        """All known jobs, newest first."""
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    def stats(self):
+        """Return job counts per state."""
+        with self._lock:
+            states = [job.status for job in self._jobs.values()]
+        return {state: states.count(state) for state in (QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED)}
+
+    def shutdown(self):
+        """Cancel every job and stop the worker threads without waiting."""
+        for job in self.jobs():
+            job._cancel.set()
+            if job.future is not None:
+                job.future.cancel()
+        self._executor.shutdown(wait=False)
+
+
+# One runner shared by every session in the process
+job_runner = JobRunner()
+metrics.register_collector("jobs", job_runner.stats)
+atexit.register(job_runner.shutdown)
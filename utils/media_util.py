@@ -1,14 +1,273 @@
 # Standard library imports
 import os          # For operating system path operations
-import glob        # For file pattern matching
-import subprocess  # For launching external applications
+import json        # For persisting the media index
+import hashlib     # For naming per-folder index files
+import time        # For the index staleness check
+import threading   # For guarding the shared index cache
+from config import MEDIA_INDEX_DIR, MEDIA_INDEX_MAX_AGE_SECONDS
+from utils.player_util import play_media_file  # Shared, managed player process
+
+# Optional tag/duration reader; the index still works without it
+try:
+    import mutagen
+except ImportError:
+    mutagen = None
+
+# Media file extensions recognised by the index, grouped by media type
+MEDIA_EXTENSIONS = {
+    "audio": (".mp3", ".wav", ".flac", ".aac", ".m4a", ".ogg", ".opus", ".wma"),
+    "video": (".mp4", ".mkv", ".avi", ".mov", ".webm", ".wmv", ".m4v", ".flv"),
+}
+
+# Fields that can be used to order the playlist
+SORT_FIELDS = ("name", "mtime", "size", "duration", "title", "artist")
+
+# Bump when the on-disk entry layout changes so stale indexes are rebuilt
+INDEX_VERSION = 1
+
+
+def get_media_type(file_name):
+    """Return "audio", "video" or None based on the file extension."""
+    extension = os.path.splitext(file_name)[1].lower()
+    for media_type, extensions in MEDIA_EXTENSIONS.items():
+        if extension in extensions:
+            return media_type
+    return None
+
+
+def read_media_metadata(file_path):
+    """Read duration and tag metadata from a media file.
+
+    Args:
+        file_path (str): Path to the media file
+
+    Returns:
+        dict: Dictionary containing duration (seconds or None), title, artist and album
+    """
+    metadata = {"duration": None, "title": None, "artist": None, "album": None}
+    if mutagen is None:
+        return metadata
+    try:
+        # easy=True maps ID3/MP4/Vorbis tags onto common key names
+        media = mutagen.File(file_path, easy=True)
+        if media is None:
+            return metadata
+        if media.info is not None and getattr(media.info, "length", None):
+            metadata["duration"] = round(float(media.info.length), 2)
+        tags = media.tags or {}
+        for key in ("title", "artist", "album"):
+            values = tags.get(key)
+            if values:
+                metadata[key] = str(values[0])
+    except Exception:
+        # Unreadable tags should never drop the file from the index
+        pass
+    return metadata
+
+
+class MediaIndex:
+    """Persistent index of the media files in a single folder.
+
+    The index is built with os.scandir and kept on disk under MEDIA_INDEX_DIR.
+    Refreshing only re-reads metadata for files whose size or mtime changed,
+    and all lookups are served from memory. is_stale() tells callers whether
+    a rescan is worth doing at all.
+    """
+
+    def __init__(self, folder_path):
+        self.folder_path = os.path.abspath(folder_path)
+        self.entries = {}  # Maps absolute file path to its metadata entry
+        folder_hash = hashlib.sha1(self.folder_path.encode("utf-8")).hexdigest()
+        self.index_path = os.path.join(MEDIA_INDEX_DIR, f"{folder_hash}.json")
+        self._lock = threading.Lock()
+        self.folder_mtime = None  # Folder mtime seen by the last refresh
+        self.refreshed_at = 0.0   # time.monotonic() of the last refresh
+
+    def is_stale(self, max_age=MEDIA_INDEX_MAX_AGE_SECONDS):
+        """Check whether the folder may have changed since the last refresh.
+
+        Adding, removing or renaming a file updates the folder's mtime; files
+        rewritten in place (e.g. re-tagged) are only caught once the index is
+        older than max_age seconds.
+        """
+        try:
+            folder_mtime = os.stat(self.folder_path).st_mtime
+        except OSError:
+            return True
+        return folder_mtime != self.folder_mtime or time.monotonic() - self.refreshed_at > max_age
+
+    def load(self):
+        """Load a previously saved index from disk, if present and current."""
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION and data.get("folder") == self.folder_path:
+                self.entries = {entry["path"]: entry for entry in data["entries"]}
+        except (OSError, ValueError, KeyError):
+            # Missing or corrupt index files are simply rebuilt
+            self.entries = {}
+
+    def save(self):
+        """Write the index to disk atomically."""
+        os.makedirs(MEDIA_INDEX_DIR, exist_ok=True)
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": INDEX_VERSION,
+                "folder": self.folder_path,
+                "entries": list(self.entries.values()),
+            }, f)
+        os.replace(temp_path, self.index_path)
+
+    def refresh(self):
+        """Bring the index up to date with the folder contents.
+
+        Returns:
+            bool: True if any entry was added, changed or removed
+        """
+        with self._lock:
+            changed = False
+            seen = set()
+            # Taken before the scan, so a file added during it makes the index stale
+            folder_mtime = os.stat(self.folder_path).st_mtime
+            with os.scandir(self.folder_path) as scanner:
+                for entry in scanner:
+                    media_type = get_media_type(entry.name)
+                    if media_type is None or not entry.is_file():
+                        continue
+                    # DirEntry caches the stat result, avoiding another syscall on Windows
+                    stat = entry.stat()
+                    path = os.path.abspath(entry.path)
+                    seen.add(path)
+                    cached = self.entries.get(path)
+                    if cached and cached["mtime"] == stat.st_mtime and cached["size"] == stat.st_size:
+                        continue
+                    record = {
+                        "path": path,
+                        "name": entry.name,
+                        "type": media_type,
+                        "size": stat.st_size,
+                        "mtime": stat.st_mtime,
+                    }
+                    record.update(read_media_metadata(path))
+                    self.entries[path] = record
+                    changed = True
+
+            # Drop files that disappeared since the last refresh
+            for path in list(self.entries):
+                if path not in seen:
+                    del self.entries[path]
+                    changed = True
+
+            if changed:
+                self.save()
+            self.folder_mtime = folder_mtime
+            self.refreshed_at = time.monotonic()
+            return changed
+
+    def query(self, media_type=None, search=None, sort_by="name", descending=False):
+        """Return index entries filtered by type and search text, in sorted order.
+
+        Args:
+            media_type (str): "audio", "video" or None for both
+            search (str): Case-insensitive text matched against name, title, artist and album
+            sort_by (str): One of SORT_FIELDS (default: "name")
+            descending (bool): Reverse the sort order
+
+        Returns:
+            list: Matching entry dictionaries
+        """
+        if sort_by not in SORT_FIELDS:
+            sort_by = "name"
+        # refresh() from another session may be changing entries; filter a consistent view
+        with self._lock:
+            results = [entry for entry in self.entries.values()
+                       if entry_matches(entry, media_type, search)]
+
+        def sort_key(entry):
+            value = entry.get(sort_by)
+            # Names break ties
+            if isinstance(value, str):
+                value = value.lower()
+            return (value if value is not None else 0, entry["name"].lower())
+
+        results.sort(key=sort_key, reverse=descending)
+        # Entries missing the field sort last in either direction (the sort is stable)
+        results.sort(key=lambda entry: entry.get(sort_by) is None)
+        return results
+
+    def get(self, file_path):
+        """Look up a single entry by path without touching the disk."""
+        with self._lock:
+            return self.entries.get(os.path.abspath(file_path))
+
+
+def entry_matches(entry, media_type=None, search=None):
+    """Check whether an index entry passes the type and search filters."""
+    if media_type and entry["type"] != media_type:
+        return False
+    if search:
+        needle = search.lower()
+        haystack = " ".join(str(entry.get(key) or "") for key in ("name", "title", "artist", "album"))
+        if needle not in haystack.lower():
+            return False
+    return True
+
+
+# Indexes are shared by every session in the process, keyed by absolute folder path
+_media_indexes = {}
+_media_indexes_lock = threading.Lock()
+
+
+def get_media_index(folder_path, refresh=True):
+    """Return the shared MediaIndex for a folder, loading it from disk on first use.
+
+    Args:
+        folder_path (str): Path to the media folder
+        refresh (bool): Incrementally rescan the folder before returning; when
+                        False, rescan only if the index is_stale()
+
+    Returns:
+        MediaIndex: The index for the folder
+    """
+    key = os.path.abspath(folder_path)
+    with _media_indexes_lock:
+        index = _media_indexes.get(key)
+        if index is None:
+            index = MediaIndex(key)
+            index.load()
+            _media_indexes[key] = index
+            # A freshly loaded index must be reconciled with the folder once
+            refresh = True
+    if refresh or index.is_stale():
+        index.refresh()
+    return index
+
+
+def lookup_media_entry(file_path):
+    """Find the index entry for a file from the in-memory index of its folder.
+
+    The folder is only scanned if its index is not loaded yet (e.g. after a restart).
+    """
+    folder_path = os.path.dirname(os.path.abspath(file_path))
+    index = _media_indexes.get(folder_path)
+    if index is None:
+        if not os.path.isdir(folder_path):
+            return None
+        index = get_media_index(folder_path, refresh=False)
+    return index.get(file_path)
+
+
+def open_first_media_file(folder_path, media_type=None, search=None, sort_by="name", descending=False):
+    """Opens the first media file found in the specified folder.
 
-def open_first_media_file(folder_path):
-    """Opens the first media file (MP3/MP4) found in the specified folder.
-    
     Args:
         folder_path (str): Path to the folder containing media files
-        
+        media_type (str): Restrict to "audio" or "video" files (default: both)
+        search (str): Only include files whose name or tags contain this text
+        sort_by (str): Playlist order, one of SORT_FIELDS (default: "name")
+        descending (bool): Reverse the playlist order
+
     Returns:
         dict: Dictionary containing:
             - status: "success" or "error"
@@ -18,20 +277,23 @@ def open_first_media_file(folder_path):
     """
     try:
         # Verify the folder exists
-        if not os.path.exists(folder_path):
-            return f"Error: Folder '{folder_path}' does not exist."
+        if not os.path.isdir(folder_path):
+            return {
+                "status": "error",
+                "message": f"Error: Folder '{folder_path}' does not exist."
+            }
+
+        # Build the playlist from the folder index, rescanning only if the folder changed
+        index = get_media_index(folder_path, refresh=False)
+        files = [entry["path"] for entry in index.query(media_type, search, sort_by, descending)]
 
-        # Find all MP3 and MP4 files in the folder
-        files = glob.glob(os.path.join(folder_path, '*.mp3')) + \
-                glob.glob(os.path.join(folder_path, '*.mp4'))
-        
         if files:
             # Get the first file in the list
             file_path = files[0]
-            
-            # Open the file using the default system application
-            subprocess.Popen([file_path], shell=True)
-            
+
+            # Play the file on the shared player process
+            play_media_file(file_path)
+
             return {
                 "status": "success",
                 "message": f"Opened file: {file_path}",
@@ -41,7 +303,7 @@ def open_first_media_file(folder_path):
         else:
             return {
                 "status": "error",
-                "message": f"No MP3 or MP4 files found in folder: {folder_path}"
+                "message": f"No matching media files found in folder: {folder_path}"
             }
     except Exception as e:
         return {
@@ -49,14 +311,20 @@ def open_first_media_file(folder_path):
             "message": f"Error opening file: {str(e)}"
         }
 
-def navigate_media_file(direction, current_index, file_list):
+def navigate_media_file(direction, current_index, file_list, media_type=None, search=None):
     """Navigates to next/previous media file in a playlist.
-    
+
+    When a media type or search text is given, the playlist is walked in the
+    requested direction until a matching file is found. Matching uses the
+    in-memory media index, so the disk is not rescanned.
+
     Args:
         direction (str): "next" or "previous"
         current_index (int): Current position in file_list
         file_list (list): List of media file paths
-        
+        media_type (str): Only stop on "audio" or "video" files
+        search (str): Only stop on files whose name or tags contain this text
+
     Returns:
         dict: Dictionary containing:
             - status: "success" or "error"
@@ -72,20 +340,38 @@ def navigate_media_file(direction, current_index, file_list):
                 "message": "No files are currently open."
             }
 
-        # Calculate new index based on direction
+        # Calculate step based on direction
         if direction == "next":
-            new_index = (current_index + 1) % len(file_list)  # Wrap around
+            step = 1
         elif direction == "previous":
-            new_index = (current_index - 1) % len(file_list)  # Wrap around
+            step = -1
         else:
             return {
                 "status": "error",
                 "message": "Invalid navigation direction."
             }
 
-        # Get and open the new file
+        # Walk the playlist (wrapping around) until a file passes the filters
+        new_index = None
+        for offset in range(1, len(file_list) + 1):
+            candidate = (current_index + step * offset) % len(file_list)
+            if not media_type and not search:
+                new_index = candidate
+                break
+            entry = lookup_media_entry(file_list[candidate])
+            if entry and entry_matches(entry, media_type, search):
+                new_index = candidate
+                break
+
+        if new_index is None:
+            return {
+                "status": "error",
+                "message": "No matching media file found in the current playlist."
+            }
+
+        # Load the new file into the already running player
         new_file_path = file_list[new_index]
-        subprocess.Popen([new_file_path], shell=True)
+        play_media_file(new_file_path)
 
         return {
             "status": "success",
@@ -97,4 +383,4 @@ def navigate_media_file(direction, current_index, file_list):
         return {
             "status": "error",
             "message": f"Error navigating files: {str(e)}"
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,452 @@
+# Standard library imports
+import os          # For index file paths
+import json        # For index metadata
+import math        # For choosing the number of clusters
+import time        # For throttling incremental updates
+import argparse    # For the command-line indexer
+import threading   # For guarding the shared index
+import numpy as np  # For vectors and memory-mapped arrays
+from scipy import sparse  # For k-means centroid sums
+from sklearn.feature_extraction.text import HashingVectorizer  # Stateless text vectors
+from config import MESSAGE_INDEX_DIR, MESSAGE_INDEX_DIM, MESSAGE_INDEX_NPROBE, MESSAGE_INDEX_REFRESH_SECONDS
+from utils.db_util import count_telegram_messages, stream_telegram_messages, fetch_telegram_messages_by_id
+from utils.job_util import job_runner  # Runs catch-up syncs off the chat request
+
+# Bump when the on-disk layout changes so stale indexes are rebuilt
+INDEX_VERSION = 1
+
+# Marks a row whose message was deleted or replaced by a newer version
+DELETED = -1
+
+TRAIN_SAMPLES_PER_LIST = 40   # k-means training rows per cluster
+KMEANS_ITERATIONS = 8
+MAX_LISTS = 4096
+COMPACT_FRACTION = 0.1        # Compact once unsorted or deleted rows exceed this share
+CHUNK_ROWS = 20000            # Rows processed at a time when assigning or compacting
+
+
+def choose_list_count(row_count):
+    """Number of IVF clusters for a table of row_count messages (about sqrt(n))."""
+    return max(1, min(MAX_LISTS, int(math.sqrt(max(row_count, 1)))))
+
+
+class MessageIndex:
+    """Inverted-file (IVF) vector index of Telegram messages, stored as memory-mapped files.
+
+    Messages are embedded with a signed HashingVectorizer (the hashing trick
+    from file_analysis_util's TF-IDF approach, but stateless, so new messages
+    never require refitting) into `dim` float32 values. Vectors are grouped
+    into k-means clusters; a query scans only the `nprobe` clusters nearest to
+    it.
+
+    Files in `folder`:
+        vectors.f32   (count, dim) float32, rows [0, compacted) sorted by cluster
+        ids.i64       message id per row (DELETED for stale rows)
+        lists.i32     cluster per row
+        centroids.npy (nlist, dim) float32
+        offsets.npy   (nlist + 1) start row of each cluster in the sorted region
+        meta.json     counts, dimension, the highest indexed id and the last sync time
+
+    New rows are appended after the sorted region and scanned per cluster
+    until the next compact().
+    """
+
+    FILES = ("vectors.f32", "ids.i64", "lists.i32")
+
+    def __init__(self, folder=MESSAGE_INDEX_DIR, dim=MESSAGE_INDEX_DIM):
+        self.folder = folder
+        self.dim = dim
+        self.vectorizer = HashingVectorizer(n_features=dim, alternate_sign=True, norm="l2", dtype=np.float32)
+        self.centroids = None
+        self.offsets = None
+        self.count = 0        # Rows in the files, including deleted ones
+        self.compacted = 0    # Rows in the cluster-sorted region
+        self.deleted = 0
+        self.watermark = 0    # Highest message id indexed so far
+        self.updated_at = 0.0  # When the index was last synced with the database
+        self._vectors = self._ids = self._lists = None
+        self._lock = threading.RLock()
+
+    def _path(self, name):
+        return os.path.join(self.folder, name)
+
+    @property
+    def is_trained(self):
+        return self.centroids is not None
+
+    def load(self):
+        """Load the index from disk. Returns False if it is missing or stale."""
+        try:
+            with open(self._path("meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("version") != INDEX_VERSION or meta.get("dim") != self.dim:
+                return False
+            centroids = np.load(self._path("centroids.npy"))
+            offsets = np.load(self._path("offsets.npy"))
+        except (OSError, ValueError, KeyError):
+            return False
+        with self._lock:
+            self.centroids, self.offsets = centroids, offsets
+            self.count, self.compacted = meta["count"], meta["compacted"]
+            self.deleted, self.watermark = meta["deleted"], meta["watermark"]
+            self.updated_at = meta.get("updated_at", 0.0)
+            self._open()
+        return True
+
+    def _open(self):
+        """(Re)map the row files at the current count."""
+        self._vectors = self._ids = self._lists = None  # Release old mappings first (Windows)
+        if not self.count:
+            self._vectors = np.zeros((0, self.dim), dtype=np.float32)
+            self._ids = np.zeros(0, dtype=np.int64)
+            self._lists = np.zeros(0, dtype=np.int32)
+            return
+        self._vectors = np.memmap(self._path("vectors.f32"), dtype=np.float32, mode="r",
+                                  shape=(self.count, self.dim))
+        # Writable so stale rows can be marked DELETED in place
+        self._ids = np.memmap(self._path("ids.i64"), dtype=np.int64, mode="r+", shape=(self.count,))
+        self._lists = np.memmap(self._path("lists.i32"), dtype=np.int32, mode="r", shape=(self.count,))
+
+    def save(self):
+        """Write the metadata, centroids and cluster offsets (row files are written as they change)."""
+        with self._lock:
+            if self._ids is not None and isinstance(self._ids, np.memmap):
+                self._ids.flush()
+            os.makedirs(self.folder, exist_ok=True)
+            for name, array in (("centroids.npy", self.centroids), ("offsets.npy", self.offsets)):
+                with open(self._path(name + ".tmp"), "wb") as f:
+                    np.save(f, array)
+                os.replace(self._path(name + ".tmp"), self._path(name))
+            meta = {"version": INDEX_VERSION, "dim": self.dim, "count": self.count,
+                    "compacted": self.compacted, "deleted": self.deleted, "watermark": self.watermark,
+                    "updated_at": self.updated_at, "lists": len(self.centroids)}
+            with open(self._path("meta.json.tmp"), "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(self._path("meta.json.tmp"), self._path("meta.json"))
+
+    def reset(self, centroids):
+        """Drop every row and start over with the given cluster centroids."""
+        with self._lock:
+            self._vectors = self._ids = self._lists = None
+            os.makedirs(self.folder, exist_ok=True)
+            for name in self.FILES:
+                open(self._path(name), "wb").close()
+            self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+            self.offsets = np.zeros(len(self.centroids) + 1, dtype=np.int64)
+            self.count = self.compacted = self.deleted = self.watermark = 0
+            self._open()
+
+    def embed(self, texts):
+        """Embed texts as L2-normalised float32 vectors of shape (len(texts), dim)."""
+        return self.vectorizer.transform(texts).toarray()
+
+    def _assign(self, vectors):
+        """Nearest centroid (by cosine similarity) for each vector."""
+        lists = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), CHUNK_ROWS):
+            lists[start:start + CHUNK_ROWS] = np.argmax(vectors[start:start + CHUNK_ROWS] @ self.centroids.T, axis=1)
+        return lists
+
+    def train(self, vectors, nlist, iterations=KMEANS_ITERATIONS, seed=0):
+        """Spherical k-means over sample vectors; returns (nlist, dim) float32 centroids."""
+        rng = np.random.default_rng(seed)
+        nlist = max(1, min(nlist, len(vectors)))
+        centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmax(vectors @ centroids.T, axis=1)
+            # Sum the members of each cluster with a sparse one-hot product
+            membership = sparse.csr_matrix((np.ones(len(vectors), dtype=np.float32),
+                                            (assign, np.arange(len(vectors)))), shape=(nlist, len(vectors)))
+            sums = np.asarray(membership @ vectors)
+            empty = np.bincount(assign, minlength=nlist) == 0
+            if empty.any():
+                # Re-seed empty clusters with random samples
+                sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = sums / norms
+        return centroids.astype(np.float32)
+
+    def _mark_deleted(self, ids):
+        """Mark existing rows for these message ids as DELETED. Returns the number marked."""
+        if not self.count or not len(ids):
+            return 0
+        rows = np.nonzero(np.isin(self._ids, ids))[0]
+        rows = rows[self._ids[rows] != DELETED]
+        self._ids[rows] = DELETED
+        self.deleted += len(rows)
+        return len(rows)
+
+    def add(self, ids, texts):
+        """Insert or replace messages by id. Empty messages are not indexed.
+
+        Returns:
+            int: Number of rows written
+        """
+        with self._lock:
+            ids = np.asarray(ids, dtype=np.int64)
+            if not len(ids):
+                return 0
+            # Ids above the watermark cannot be in the index yet; skip the scan for them
+            if ids.min() <= self.watermark:
+                self._mark_deleted(ids)
+            self.watermark = max(self.watermark, int(ids.max()))
+            keep = np.array([bool(text and text.strip()) for text in texts])
+            if not keep.any():
+                return 0
+            ids = ids[keep]
+            vectors = self.embed([text for text, kept in zip(texts, keep) if kept])
+            lists = self._assign(vectors)
+            for name, array in zip(self.FILES, (vectors, ids, lists)):
+                with open(self._path(name), "ab") as f:
+                    f.write(np.ascontiguousarray(array).tobytes())
+            self.count += len(ids)
+            self._open()
+            return len(ids)
+
+    def delete(self, ids):
+        """Remove messages by id. Returns the number of rows removed."""
+        with self._lock:
+            return self._mark_deleted(np.asarray(ids, dtype=np.int64))
+
+    def needs_compaction(self):
+        return self.count and (self.count - self.compacted + self.deleted) > COMPACT_FRACTION * self.count
+
+    def compact(self):
+        """Rewrite the row files sorted by cluster, dropping deleted rows."""
+        with self._lock:
+            order = np.argsort(self._lists, kind="stable")
+            order = order[self._ids[order] != DELETED]
+            for name, source in zip(self.FILES, (self._vectors, self._ids, self._lists)):
+                with open(self._path(name + ".tmp"), "wb") as f:
+                    for start in range(0, len(order), CHUNK_ROWS):
+                        f.write(np.ascontiguousarray(source[order[start:start + CHUNK_ROWS]]).tobytes())
+            live_lists = np.asarray(self._lists[order])
+            self._vectors = self._ids = self._lists = None
+            for name in self.FILES:
+                os.replace(self._path(name + ".tmp"), self._path(name))
+            counts = np.bincount(live_lists, minlength=len(self.centroids))
+            self.offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+            self.count = self.compacted = len(order)
+            self.deleted = 0
+            self._open()
+            self.save()
+
+    def _top_k(self, rows, scores, k):
+        live = self._ids[rows] != DELETED
+        rows, scores = rows[live], scores[live]
+        if len(rows) > k:
+            best = np.argpartition(-scores, k)[:k]
+            rows, scores = rows[best], scores[best]
+        order = np.argsort(-scores)
+        return [(int(self._ids[row]), float(score)) for row, score in zip(rows[order], scores[order])]
+
+    def search(self, text, k=10, nprobe=MESSAGE_INDEX_NPROBE):
+        """Approximate nearest neighbours of text.
+
+        Returns:
+            list: (message id, cosine similarity) pairs, best first
+        """
+        with self._lock:
+            if not self.count:
+                return []
+            query = self.embed([text])[0]
+            if not query.any():
+                return []
+            probe = np.argsort(-(self.centroids @ query))[:nprobe]
+            row_parts, score_parts = [], []
+            # Sorted region: each probed cluster is one contiguous slice
+            for cluster in probe:
+                start, end = int(self.offsets[cluster]), int(self.offsets[cluster + 1])
+                if end > start:
+                    row_parts.append(np.arange(start, end))
+                    score_parts.append(self._vectors[start:end] @ query)
+            # Rows appended since the last compaction
+            if self.count > self.compacted:
+                tail = self.compacted + np.nonzero(np.isin(self._lists[self.compacted:], probe))[0]
+                row_parts.append(tail)
+                score_parts.append(self._vectors[tail] @ query)
+            if not row_parts:
+                return []
+            return self._top_k(np.concatenate(row_parts), np.concatenate(score_parts), k)
+
+    def search_exact(self, text, k=10):
+        """Brute-force nearest neighbours over every row (for measuring recall)."""
+        with self._lock:
+            if not self.count:
+                return []
+            query = self.embed([text])[0]
+            scores = np.empty(self.count, dtype=np.float32)
+            for start in range(0, self.count, CHUNK_ROWS * 10):
+                scores[start:start + CHUNK_ROWS * 10] = self._vectors[start:start + CHUNK_ROWS * 10] @ query
+            return self._top_k(np.arange(self.count), scores, k)
+
+    def stats(self):
+        with self._lock:
+            size = sum(os.path.getsize(self._path(name)) for name in self.FILES
+                       if os.path.exists(self._path(name)))
+            return {"rows": self.count - self.deleted, "deleted": self.deleted,
+                    "unsorted": self.count - self.compacted,
+                    "lists": len(self.centroids) if self.centroids is not None else 0,
+                    "dim": self.dim, "watermark": self.watermark, "bytes": size}
+
+
+def build_message_index(index=None, rebuild=False, batch_size=10000, progress=None):
+    """Stream telegram_messages from the database into the index.
+
+    The first build (or rebuild) trains the clusters on the first
+    TRAIN_SAMPLES_PER_LIST * nlist messages; later calls only add messages
+    with ids above the watermark. Use rebuild=True to retrain after large
+    changes, or to pick up edits to already indexed messages.
+
+    Args:
+        index (MessageIndex): Index to update (default: the shared index)
+        rebuild (bool): Discard the index and build it from scratch
+        batch_size (int): Rows fetched per round trip
+        progress (callable): Optional progress(done, total, label); returning False stops
+
+    Returns:
+        dict: Dictionary containing status, message and index stats
+    """
+    index = index or get_message_index()
+    with _build_lock:
+        total = count_telegram_messages(0 if rebuild or not index.is_trained else index.watermark)
+        batches = stream_telegram_messages(0 if rebuild or not index.is_trained else index.watermark, batch_size)
+        done = 0
+        if rebuild or not index.is_trained:
+            # Train on the first rows, then index them along with the rest
+            nlist = choose_list_count(total)
+            sample = []
+            for rows in batches:
+                sample.extend(rows)
+                if len(sample) >= nlist * TRAIN_SAMPLES_PER_LIST:
+                    break
+            texts = [text for _, text in sample if text and text.strip()]
+            if not texts:
+                return {"status": "error", "message": "No messages to index"}
+            index.reset(index.train(index.embed(texts[:nlist * TRAIN_SAMPLES_PER_LIST]), nlist))
+            index.add([row[0] for row in sample], [row[1] for row in sample])
+            done = len(sample)
+            if progress and not progress(done, total, f"Indexed {done}/{total} messages"):
+                index.save()
+                return {"status": "cancelled", "message": "Indexing stopped", "stats": index.stats()}
+        for rows in batches:
+            index.add([row[0] for row in rows], [row[1] for row in rows])
+            done += len(rows)
+            if progress and not progress(done, total, f"Indexed {done}/{total} messages"):
+                index.save()
+                return {"status": "cancelled", "message": "Indexing stopped", "stats": index.stats()}
+        # Saved with the watermark, so a restart does not force a sync before searching
+        index.updated_at = time.time()
+        if index.needs_compaction():
+            index.compact()
+        else:
+            index.save()
+        return {"status": "success", "message": f"Indexed {done} messages", "stats": index.stats()}
+
+
+_message_index = None
+_message_index_lock = threading.Lock()
+_build_lock = threading.Lock()
+_sync_job = None           # Latest background catch-up job
+_sync_requested_at = 0.0   # When it was submitted (retries of a failing sync wait as long)
+
+
+def get_message_index():
+    """Return the process-wide MessageIndex, loading it from disk on first use."""
+    global _message_index
+    with _message_index_lock:
+        if _message_index is None:
+            _message_index = MessageIndex()
+            _message_index.load()
+        return _message_index
+
+
+def schedule_index_sync(index=None):
+    """Add new messages to the index in a background job.
+
+    Does nothing while a sync is running or if the index was synced (or a
+    sync was requested) within MESSAGE_INDEX_REFRESH_SECONDS.
+
+    Returns:
+        Job: The submitted job, or None if no sync was needed
+    """
+    global _sync_job, _sync_requested_at
+    index = index or get_message_index()
+    with _message_index_lock:
+        if _sync_job is not None and not _sync_job.is_finished:
+            return None
+        now = time.time()
+        if now - max(index.updated_at, _sync_requested_at) <= MESSAGE_INDEX_REFRESH_SECONDS:
+            return None
+        _sync_requested_at = now
+        _sync_job = job_runner.submit("sync_message_index", build_message_index, index,
+                                      description="Add new Telegram messages to the similar-message index")
+        return _sync_job
+
+
+def find_similar_messages(text, limit=10):
+    """Find the Telegram messages most similar to text.
+
+    The search always uses the index as it is; messages added since the last
+    sync are indexed by a background job (at most every
+    MESSAGE_INDEX_REFRESH_SECONDS) and show up in later searches.
+
+    Args:
+        text (str): Example message or description to match
+        limit (int): Maximum number of messages to return
+
+    Returns:
+        dict: Dictionary containing status and either data (rows with a trailing
+              similarity score, best first) or message
+    """
+    try:
+        index = get_message_index()
+        if not index.is_trained:
+            return {"status": "error",
+                    "message": "The message index has not been built yet. "
+                               "Run: python -m utils.message_index_util build"}
+        schedule_index_sync(index)
+
+        hits = index.search(text, k=int(limit))
+        rows = {row[0]: row for row in fetch_telegram_messages_by_id([message_id for message_id, _ in hits])}
+        data = [tuple(rows[message_id]) + (round(score, 3),) for message_id, score in hits if message_id in rows]
+        if data:
+            return {"status": "success", "data": data}
+        return {"status": "success", "message": "No similar messages found."}
+
+    except Exception as e:
+        return {"status": "error", "message": f"Error searching messages: {str(e)}"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the similar-message index")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Index new messages (everything on the first run)")
+    build.add_argument("--rebuild", action="store_true", help="Retrain and re-index every message")
+    build.add_argument("--batch-size", type=int, default=10000)
+    search = commands.add_parser("search", help="Find messages similar to some text")
+    search.add_argument("text")
+    search.add_argument("-k", type=int, default=10)
+    commands.add_parser("stats", help="Show index statistics")
+    args = parser.parse_args()
+
+    index = get_message_index()
+    if args.command == "build":
+        def report(done, total, label):
+            print(f"\r{label}", end="", flush=True)
+            return True
+        result = build_message_index(index, rebuild=args.rebuild, batch_size=args.batch_size, progress=report)
+        print(f"\n{result['message']}: {result.get('stats')}")
+    elif args.command == "search":
+        start = time.perf_counter()
+        hits = index.search(args.text, k=args.k)
+        print(f"{len(hits)} results in {(time.perf_counter() - start) * 1000:.1f} ms")
+        for message_id, score in hits:
+            print(f"{score:.3f}  {message_id}")
+    else:
+        print(index.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+# Standard library imports
+import json        # For sizing dict results
+import time        # For latency measurement
+import bisect      # For histogram bucket lookup
+import asyncio     # For instrumenting coroutine functions
+import functools   # For wrapping instrumented callables
+import threading   # For the shared registry and the metrics endpoint
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # For the /metrics endpoint
+
+# Histogram bucket upper bounds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Estimate a quantile by linear interpolation inside the matching bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    """Thread-safe store of per-call latency/size histograms and error counters.
+
+    Calls are identified by a kind ("model", "tool", ...) and a name. Other
+    modules can register collectors that report gauges (cache hit rates,
+    queue depth) at scrape time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latency = {}   # (kind, name) -> Histogram of seconds
+        self._payload = {}   # (kind, name) -> Histogram of bytes
+        self._errors = {}    # (kind, name) -> error count
+        self._collectors = {}  # name -> callable returning {gauge_name: value}
+
+    def record(self, kind, name, seconds, payload_bytes=None, error=False):
+        key = (kind, name)
+        with self._lock:
+            self._latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            if payload_bytes is not None:
+                self._payload.setdefault(key, Histogram(SIZE_BUCKETS)).observe(payload_bytes)
+            self._errors[key] = self._errors.get(key, 0) + (1 if error else 0)
+
+    def register_collector(self, name, collector):
+        """Register a callable returning a dict of gauge values, labelled with `name`."""
+        with self._lock:
+            self._collectors[name] = collector
+
+    def collect_gauges(self):
+        """Return {collector name: {gauge: value}}, skipping collectors that fail."""
+        with self._lock:
+            collectors = dict(self._collectors)
+        gauges = {}
+        for name, collector in collectors.items():
+            try:
+                gauges[name] = {key: value for key, value in collector().items()
+                                if isinstance(value, (int, float))}
+            except Exception:
+                continue
+        return gauges
+
+    def summary(self):
+        """Per-call rows for display: calls, errors, latency quantiles and mean payload size."""
+        with self._lock:
+            rows = []
+            for (kind, name), histogram in sorted(self._latency.items()):
+                payload = self._payload.get((kind, name))
+                rows.append({
+                    "kind": kind,
+                    "name": name,
+                    "calls": histogram.count,
+                    "errors": self._errors.get((kind, name), 0),
+                    "p50_ms": round(histogram.quantile(0.5) * 1000, 1),
+                    "p95_ms": round(histogram.quantile(0.95) * 1000, 1),
+                    "mean_ms": round(histogram.sum / histogram.count * 1000, 1),
+                    "mean_payload_bytes": int(payload.sum / payload.count) if payload and payload.count else 0,
+                })
+            return rows
+
+    def render_prometheus(self):
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for metric, store, unit_help in (
+                ("assistant_call_duration_seconds", self._latency, "Latency of model and tool calls"),
+                ("assistant_call_payload_bytes", self._payload, "Size of model and tool results"),
+            ):
+                lines.append(f"# HELP {metric} {unit_help}")
+                lines.append(f"# TYPE {metric} histogram")
+                for (kind, name), histogram in sorted(store.items()):
+                    labels = f'kind="{_escape(kind)}",name="{_escape(name)}"'
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                    lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                    lines.append(f"{metric}_sum{{{labels}}} {histogram.sum}")
+                    lines.append(f"{metric}_count{{{labels}}} {histogram.count}")
+            lines.append("# HELP assistant_call_errors_total Failed model and tool calls")
+            lines.append("# TYPE assistant_call_errors_total counter")
+            for (kind, name), count in sorted(self._errors.items()):
+                lines.append(f'assistant_call_errors_total{{kind="{_escape(kind)}",name="{_escape(name)}"}} {count}')
+        for source, gauges in sorted(self.collect_gauges().items()):
+            for gauge, value in sorted(gauges.items()):
+                metric = f"assistant_{source}_{gauge}"
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def payload_size(result):
+    """Approximate size in bytes of a call result."""
+    if result is None:
+        return 0
+    if isinstance(result, bytes):
+        return len(result)
+    if isinstance(result, str):
+        return len(result.encode("utf-8"))
+    if isinstance(result, (dict, list, tuple)):
+        return len(json.dumps(result, default=str).encode("utf-8"))
+    return len(str(result).encode("utf-8"))
+
+
+def is_error_result(result):
+    """Recognise the error results the utils return instead of raising."""
+    if isinstance(result, dict):
+        return result.get("status") == "error"
+    if isinstance(result, str):
+        return result.startswith(("Error", "⚠️", "❌"))
+    return False
+
+
+# One registry shared by every session in the process
+metrics = MetricsRegistry()
+
+
+def instrument(kind, name, registry=None):
+    """Decorator recording latency, payload size and errors of each call.
+
+    Exceptions are counted as errors and re-raised; results recognised by
+    is_error_result() are counted as errors too. Coroutine functions get an
+    async wrapper that times the awaited call.
+    """
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                target = registry or metrics
+                start = time.perf_counter()
+                try:
+                    result = await fn(*args, **kwargs)
+                except Exception:
+                    target.record(kind, name, time.perf_counter() - start, error=True)
+                    raise
+                target.record(kind, name, time.perf_counter() - start,
+                              payload_size(result), is_error_result(result))
+                return result
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            target = registry or metrics
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception:
+                target.record(kind, name, time.perf_counter() - start, error=True)
+                raise
+            target.record(kind, name, time.perf_counter() - start,
+                          payload_size(result), is_error_result(result))
+            return result
+        return wrapper
+    return decorator
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass  # Scrapes should not flood the app log
+
+
+_metrics_server = None
+_metrics_server_lock = threading.Lock()
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """Serve /metrics on a background thread (once per process).
+
+    Returns:
+        str: The endpoint URL, or None if disabled or the port is unavailable
+    """
+    global _metrics_server
+    if not port:
+        return None
+    with _metrics_server_lock:
+        if _metrics_server is None:
+            try:
+                _metrics_server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+            except OSError:
+                return None
+            _metrics_server.daemon_threads = True
+            threading.Thread(target=_metrics_server.serve_forever, name="metrics-endpoint", daemon=True).start()
+        bound_host, bound_port = _metrics_server.server_address[:2]
+        return f"http://{bound_host}:{bound_port}/metrics"
@@ -0,0 +1,302 @@
+# Standard library imports
+import os          # For path and platform checks
+import json        # For the mpv JSON IPC protocol
+import time        # For connection retry timing
+import atexit      # For reaping the player when the app exits
+import shutil      # For locating the player executable
+import shlex       # For splitting a configured player command
+import socket      # For the mpv IPC socket on POSIX systems
+import tempfile    # For the IPC socket location
+import threading   # For serialising access to the shared player
+import subprocess  # For launching the player process
+from config import MEDIA_PLAYER, MPV_PATH, MEDIA_SYSTEM_PLAYER
+
+# Players the fallback launches directly, in order of preference. They keep running
+# with the file open, so the process the app starts is the one it can close later.
+SYSTEM_PLAYER_CANDIDATES = ("vlc", "ffplay", "mplayer", "celluloid", "totem")
+WINDOWS_PLAYER_PATHS = (r"%ProgramFiles%\VideoLAN\VLC\vlc.exe", r"%ProgramFiles(x86)%\VideoLAN\VLC\vlc.exe")
+
+
+class MpvPlayer:
+    """Long-lived mpv process controlled over its JSON IPC channel.
+
+    A single idle mpv instance is started on first use and every file is loaded
+    into it with a `loadfile` command, so skipping through a playlist never
+    spawns another process.
+    """
+
+    def __init__(self, executable=MPV_PATH, connect_timeout=5.0):
+        self.executable = executable
+        self.connect_timeout = connect_timeout
+        self.process = None
+        self._conn = None
+        self._reader = None
+        self._request_id = 0
+        # Windows uses a named pipe, everything else a Unix domain socket
+        name = f"gemini-assistant-mpv-{os.getpid()}"
+        if os.name == "nt":
+            self.ipc_path = rf"\\.\pipe\{name}"
+        else:
+            self.ipc_path = os.path.join(tempfile.gettempdir(), f"{name}.sock")
+
+    def is_alive(self):
+        """Return True if the player process is running."""
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        """Start mpv in idle mode and connect to its IPC channel."""
+        if self.is_alive():
+            return
+        self._close_connection()
+        if os.name != "nt" and os.path.exists(self.ipc_path):
+            os.remove(self.ipc_path)  # Stale socket from a crashed player
+        self.process = subprocess.Popen(
+            [self.executable, "--idle=yes", "--force-window=yes", "--no-terminal",
+             f"--input-ipc-server={self.ipc_path}"],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        self._connect()
+
+    def _connect(self):
+        """Wait for mpv to create its IPC endpoint and open it."""
+        deadline = time.monotonic() + self.connect_timeout
+        while True:
+            try:
+                if os.name == "nt":
+                    self._conn = open(self.ipc_path, "r+b", buffering=0)
+                    self._reader = self._conn
+                else:
+                    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                    sock.settimeout(self.connect_timeout)
+                    sock.connect(self.ipc_path)
+                    self._conn = sock
+                    self._reader = sock.makefile("rb")
+                return
+            except OSError:
+                if not self.is_alive() or time.monotonic() > deadline:
+                    self.stop()
+                    raise RuntimeError("Could not connect to the mpv IPC channel")
+                time.sleep(0.05)
+
+    def _close_connection(self):
+        """Close the IPC channel if it is open."""
+        for handle in (self._reader, self._conn):
+            try:
+                if handle is not None:
+                    handle.close()
+            except OSError:
+                pass
+        self._conn = None
+        self._reader = None
+
+    def command(self, *args):
+        """Send a command over IPC and return mpv's reply.
+
+        Args:
+            *args: Command name followed by its arguments, e.g. ("loadfile", path)
+
+        Returns:
+            dict: The decoded response matching this request
+
+        Raises:
+            RuntimeError: If mpv reports an error or the channel closes
+        """
+        self._request_id += 1
+        payload = json.dumps({"command": list(args), "request_id": self._request_id}) + "\n"
+        data = payload.encode("utf-8")
+        if os.name == "nt":
+            self._conn.write(data)
+        else:
+            self._conn.sendall(data)
+
+        # mpv interleaves asynchronous events with replies, so skip until ours arrives
+        while True:
+            line = self._reader.readline()
+            if not line:
+                raise RuntimeError("mpv closed the IPC channel")
+            message = json.loads(line)
+            if message.get("request_id") == self._request_id:
+                if message.get("error") != "success":
+                    raise RuntimeError(f"mpv error: {message.get('error')}")
+                return message
+
+    def play(self, file_path):
+        """Replace whatever is playing with file_path, starting mpv if needed."""
+        self.start()
+        self.command("loadfile", os.path.abspath(file_path), "replace")
+
+    def stop(self):
+        """Ask mpv to quit, then make sure the process is gone and reaped."""
+        if self.is_alive() and self._conn is not None:
+            try:
+                self.command("quit")
+            except (OSError, RuntimeError, ValueError):
+                pass
+        self._close_connection()
+        _reap(self.process)
+        self.process = None
+        if os.name != "nt" and os.path.exists(self.ipc_path):
+            os.remove(self.ipc_path)
+
+
+def find_system_player():
+    """Return the command (list) of a media player to launch directly, or None.
+
+    MEDIA_SYSTEM_PLAYER wins if set; otherwise the first known player found on
+    PATH (or VLC's default install folder on Windows) is used.
+    """
+    if MEDIA_SYSTEM_PLAYER:
+        return shlex.split(MEDIA_SYSTEM_PLAYER, posix=os.name != "nt")
+    for name in SYSTEM_PLAYER_CANDIDATES:
+        path = shutil.which(name)
+        if path:
+            return [path]
+    if os.name == "nt":
+        for path in WINDOWS_PLAYER_PATHS:
+            path = os.path.expandvars(path)
+            if os.path.isfile(path):
+                return [path]
+    return None
+
+
+class SystemPlayer:
+    """Fallback player for when mpv is not available.
+
+    With a player command (MEDIA_SYSTEM_PLAYER or a known player that was
+    found), each file is opened by launching that player directly. The
+    previous player is terminated and reaped before the next file is opened,
+    so only one runs at a time.
+
+    Without one, files are handed to the desktop opener (xdg-open, open or
+    start). The opener exits at once and the application it starts is not a
+    child of the app, so earlier files cannot be closed: `can_close` is False
+    and each file opens wherever that application puts it.
+    """
+
+    def __init__(self, command=None):
+        self.command = command if command is not None else find_system_player()
+        self.can_close = bool(self.command)
+        self.process = None
+
+    def is_alive(self):
+        """Return True if the last launched process is still running."""
+        return self.process is not None and self.process.poll() is None
+
+    def play(self, file_path):
+        """Open file_path in the player (or with the system's associated application)."""
+        self.stop()
+        if self.command:
+            command = list(self.command) + [file_path]
+        elif os.name == "nt":
+            command = ["cmd", "/c", "start", "", file_path]
+        elif shutil.which("xdg-open"):
+            command = ["xdg-open", file_path]
+        else:
+            command = ["open", file_path]
+        self.process = subprocess.Popen(
+            command,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def stop(self):
+        """Terminate and reap the last launched process (only the opener when can_close is False)."""
+        _reap(self.process)
+        self.process = None
+
+
+class FakePlayer:
+    """In-memory player for tests and headless runs; records every call."""
+
+    def __init__(self):
+        self.played = []   # File paths passed to play(), in order
+        self.started = 0   # Number of times the fake "process" was started
+        self.running = False
+
+    def is_alive(self):
+        return self.running
+
+    def play(self, file_path):
+        if not self.running:
+            self.running = True
+            self.started += 1
+        self.played.append(os.path.abspath(file_path))
+
+    def stop(self):
+        self.running = False
+
+
+def _reap(process, timeout=3.0):
+    """Terminate a child process if still running and wait for it to exit."""
+    if process is None:
+        return
+    try:
+        if process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        else:
+            process.wait()  # Collect the exit status so no zombie is left behind
+    except OSError:
+        pass
+
+
+# The player is shared by every session in the process
+_player = None
+_player_lock = threading.Lock()
+
+
+def create_player(kind=MEDIA_PLAYER):
+    """Create a player backend by name ("mpv", "system" or "fake").
+
+    Falls back to the system player when mpv is requested but not installed.
+    """
+    if kind == "fake":
+        return FakePlayer()
+    if kind == "mpv" and shutil.which(MPV_PATH):
+        return MpvPlayer()
+    return SystemPlayer()
+
+
+def get_player():
+    """Return the shared player, creating it on first use."""
+    global _player
+    with _player_lock:
+        if _player is None:
+            _player = create_player()
+        return _player
+
+
+def set_player(player):
+    """Replace the shared player (e.g. with a FakePlayer); the old one is stopped."""
+    global _player
+    with _player_lock:
+        if _player is not None:
+            _player.stop()
+        _player = player
+
+
+def play_media_file(file_path):
+    """Play a file on the shared player, serialising concurrent requests."""
+    player = get_player()
+    with _player_lock:
+        player.play(file_path)
+
+
+def shutdown_player():
+    """Stop the shared player and reap its process."""
+    global _player
+    with _player_lock:
+        if _player is not None:
+            _player.stop()
+            _player = None
+
+
+# Make sure no player process outlives the app
+atexit.register(shutdown_player)
@@ -0,0 +1,271 @@
+# Standard library imports
+import io          # For pstats text output
+import os          # For profile folders
+import re          # For folder-name slugs
+import sys         # For sampling the request thread's stack
+import time        # For timing and folder names
+import uuid        # For unique folder names
+import pstats      # For the function report
+import cProfile    # For deterministic function timings
+import threading   # For the stack sampler
+import tracemalloc  # For allocation tracking
+from collections import Counter  # For stack counts
+from contextlib import contextmanager   # For profile_request()
+from config import (PROFILE_DIR, PROFILE_SAMPLE_INTERVAL_MS, PROFILE_TOP_ENTRIES,
+                    PROFILE_HISTORY, PROFILE_REQUESTS)
+
+# Typing this before a prompt profiles just that request
+PROFILE_PREFIX = "/profile"
+
+# Files written per profiled request
+PSTATS_FILE = "profile.pstats"
+STACKS_FILE = "stacks.collapsed"
+REPORT_FILE = "report.txt"
+
+
+class _StackSampler(threading.Thread):
+    """Samples one thread's Python stack at a fixed interval.
+
+    cProfile only records caller/callee pairs, so full stacks for flame
+    graphs come from sampling. Stacks are counted in the collapsed format
+    ("outer;inner;leaf count") that flamegraph.pl, speedscope and similar
+    tools read.
+    """
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name="request-stack-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._done = threading.Event()
+
+    def run(self):
+        own_file = __file__
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                if code.co_filename != own_file:  # Leave out the profiler's own frames
+                    names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+class RequestProfile:
+    """cProfile timings, sampled stacks and allocations for one chat request.
+
+    tracemalloc is process-wide, so allocations made by other sessions while
+    the request runs are included in its allocation report.
+    """
+
+    def __init__(self, label, folder=None):
+        self.label = label
+        self.folder = folder or os.path.join(
+            PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{_slug(label)}-{uuid.uuid4().hex[:6]}")
+        self.started_at = time.time()
+        self.seconds = None
+        self.peak_bytes = None
+        self.samples = 0
+        self.error = None
+        self.files = {}
+        self._profiler = None
+        self._sampler = None
+        self._snapshot = None
+        self._allocations = []
+
+    def start(self):
+        """Start tracing, sampling and cProfile; a failure undoes whatever had started."""
+        _start_tracing()
+        try:
+            tracemalloc.reset_peak()
+            self._snapshot = tracemalloc.take_snapshot()
+            self._sampler = _StackSampler(threading.get_ident(), PROFILE_SAMPLE_INTERVAL_MS / 1000)
+            self._sampler.start()
+            self._profiler = cProfile.Profile()
+            try:
+                self._profiler.enable()
+            except ValueError:
+                self._profiler = None  # Another profiler is active in this thread
+            self._start = time.perf_counter()
+        except BaseException:
+            self._abort()
+            raise
+
+    def _abort(self):
+        """Undo a partial start(): stop the sampler thread and release tracemalloc."""
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler = None
+        if self._sampler is not None and self._sampler.is_alive():
+            self._sampler.stop()
+        self._sampler = None
+        self._snapshot = None
+        _stop_tracing()
+
+    def stop(self):
+        self.seconds = time.perf_counter() - self._start
+        if self._profiler is not None:
+            self._profiler.disable()
+        self._sampler.stop()
+        self.samples = sum(self._sampler.stacks.values())
+        self.peak_bytes = tracemalloc.get_traced_memory()[1]
+        snapshot = tracemalloc.take_snapshot()
+        _stop_tracing()
+        # Allocation sites that grew during the request, largest first
+        ignore = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))
+        self._allocations = snapshot.filter_traces(ignore).compare_to(
+            self._snapshot.filter_traces(ignore), "lineno")
+        self._snapshot = None
+
+    def save(self):
+        """Write the pstats file, collapsed stacks and text report. Returns the file paths."""
+        os.makedirs(self.folder, exist_ok=True)
+        files = {}
+        if self._profiler is not None:
+            files["pstats"] = os.path.join(self.folder, PSTATS_FILE)
+            self._profiler.dump_stats(files["pstats"])
+        files["stacks"] = os.path.join(self.folder, STACKS_FILE)
+        with open(files["stacks"], "w", encoding="utf-8") as f:
+            for stack, count in self._sampler.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        files["report"] = os.path.join(self.folder, REPORT_FILE)
+        with open(files["report"], "w", encoding="utf-8") as f:
+            f.write(self.report())
+        self.files = files
+        return files
+
+    def report(self):
+        """Text summary: slowest functions by cumulative time and top allocation sites."""
+        lines = [
+            f"Request: {self.label}",
+            f"Started: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started_at))}",
+            f"Wall time: {self.seconds * 1000:.1f} ms",
+            f"Stack samples: {self.samples} (every {PROFILE_SAMPLE_INTERVAL_MS:g} ms)",
+            f"Peak traced memory: {self.peak_bytes / 2 ** 20:.1f} MiB",
+        ]
+        if self.error:
+            lines.append(f"Error: {self.error}")
+        lines += ["", f"Top {PROFILE_TOP_ENTRIES} functions by cumulative time", "=" * 40]
+        if self._profiler is not None:
+            buffer = io.StringIO()
+            pstats.Stats(self._profiler, stream=buffer).sort_stats("cumulative").print_stats(PROFILE_TOP_ENTRIES)
+            lines.append(buffer.getvalue().strip())
+        else:
+            lines.append("(cProfile was unavailable: another profiler was active)")
+        lines += ["", f"Top {PROFILE_TOP_ENTRIES} allocation sites (growth during the request)", "=" * 40]
+        for stat in self._allocations[:PROFILE_TOP_ENTRIES]:
+            frame = stat.traceback[0]
+            lines.append(f"{stat.size_diff / 1024:>10.1f} KiB {stat.count_diff:>+8} blocks  "
+                         f"{frame.filename}:{frame.lineno}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """Dictionary shown in the diagnostics panel."""
+        return {
+            "label": self.label,
+            "started_at": self.started_at,
+            "seconds": self.seconds,
+            "peak_mb": self.peak_bytes / 2 ** 20 if self.peak_bytes is not None else None,
+            "folder": self.folder,
+            "files": self.files,
+            "error": self.error,
+        }
+
+
+# tracemalloc is process-wide: it runs while any request is being profiled
+_tracing_users = 0
+_tracing_lock = threading.Lock()
+_tracing_owned = False
+
+
+def _start_tracing():
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_owned = True  # Left on if someone else (e.g. a benchmark) started it
+        _tracing_users += 1
+
+
+def _stop_tracing():
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_owned:
+            tracemalloc.stop()
+            _tracing_owned = False
+
+
+def _slug(text):
+    return re.sub(r"[^A-Za-z0-9]+", "-", text[:40]).strip("-").lower() or "request"
+
+
+def recent_profiles(history):
+    """Summaries of a session's most recent profiled requests, newest first.
+
+    Args:
+        history (list): The session's profile summaries, as filled in by profile_request()
+    """
+    return list(reversed(history or []))
+
+
+def split_profile_prefix(prompt):
+    """Strip a leading "/profile" from a prompt.
+
+    Returns:
+        tuple: (prompt without the prefix, True if it was there)
+    """
+    stripped = prompt.lstrip()
+    if stripped.lower().startswith(PROFILE_PREFIX) and stripped[len(PROFILE_PREFIX):][:1] in ("", " "):
+        return stripped[len(PROFILE_PREFIX):].strip(), True
+    return prompt, False
+
+
+def profiling_enabled(requested=False):
+    """True if this request should be profiled (per-request flag or PROFILE_REQUESTS)."""
+    return bool(requested or PROFILE_REQUESTS)
+
+
+@contextmanager
+def profile_request(label, enabled=True, history=None):
+    """Profile the code inside the block and save the results.
+
+    Yields the RequestProfile (None when disabled); after the block its
+    summary() lists the saved files. Profiling failures never fail the
+    request.
+
+    Args:
+        label (str): Prompt or description of the request
+        enabled (bool): Profile only when True
+        history (list): The session's profile summaries; the newest is appended
+                        and the oldest dropped beyond PROFILE_HISTORY
+    """
+    if not enabled:
+        yield None
+        return
+    profile = RequestProfile(label)
+    try:
+        profile.start()
+    except Exception:
+        yield None  # Profiling is best effort; run the request unprofiled
+        return
+    try:
+        yield profile
+    except BaseException as e:
+        profile.error = repr(e)
+        raise
+    finally:
+        try:
+            profile.stop()
+            profile.save()
+            if history is not None:
+                history.append(profile.summary())
+                del history[:-PROFILE_HISTORY]
+        except Exception:
+            pass
@@ -0,0 +1,104 @@
+# Standard library imports
+import re          # For prompt normalisation
+import time        # For TTL expiry
+import hashlib     # For cache keys
+import threading   # For sharing the cache between sessions
+from collections import OrderedDict  # For LRU ordering
+from config import RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTL
+from utils.metrics_util import metrics  # Exposes hit-rate statistics
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt):
+    """Normalise a prompt so trivially different spellings share a cache entry."""
+    prompt = WHITESPACE_PATTERN.sub(" ", prompt.strip().lower())
+    return prompt.rstrip(" .!?")
+
+
+def make_cache_key(prompt, model_name, schema_version):
+    """Build a cache key from the normalised prompt, model name and tool-schema version."""
+    raw = "\x1f".join((model_name, schema_version, normalize_prompt(prompt)))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Thread-safe LRU cache of Gemini text answers with TTL expiry.
+
+    Bounded by entry count and total text size. Only plain-text answers should
+    be stored; answers that called a tool depend on live state and are skipped.
+    """
+
+    def __init__(self, max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+                 max_bytes=RESPONSE_CACHE_MAX_BYTES, ttl=RESPONSE_CACHE_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (text, size, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Return the cached text for key, or None on a miss or expired entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            text, size, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)  # Most recently used
+            self.hits += 1
+            return text
+
+    def put(self, key, text):
+        """Store a text answer, evicting least recently used entries to stay in bounds."""
+        size = len(text.encode("utf-8"))
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (text, size, time.monotonic() + self.ttl)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        """Drop every entry (statistics are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Return hit/miss counters, current size and hit rate."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# One cache shared by every session in the process
+response_cache = ResponseCache()
+metrics.register_collector("response_cache", response_cache.stats)
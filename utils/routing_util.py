@@ -0,0 +1,828 @@
+# Standard library imports
+import os          # For graph file paths
+import re          # For maxspeed tags and coordinate input
+import sys         # For the byte order of the array files
+import bz2         # For .osm.bz2 extracts
+import gzip        # For .osm.gz extracts
+import json        # For graph metadata
+import math        # For great-circle distances
+import time        # For build timing
+import heapq       # For Dijkstra and node ordering
+import bisect      # For grid-cell lookups
+import shutil      # For replacing a graph folder
+import difflib     # For fuzzy place-name matches
+import argparse    # For the command-line builder
+import threading   # For the shared graph
+import unicodedata  # For place-name normalisation
+import xml.etree.ElementTree as ET  # For OSM XML extracts
+from array import array  # Compact typed storage for the graph
+from config import ROUTING_GRAPH_DIR, ROUTING_MAX_SNAP_KM
+
+# PBF extracts need pyosmium; OSM XML (.osm, .osm.bz2, .osm.gz) works without it
+try:
+    import osmium
+except ImportError:
+    osmium = None
+
+# Bump when the on-disk layout changes so stale graphs are rebuilt
+GRAPH_VERSION = 1
+
+# Default car speeds (km/h) for roads without a maxspeed tag
+HIGHWAY_SPEEDS = {
+    "motorway": 100, "motorway_link": 60, "trunk": 80, "trunk_link": 50,
+    "primary": 65, "primary_link": 45, "secondary": 55, "secondary_link": 40,
+    "tertiary": 45, "tertiary_link": 35, "unclassified": 35, "residential": 30,
+    "living_street": 10, "service": 20, "road": 30, "track": 15,
+}
+NO_ACCESS = ("no", "private")
+ONEWAY_VALUES = ("yes", "true", "1")
+
+# Places that go into the gazetteer, and the tags whose values name them
+PLACE_KINDS = ("city", "town", "village", "hamlet", "suburb", "quarter", "neighbourhood", "locality")
+NAME_TAGS = ("name", "name:en", "int_name", "alt_name", "old_name", "official_name")
+
+# Nodes are stored in grid-cell order so nearest-node lookups scan a few cells
+CELL_DEGREES = 0.02
+LNG_CELLS = int(360 / CELL_DEGREES) + 1
+
+# Contraction hierarchy preprocessing: nodes settled per witness search
+WITNESS_SETTLE_LIMIT = 60
+
+EARTH_RADIUS_M = 6371000.0
+COORDINATE_PATTERN = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$")
+MAXSPEED_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(mph)?")
+
+# Graph files: (name, array typecode)
+NODE_FILES = (("lat.f64", "d"), ("lng.f64", "d"), ("cells.i64", "q"))
+EDGE_FILES = ("offsets.i64", "targets.i32", "seconds.f32", "meters.f32")
+EDGE_TYPES = ("q", "i", "f", "f")
+
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    """Great-circle distance in meters."""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(h)))
+
+
+def cell_of(lat, lng):
+    """Grid cell key of a coordinate."""
+    return int((lat + 90) / CELL_DEGREES) * LNG_CELLS + int((lng + 180) / CELL_DEGREES)
+
+
+def normalize_place(name):
+    """Lower-case a place name and strip accents and punctuation for lookups."""
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", name.lower()).split())
+
+
+# ---------------------------------------------------------------------------
+# Compressed sparse row adjacency
+# ---------------------------------------------------------------------------
+
+class Adjacency:
+    """Edges grouped by source node: edges of u are [offsets[u], offsets[u + 1])."""
+
+    __slots__ = ("offsets", "targets", "seconds", "meters")
+
+    def __init__(self, offsets, targets, seconds, meters):
+        self.offsets = offsets    # array("q"), node count + 1
+        self.targets = targets    # array("i")
+        self.seconds = seconds    # array("f"), travel time
+        self.meters = meters      # array("f"), length
+
+    @classmethod
+    def from_edges(cls, node_count, edges):
+        """Build from (source, target, seconds, meters) tuples."""
+        edges = sorted(edges, key=lambda edge: edge[0])
+        offsets = array("q", bytes(8 * (node_count + 1)))
+        for source, _, _, _ in edges:
+            offsets[source + 1] += 1
+        for u in range(node_count):
+            offsets[u + 1] += offsets[u]
+        return cls(offsets,
+                   array("i", (edge[1] for edge in edges)),
+                   array("f", (edge[2] for edge in edges)),
+                   array("f", (edge[3] for edge in edges)))
+
+    def __len__(self):
+        return len(self.targets)
+
+    def save(self, folder, prefix):
+        for name, values in zip(EDGE_FILES, (self.offsets, self.targets, self.seconds, self.meters)):
+            with open(os.path.join(folder, f"{prefix}_{name}"), "wb") as f:
+                values.tofile(f)
+
+    @classmethod
+    def load(cls, folder, prefix, swap=False):
+        return cls(*(_read_array(os.path.join(folder, f"{prefix}_{name}"), typecode, swap)
+                     for name, typecode in zip(EDGE_FILES, EDGE_TYPES)))
+
+
+def _read_array(path, typecode, swap=False):
+    values = array(typecode)
+    with open(path, "rb") as f:
+        values.fromfile(f, os.path.getsize(path) // values.itemsize)
+    if swap:
+        values.byteswap()  # Graph built on a machine with the other byte order
+    return values
+
+
+# ---------------------------------------------------------------------------
+# Graph building
+# ---------------------------------------------------------------------------
+
+def _largest_component(node_count, edges):
+    """Nodes of the largest weakly connected component (small islands cannot be routed to)."""
+    parent = list(range(node_count))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for u, v, _, _ in edges:
+        ru, rv = find(u), find(v)
+        if ru != rv:
+            parent[ru] = rv
+    sizes = {}
+    for node in range(node_count):
+        root = find(node)
+        sizes[root] = sizes.get(root, 0) + 1
+    if not sizes:
+        return set()
+    largest = max(sizes, key=sizes.get)
+    return {node for node in range(node_count) if find(node) == largest}
+
+
+def compress_chains(node_count, edges):
+    """Replace chains of degree-2 nodes with single edges.
+
+    Most OSM nodes only shape a road between two junctions. A node is
+    dropped when it joins exactly two neighbours and traffic passes straight
+    through it: both ways (edges to and from each neighbour) or one way (one
+    edge in, one edge out). Each chain becomes one edge carrying the summed
+    seconds and meters, keeping the fastest where two chains join the same
+    junctions. Dropped nodes are left without edges, so write_road_graph()
+    leaves them out; places then snap to the nearest remaining junction.
+
+    Args:
+        node_count (int): Number of nodes
+        edges (list): Directed (source, target, seconds, meters) edges
+
+    Returns:
+        list: The compressed edges, over the same node indexes
+    """
+    outgoing = [[] for _ in range(node_count)]
+    incoming = [[] for _ in range(node_count)]
+    for u, v, seconds, meters in edges:
+        if u != v:
+            outgoing[u].append((v, seconds, meters))
+            incoming[v].append(u)
+
+    def passes_through(v):
+        targets, sources = [edge[0] for edge in outgoing[v]], incoming[v]
+        if len(set(targets) | set(sources)) != 2:
+            return False
+        if len(targets) == 2 and len(sources) == 2:
+            return set(targets) == set(sources)  # Two-way road, no parallel edges
+        return len(targets) == 1 and len(sources) == 1  # One-way road
+
+    through = [passes_through(v) for v in range(node_count)]
+    best = {}
+    for u in range(node_count):
+        if through[u]:
+            continue
+        for v, seconds, meters in outgoing[u]:
+            previous = u
+            while through[v]:
+                # Continue away from the node we came from
+                w, step_seconds, step_meters = next(edge for edge in outgoing[v] if edge[0] != previous)
+                seconds, meters = seconds + step_seconds, meters + step_meters
+                previous, v = v, w
+            if v != u and ((u, v) not in best or seconds < best[(u, v)][0]):
+                best[(u, v)] = (seconds, meters)
+    return [(u, v, seconds, meters) for (u, v), (seconds, meters) in best.items()]
+
+
+def contract_graph(node_count, forward, progress=None):
+    """Contraction hierarchy preprocessing.
+
+    Nodes are contracted in order of edge difference (shortcuts added minus
+    edges removed) plus contracted neighbours, with lazy priority updates.
+    A shortcut u -> w replaces u -> v -> w unless a bounded witness search
+    finds a path that is no slower. The edges a node has when it is
+    contracted all lead to higher-ranked nodes, so they are exactly the
+    upward graphs the query searches.
+
+    Args:
+        node_count (int): Number of nodes
+        forward (Adjacency): Road graph
+        progress (callable): Optional progress(done, total, label)
+
+    Returns:
+        tuple: (upward Adjacency, downward Adjacency, rank array); downward
+               edges are stored at their head, pointing to their tail
+    """
+    out = [dict() for _ in range(node_count)]  # u -> {w: (seconds, meters)}
+    inn = [dict() for _ in range(node_count)]  # w -> {u: (seconds, meters)}
+    for u in range(node_count):
+        for e in range(forward.offsets[u], forward.offsets[u + 1]):
+            w, cost = forward.targets[e], (forward.seconds[e], forward.meters[e])
+            if w != u and (w not in out[u] or cost[0] < out[u][w][0]):
+                out[u][w] = inn[w][u] = cost
+
+    contracted_neighbours = [0] * node_count
+
+    def witness_distances(source, skip, limit):
+        """Travel times from source avoiding skip, up to limit seconds."""
+        distances, heap, settled = {source: 0.0}, [(0.0, source)], 0
+        while heap and settled < WITNESS_SETTLE_LIMIT:
+            d, u = heapq.heappop(heap)
+            if d > distances[u]:
+                continue  # Stale heap entry
+            if d > limit:
+                break
+            settled += 1
+            for w, (seconds, _) in out[u].items():
+                if w == skip:
+                    continue
+                nd = d + seconds
+                if nd < distances.get(w, math.inf):
+                    distances[w] = nd
+                    heapq.heappush(heap, (nd, w))
+        return distances
+
+    def shortcuts(v):
+        needed = []
+        if not out[v]:
+            return needed
+        longest_out = max(seconds for seconds, _ in out[v].values())
+        for u, (seconds_in, meters_in) in inn[v].items():
+            distances = witness_distances(u, v, seconds_in + longest_out)
+            for w, (seconds_out, meters_out) in out[v].items():
+                if w != u and distances.get(w, math.inf) > seconds_in + seconds_out:
+                    needed.append((u, w, seconds_in + seconds_out, meters_in + meters_out))
+        return needed
+
+    def priority(v):
+        needed = shortcuts(v)
+        return len(needed) - len(out[v]) - len(inn[v]) + contracted_neighbours[v], needed
+
+    heap = [(priority(v)[0], v) for v in range(node_count)]
+    heapq.heapify(heap)
+    rank = array("i", bytes(4 * node_count))
+    upward, downward = [], []
+    done = 0
+    while heap:
+        _, v = heapq.heappop(heap)
+        if rank[v]:
+            continue  # Already contracted (stale heap entry)
+        value, needed = priority(v)
+        if heap and value > heap[0][0]:
+            heapq.heappush(heap, (value, v))  # Priority went up since it was queued
+            continue
+
+        for u, w, seconds, meters in needed:
+            if w not in out[u] or seconds < out[u][w][0]:
+                out[u][w] = inn[w][u] = (seconds, meters)
+        upward.extend((v, w, seconds, meters) for w, (seconds, meters) in out[v].items())
+        downward.extend((v, u, seconds, meters) for u, (seconds, meters) in inn[v].items())
+        for u in inn[v]:
+            del out[u][v]
+            contracted_neighbours[u] += 1
+        for w in out[v]:
+            del inn[w][v]
+            contracted_neighbours[w] += 1
+        out[v] = inn[v] = None
+        done += 1
+        rank[v] = done
+        if progress and done % 1000 == 0:
+            progress(done, node_count, f"Contracted {done:,} of {node_count:,} nodes")
+    return Adjacency.from_edges(node_count, upward), Adjacency.from_edges(node_count, downward), rank
+
+
+def write_road_graph(folder, coordinates, edges, places=(), contract=False, progress=None):
+    """Write a routable graph folder from nodes, directed edges and named places.
+
+    Only the largest connected part of the network is kept. Nodes are
+    renumbered in grid-cell order, which keeps nearby nodes close together in
+    the arrays and lets nearest-node lookups bisect the sorted cell keys.
+
+    Files in `folder`:
+        lat.f64, lng.f64, cells.i64   per-node coordinates and grid cell
+        fwd_*, bwd_*                  outgoing and incoming edges (CSR:
+                                      offsets.i64, targets.i32, seconds.f32, meters.f32)
+        up_*, down_*, rank.i32        contraction hierarchy (only with contract=True)
+        gazetteer.tsv                 name, lat, lng, population, kind per place
+        meta.json                     counts, byte order and build information
+
+    Args:
+        folder (str): Output folder (replaced if it exists)
+        coordinates (list): (lat, lng) per node
+        edges (iterable): Directed (source, target, seconds, meters) edges between node indexes
+        places (iterable): (name, lat, lng, population, kind) gazetteer entries
+        contract (bool): Also build a contraction hierarchy for faster queries
+        progress (callable): Optional progress(done, total, label)
+
+    Returns:
+        dict: The graph metadata
+    """
+    start = time.perf_counter()
+    edges = list(edges)
+    keep = _largest_component(len(coordinates), edges)
+    order = sorted(keep, key=lambda node: (cell_of(*coordinates[node]), coordinates[node]))
+    index = {old: new for new, old in enumerate(order)}
+    edges = [(index[u], index[v], seconds, meters) for u, v, seconds, meters in edges if u in index and v in index]
+    node_count = len(order)
+
+    temp = folder.rstrip(os.sep) + ".part"
+    shutil.rmtree(temp, ignore_errors=True)
+    os.makedirs(temp)
+    for (name, typecode), values in zip(NODE_FILES, (
+            (coordinates[node][0] for node in order),
+            (coordinates[node][1] for node in order),
+            (cell_of(*coordinates[node]) for node in order))):
+        with open(os.path.join(temp, name), "wb") as f:
+            array(typecode, values).tofile(f)
+    forward = Adjacency.from_edges(node_count, edges)
+    forward.save(temp, "fwd")
+    Adjacency.from_edges(node_count, ((v, u, seconds, meters) for u, v, seconds, meters in edges)).save(temp, "bwd")
+
+    if contract:
+        upward, downward, rank = contract_graph(node_count, forward, progress)
+        upward.save(temp, "up")
+        downward.save(temp, "down")
+        with open(os.path.join(temp, "rank.i32"), "wb") as f:
+            rank.tofile(f)
+
+    place_count = 0
+    with open(os.path.join(temp, "gazetteer.tsv"), "w", encoding="utf-8") as f:
+        for name, lat, lng, population, kind in places:
+            name = " ".join(name.split())  # No tabs or newlines in the TSV
+            if name:
+                f.write(f"{name}\t{lat:.7f}\t{lng:.7f}\t{int(population or 0)}\t{kind}\n")
+                place_count += 1
+
+    meta = {
+        "version": GRAPH_VERSION,
+        "byteorder": sys.byteorder,
+        "nodes": node_count,
+        "edges": len(edges),
+        "places": place_count,
+        "contracted": bool(contract),
+        "shortcut_edges": len(upward) + len(downward) if contract else 0,
+        "max_speed_kmh": max((meters / seconds * 3.6 for _, _, seconds, meters in edges if seconds > 0), default=1.0),
+        "build_seconds": round(time.perf_counter() - start, 1),
+    }
+    with open(os.path.join(temp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    shutil.rmtree(folder, ignore_errors=True)
+    os.replace(temp, folder)
+    return meta
+
+
+# ---------------------------------------------------------------------------
+# OpenStreetMap import
+# ---------------------------------------------------------------------------
+
+def _way_speed(tags):
+    """Car speed in km/h for a way, or None if cars cannot use it."""
+    highway = tags.get("highway")
+    if highway not in HIGHWAY_SPEEDS or tags.get("area") == "yes":
+        return None
+    if any(tags.get(key) in NO_ACCESS for key in ("access", "motor_vehicle", "motorcar")):
+        return None
+    match = MAXSPEED_PATTERN.match(tags.get("maxspeed", ""))
+    if match:
+        speed = float(match.group(1)) * (1.609 if match.group(2) else 1.0)
+        if speed > 0:
+            return speed
+    return HIGHWAY_SPEEDS[highway]
+
+
+def _way_directions(tags):
+    """(forward, backward) travel allowed along the way's node order."""
+    oneway = tags.get("oneway", "")
+    if oneway == "-1":
+        return False, True
+    if oneway in ONEWAY_VALUES:
+        return True, False
+    # Roundabouts and motorways are one-way unless tagged otherwise
+    if oneway != "no" and (tags.get("junction") == "roundabout" or tags.get("highway") == "motorway"):
+        return True, False
+    return True, True
+
+
+def _place(tags, lat, lng):
+    """Gazetteer entries for a place node: one per name variant."""
+    if tags.get("place") not in PLACE_KINDS:
+        return []
+    try:
+        population = int(re.sub(r"\D", "", tags.get("population", "")) or 0)
+    except ValueError:
+        population = 0
+    names = []
+    for key in NAME_TAGS:
+        for name in tags.get(key, "").split(";"):
+            if name.strip() and name.strip() not in names:
+                names.append(name.strip())
+    return [(name, lat, lng, population, tags["place"]) for name in names]
+
+
+def _open_osm(path):
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def _iter_osm_xml(path):
+    """Yield the top-level elements (nodes, ways, relations) of an OSM XML extract.
+
+    Each element is dropped from the document root once the caller is done
+    with it. Clearing only the element would leave an empty element per
+    node and way attached to the root, which grows with the file.
+    """
+    with _open_osm(path) as f:
+        events = ET.iterparse(f, events=("start", "end"))
+        _, root = next(events)
+        for event, element in events:
+            if event == "end" and element.tag in ("node", "way", "relation"):
+                yield element
+                root.clear()  # Keep memory flat on large extracts
+
+
+def _read_osm_xml(path):
+    """Routable ways, their node coordinates and places from an OSM XML extract (two passes)."""
+    ways, places, needed = [], [], set()
+    for element in _iter_osm_xml(path):
+        if element.tag == "way":
+            tags = {tag.get("k"): tag.get("v") for tag in element.iter("tag")}
+            speed = _way_speed(tags)
+            if speed:
+                refs = [int(nd.get("ref")) for nd in element.iter("nd")]
+                ways.append((refs, speed, _way_directions(tags)))
+                needed.update(refs)
+        elif element.tag == "node":
+            tags = {tag.get("k"): tag.get("v") for tag in element.iter("tag")}
+            if "place" in tags:
+                places.extend(_place(tags, float(element.get("lat")), float(element.get("lon"))))
+
+    locations = {}
+    for element in _iter_osm_xml(path):
+        if element.tag == "node":
+            node_id = int(element.get("id"))
+            if node_id in needed:
+                locations[node_id] = (float(element.get("lat")), float(element.get("lon")))
+    return ways, locations, places
+
+
+def _read_osm_pbf(path):
+    """Same as _read_osm_xml for .osm.pbf extracts, using pyosmium."""
+    if osmium is None:
+        raise RuntimeError("Reading .pbf extracts needs pyosmium (pip install osmium), or use an .osm/.osm.bz2 file")
+    ways, locations, places = [], {}, []
+
+    class Handler(osmium.SimpleHandler):
+        def node(self, node):
+            if "place" in node.tags and node.location.valid():
+                places.extend(_place({tag.k: tag.v for tag in node.tags}, node.location.lat, node.location.lon))
+
+        def way(self, way):
+            tags = {tag.k: tag.v for tag in way.tags}
+            speed = _way_speed(tags)
+            if speed:
+                refs = []
+                for nd in way.nodes:
+                    if nd.location.valid():
+                        refs.append(nd.ref)
+                        locations[nd.ref] = (nd.location.lat, nd.location.lon)
+                ways.append((refs, speed, _way_directions(tags)))
+
+    Handler().apply_file(path, locations=True)
+    return ways, locations, places
+
+
+def build_road_graph(osm_path, folder=ROUTING_GRAPH_DIR, contract=False, progress=None):
+    """Build the local routing graph and gazetteer from an OpenStreetMap extract.
+
+    Args:
+        osm_path (str): .osm, .osm.bz2, .osm.gz or .osm.pbf file (e.g. from download.geofabrik.de)
+        folder (str): Graph folder (default: ROUTING_GRAPH_DIR)
+        contract (bool): Build a contraction hierarchy (slower build, faster queries)
+        progress (callable): Optional progress(done, total, label)
+
+    Returns:
+        dict: Dictionary containing status, message and, on success, the graph metadata
+    """
+    try:
+        reader = _read_osm_pbf if osm_path.endswith(".pbf") else _read_osm_xml
+        ways, locations, places = reader(osm_path)
+        nodes, coordinates, edges = {}, [], []
+        for refs, speed, (forward, backward) in ways:
+            refs = [ref for ref in refs if ref in locations]
+            for a, b in zip(refs, refs[1:]):
+                for ref in (a, b):
+                    if ref not in nodes:
+                        nodes[ref] = len(coordinates)
+                        coordinates.append(locations[ref])
+                meters = haversine_m(*locations[a], *locations[b])
+                seconds = meters / (speed / 3.6)
+                if forward:
+                    edges.append((nodes[a], nodes[b], seconds, meters))
+                if backward:
+                    edges.append((nodes[b], nodes[a], seconds, meters))
+        if not edges:
+            return {"status": "error", "message": f"No drivable roads found in {osm_path}"}
+        # Shape points between junctions only slow the searches down
+        edges = compress_chains(len(coordinates), edges)
+        meta = write_road_graph(folder, coordinates, edges, places, contract=contract, progress=progress)
+        return {"status": "success", "message": f"Built road graph with {meta['nodes']:,} nodes, "
+                                                f"{meta['edges']:,} edges and {meta['places']:,} places",
+                "meta": meta}
+
+    except Exception as e:
+        return {"status": "error", "message": f"Error building road graph: {str(e)}"}
+
+
+# ---------------------------------------------------------------------------
+# Queries
+# ---------------------------------------------------------------------------
+
+class RoadGraph:
+    """Read-only road graph loaded from a folder written by write_road_graph().
+
+    route() answers with a contraction hierarchy query when the graph was
+    contracted and with bidirectional Dijkstra otherwise; A* and plain
+    Dijkstra are available for comparison.
+    """
+
+    METHODS = ("ch", "bidirectional", "astar", "dijkstra")
+
+    def __init__(self, folder=ROUTING_GRAPH_DIR):
+        self.folder = folder
+        with open(os.path.join(folder, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != GRAPH_VERSION:
+            raise ValueError("The road graph was built by an older version; rebuild it")
+        swap = self.meta["byteorder"] != sys.byteorder
+        self.lat, self.lng, self.cells = (_read_array(os.path.join(folder, name), typecode, swap)
+                                          for name, typecode in NODE_FILES)
+        self.forward = Adjacency.load(folder, "fwd", swap)
+        self.backward = Adjacency.load(folder, "bwd", swap)
+        self.upward = self.downward = None
+        if self.meta["contracted"]:
+            self.upward = Adjacency.load(folder, "up", swap)
+            self.downward = Adjacency.load(folder, "down", swap)
+        # Admissible A* bound: straight-line distance at the top speed in the graph
+        self.max_speed_mps = self.meta["max_speed_kmh"] / 3.6
+
+    def __len__(self):
+        return len(self.lat)
+
+    def nearest_node(self, lat, lng, max_km=ROUTING_MAX_SNAP_KM):
+        """Closest node to a coordinate within max_km, as (node, meters), or (None, None)."""
+        row, column = int((lat + 90) / CELL_DEGREES), int((lng + 180) / CELL_DEGREES)
+        # A cell is at least this many meters wide at this latitude
+        cell_m = CELL_DEGREES * 111320 * max(math.cos(math.radians(min(abs(lat) + CELL_DEGREES, 89.9))), 0.01)
+        best, best_m = None, max_km * 1000
+        for ring in range(int(best_m / cell_m) + 2):
+            if best is not None and (ring - 1) * cell_m > best_m:
+                break  # Nothing in further rings can be closer
+            for r in range(row - ring, row + ring + 1):
+                for c in range(column - ring, column + ring + 1):
+                    if max(abs(r - row), abs(c - column)) != ring:
+                        continue  # Inner cells were scanned in earlier rings
+                    key = r * LNG_CELLS + c
+                    for node in range(bisect.bisect_left(self.cells, key), bisect.bisect_right(self.cells, key)):
+                        meters = haversine_m(lat, lng, self.lat[node], self.lng[node])
+                        if meters < best_m:
+                            best, best_m = node, meters
+        return (best, best_m) if best is not None else (None, None)
+
+    def route(self, source, target, method=None):
+        """Fastest route between two nodes.
+
+        Args:
+            source (int): Start node
+            target (int): End node
+            method (str): "ch", "bidirectional", "astar" or "dijkstra" (default:
+                          "ch" for contracted graphs, else "bidirectional")
+
+        Returns:
+            tuple: (seconds, meters) of the fastest route, or None if there is none
+        """
+        method = method or ("ch" if self.upward is not None else "bidirectional")
+        if source == target:
+            return 0.0, 0.0
+        if method == "ch":
+            if self.upward is None:
+                raise ValueError("The road graph has no contraction hierarchy; build it with --contract")
+            return self._bidirectional(source, target, self.upward, self.downward, upward_only=True)
+        if method == "bidirectional":
+            return self._bidirectional(source, target, self.forward, self.backward)
+        if method in ("astar", "dijkstra"):
+            return self._astar(source, target, use_heuristic=method == "astar")
+        raise ValueError(f"Unknown routing method '{method}' (use one of {', '.join(self.METHODS)})")
+
+    def _bidirectional(self, source, target, forward, backward, upward_only=False):
+        """Dijkstra from both ends, meeting in the middle.
+
+        With the road graph's forward/backward edges this is bidirectional
+        Dijkstra, which stops once the two frontier keys add up to the best
+        meeting cost. With the upward/downward graphs of a contraction
+        hierarchy (upward_only=True) it is the CH query: each side only climbs
+        to higher-ranked nodes and runs until its own frontier passes the
+        best meeting cost.
+        """
+        forward_side = ({source: 0.0}, {source: 0.0}, [(0.0, source)], forward)
+        backward_side = ({target: 0.0}, {target: 0.0}, [(0.0, target)], backward)
+        best, best_m = math.inf, None
+        while True:
+            # Sides whose frontier can still lead to a better meeting point
+            open_sides = [side for side in (forward_side, backward_side) if side[2] and side[2][0][0] < best]
+            if not open_sides:
+                break
+            if not upward_only and len(open_sides) == 2 and forward_side[2][0][0] + backward_side[2][0][0] >= best:
+                break
+            side = min(open_sides, key=lambda s: s[2][0][0])
+            seconds, meters, heap, graph = side
+            other_seconds, other_meters = (backward_side if side is forward_side else forward_side)[:2]
+            d, u = heapq.heappop(heap)
+            if d > seconds[u]:
+                continue  # Stale heap entry
+            if u in other_seconds and d + other_seconds[u] < best:
+                best, best_m = d + other_seconds[u], meters[u] + other_meters[u]
+            offsets, targets, edge_seconds, edge_meters = graph.offsets, graph.targets, graph.seconds, graph.meters
+            for e in range(offsets[u], offsets[u + 1]):
+                w, nd = targets[e], d + edge_seconds[e]
+                if nd < seconds.get(w, math.inf):
+                    seconds[w] = nd
+                    meters[w] = meters[u] + edge_meters[e]
+                    heapq.heappush(heap, (nd, w))
+                    if w in other_seconds and nd + other_seconds[w] < best:
+                        best, best_m = nd + other_seconds[w], meters[w] + other_meters[w]
+        return (best, best_m) if best_m is not None else None
+
+    def _astar(self, source, target, use_heuristic=True):
+        """One-directional A* towards target (plain Dijkstra without the heuristic)."""
+        lat, lng, speed = self.lat, self.lng, self.max_speed_mps
+        target_lat, target_lng = lat[target], lng[target]
+
+        def estimate(node):
+            return haversine_m(lat[node], lng[node], target_lat, target_lng) / speed if use_heuristic else 0.0
+
+        seconds, meters = {source: 0.0}, {source: 0.0}
+        heap = [(estimate(source), 0.0, source)]
+        graph = self.forward
+        while heap:
+            _, d, u = heapq.heappop(heap)
+            if d > seconds[u]:
+                continue
+            if u == target:
+                return d, meters[u]
+            for e in range(graph.offsets[u], graph.offsets[u + 1]):
+                w, nd = graph.targets[e], d + graph.seconds[e]
+                if nd < seconds.get(w, math.inf):
+                    seconds[w] = nd
+                    meters[w] = meters[u] + graph.meters[e]
+                    heapq.heappush(heap, (nd + estimate(w), nd, w))
+        return None
+
+    def stats(self):
+        return dict(self.meta, loaded_nodes=len(self))
+
+
+class Gazetteer:
+    """Offline place-name lookup from the gazetteer.tsv written with the graph.
+
+    Names are matched after normalisation (case, accents, punctuation); when
+    several places share a name the most populous wins. Misspellings fall
+    back to the closest name by difflib ratio. "lat, lng" input is taken as
+    a coordinate.
+    """
+
+    def __init__(self, path):
+        self.places = {}  # normalised name -> (lat, lng, population, name)
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                name, lat, lng, population, _ = line.rstrip("\n").split("\t")
+                key = normalize_place(name)
+                entry = (float(lat), float(lng), int(population), name)
+                if key and (key not in self.places or entry[2] > self.places[key][2]):
+                    self.places[key] = entry
+        self._names = list(self.places)
+
+    def __len__(self):
+        return len(self.places)
+
+    def lookup(self, text):
+        """Coordinates of a place as (lat, lng, matched name), or None."""
+        match = COORDINATE_PATTERN.match(text)
+        if match:
+            lat, lng = float(match.group(1)), float(match.group(2))
+            if -90 <= lat <= 90 and -180 <= lng <= 180:
+                return lat, lng, text.strip()
+        key = normalize_place(text)
+        entry = self.places.get(key)
+        if entry is None:
+            close = difflib.get_close_matches(key, self._names, n=1, cutoff=0.85)
+            entry = self.places[close[0]] if close else None
+        return (entry[0], entry[1], entry[3]) if entry else None
+
+
+# The graph and gazetteer are shared by every session in the process
+_road_graph = None
+_gazetteer = None
+_road_graph_lock = threading.Lock()
+
+
+def has_road_graph(folder=None):
+    """True if a local road graph has been built (default folder: ROUTING_GRAPH_DIR)."""
+    return os.path.exists(os.path.join(folder or ROUTING_GRAPH_DIR, "meta.json"))
+
+
+def get_road_graph():
+    """Return the shared (RoadGraph, Gazetteer), loading them on first use."""
+    global _road_graph, _gazetteer
+    with _road_graph_lock:
+        if _road_graph is None:
+            _road_graph = RoadGraph(ROUTING_GRAPH_DIR)
+            _gazetteer = Gazetteer(os.path.join(ROUTING_GRAPH_DIR, "gazetteer.tsv"))
+        return _road_graph, _gazetteer
+
+
+def local_route(origin, destination, method=None):
+    """Driving distance and duration between two places from the local road graph.
+
+    Args:
+        origin (str): Starting place name (or "lat, lng")
+        destination (str): Destination place name (or "lat, lng")
+        method (str): Routing method (see RoadGraph.route)
+
+    Returns:
+        dict: Dictionary containing status, message and, on success,
+              distance_km and duration_min
+    """
+    try:
+        graph, gazetteer = get_road_graph()
+        nodes = []
+        for place in (origin, destination):
+            found = gazetteer.lookup(place)
+            if found is None:
+                return {"status": "error", "message": f"Location '{place}' not found in the local gazetteer."}
+            node, _ = graph.nearest_node(found[0], found[1])
+            if node is None:
+                return {"status": "error",
+                        "message": f"No road within {ROUTING_MAX_SNAP_KM:g} km of '{place}'."}
+            nodes.append(node)
+        result = graph.route(nodes[0], nodes[1], method)
+        if result is None:
+            return {"status": "error", "message": f"No driving route from {origin} to {destination}."}
+        seconds, meters = result
+        return {"status": "success", "message": "Route found",
+                "distance_km": meters / 1000, "duration_min": seconds / 60}
+
+    except Exception as e:
+        return {"status": "error", "message": f"Error routing offline: {str(e)}"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the offline road graph")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Build the graph and gazetteer from an OSM extract")
+    build.add_argument("osm_path", help=".osm, .osm.bz2, .osm.gz or .osm.pbf extract")
+    build.add_argument("--contract", action="store_true", help="Add a contraction hierarchy (faster queries)")
+    build.add_argument("--output", default=ROUTING_GRAPH_DIR, help="Graph folder")
+    route = commands.add_parser("route", help="Driving distance between two places")
+    route.add_argument("origin")
+    route.add_argument("destination")
+    route.add_argument("--method", choices=RoadGraph.METHODS)
+    commands.add_parser("stats", help="Show graph statistics")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        def report(done, total, label):
+            print(f"\r{label}", end="", flush=True)
+            return True
+        result = build_road_graph(args.osm_path, args.output, contract=args.contract, progress=report)
+        print(f"\n{result['message']}")
+        if result["status"] != "success":
+            sys.exit(1)
+    elif args.command == "route":
+        start = time.perf_counter()
+        result = local_route(args.origin, args.destination, args.method)
+        elapsed = (time.perf_counter() - start) * 1000
+        if result["status"] != "success":
+            print(result["message"])
+            sys.exit(1)
+        print(f"{result['distance_km']:.1f} km, {result['duration_min']:.1f} min ({elapsed:.1f} ms)")
+    else:
+        print(json.dumps(get_road_graph()[0].stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
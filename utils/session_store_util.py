@@ -0,0 +1,460 @@
+# Standard library imports
+import os          # For spill file paths
+import time        # For idle tracking
+import uuid        # For unique spill file names
+import pickle      # For sizing and spilling session values
+import shutil      # For removing expired spill folders
+import weakref     # For reaching idle sessions without keeping them alive
+import threading   # For sharing the store between sessions
+from config import (SESSION_SPILL_DIR, SESSION_MEMORY_BUDGET_MB, SESSION_TOTAL_MEMORY_MB,
+                    SESSION_SPILL_THRESHOLD_KB, SESSION_HISTORY_MESSAGES,
+                    SESSION_IDLE_SECONDS, SESSION_EXPIRE_SECONDS)
+from utils.metrics_util import metrics  # Exposes memory and spill statistics
+
+# Streamlit is only needed to identify the running session
+try:
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+except ImportError:
+    get_script_run_ctx = None
+
+# Session values that may be moved to disk as a whole
+SPILLABLE_KEYS = ("messages", "file_list", "canvas_data", "stroke_log")
+# Only used while the whiteboard is shown, so they stay in memory then
+CANVAS_KEYS = ("canvas_data", "stroke_log")
+# Chunks of the oldest chat messages, oldest first
+HISTORY_KEY = "spilled_history"
+# Minimum gap between sweeps over the other sessions
+SWEEP_SECONDS = 30.0
+# Cached sizes are re-measured from scratch every this many runs of a session
+SIZE_REFRESH_RUNS = 20
+
+
+class Spilled:
+    """Placeholder left in session state for a value moved to the disk store."""
+
+    __slots__ = ("path", "nbytes", "count")
+
+    def __init__(self, path, nbytes, count=None):
+        self.path = path
+        self.nbytes = nbytes  # Pickled size
+        self.count = count    # len() of the value, when it has one
+
+    def __repr__(self):
+        return f"Spilled({os.path.basename(self.path)}, {self.nbytes} bytes)"
+
+
+def _get(state, key, default=None):
+    # Streamlit's SessionState has no get()
+    return state[key] if key in state else default
+
+
+def _keys(state):
+    filtered = getattr(state, "filtered_state", None)  # Streamlit SessionState: user-visible keys
+    return list(filtered if filtered is not None else state.keys())
+
+
+def _stamp(value):
+    """Cheap change marker for a value: identity, length and a revision counter if it has one.
+
+    In-place changes that keep the length (e.g. editing one dict entry) are
+    missed until the next full re-measure.
+    """
+    try:
+        length = len(value)
+    except Exception:
+        length = None
+    return id(value), length, getattr(value, "revision", None)
+
+
+def approx_size(value):
+    """Approximate memory held by a value: its pickled size (spilled values count as 0)."""
+    if isinstance(value, Spilled):
+        return 0
+    try:
+        return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 0  # Widgets, futures and other unpicklable values are not managed
+
+
+class SessionStore:
+    """Process-wide memory accounting and spill store for Streamlit session state.
+
+    At the end of every run the session's state is sized (pickled size per
+    key, re-measured only for values that changed since the last run) and,
+    if needed, trimmed:
+
+    - table results larger than spill_threshold move to disk
+    - chat messages beyond history_messages move to disk in chunks
+    - while the session is over its budget, its largest spillable values
+      (file list, canvas drawing) move to disk as a whole
+
+    Sessions idle for idle_seconds, or the least recently used ones while
+    the process is over its total budget, have every spillable value moved to
+    disk. Spilled values are replaced by Spilled placeholders and loaded back
+    lazily by the code that needs them. After expire_seconds idle (or once
+    Streamlit drops the session) a session's spill files are deleted.
+    """
+
+    def __init__(self, spill_dir=SESSION_SPILL_DIR, session_budget=SESSION_MEMORY_BUDGET_MB * 2 ** 20,
+                 total_budget=SESSION_TOTAL_MEMORY_MB * 2 ** 20, spill_threshold=SESSION_SPILL_THRESHOLD_KB * 1024,
+                 history_messages=SESSION_HISTORY_MESSAGES, idle_seconds=SESSION_IDLE_SECONDS,
+                 expire_seconds=SESSION_EXPIRE_SECONDS):
+        self.spill_dir = spill_dir
+        self.session_budget = session_budget
+        self.total_budget = total_budget
+        self.spill_threshold = spill_threshold
+        self.history_messages = history_messages
+        self.idle_seconds = idle_seconds
+        self.expire_seconds = expire_seconds
+        self._lock = threading.Lock()
+        # session id -> {"state": weakref, "last_seen", "running", "bytes", "idle",
+        #                "lock", "sizes", "tables", "runs"}; see _info()
+        self._sessions = {}
+        self._last_sweep = 0.0
+        self.spills = 0
+        self.loads = 0
+        self.spilled_bytes = 0
+        self.expired = 0
+        self._remove_stale_folders()
+
+    # ---- spill files ----
+
+    def _remove_stale_folders(self):
+        """Delete spill folders left behind by earlier processes."""
+        try:
+            entries = list(os.scandir(self.spill_dir))
+        except OSError:
+            return
+        cutoff = time.time() - self.expire_seconds
+        for entry in entries:
+            try:
+                if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+            except OSError:
+                continue
+
+    def spill(self, session_id, name, value):
+        """Write a value to the session's spill folder and return its placeholder."""
+        folder = os.path.join(self.spill_dir, session_id)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"{name}-{uuid.uuid4().hex}.pkl")
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with open(path + ".part", "wb") as f:
+            f.write(data)
+        os.replace(path + ".part", path)
+        self.spills += 1
+        self.spilled_bytes += len(data)
+        count = len(value) if hasattr(value, "__len__") else None
+        return Spilled(path, len(data), count)
+
+    def load(self, spilled, discard=False, default=None):
+        """Read a spilled value back (default if its file has expired).
+
+        Args:
+            spilled (Spilled): Placeholder returned by spill()
+            discard (bool): Delete the file (the value is going back into memory)
+            default: Returned when the file no longer exists
+        """
+        try:
+            with open(spilled.path, "rb") as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return default
+        self.loads += 1
+        if discard:
+            self.discard(spilled)
+        return value
+
+    def discard(self, spilled):
+        try:
+            os.remove(spilled.path)
+            self.spilled_bytes -= spilled.nbytes
+        except OSError:
+            pass
+
+    # ---- per-session policy ----
+
+    def _info(self, session_id):
+        """The bookkeeping entry of a session, created on first use (lock held)."""
+        info = self._sessions.get(session_id)
+        if info is None:
+            info = self._sessions[session_id] = {
+                "state": None, "last_seen": time.time(), "running": False, "bytes": 0, "idle": False,
+                "lock": threading.Lock(),  # Held while the session's values are spilled by a sweep
+                "sizes": {},   # key -> (stamp, size) from the last measurement
+                "tables": {},  # stamp -> size of table results under the spill threshold
+                "runs": 0,
+            }
+        return info
+
+    def begin(self, session_id, state):
+        """Mark a session as running and bring back its chat messages if they were spilled."""
+        with self._lock:
+            info = self._info(session_id)
+        with info["lock"]:  # Waits for a sweep that is spilling this session right now
+            with self._lock:
+                info.update(state=weakref.ref(state), last_seen=time.time(), running=True, idle=False)
+        # Messages are drawn on every run, so they never stay spilled as a whole
+        restore_session_values(state, "messages", store=self)
+
+    def end(self, session_id, state):
+        """Trim a session after its run and apply the idle and total budgets.
+
+        Other sessions are picked for spilling or expiry under the store lock,
+        but their values are written to disk after it is released, so other
+        sessions' begin() and end() never wait for that I/O.
+
+        Returns:
+            int: Approximate bytes the session keeps in memory
+        """
+        with self._lock:
+            info = self._info(session_id)
+            info["runs"] += 1
+            if info["runs"] % SIZE_REFRESH_RUNS == 0:
+                info["sizes"].clear()  # Catch in-place changes the stamps cannot see
+        if self._spill_tables(session_id, state, info["tables"]):
+            info["sizes"].pop("messages", None)
+        self._spill_history(session_id, state)
+        sizes = self._sizes(state, info["sizes"])
+        used = sum(sizes.values())
+        if used > self.session_budget:
+            # The canvas is needed on every run while the whiteboard is shown
+            keep = CANVAS_KEYS if _get(state, "whiteboard_mode") else ()
+            for key in sorted(SPILLABLE_KEYS, key=lambda k: -sizes.get(k, 0)):
+                if used <= self.session_budget:
+                    break
+                if key == "messages" or key in keep or not sizes.get(key):
+                    continue
+                state[key] = self.spill(session_id, key, state[key])
+                used -= sizes[key]
+
+        expired, to_spill = [], []
+        with self._lock:
+            info.update(state=weakref.ref(state), last_seen=time.time(), running=False, bytes=used)
+            if time.time() - self._last_sweep >= SWEEP_SECONDS or self._total_bytes() > self.total_budget:
+                expired, to_spill = self._sweep_candidates(session_id)
+        for other_id in expired:
+            self._remove_spill_folder(other_id)
+        for other_id, other_info, other_state in to_spill:
+            self._spill_idle(other_id, other_info, other_state)
+        return used
+
+    def _spill_tables(self, session_id, state, measured):
+        """Move large table results attached to chat messages to disk.
+
+        Args:
+            measured (dict): Sizes of tables already found to be under the
+                             threshold, by stamp; updated in place
+
+        Returns:
+            bool: True if any table was spilled
+        """
+        spilled, seen = False, {}
+        for message in _get(state, "messages") or []:
+            table = message.get("table")
+            if table is None or isinstance(table, Spilled):
+                continue
+            stamp = _stamp(table)
+            size = measured.get(stamp)
+            if size is None:
+                size = approx_size(table)
+            if size > self.spill_threshold:
+                message["table"] = self.spill(session_id, "table", table)
+                spilled = True
+            else:
+                seen[stamp] = size
+        measured.clear()
+        measured.update(seen)
+        return spilled
+
+    def _spill_history(self, session_id, state):
+        """Move the oldest chat messages beyond history_messages to disk, one chunk per spill."""
+        messages = _get(state, "messages")
+        if isinstance(messages, Spilled) or not messages or len(messages) <= self.history_messages:
+            return
+        cut = len(messages) - self.history_messages
+        chunk = self.spill(session_id, "history", messages[:cut])
+        # Mutated in place: the running script may still hold this list
+        del messages[:cut]
+        state[HISTORY_KEY] = list(_get(state, HISTORY_KEY) or []) + [chunk]
+
+    def _sizes(self, state, cache):
+        """Size per key, pickling only values whose stamp changed since they were cached."""
+        sizes = {}
+        for key in _keys(state):
+            try:
+                value = state[key]
+            except KeyError:
+                continue
+            stamp = _stamp(value)
+            cached = cache.get(key)
+            if cached is not None and cached[0] == stamp:
+                sizes[key] = cached[1]
+            else:
+                sizes[key] = approx_size(value)
+                cache[key] = (stamp, sizes[key])
+        for key in [key for key in cache if key not in sizes]:
+            del cache[key]
+        return sizes
+
+    def _spill_all(self, session_id, state, cache):
+        """Move every large spillable value of a session that is not running to disk."""
+        for key in SPILLABLE_KEYS:
+            if key in state:
+                value = state[key]
+                if not isinstance(value, Spilled) and approx_size(value) > self.spill_threshold:
+                    state[key] = self.spill(session_id, key, value)
+        return sum(self._sizes(state, cache).values())
+
+    # ---- across sessions ----
+
+    def _total_bytes(self):
+        return sum(info.get("bytes", 0) for info in self._sessions.values())
+
+    def _can_spill(self, info, now):
+        # A script that is still running (or crashed within the idle window) may hold its values
+        return not info["idle"] and not (info["running"] and now - info["last_seen"] < self.idle_seconds)
+
+    def _sweep_candidates(self, current_id):
+        """Pick sessions to expire and to spill (lock held; the caller does the I/O).
+
+        Expired sessions are dropped from the table here. Idle sessions are
+        spilled, then the least recently seen ones until the total budget
+        would be met.
+
+        Returns:
+            tuple: (expired session ids, [(session id, info, state) to spill])
+        """
+        self._last_sweep = now = time.time()
+        expired, to_spill = [], []
+        for session_id, info in list(self._sessions.items()):
+            state = info["state"]() if info["state"] is not None else None
+            idle = now - info["last_seen"]
+            if state is None or idle > self.expire_seconds:
+                # Streamlit dropped the session, or it has been gone too long
+                if session_id != current_id:
+                    del self._sessions[session_id]
+                    expired.append(session_id)
+            elif session_id != current_id and idle > self.idle_seconds and self._can_spill(info, now):
+                to_spill.append((session_id, info, state))
+
+        # Least recently seen sessions go to disk first
+        chosen = {session_id for session_id, _, _ in to_spill}
+        excess = self._total_bytes() - self.total_budget - sum(info["bytes"] for _, info, _ in to_spill)
+        for session_id, info in sorted(self._sessions.items(), key=lambda item: item[1]["last_seen"]):
+            if excess <= 0:
+                break
+            state = info["state"]() if info["state"] is not None else None
+            if session_id == current_id or session_id in chosen or state is None or not self._can_spill(info, now):
+                continue
+            to_spill.append((session_id, info, state))
+            excess -= info["bytes"]
+        return expired, to_spill
+
+    def _spill_idle(self, session_id, info, state):
+        """Spill another session's values without holding the store lock."""
+        with info["lock"]:
+            with self._lock:
+                # It may have started a run since it was picked
+                if not self._can_spill(info, time.time()):
+                    return
+            try:
+                used = self._spill_all(session_id, state, info["sizes"])
+            except Exception:
+                return  # Best effort: the session keeps its values in memory
+            with self._lock:
+                info["bytes"] = used
+                info["idle"] = True
+
+    def _remove_spill_folder(self, session_id):
+        folder = os.path.join(self.spill_dir, session_id)
+        if os.path.isdir(folder):
+            for entry in os.scandir(folder):
+                try:
+                    self.spilled_bytes -= entry.stat().st_size
+                except OSError:
+                    pass
+            shutil.rmtree(folder, ignore_errors=True)
+        self.expired += 1
+
+    def session_bytes(self, session_id):
+        with self._lock:
+            return self._sessions.get(session_id, {}).get("bytes", 0)
+
+    def stats(self):
+        """Memory and spill statistics for the diagnostics panel and /metrics."""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            return {
+                "sessions": len(sessions),
+                "idle_sessions": sum(1 for info in sessions if info.get("idle")),
+                "memory_mb": round(sum(info.get("bytes", 0) for info in sessions) / 2 ** 20, 1),
+                "largest_session_mb": round(max((info.get("bytes", 0) for info in sessions), default=0) / 2 ** 20, 1),
+                "spilled_mb": round(max(self.spilled_bytes, 0) / 2 ** 20, 1),
+                "spills": self.spills,
+                "loads": self.loads,
+                "expired": self.expired,
+            }
+
+
+# The store is shared by every session in the process
+session_store = SessionStore()
+metrics.register_collector("session_memory", session_store.stats)
+
+
+def restore_session_values(state, *keys, store=None):
+    """Load spilled values back into session state before they are used.
+
+    Keys whose spill files have expired are removed, so the usual
+    "if key not in st.session_state" initialisation recreates them.
+
+    Args:
+        state: Session state (st.session_state or a dict)
+        keys: Session keys to restore
+        store (SessionStore): Store the values were spilled to (default: the shared store)
+    """
+    store = store or session_store
+    for key in keys:
+        value = _get(state, key)
+        if isinstance(value, Spilled):
+            restored = store.load(value, discard=True, default=value)
+            if restored is value:
+                del state[key]
+            else:
+                state[key] = restored
+
+
+def load_spilled(value, default=None):
+    """Return a value that may have been spilled (the placeholder is left in place)."""
+    if isinstance(value, Spilled):
+        return session_store.load(value, default=default)
+    return value
+
+
+def _current_session():
+    """(session id, session state) of the running Streamlit script, or (None, None)."""
+    ctx = get_script_run_ctx() if get_script_run_ctx else None
+    if ctx is None:
+        return None, None
+    # SafeSessionState is recreated for every run; the SessionState it wraps
+    # lives as long as the session, so that is what idle sweeps hold on to
+    return ctx.session_id, getattr(ctx.session_state, "_state", ctx.session_state)
+
+
+def begin_session_run():
+    """Call at the top of every run: marks the session active and restores its messages."""
+    session_id, state = _current_session()
+    if session_id:
+        session_store.begin(session_id, state)
+
+
+def end_session_run():
+    """Call at the end of every run: spills what exceeds the session's limits.
+
+    Returns:
+        int: Approximate bytes the session keeps in memory (0 outside Streamlit)
+    """
+    session_id, state = _current_session()
+    if not session_id:
+        return 0
+    return session_store.end(session_id, state)
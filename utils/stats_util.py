@@ -0,0 +1,227 @@
+# Standard library imports
+import time        # For refresh throttling and timestamps
+import threading   # For serialising refreshes within the process
+import psycopg2
+from config import DB_CONFIG, STATS_REFRESH_SECONDS, STATS_WATERMARK_LAG_SECONDS
+from utils.db_util import parse_date
+
+# Messages per (channel, day, emoji), kept up to date from telegram_messages.
+# Empty strings stand in for NULL channels and emojis so they can be part of the key.
+SUMMARY_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS telegram_stats_daily (
+        channel_title TEXT NOT NULL,
+        day DATE NOT NULL,
+        emoji TEXT NOT NULL,
+        messages BIGINT NOT NULL,
+        PRIMARY KEY (channel_title, day, emoji)
+    )""",
+    """CREATE TABLE IF NOT EXISTS telegram_stats_watermark (
+        name TEXT PRIMARY KEY,
+        last_id BIGINT NOT NULL,
+        refreshed_at DOUBLE PRECISION NOT NULL
+    )""",
+    # Ids above the watermark that are already in the summary, with the time they were counted
+    """CREATE TABLE IF NOT EXISTS telegram_stats_counted (
+        id BIGINT PRIMARY KEY,
+        counted_at DOUBLE PRECISION NOT NULL
+    )""",
+)
+
+# Marks messages above the watermark that are not in the summary yet as counted at %s
+MARK_NEW_SQL = """
+INSERT INTO telegram_stats_counted (id, counted_at)
+SELECT m.id, %s FROM telegram_messages m
+WHERE m.id > %s AND NOT EXISTS (SELECT 1 FROM telegram_stats_counted c WHERE c.id = m.id)
+"""
+
+# Folds the messages marked by MARK_NEW_SQL into the summary
+REFRESH_SQL = """
+INSERT INTO telegram_stats_daily (channel_title, day, emoji, messages)
+SELECT COALESCE(m.channel_title, ''), m.message_date::date, COALESCE(m.emoji, ''), COUNT(*)
+FROM telegram_messages m JOIN telegram_stats_counted c ON c.id = m.id
+WHERE c.counted_at = %s AND m.message_date IS NOT NULL
+GROUP BY 1, 2, 3
+ON CONFLICT (channel_title, day, emoji)
+DO UPDATE SET messages = telegram_stats_daily.messages + EXCLUDED.messages
+"""
+
+WATERMARK = "telegram_messages"
+STATS_METRICS = ("counts", "histogram", "emojis")
+STATS_INTERVALS = ("day", "week", "month", "year")
+
+_refresh_lock = threading.Lock()
+_last_refresh = 0.0
+_tables_ready = False
+
+
+def create_stats_tables():
+    """Create the summary tables. Run once at setup (`python -m utils.db_util migrate`).
+
+    Returns:
+        dict: Dictionary containing status and message
+    """
+    global _tables_ready
+    try:
+        conn = psycopg2.connect(**DB_CONFIG)
+        try:
+            with conn:
+                cur = conn.cursor()
+                for statement in SUMMARY_SCHEMA:
+                    cur.execute(statement)
+                cur.close()
+        finally:
+            conn.close()
+        _tables_ready = True
+        return {"status": "success", "message": "Statistics tables are ready"}
+    except Exception as e:
+        return {"status": "error", "message": f"Error creating statistics tables: {str(e)}"}
+
+
+def refresh_telegram_stats(rebuild=False):
+    """Bring the summary table up to date with telegram_messages.
+
+    Messages with an id above the stored watermark that are not summarised
+    yet are aggregated, so a refresh costs in proportion to the new
+    messages. Ids are assigned before a transaction commits, so a message
+    with a lower id can appear after a higher one: the watermark only
+    advances past ids that were counted more than STATS_WATERMARK_LAG_SECONDS
+    ago, and the ids counted since then are remembered so none is counted
+    twice. A message whose transaction stays open longer than that lag is
+    missed until rebuild=True, which also picks up edits and deletions.
+
+    Args:
+        rebuild (bool): Clear the summary and aggregate every message again
+
+    Returns:
+        dict: Dictionary containing status, message, new_rows and watermark
+    """
+    global _last_refresh
+    with _refresh_lock:
+        if not _tables_ready:
+            # Normally done by the migrate step; only the first refresh in a process checks
+            created = create_stats_tables()
+            if created["status"] == "error":
+                return created
+        try:
+            conn = psycopg2.connect(**DB_CONFIG)
+            try:
+                with conn:  # One transaction: the summary and watermark move together
+                    cur = conn.cursor()
+                    if rebuild:
+                        cur.execute("DELETE FROM telegram_stats_daily")
+                        cur.execute("DELETE FROM telegram_stats_counted")
+                        cur.execute("DELETE FROM telegram_stats_watermark WHERE name = %s", (WATERMARK,))
+                    # Row lock so concurrent refreshes (other processes) cannot double count
+                    cur.execute("SELECT last_id FROM telegram_stats_watermark WHERE name = %s FOR UPDATE",
+                                (WATERMARK,))
+                    row = cur.fetchone()
+                    last_id = row[0] if row else 0
+                    now = time.time()
+                    cur.execute(MARK_NEW_SQL, (now, last_id))
+                    new_rows = cur.rowcount
+                    if new_rows:
+                        cur.execute(REFRESH_SQL, (now,))
+                    # Advance past ids counted long enough ago that no lower id can still be in flight
+                    cur.execute("SELECT COALESCE(MAX(id), 0) FROM telegram_stats_counted WHERE counted_at <= %s",
+                                (now - STATS_WATERMARK_LAG_SECONDS,))
+                    watermark = max(cur.fetchone()[0], last_id)
+                    cur.execute("DELETE FROM telegram_stats_counted WHERE id <= %s", (watermark,))
+                    cur.execute("DELETE FROM telegram_stats_watermark WHERE name = %s", (WATERMARK,))
+                    cur.execute("INSERT INTO telegram_stats_watermark (name, last_id, refreshed_at) "
+                                "VALUES (%s, %s, %s)", (WATERMARK, watermark, now))
+                    cur.close()
+            finally:
+                conn.close()
+            _last_refresh = time.time()
+            return {"status": "success", "message": f"Summarised {new_rows} new messages",
+                    "new_rows": new_rows, "watermark": watermark}
+
+        except Exception as e:
+            return {"status": "error", "message": f"Error refreshing statistics: {str(e)}"}
+
+
+def _period(start, interval):
+    """Label of a histogram bucket from its first day (date_trunc weeks start on Monday)."""
+    day = parse_date(start, "day").isoformat()
+    if interval == "month":
+        return day[:7]
+    if interval == "year":
+        return day[:4]
+    return day
+
+
+def _summary_filters(channel, date_from, date_to):
+    where, params = " WHERE 1=1", []
+    if channel:
+        where += " AND channel_title = %s"
+        params.append(channel)
+    if date_from:
+        where += " AND day >= %s::date"
+        params.append(parse_date(date_from, "date_from"))
+    if date_to:
+        where += " AND day <= %s::date"
+        params.append(parse_date(date_to, "date_to"))
+    return where, params
+
+
+def telegram_stats(metric="counts", channel=None, interval="month", date_from=None, date_to=None, limit=None):
+    """Answer summary questions about telegram_messages from the summary table.
+
+    The summary is refreshed first if it is older than STATS_REFRESH_SECONDS.
+
+    Args:
+        metric (str): "counts" (messages per channel), "histogram" (messages per
+                      channel and period) or "emojis" (most used emojis)
+        channel (str): Only this channel (default: all channels)
+        interval (str): Histogram period: "day", "week", "month" or "year"
+        date_from (str): First day to include (YYYY-MM-DD)
+        date_to (str): Last day to include (YYYY-MM-DD)
+        limit (int): Maximum number of rows
+
+    Returns:
+        dict: Dictionary containing status and either data and columns, or message
+    """
+    if metric not in STATS_METRICS:
+        return {"status": "error", "message": f"metric must be one of {', '.join(STATS_METRICS)}"}
+    if interval not in STATS_INTERVALS:
+        return {"status": "error", "message": f"interval must be one of {', '.join(STATS_INTERVALS)}"}
+    if time.time() - _last_refresh > STATS_REFRESH_SECONDS:
+        refreshed = refresh_telegram_stats()
+        if refreshed["status"] == "error":
+            return refreshed
+
+    try:
+        where, params = _summary_filters(channel, date_from, date_to)
+        conn = psycopg2.connect(**DB_CONFIG)
+        try:
+            cur = conn.cursor()
+            if metric == "counts":
+                cur.execute("SELECT channel_title, SUM(messages), MIN(day), MAX(day) FROM telegram_stats_daily"
+                            + where + " GROUP BY channel_title ORDER BY 2 DESC", params)
+                columns = ["Channel", "Messages", "First day", "Last day"]
+                data = [(title, int(total), str(first), str(last)) for title, total, first, last in cur.fetchall()]
+            elif metric == "emojis":
+                cur.execute("SELECT emoji, SUM(messages) FROM telegram_stats_daily" + where
+                            + " AND emoji <> '' GROUP BY emoji ORDER BY 2 DESC", params)
+                columns = ["Emoji", "Messages"]
+                data = [(emoji, int(total)) for emoji, total in cur.fetchall()]
+            else:
+                # One row per channel and period: the database does the bucketing
+                cur.execute("SELECT channel_title, date_trunc(%s, day::timestamp)::date AS period, SUM(messages) "
+                            "FROM telegram_stats_daily" + where
+                            + " GROUP BY channel_title, period ORDER BY channel_title, period",
+                            [interval] + params)
+                columns = ["Channel", interval.capitalize(), "Messages"]
+                data = [(title, _period(start, interval), int(total)) for title, start, total in cur.fetchall()]
+            cur.close()
+        finally:
+            conn.close()
+
+        if limit is not None:
+            data = data[:int(limit)]
+        if data:
+            return {"status": "success", "data": data, "columns": columns}
+        return {"status": "success", "message": "No matching messages found."}
+
+    except Exception as e:
+        return {"status": "error", "message": f"Error reading statistics: {str(e)}"}
@@ -0,0 +1,245 @@
+# Standard library imports
+import json    # For object metadata and fingerprints
+import zlib    # For compressing the binary log
+import struct  # For the binary header
+from array import array  # For packed coordinate storage
+
+# Coordinates are stored as integers in units of 1/QUANTIZATION pixels
+QUANTIZATION = 10
+
+# Magic bytes identifying the binary stroke log format
+MAGIC = b"SLG1"
+
+# Default number of recorded interactions between compactions
+DEFAULT_COMPACT_EVERY = 50
+
+# Numeric object properties stored quantized (path coordinates are always quantized)
+GEOMETRY_KEYS = ("left", "top", "width", "height", "radius")
+
+
+def fingerprint(obj):
+    """Return a cheap identity hash for a canvas object.
+
+    The object is hashed as it is stored (coordinates quantized), so an
+    object restored by from_bytes() matches the canvas object it came from.
+    """
+    return hash(json.dumps(_quantized(obj), sort_keys=True, separators=(",", ":")))
+
+
+def _quantized(obj):
+    """Copy of a canvas object with its coordinates rounded as to_bytes() stores them."""
+    obj = dict(obj)
+    for key in GEOMETRY_KEYS:
+        if isinstance(obj.get(key), (int, float)):
+            obj[key] = _quantize(obj[key]) / QUANTIZATION
+    if obj.get("path") is not None:
+        obj["path"] = [[segment[0]] + [_quantize(value) / QUANTIZATION for value in segment[1:]]
+                       for segment in obj["path"]]
+    return obj
+
+
+class StrokeLog:
+    """Delta log of the objects drawn on a fabric.js canvas.
+
+    Each interaction records only the objects added (or the number removed by
+    undo/clear) since the previous one. Every `compact_every` interactions the
+    deltas are folded into a snapshot. The log serializes to a compact binary
+    format with quantized, delta-encoded path coordinates.
+    """
+
+    def __init__(self, compact_every=DEFAULT_COMPACT_EVERY):
+        self.compact_every = compact_every
+        self.version = "4.4.0"  # fabric.js version reported by the canvas
+        self.snapshot = []      # Objects as of the last compaction
+        self.deltas = []        # ("add", [objects]) or ("truncate", count) since the snapshot
+        self.objects = []       # Current objects, kept in step with the log
+        self.fingerprints = []  # Fingerprint per current object for change detection
+        self.revision = 0       # Bumped on every change, so callers can cache derived values
+
+    def __len__(self):
+        return len(self.objects)
+
+    def record(self, json_data):
+        """Record the canvas state after an interaction as a delta.
+
+        Args:
+            json_data (dict): The canvas `json_data` returned by st_canvas
+
+        Returns:
+            bool: True if the drawing changed
+        """
+        if not json_data:
+            return False
+        self.version = json_data.get("version", self.version)
+        objects = json_data.get("objects", [])
+        known = len(self.objects)
+
+        # Strokes are appended, so usually only the tail needs fingerprinting.
+        # Walk back to the longest prefix that still matches what we recorded.
+        common = min(known, len(objects))
+        while common and fingerprint(objects[common - 1]) != self.fingerprints[common - 1]:
+            common -= 1
+
+        if common == known == len(objects):
+            return False
+
+        if common < known:
+            self.deltas.append(("truncate", common))
+            del self.objects[common:]
+            del self.fingerprints[common:]
+        if len(objects) > common:
+            added = list(objects[common:])
+            self.deltas.append(("add", added))
+            self.objects.extend(added)
+            self.fingerprints.extend(fingerprint(obj) for obj in added)
+
+        self.revision += 1
+        if len(self.deltas) >= self.compact_every:
+            self.compact()
+        return True
+
+    def compact(self):
+        """Fold all deltas into the snapshot."""
+        self.snapshot = list(self.objects)
+        self.deltas = []
+        self.revision += 1
+
+    def clear(self):
+        """Record that every object was removed."""
+        self.record({"version": self.version, "objects": []})
+
+    def materialize(self, quantized=False):
+        """Return the full drawing in the format st_canvas accepts as initial_drawing.
+
+        Args:
+            quantized (bool): Round coordinates to 1/QUANTIZATION px, as stored by
+                              to_bytes(); a much smaller payload for (re)mounting
+        """
+        objects = [_quantized(obj) for obj in self.objects] if quantized else list(self.objects)
+        return {"version": self.version, "objects": objects}
+
+    def to_bytes(self):
+        """Serialize the snapshot and deltas to the compact binary format.
+
+        Path coordinates are quantized to 1/QUANTIZATION px and delta-encoded
+        into one int32 array. Object properties shared with an earlier object of
+        the same type are stored once as a template and referenced by index.
+        """
+        encoder = _Encoder()
+        body = {
+            "version": self.version,
+            "snapshot": [encoder.encode(obj) for obj in self.snapshot],
+            "deltas": [
+                [op, [encoder.encode(obj) for obj in arg]] if op == "add" else [op, arg]
+                for op, arg in self.deltas
+            ],
+            "templates": encoder.templates,
+        }
+        meta = json.dumps(body, separators=(",", ":")).encode("utf-8")
+        coords = encoder.coords.tobytes()
+        raw = struct.pack("<II", len(meta), len(coords)) + meta + coords
+        return MAGIC + zlib.compress(raw, 6)
+
+    @classmethod
+    def from_bytes(cls, data, compact_every=DEFAULT_COMPACT_EVERY):
+        """Rebuild a StrokeLog from bytes produced by to_bytes()."""
+        if data[:4] != MAGIC:
+            raise ValueError("Not a stroke log")
+        raw = zlib.decompress(data[4:])
+        meta_len, coords_len = struct.unpack_from("<II", raw)
+        meta = json.loads(raw[8:8 + meta_len].decode("utf-8"))
+        coords = array("i")
+        coords.frombytes(raw[8 + meta_len:8 + meta_len + coords_len])
+        decoder = _Decoder(meta["templates"], coords)
+
+        log = cls(compact_every=compact_every)
+        log.version = meta["version"]
+        log.snapshot = [decoder.decode(obj) for obj in meta["snapshot"]]
+        log.objects = list(log.snapshot)
+        for op, arg in meta["deltas"]:
+            if op == "add":
+                added = [decoder.decode(obj) for obj in arg]
+                log.deltas.append(("add", added))
+                log.objects.extend(added)
+            else:
+                log.deltas.append(("truncate", arg))
+                del log.objects[arg:]
+        log.fingerprints = [fingerprint(obj) for obj in log.objects]
+        return log
+
+
+class _Encoder:
+    """Shared state while encoding objects: templates and the coordinate stream."""
+
+    def __init__(self):
+        self.templates = []        # Property dicts shared between objects
+        self._template_ids = {}    # Maps serialized properties to template index
+        self.coords = array("i")   # Quantized, delta-encoded path coordinates
+
+    def encode(self, obj):
+        props = dict(obj)
+        path = props.pop("path", None)
+        # Geometry varies per object; everything else is usually a repeated style
+        geometry = {key: props.pop(key) for key in GEOMETRY_KEYS if isinstance(props.get(key), (int, float))}
+        key = json.dumps(props, sort_keys=True, separators=(",", ":"))
+        template_id = self._template_ids.get(key)
+        if template_id is None:
+            template_id = len(self.templates)
+            self.templates.append(props)
+            self._template_ids[key] = template_id
+
+        encoded = {"t": template_id}
+        if geometry:
+            encoded["g"] = {k: _quantize(v) for k, v in geometry.items()}
+        if path is not None:
+            encoded["p"] = self._encode_path(path)
+        return encoded
+
+    def _encode_path(self, path):
+        """Store path coordinates in the stream; return (commands, offset, count)."""
+        commands = []
+        offset = len(self.coords)
+        previous = [0, 0]
+        for segment in path:
+            commands.append(f"{segment[0]}{len(segment) - 1}")
+            for i, value in enumerate(segment[1:]):
+                # Alternate x/y deltas keep consecutive values small for zlib
+                q = _quantize(value)
+                self.coords.append(q - previous[i % 2])
+                previous[i % 2] = q
+        return [",".join(commands), offset, len(self.coords) - offset]
+
+
+class _Decoder:
+    """Inverse of _Encoder for a single serialized log."""
+
+    def __init__(self, templates, coords):
+        self.templates = templates
+        self.coords = coords
+
+    def decode(self, encoded):
+        obj = dict(self.templates[encoded["t"]])
+        for key, value in encoded.get("g", {}).items():
+            obj[key] = value / QUANTIZATION
+        if "p" in encoded:
+            obj["path"] = self._decode_path(*encoded["p"])
+        return obj
+
+    def _decode_path(self, commands, offset, count):
+        path = []
+        position = offset
+        previous = [0, 0]
+        for command in commands.split(",") if commands else []:
+            name, arity = command[0], int(command[1:])
+            segment = [name]
+            for i in range(arity):
+                previous[i % 2] += self.coords[position]
+                position += 1
+                segment.append(previous[i % 2] / QUANTIZATION)
+            path.append(segment)
+        return path
+
+
+def _quantize(value):
+    """Convert a coordinate to fixed-point integer units."""
+    return int(round(float(value) * QUANTIZATION))
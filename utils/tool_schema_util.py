@@ -0,0 +1,338 @@
+import json      # For hashing the declarations
+import hashlib   # For the schema version
+
+# Function declarations for every tool the assistant can call.
+# Shared by the Gemini request and the local intent router.
+TOOL_DECLARATIONS = [
+    # Brightness adjustment tool
+    {
+        "name": "adjust_brightness",
+        "description": "Adjusts screen brightness percentage",
+        "parameters": {
+            "type": "OBJECT",
+            "properties": {
+                "percentage": {
+                    "type": "NUMBER",
+                    "description": "Brightness percentage (0-100)",
+                },
+            },
+            "required": ["percentage"],
+        },
+    },
+    # Volume adjustment tool
+    {
+        "name": "adjust_volume",
+        "description": "Adjusts system volume percentage",
+        "parameters": {
+            "type": "OBJECT",
+            "properties": {
+                "percentage": {
+                    "type": "NUMBER",
+                    "description": "Volume percentage (0-100)",
+                },
+            },
+            "required": ["percentage"],
+        },
+    },
+    # Distance calculation tool
+    {
+        "name": "get_distance",
+        "description": "Calculates driving distance between locations",
+        "parameters": {
+            "type": "OBJECT",
+            "properties": {
+                "origin": {"type": "STRING", "description": "Start location"},
+                "destination": {"type": "STRING", "description": "End location"},
+            },
+            "required": ["origin", "destination"],
+        },
+    },
+    # Media file opener
+    {
+        "name": "open_first_media_file",
+        "description": "Opens first media file in folder",
+        "parameters": {
+            "type": "OBJECT",
+            "properties": {
+                "folder_path": {
+                    "type": "STRING",
+                    "description": "Path to media files folder",
+                },
+                "media_type": {
+                    "type": "STRING",
+                    "enum": ["audio", "video"],
+                    "description": "Only include audio or video files",
+                },
+                "search": {
+                    "type": "STRING",
+                    "description": "Text to match in file name, title, artist or album",
+                },
+                "sort_by": {
+                    "type": "STRING",
+                    "enum": ["name", "mtime", "size", "duration", "title", "artist"],
+                    "description": "Playlist order",
+                },
+                "descending": {
+                    "type": "BOOLEAN",
+                    "description": "Reverse the playlist order",
+                },
+            },
+            "required": ["folder_path"],
+        },
+    },
+    # Media file navigator
+    {
+        "name": "navigate_media_file",
+        "description": "Navigates between media files",
+        "parameters": {
+            "type": "OBJECT",
+            "properties": {
+                "direction": {
+                    "type": "STRING",
+                    "enum": ["next", "previous"],
+                    "description": "Navigation direction",
+                },
+                "media_type": {
+                    "type": "STRING",
+                    "enum": ["audio", "video"],
+                    "description": "Skip to the next audio or video file",
+                },
+                "search": {
+                    "type": "STRING",
+                    "description": "Skip to a file whose name, title, artist or album matches",
+                },
+            },
+            "required": ["direction"],
+        },
+    },
+    # Telegram messages query
+    {
+        "name": "query_telegram_messages",
+        "description": "Queries telegram messages database; give at least one filter",
+        "parameters": {
+            "type": "OBJECT",
+            "properties": {
+                "channel": {"type": "STRING", "description": "Exact channel title"},
+                "date_from": {"type": "STRING", "description": "First day to include (YYYY-MM-DD)"},
+                "date_to": {"type": "STRING", "description": "Last day to include (YYYY-MM-DD)"},
+                "text": {"type": "STRING", "description": "Text the message contains"},
+                "emoji": {"type": "STRING", "description": "Emoji reaction"},
+                "youtube": {"type": "STRING", "description": "YouTube link"},
+                "limit": {"type": "NUMBER", "description": "Maximum number of messages"},
+                "order": {
+                    "type": "STRING",
+                    "enum": ["newest", "oldest"],
+                    "description": "Sort by message date",
+                },
+                "query": {
+                    "type": "STRING",
+                    "description": "Free-text filters, e.g. channel 'X' message 'Y' (prefer the typed fields)",
+                },
+            },
+        },
+    },
+    # Telegram export to a file
+    {
+        "name": "export_telegram_messages",
+        "description": "Exports matching telegram messages to a downloadable CSV or Parquet file",
+        "parameters": {
+            "type": "OBJECT",
+            "properties": {
+                "channel": {"type": "STRING", "description": "Exact channel title"},
+                "date_from": {"type": "STRING", "description": "First day to include (YYYY-MM-DD)"},
+                "date_to": {"type": "STRING", "description": "Last day to include (YYYY-MM-DD)"},
+                "text": {"type": "STRING", "description": "Text the message contains"},
+                "emoji": {"type": "STRING", "description": "Emoji reaction"},
+                "youtube": {"type": "STRING", "description": "YouTube link"},
+                "format": {
+                    "type": "STRING",
+                    "enum": ["csv", "parquet"],
+                    "description": "File format (default csv)",
+                },
+            },
+        },
+    },
+    # Telegram summary statistics
+    {
+        "name": "telegram_stats",
+        "description": "Summary statistics of telegram messages: per-channel counts, "
+                       "messages per day/week/month/year, or most used emojis",
+        "parameters": {
+            "type": "OBJECT",
+            "properties": {
+                "metric": {
+                    "type": "STRING",
+                    "enum": ["counts", "histogram", "emojis"],
+                    "description": "counts per channel, histogram over time, or emoji frequencies",
+                },
+                "channel": {"type": "STRING", "description": "Only this channel"},
+                "interval": {
+                    "type": "STRING",
+                    "enum": ["day", "week", "month", "year"],
+                    "description": "Histogram period (default month)",
+                },
+                "date_from": {"type": "STRING", "description": "First day to include (YYYY-MM-DD)"},
+                "date_to": {"type": "STRING", "description": "Last day to include (YYYY-MM-DD)"},
+                "limit": {"type": "NUMBER", "description": "Maximum number of rows"},
+            },
+            "required": ["metric"],
+        },
+    },
+    # Similar telegram messages
+    {
+        "name": "find_similar_messages",
+        "description": "Finds telegram messages similar in content to the given text",
+        "parameters": {
+            "type": "OBJECT",
+            "properties": {
+                "text": {
+                    "type": "STRING",
+                    "description": "Example message or topic to match",
+                },
+                "limit": {
+                    "type": "NUMBER",
+                    "description": "Maximum number of messages to return (default 10)",
+                },
+            },
+            "required": ["text"],
+        },
+    },
+    # Annotation tool starter
+    {
+        "name": "start_annotation",
+        "description": "Starts annotation with specified tool",
+        "parameters": {
+            "type": "OBJECT",
+            "properties": {
+                "tool": {
+                    "type": "STRING",
+                    "enum": ["pen", "rectangle", "circle"],
+                    "description": "Annotation tool to use",
+                },
+            },
+            "required": ["tool"],
+        },
+    },
+    # Whiteboard toggle
+    {
+        "name": "toggle_whiteboard",
+        "description": "Toggles whiteboard mode",
+        "parameters": {
+            "type": "OBJECT",
+            "properties": {
+                "enable": {
+                    "type": "BOOLEAN",
+                    "description": "Enable/disable whiteboard",
+                },
+            },
+            "required": ["enable"],
+        },
+    },
+    # Whiteboard save
+    {
+        "name": "save_whiteboard",
+        "description": "Saves the current whiteboard drawing under a name as a new version",
+        "parameters": {
+            "type": "OBJECT",
+            "properties": {
+                "name": {"type": "STRING", "description": "Whiteboard name"},
+            },
+            "required": ["name"],
+        },
+    },
+    # Whiteboard restore
+    {
+        "name": "load_whiteboard",
+        "description": "Opens a saved whiteboard, optionally at a specific version",
+        "parameters": {
+            "type": "OBJECT",
+            "properties": {
+                "name": {"type": "STRING", "description": "Whiteboard name"},
+                "version": {"type": "NUMBER", "description": "Version to restore (default: latest)"},
+            },
+            "required": ["name"],
+        },
+    },
+    # Whiteboard listing
+    {
+        "name": "list_whiteboards",
+        "description": "Lists saved whiteboards",
+    },
+    # Whiteboard export
+    {
+        "name": "export_whiteboard",
+        "description": "Exports a saved whiteboard as a PNG or SVG image",
+        "parameters": {
+            "type": "OBJECT",
+            "properties": {
+                "name": {"type": "STRING", "description": "Whiteboard name"},
+                "format": {
+                    "type": "STRING",
+                    "enum": ["png", "svg"],
+                    "description": "Image format",
+                },
+                "version": {"type": "NUMBER", "description": "Version to export (default: latest)"},
+            },
+            "required": ["name"],
+        },
+    },
+    # Text-to-speech reader
+    {
+        "name": "read_file_aloud",
+        "description": "Reads file content aloud",
+        "parameters": {
+            "type": "OBJECT",
+            "properties": {
+                "file_path": {
+                    "type": "STRING",
+                    "description": "Path to file to read",
+                },
+            },
+            "required": ["file_path"],
+        },
+    },
+    # File grouping tool
+    {
+        "name": "group_related_files",
+        "description": "Groups similar files in folder",
+        "parameters": {
+            "type": "OBJECT",
+            "properties": {
+                "folder_path": {
+                    "type": "STRING",
+                    "description": "Path to folder to analyze",
+                },
+                "output_folder": {
+                    "type": "STRING",
+                    "description": "Output folder name",
+                },
+                "similarity_threshold": {
+                    "type": "NUMBER",
+                    "description": "Similarity threshold (0-1)",
+                },
+                "recursive": {
+                    "type": "BOOLEAN",
+                    "description": "Also analyze files in subfolders",
+                },
+                "include": {
+                    "type": "STRING",
+                    "description": "Comma-separated glob patterns of files to analyze, e.g. '*.pdf,*.docx'",
+                },
+                "exclude": {
+                    "type": "STRING",
+                    "description": "Comma-separated glob patterns of files or folders to skip",
+                },
+                "max_depth": {
+                    "type": "NUMBER",
+                    "description": "Deepest subfolder level to scan",
+                },
+            },
+            "required": ["folder_path"],
+        },
+    }
+]
+
+# Changes whenever a declaration changes; used to key caches that depend on the tool set
+TOOL_SCHEMA_VERSION = hashlib.sha256(
+    json.dumps(TOOL_DECLARATIONS, sort_keys=True).encode("utf-8")
+).hexdigest()[:12]
@@ -1,16 +1,61 @@
 import pyttsx3      # for text-to-speech functionality
 import os 
+import threading    # for serializing speech across job worker threads
 from PyPDF2 import PdfReader    # for PDF text extraction
 
-def read_file_aloud(file_path):
+# pyttsx3 drives one speech engine per process, so files are read aloud one at a time
+_speech_lock = threading.Lock()
+
+# How often a queued reading checks whether it was cancelled (seconds)
+SPEECH_WAIT_SECONDS = 0.5
+
+def wait_for_speech(progress=None):
+    """Acquire the speech lock, reporting progress while another reading holds it.
+    
+    Args:
+        progress (callable): Optional progress(done, total, label) callback;
+                             returning False gives up waiting
+        
+    Returns:
+        bool: True if the lock was acquired (the caller must release it)
+    """
+    while not _speech_lock.acquire(timeout=SPEECH_WAIT_SECONDS):
+        if progress and not progress(0, None, "Waiting for another reading to finish"):
+            return False
+    return True
+
+def speak_chunks(engine, chunks, progress=None, unit="part"):
+    """Speak text chunks one at a time so progress can be reported and cancelled.
+    
+    Args:
+        engine: Initialized pyttsx3 engine
+        chunks (list): Text chunks (pages or paragraphs) in reading order
+        progress (callable): Optional progress(done, total, label) callback;
+                             returning False stops before the next chunk
+        unit (str): Name of a chunk used in progress labels ("page", "paragraph")
+        
+    Returns:
+        bool: True if every chunk was spoken, False if cancelled
+    """
+    for n, chunk in enumerate(chunks, 1):
+        if chunk.strip():
+            engine.say(chunk)
+            engine.runAndWait()
+        if progress and not progress(n, len(chunks), f"Spoke {unit} {n}/{len(chunks)}"):
+            return False
+    return True
+
+def read_file_aloud(file_path, progress=None):
     """Reads the contents of a text or PDF file aloud using text-to-speech.
     
     Args:
         file_path (str): Path to the file to be read
+        progress (callable): Optional progress(done, total, label) callback, called
+                             after each page/paragraph; returning False stops reading
         
     Returns:
         dict: Dictionary containing:
-            - status: "success" or "error"
+            - status: "success", "error" or "cancelled"
             - message: Detailed result message
     
     Supported Formats:
@@ -18,6 +63,19 @@ def read_file_aloud(file_path):
         - Text (.txt, .md)
         - Data files (.csv, .json)
     """
+    # Background jobs run on several threads; wait until no other job is speaking
+    if not wait_for_speech(progress):
+        return {
+            "status": "cancelled", 
+            "message": f"Cancelled before reading: {os.path.basename(file_path)}"
+        }
+    try:
+        return _read_file_aloud(file_path, progress)
+    finally:
+        _speech_lock.release()
+
+def _read_file_aloud(file_path, progress):
+    """Speaks a file for read_file_aloud(); the caller holds the speech lock."""
     try:
         # Check if the specified file exists at the given path
         if not os.path.exists(file_path):
@@ -33,22 +91,23 @@ def read_file_aloud(file_path):
         if file_path.lower().endswith('.pdf'):
             # Create PDF reader object
             pdf_reader = PdfReader(file_path)
-            text = ""
             
             # Extract text from each page
-            for page in pdf_reader.pages:
-                text += page.extract_text()
+            pages = [page.extract_text() or "" for page in pdf_reader.pages]
             
             # Check if any text was extracted
-            if not text.strip():
+            if not "".join(pages).strip():
                 return {
                     "status": "error", 
                     "message": "No readable text found in PDF"
                 }
             
-            # Convert text to speech
-            engine.say(text)
-            engine.runAndWait()
+            # Convert text to speech page by page
+            if not speak_chunks(engine, pages, progress, unit="page"):
+                return {
+                    "status": "cancelled", 
+                    "message": f"Stopped reading PDF: {os.path.basename(file_path)}"
+                }
             
             return {
                 "status": "success", 
@@ -61,9 +120,13 @@ def read_file_aloud(file_path):
             with open(file_path, 'r', encoding='utf-8') as file:
                 content = file.read()
             
-            # Convert text to speech
-            engine.say(content)
-            engine.runAndWait()
+            # Convert text to speech paragraph by paragraph
+            paragraphs = [paragraph for paragraph in content.split("\n\n") if paragraph.strip()]
+            if not speak_chunks(engine, paragraphs, progress, unit="paragraph"):
+                return {
+                    "status": "cancelled", 
+                    "message": f"Stopped reading: {os.path.basename(file_path)}"
+                }
             
             return {
                 "status": "success", 
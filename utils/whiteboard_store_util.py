@@ -0,0 +1,325 @@
+# Standard library imports
+import os          # For path operations
+import time        # For snapshot timestamps
+import uuid        # For unique export file names
+import queue       # For the background save queue
+import sqlite3     # For durable whiteboard storage
+import threading   # For the background writer
+from concurrent.futures import Future, ThreadPoolExecutor  # For off-thread exports
+from config import WHITEBOARD_DB_PATH, WHITEBOARD_EXPORT_DIR
+from utils.stroke_log_util import StrokeLog
+
+# Optional PNG renderer; SVG export works without it
+try:
+    from PIL import Image, ImageDraw
+except ImportError:
+    Image = ImageDraw = None
+
+# Canvas dimensions used by get_annotation_canvas
+CANVAS_WIDTH = 700
+CANVAS_HEIGHT = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS boards (
+    name TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    latest_version INTEGER NOT NULL,
+    object_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    board TEXT NOT NULL REFERENCES boards(name) ON DELETE CASCADE,
+    version INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    object_count INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (board, version)
+);
+"""
+
+
+class WhiteboardStore:
+    """SQLite-backed store of named whiteboards with versioned snapshots.
+
+    Each save adds a new version holding the drawing as a compacted stroke log.
+    Listing boards and versions only reads metadata; snapshot blobs are loaded
+    on demand. Saves can be queued to a background writer thread so drawing is
+    never blocked on disk I/O.
+    """
+
+    def __init__(self, db_path=WHITEBOARD_DB_PATH):
+        self.db_path = db_path
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+        self._queue = queue.Queue()
+        self._pending = {}  # Maps board name to (drawing, Future) awaiting the writer
+        self._pending_lock = threading.Lock()
+        self._writer = None
+        self._exporter = ThreadPoolExecutor(max_workers=1, thread_name_prefix="whiteboard-export")
+
+    def _connect(self):
+        """Open a connection; each thread uses its own."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def save(self, name, drawing):
+        """Store a drawing as the next version of a board.
+
+        Args:
+            name (str): Board name
+            drawing (dict): Canvas drawing with an "objects" list
+
+        Returns:
+            int: The new version number
+        """
+        log = StrokeLog()
+        log.record(drawing)
+        log.compact()  # Snapshots hold no deltas
+        data = log.to_bytes()
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                row = conn.execute("SELECT latest_version FROM boards WHERE name = ?", (name,)).fetchone()
+                version = (row[0] if row else 0) + 1
+                if row:
+                    conn.execute(
+                        "UPDATE boards SET updated_at = ?, latest_version = ?, object_count = ? WHERE name = ?",
+                        (now, version, len(log), name))
+                else:
+                    conn.execute(
+                        "INSERT INTO boards (name, created_at, updated_at, latest_version, object_count) "
+                        "VALUES (?, ?, ?, ?, ?)", (name, now, now, version, len(log)))
+                conn.execute(
+                    "INSERT INTO snapshots (board, version, created_at, object_count, size, data) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", (name, version, now, len(log), len(data), data))
+            return version
+        finally:
+            conn.close()
+
+    def save_async(self, name, drawing):
+        """Queue a save on the background writer.
+
+        If a save for the same board is still waiting, it is replaced by this
+        one, so a burst of saves only writes the latest drawing.
+
+        Returns:
+            Future: Resolves to the saved version number
+        """
+        with self._pending_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._write_loop, name="whiteboard-writer", daemon=True)
+                self._writer.start()
+            pending = self._pending.get(name)
+            if pending is not None:
+                # Coalesce with the queued save; callers share its Future
+                self._pending[name] = (drawing, pending[1])
+                return pending[1]
+            future = Future()
+            self._pending[name] = (drawing, future)
+        self._queue.put(name)
+        return future
+
+    def _write_loop(self):
+        """Background writer: performs queued saves one at a time."""
+        while True:
+            name = self._queue.get()
+            if name is None:
+                self._queue.task_done()
+                break
+            with self._pending_lock:
+                drawing, future = self._pending.pop(name)
+            try:
+                future.set_result(self.save(name, drawing))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """Block until every queued save has been written."""
+        self._queue.join()
+
+    def list_boards(self):
+        """Return metadata for every board, most recently updated first."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT name, created_at, updated_at, latest_version, object_count "
+                "FROM boards ORDER BY updated_at DESC").fetchall()
+        finally:
+            conn.close()
+        return [dict(zip(("name", "created_at", "updated_at", "latest_version", "object_count"), row))
+                for row in rows]
+
+    def list_versions(self, name):
+        """Return metadata for every saved version of a board, newest first."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT version, created_at, object_count, size FROM snapshots "
+                "WHERE board = ? ORDER BY version DESC", (name,)).fetchall()
+        finally:
+            conn.close()
+        return [dict(zip(("version", "created_at", "object_count", "size"), row)) for row in rows]
+
+    def load(self, name, version=None):
+        """Load a board snapshot as a StrokeLog.
+
+        Args:
+            name (str): Board name
+            version (int): Version to load (default: latest)
+
+        Returns:
+            StrokeLog: The saved drawing, or None if it does not exist
+        """
+        version, log = self._load_snapshot(name, version)
+        return log
+
+    def _load_snapshot(self, name, version=None):
+        """Return (version, StrokeLog) of a snapshot, or (None, None) if it does not exist."""
+        conn = self._connect()
+        try:
+            if version is None:
+                row = conn.execute(
+                    "SELECT version, data FROM snapshots WHERE board = ? ORDER BY version DESC LIMIT 1",
+                    (name,)).fetchone()
+            else:
+                row = conn.execute(
+                    "SELECT version, data FROM snapshots WHERE board = ? AND version = ?",
+                    (name, int(version))).fetchone()
+        finally:
+            conn.close()
+        return (row[0], StrokeLog.from_bytes(row[1])) if row else (None, None)
+
+    def delete(self, name):
+        """Delete a board and all of its versions."""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM snapshots WHERE board = ?", (name,))
+                conn.execute("DELETE FROM boards WHERE name = ?", (name,))
+        finally:
+            conn.close()
+
+    def export(self, name, fmt="svg", version=None, output_dir=WHITEBOARD_EXPORT_DIR):
+        """Render a board to SVG or PNG on the export thread.
+
+        Returns:
+            Future: Resolves to the path of the exported file
+        """
+        return self._exporter.submit(self._export, name, fmt.lower(), version, output_dir)
+
+    def _export(self, name, fmt, version, output_dir):
+        # A save queued just before the export must be on disk first
+        self.flush()
+        version, log = self._load_snapshot(name, version)
+        if log is None:
+            raise ValueError(f"Whiteboard '{name}' not found")
+        os.makedirs(output_dir, exist_ok=True)
+        safe_name = "".join(c if c.isalnum() or c in "-_" else "_" for c in name)
+        # Version and a unique suffix: concurrent exports of the same board never overwrite each other
+        output_path = os.path.join(output_dir, f"{safe_name}-v{version}-{uuid.uuid4().hex[:8]}.{fmt}")
+        objects = log.materialize()["objects"]
+        if fmt == "svg":
+            with open(output_path, "w", encoding="utf-8") as f:
+                f.write(render_svg(objects))
+        elif fmt == "png":
+            render_png(objects).save(output_path)
+        else:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        return os.path.abspath(output_path)
+
+
+def _style(obj):
+    """Return (stroke, fill, stroke width) for a fabric.js object."""
+    return obj.get("stroke") or "#000000", obj.get("fill") or "none", obj.get("strokeWidth") or 1
+
+
+def render_svg(objects, width=CANVAS_WIDTH, height=CANVAS_HEIGHT):
+    """Render fabric.js canvas objects (paths, rectangles, circles) as an SVG document."""
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}">',
+        f'<rect width="{width}" height="{height}" fill="#FFFFFF"/>',
+    ]
+    for obj in objects:
+        stroke, fill, stroke_width = _style(obj)
+        style = (f'stroke="{stroke}" fill="{fill}" stroke-width="{stroke_width}" '
+                 f'stroke-linecap="round" stroke-linejoin="round"')
+        scale_x, scale_y = obj.get("scaleX", 1), obj.get("scaleY", 1)
+        if obj.get("type") == "path":
+            d = " ".join(" ".join(str(part) for part in segment) for segment in obj.get("path", []))
+            parts.append(f'<path d="{d}" {style}/>')
+        elif obj.get("type") == "rect":
+            parts.append(f'<rect x="{obj["left"]}" y="{obj["top"]}" width="{obj["width"] * scale_x}" '
+                         f'height="{obj["height"] * scale_y}" {style}/>')
+        elif obj.get("type") == "circle":
+            rx, ry = obj["radius"] * scale_x, obj["radius"] * scale_y
+            parts.append(f'<ellipse cx="{obj["left"] + rx}" cy="{obj["top"] + ry}" '
+                         f'rx="{rx}" ry="{ry}" {style}/>')
+    parts.append("</svg>")
+    return "\n".join(parts)
+
+
+def _pil_color(value):
+    """Convert a CSS color (including rgba() with a 0-1 alpha) for Pillow."""
+    if value is None or value == "none":
+        return None
+    if value.startswith("rgba("):
+        r, g, b, a = (part.strip() for part in value[5:-1].split(","))
+        return int(r), int(g), int(b), int(round(float(a) * 255))
+    return value
+
+
+def render_png(objects, width=CANVAS_WIDTH, height=CANVAS_HEIGHT):
+    """Render fabric.js canvas objects to a Pillow image.
+
+    Raises:
+        RuntimeError: If Pillow is not installed
+    """
+    if Image is None:
+        raise RuntimeError("PNG export requires the Pillow package")
+    image = Image.new("RGBA", (width, height), "#FFFFFF")
+    draw = ImageDraw.Draw(image, "RGBA")
+    for obj in objects:
+        stroke, fill, stroke_width = _style(obj)
+        stroke, fill = _pil_color(stroke), _pil_color(fill)
+        stroke_width = max(1, int(round(stroke_width)))
+        scale_x, scale_y = obj.get("scaleX", 1), obj.get("scaleY", 1)
+        if obj.get("type") == "path":
+            # Segment end points are close enough to the curve for freehand strokes
+            points = [(segment[-2], segment[-1]) for segment in obj.get("path", []) if len(segment) >= 3]
+            if len(points) > 1:
+                draw.line(points, fill=stroke, width=stroke_width, joint="curve")
+        elif obj.get("type") == "rect":
+            box = [obj["left"], obj["top"],
+                   obj["left"] + obj["width"] * scale_x, obj["top"] + obj["height"] * scale_y]
+            draw.rectangle(box, outline=stroke, fill=fill, width=stroke_width)
+        elif obj.get("type") == "circle":
+            box = [obj["left"], obj["top"],
+                   obj["left"] + 2 * obj["radius"] * scale_x, obj["top"] + 2 * obj["radius"] * scale_y]
+            draw.ellipse(box, outline=stroke, fill=fill, width=stroke_width)
+    return image
+
+
+# The store is shared by every session in the process
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_whiteboard_store():
+    """Return the shared WhiteboardStore, creating it on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = WhiteboardStore()
+        return _store